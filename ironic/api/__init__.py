@@ -28,6 +28,100 @@ API_SERVICE_OPTS = [
                default=1000,
                help=_('The maximum number of items returned in a single '
                       'response from a collection resource.')),
+    cfg.IntOpt('bulk_rpc_chunk_size',
+               default=25,
+               min=1,
+               help=_('The maximum number of nodes of a bulk request sent '
+                      'to a conductor in a single RPC call. The nodes of a '
+                      'conductor are sent in several calls if needed, so '
+                      'that each call completes within the RPC timeout.')),
+    cfg.IntOpt('response_cache_size',
+               default=256,
+               help=_('The maximum number of rendered node responses kept '
+                      'in memory by each API worker. Used only when '
+                      'response_cache_ttl is set.')),
+    cfg.IntOpt('response_cache_ttl',
+               default=0,
+               help=_('Number of seconds a rendered node response is served '
+                      'from memory without looking the node(s) up in the '
+                      'database. Changes made by the conductors may not be '
+                      'visible for up to this many seconds. Setting it to 0 '
+                      'disables the cache; ETags are always returned and '
+                      'conditional requests are honored regardless of this '
+                      'option.')),
+    cfg.IntOpt('aggregates_cache_ttl',
+               default=10,
+               help=_('Number of seconds the node counts returned by '
+                      'GET /v1/nodes/aggregates are served from memory '
+                      'instead of being computed again by the database. '
+                      'Changes made by the conductors may not be visible '
+                      'for up to this many seconds. Set to 0 to disable '
+                      'this cache.')),
+    cfg.IntOpt('max_changes_wait',
+               default=60,
+               help=_('The maximum number of seconds a GET /v1/nodes/changes '
+                      'request waits for a change of the state of a node '
+                      'before returning an empty response. Requests asking '
+                      'to wait longer are capped to this value.')),
+    cfg.IntOpt('changes_poll_interval',
+               default=1,
+               help=_('Interval (seconds) between two checks of the '
+                      'database for new changes of the node states, while '
+                      'a GET /v1/nodes/changes request is waiting.')),
+    cfg.IntOpt('changes_settle_time',
+               default=5,
+               min=0,
+               help=_('The sequence number of a change of a node state is '
+                      'allocated before the change is committed, so an '
+                      'earlier change may still be committed after a '
+                      'later one is visible. GET /v1/nodes/changes does '
+                      'not return the changes following a missing '
+                      'sequence number until they are this many seconds '
+                      'old. It must be longer than the transactions '
+                      'updating the nodes, plus the clock difference '
+                      'between the conductors and the API services.')),
+    cfg.IntOpt('changes_seq_increment',
+               default=1,
+               min=1,
+               help=_('The difference between the sequence numbers of '
+                      'consecutive changes of the node states, which is '
+                      'the auto_increment_increment of MySQL. A larger '
+                      'difference is a missing sequence number, see '
+                      'changes_settle_time. Set it to the number of nodes '
+                      'of a Galera cluster which sets '
+                      'auto_increment_increment to it, or every change is '
+                      'held back. A change committed late through another '
+                      'node of a cluster written through several nodes may '
+                      'then be skipped: write through a single node.')),
+    cfg.BoolOpt('enable_profiling',
+                default=False,
+                help=_('Record the time spent by each API request in '
+                       'authentication, pecan hooks, policy checks, database '
+                       'statements, RPC calls, rendering and the rest of the '
+                       'application, and aggregate these timings per route. '
+                       'Adds a small overhead to every request.')),
+    cfg.BoolOpt('profiling_server_timing',
+                default=False,
+                help=_('Return the timings of each request in a '
+                       'Server-Timing header of the response. Used only '
+                       'when enable_profiling is True. WARNING: this '
+                       'discloses internal details and should not be used '
+                       'in a production environment.')),
+    cfg.IntOpt('profiling_report_interval',
+               default=60,
+               help=_('Interval (seconds) between two logs of the aggregated '
+                      'request timings, as JSON. Used only when '
+                      'enable_profiling is True. Set to 0 to never log '
+                      'them.')),
+    cfg.IntOpt('stream_chunk_size',
+               default=1000,
+               help=_('Node and port collections of more than this many items '
+                      'are loaded from the database and sent to the client '
+                      'in chunks of this size, using a chunked response, '
+                      'instead of being rendered in memory at once. Only '
+                      'matters when max_limit is larger than this value. '
+                      'Streamed responses do not have an ETag. Set to 0 to '
+                      'never stream collections.')),
     cfg.StrOpt('public_endpoint',
                default=None,
                help=_("Public URL to use when building the links to the API "
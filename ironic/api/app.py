@@ -24,6 +24,7 @@ from ironic.api import config
 from ironic.api.controllers.base import Version
 from ironic.api import hooks
 from ironic.api import middleware
+from ironic.api.middleware import profiler
 from ironic.common.i18n import _
 
 api_opts = [
@@ -70,6 +71,13 @@ def setup_app(pecan_config=None, extra_hooks=None):
     if pecan_config.app.enable_acl:
         app_hooks.append(hooks.TrustedCallHook())
 
+    custom_renderers = {}
+    if CONF.api.enable_profiling:
+        app_hooks = [profiler.TimedHook(hook) for hook in app_hooks]
+        app_hooks.append(profiler.ProfilerHook())
+        custom_renderers['wsmejson'] = profiler.TimedJSONRenderer
+        profiler.install_db_listeners()
+
     pecan.configuration.set_config(dict(pecan_config), overwrite=True)
 
     app = pecan.make_app(
@@ -78,11 +86,17 @@ def setup_app(pecan_config=None, extra_hooks=None):
         debug=CONF.pecan_debug,
         force_canonical=getattr(pecan_config.app, 'force_canonical', True),
         hooks=app_hooks,
+        custom_renderers=custom_renderers,
         wrap_app=middleware.ParsableErrorMiddleware,
     )
 
+    if CONF.api.enable_profiling:
+        app = profiler.PhaseMiddleware(app, 'app')
+
     if pecan_config.app.enable_acl:
         app = acl.install(app, cfg.CONF, pecan_config.app.acl_public_routes)
+        if CONF.api.enable_profiling:
+            app = profiler.PhaseMiddleware(app, 'auth')
 
     # Create a CORS wrapper, and attach ironic-specific defaults that must be
     # included in all CORS responses.
@@ -93,6 +107,9 @@ def setup_app(pecan_config=None, extra_hooks=None):
         expose_headers=[Version.max_string, Version.min_string, Version.string]
     )
 
+    if CONF.api.enable_profiling:
+        app = profiler.ProfilerMiddleware(app)
+
     return app
 
 
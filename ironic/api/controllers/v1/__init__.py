@@ -31,6 +31,8 @@ from ironic.api.controllers import base
 from ironic.api.controllers import link
 from ironic.api.controllers.v1 import chassis
 from ironic.api.controllers.v1 import driver
+from ironic.api.controllers.v1 import image_cache
+from ironic.api.controllers.v1 import job
 from ironic.api.controllers.v1 import node
 from ironic.api.controllers.v1 import port
 from ironic.api.controllers.v1 import versions
@@ -134,6 +136,8 @@ class Controller(rest.RestController):
     ports = port.PortsController()
     chassis = chassis.ChassisController()
     drivers = driver.DriversController()
+    jobs = job.JobsController()
+    image_cache = image_cache.ImageCacheController()
 
     @expose.expose(V1)
     def get(self):
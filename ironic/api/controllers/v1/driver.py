@@ -21,6 +21,7 @@ from wsme import types as wtypes
 
 from ironic.api.controllers import base
 from ironic.api.controllers import link
+from ironic.api.controllers.v1 import job
 from ironic.api.controllers.v1 import types
 from ironic.api.controllers.v1 import utils as api_utils
 from ironic.api import expose
@@ -168,6 +169,10 @@ class DriverPassthruController(rest.RestController):
         :param data: body of data to supply to the specified method.
         """
         topic = pecan.request.rpcapi.get_topic_for_driver(driver_name)
+        if api_utils.use_async_job():
+            return job.start_vendor_passthru_job(driver_name, method, topic,
+                                                 data=data,
+                                                 driver_passthru=True)
         return api_utils.vendor_passthru(driver_name, method, topic, data=data,
                                          driver_passthru=True)
 
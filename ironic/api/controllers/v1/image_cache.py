@@ -0,0 +1,134 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import oslo_messaging as messaging
+import pecan
+from pecan import rest
+from six.moves import http_client
+import wsme
+from wsme import types as wtypes
+
+from ironic.api.controllers import base
+from ironic.api.controllers.v1 import job
+from ironic.api.controllers.v1 import utils as api_utils
+from ironic.api import expose
+from ironic.common import exception
+from ironic.common.i18n import _
+
+
+class DeployImages(base.APIBase):
+    """API representation of the deploy kernel and ramdisk of nodes."""
+
+    deploy_kernel = wsme.wsattr(wtypes.text, mandatory=True)
+    """The UUID or href of the deploy kernel"""
+
+    deploy_ramdisk = wsme.wsattr(wtypes.text, mandatory=True)
+    """The UUID or href of the deploy ramdisk"""
+
+
+class ImageCachePrewarm(base.APIBase):
+    """API representation of a request to pre-warm the image caches.
+
+    See ImageCacheController.prewarm().
+    """
+
+    images = [wtypes.text]
+    """The UUIDs or hrefs of the instance images"""
+
+    deploy_images = [DeployImages]
+    """The deploy kernels and ramdisks"""
+
+    pin_time = wsme.wsattr(wtypes.IntegerType(minimum=0))
+    """The number of seconds during which the images are not evicted"""
+
+
+class ConductorJob(base.APIBase):
+    """API representation of the job started on a conductor, if any."""
+
+    conductor = wtypes.text
+    """The hostname of the conductor"""
+
+    status_code = int
+    """202 if the job was started, or the HTTP status code of the error"""
+
+    error = wtypes.text
+    """The error message, if the job could not be started"""
+
+    job = job.Job
+    """The job reporting the progress of the conductor"""
+
+
+class ConductorJobCollection(base.APIBase):
+    """API representation of the jobs started on the conductors."""
+
+    jobs = [ConductorJob]
+    """A list with the job of each conductor"""
+
+
+class ImageCacheController(rest.RestController):
+    """REST controller for the master image caches of the conductors."""
+
+    _custom_actions = {
+        'prewarm': ['POST'],
+    }
+
+    @expose.expose(ConductorJobCollection, body=ImageCachePrewarm,
+                   status_code=http_client.ACCEPTED)
+    def prewarm(self, request):
+        """Download images into the master image caches of all conductors.
+
+        Before a wave of deployments, this saves the first deployments
+        handled by each conductor from all missing the caches at once and
+        waiting for the same downloads. Each conductor downloads the images
+        in the background, reporting its progress in a job, and protects
+        them from eviction for the given time.
+
+        :param request: the instance images and the deploy kernels and
+            ramdisks to download, and optionally the number of seconds
+            during which they are not evicted, defaulting to the
+            configuration of each conductor.
+        :returns: the job started on each conductor, or the error which
+            prevented it.
+        """
+        if not api_utils.allow_image_cache_prewarm():
+            raise exception.NotFound()
+
+        images = request.images or []
+        deploy_images = [{'deploy_kernel': deploy.deploy_kernel,
+                          'deploy_ramdisk': deploy.deploy_ramdisk}
+                         for deploy in request.deploy_images or []]
+        if not images and not deploy_images:
+            raise wsme.exc.ClientSideError(
+                _("No image to download was given."),
+                status_code=http_client.BAD_REQUEST)
+        api_utils.validate_bulk_size(images + deploy_images)
+        pin_time = request.pin_time
+        if pin_time == wtypes.Unset:
+            pin_time = None
+
+        context = pecan.request.context
+        topics = pecan.request.rpcapi.get_conductor_topics()
+        results = []
+        for hostname in sorted(topics):
+            try:
+                rpc_job = pecan.request.rpcapi.prewarm_image_cache(
+                    context, images, deploy_images, pin_time=pin_time,
+                    topic=topics[hostname])
+            except (exception.IronicException,
+                    messaging.MessagingException) as e:
+                results.append(ConductorJob(conductor=hostname,
+                                            **api_utils.bulk_error(e)))
+            else:
+                results.append(ConductorJob(
+                    conductor=hostname, status_code=http_client.ACCEPTED,
+                    job=job.Job.convert_with_links(rpc_job)))
+        return ConductorJobCollection(jobs=results)
@@ -0,0 +1,186 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+import pecan
+from pecan import rest
+from six.moves import http_client
+import wsme
+from wsme import types as wtypes
+
+from ironic.api.controllers import base
+from ironic.api.controllers import link
+from ironic.api.controllers.v1 import types
+from ironic.api.controllers.v1 import utils as api_utils
+from ironic.api import expose
+from ironic.common import exception
+from ironic.common.i18n import _
+from ironic.common import states
+from ironic import objects
+
+
+# The jobs whose result reports their progress while they run
+_PROGRESS_METHODS = ('prewarm_image_cache',)
+
+
+def _format_result(method, result):
+    """Return the result of a job as the synchronous call would."""
+    value = result['return']
+    if method == 'get_supported_boot_devices':
+        return {'supported_boot_devices': value}
+    if method == 'get_console_information':
+        # NOTE: the job of a disabled console returns no information
+        return {'console_enabled': value is not None, 'console_info': value}
+    if method in ('vendor_passthru', 'driver_vendor_passthru'):
+        return value['return']
+    return value
+
+
+class Job(base.APIBase):
+    """API representation of an asynchronous job.
+
+    A job is a synchronous call, for example a vendor passthru method, run
+    in the background by a conductor on behalf of the API.
+    """
+
+    uuid = types.uuid
+    """The UUID of the job"""
+
+    node_uuid = wsme.wsattr(types.uuid, readonly=True)
+    """The UUID of the node the job is about, if any"""
+
+    method = wsme.wsattr(wtypes.text, readonly=True)
+    """The name of the call run by the job"""
+
+    state = wsme.wsattr(wtypes.text, readonly=True)
+    """The state of the job: pending, running, succeeded or failed"""
+
+    status_code = wsme.wsattr(int, readonly=True)
+    """The HTTP status code the synchronous call would have returned"""
+
+    result = wsme.wsattr(types.jsontype, readonly=True)
+    """The body the call would have returned, or the progress of the job"""
+
+    last_error = wsme.wsattr(wtypes.text, readonly=True)
+    """The error message of the call, if failed"""
+
+    links = wsme.wsattr([link.Link], readonly=True)
+    """A list containing a self link and associated job links"""
+
+    def __init__(self, **kwargs):
+        self.fields = []
+        for field in objects.Job.fields:
+            # Skip fields we do not expose.
+            if not hasattr(self, field):
+                continue
+            self.fields.append(field)
+            setattr(self, field, kwargs.get(field, wtypes.Unset))
+
+        self.fields.append('node_uuid')
+        setattr(self, 'node_uuid', kwargs.get('node_uuid', wtypes.Unset))
+
+    @staticmethod
+    def _convert_with_links(job, url):
+        job.links = [link.Link.make_link('self', url, 'jobs', job.uuid),
+                     link.Link.make_link('bookmark', url, 'jobs', job.uuid,
+                                         bookmark=True)
+                     ]
+        return job
+
+    @classmethod
+    def convert_with_links(cls, rpc_job):
+        job = Job(**rpc_job.as_dict())
+        if rpc_job.node_id is not None:
+            try:
+                job.node_uuid = objects.Node.get_by_id(
+                    pecan.request.context, rpc_job.node_id).uuid
+            except exception.NodeNotFound:
+                job.node_uuid = None
+        else:
+            job.node_uuid = None
+
+        if rpc_job.result and (rpc_job.state == states.JOB_SUCCEEDED or
+                               rpc_job.method in _PROGRESS_METHODS):
+            job.result = _format_result(rpc_job.method, rpc_job.result)
+        else:
+            job.result = None
+
+        return cls._convert_with_links(job, pecan.request.public_url)
+
+    @classmethod
+    def sample(cls):
+        time = datetime.datetime(2000, 1, 1, 12, 0, 0)
+        sample = cls(uuid='7a5b9ec3-24d5-4cb9-bda8-1fc46ba6d5d1',
+                     node_uuid='1be26c0b-03f2-4d2e-ae87-c02d7f33c123',
+                     method='get_boot_device', state=states.JOB_SUCCEEDED,
+                     status_code=http_client.OK,
+                     result={'boot_device': 'pxe', 'persistent': False},
+                     last_error=None, created_at=time, updated_at=time)
+        return cls._convert_with_links(sample, 'http://localhost:6385')
+
+
+def start_job(method, topic, **kwargs):
+    """Have a conductor run a synchronous call as a job.
+
+    :param method: the name of the RPC method to call.
+    :param topic: the RPC topic of the conductor to run the job.
+    :param kwargs: the arguments of the RPC method, except the context.
+    :returns: A WSME response object to be returned by the API, with the
+              202 (Accepted) status code and the new job as body.
+    """
+    rpc_job = pecan.request.rpcapi.start_job(pecan.request.context, method,
+                                             kwargs, topic=topic)
+    pecan.response.location = link.build_url('jobs', rpc_job.uuid)
+    pecan.response.headers['Preference-Applied'] = 'respond-async'
+    return wsme.api.Response(Job.convert_with_links(rpc_job),
+                             status_code=http_client.ACCEPTED,
+                             return_type=Job)
+
+
+def start_vendor_passthru_job(ident, method, topic, data=None,
+                              driver_passthru=False):
+    """Have a conductor run a vendor passthru method as a job.
+
+    The parameters are the ones of api_utils.vendor_passthru().
+
+    :returns: A WSME response object to be returned by the API.
+    """
+    if not method:
+        raise wsme.exc.ClientSideError(_("Method not specified"))
+
+    if data is None:
+        data = {}
+
+    kwargs = {'driver_method': method,
+              'http_method': pecan.request.method.upper(),
+              'info': data}
+    if driver_passthru:
+        return start_job('driver_vendor_passthru', topic, driver_name=ident,
+                         **kwargs)
+    return start_job('vendor_passthru', topic, node_id=ident, **kwargs)
+
+
+class JobsController(rest.RestController):
+    """REST controller for asynchronous jobs."""
+
+    @expose.expose(Job, types.uuid)
+    def get_one(self, job_uuid):
+        """Retrieve information about the given job.
+
+        :param job_uuid: UUID of a job.
+        """
+        if not api_utils.allow_async_jobs():
+            raise exception.NotFound()
+
+        rpc_job = objects.Job.get_by_uuid(pecan.request.context, job_uuid)
+        return Job.convert_with_links(rpc_job)
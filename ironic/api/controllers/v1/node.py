@@ -14,11 +14,15 @@
 #    under the License.
 
 import ast
+import collections
 import datetime
+import json
+import time
 
 from oslo_config import cfg
 from oslo_log import log
 from oslo_utils import strutils
+from oslo_utils import timeutils
 from oslo_utils import uuidutils
 import pecan
 from pecan import rest
@@ -29,7 +33,9 @@ from wsme import types as wtypes
 from ironic.api.controllers import base
 from ironic.api.controllers import link
 from ironic.api.controllers.v1 import collection
+from ironic.api.controllers.v1 import job
 from ironic.api.controllers.v1 import port
+from ironic.api.controllers.v1 import serializer
 from ironic.api.controllers.v1 import types
 from ironic.api.controllers.v1 import utils as api_utils
 from ironic.api.controllers.v1 import versions
@@ -41,7 +47,7 @@ from ironic import objects
 
 
 CONF = cfg.CONF
-CONF.import_opt('heartbeat_timeout', 'ironic.conductor.manager',
+CONF.import_opt('heartbeat_timeout', 'ironic.conductor.options',
                 group='conductor')
 
 LOG = log.getLogger(__name__)
@@ -59,6 +65,11 @@ _VENDOR_METHODS = {}
 _DEFAULT_RETURN_FIELDS = ('instance_uuid', 'maintenance', 'power_state',
                           'provision_state', 'uuid', 'name')
 
+# Fields nodes can be grouped by in GET /v1/nodes/aggregates
+_AGGREGATE_FIELDS = ('driver', 'maintenance', 'power_state',
+                     'provision_state', 'target_power_state',
+                     'target_provision_state')
+
 # Minimum API version to use for certain verbs
 MIN_VERB_VERSIONS = {
     # v1.4 added the MANAGEABLE state and two verbs to move nodes into
@@ -76,25 +87,31 @@ PROVISION_ACTION_STATES = (ir_states.VERBS['manage'],
                            ir_states.VERBS['abort'])
 
 
-def hide_fields_in_newer_versions(obj):
+def _hidden_fields():
+    """Return the node fields hidden in the requested API version."""
+    hidden = set()
     # if requested version is < 1.3, hide driver_internal_info
     if pecan.request.version.minor < versions.MINOR_3_DRIVER_INTERNAL_INFO:
-        obj.driver_internal_info = wsme.Unset
+        hidden.add('driver_internal_info')
 
     if not api_utils.allow_node_logical_names():
-        obj.name = wsme.Unset
+        hidden.add('name')
 
     # if requested version is < 1.6, hide inspection_*_at fields
     if pecan.request.version.minor < versions.MINOR_6_INSPECT_STATE:
-        obj.inspection_finished_at = wsme.Unset
-        obj.inspection_started_at = wsme.Unset
+        hidden.update(('inspection_finished_at', 'inspection_started_at'))
 
     if pecan.request.version.minor < versions.MINOR_7_NODE_CLEAN:
-        obj.clean_step = wsme.Unset
+        hidden.add('clean_step')
 
     if pecan.request.version.minor < versions.MINOR_12_RAID_CONFIG:
-        obj.raid_config = wsme.Unset
-        obj.target_raid_config = wsme.Unset
+        hidden.update(('raid_config', 'target_raid_config'))
+    return hidden
+
+
+def hide_fields_in_newer_versions(obj):
+    for field in _hidden_fields():
+        setattr(obj, field, wsme.Unset)
 
 
 def assert_juno_provision_state_name(obj):
@@ -110,6 +127,85 @@ def check_allow_management_verbs(verb):
         raise exception.NotAcceptable()
 
 
+def check_power_target(rpc_node, node_ident, target):
+    """Check that the power state of a node can be changed to a target.
+
+    :param rpc_node: the RPC object of the node.
+    :param node_ident: the UUID or logical name of the node, as requested.
+    :param target: the desired power state of the node.
+    :raises: InvalidStateRequested if the requested target state is not
+             valid or if the node is being cleaned.
+    """
+    # TODO(lucasagomes): Test if it's able to transition to the
+    #                    target state from the current one
+    if target not in [ir_states.POWER_ON,
+                      ir_states.POWER_OFF,
+                      ir_states.REBOOT]:
+        raise exception.InvalidStateRequested(
+            action=target, node=node_ident,
+            state=rpc_node.power_state)
+
+    # Don't change power state for nodes being cleaned
+    elif rpc_node.provision_state in (ir_states.CLEANWAIT,
+                                      ir_states.CLEANING):
+        raise exception.InvalidStateRequested(
+            action=target, node=node_ident,
+            state=rpc_node.provision_state)
+
+
+def check_provision_target(rpc_node, target, configdrive=None):
+    """Check that a node can be moved to a provision state.
+
+    check_allow_management_verbs() must have been called for the target.
+
+    :param rpc_node: the RPC object of the node.
+    :param target: the desired provision state of the node or verb.
+    :param configdrive: Optional. The configdrive of the request.
+    :raises: NodeInMaintenance if the node must be deployed but is in
+             maintenance mode.
+    :raises: NodeLocked if the node is being operated on.
+    :raises: InvalidStateRequested if the requested transition is not
+             possible from the current state, or is not understood.
+    :raises: ClientSideError if a configdrive is given for another target
+             than "active".
+    """
+    if (target in (ir_states.ACTIVE, ir_states.REBUILD)
+            and rpc_node.maintenance):
+        raise exception.NodeInMaintenance(op=_('provisioning'),
+                                          node=rpc_node.uuid)
+
+    m = ir_states.machine.copy()
+    m.initialize(rpc_node.provision_state)
+    if not m.is_actionable_event(ir_states.VERBS.get(target, target)):
+        # Normally, we let the task manager recognize and deal with
+        # NodeLocked exceptions. However, that isn't done until the RPC
+        # calls below.
+        # In order to main backward compatibility with our API HTTP
+        # response codes, we have this check here to deal with cases where
+        # a node is already being operated on (DEPLOYING or such) and we
+        # want to continue returning 409. Without it, we'd return 400.
+        if rpc_node.reservation:
+            raise exception.NodeLocked(node=rpc_node.uuid,
+                                       host=rpc_node.reservation)
+
+        raise exception.InvalidStateRequested(
+            action=target, node=rpc_node.uuid,
+            state=rpc_node.provision_state)
+
+    if configdrive and target != ir_states.ACTIVE:
+        msg = (_('Adding a config drive is only supported when setting '
+                 'provision state to %s') % ir_states.ACTIVE)
+        raise wsme.exc.ClientSideError(
+            msg, status_code=http_client.BAD_REQUEST)
+
+    if target not in (ir_states.ACTIVE, ir_states.REBUILD,
+                      ir_states.DELETED, ir_states.VERBS['inspect'],
+                      ) + PROVISION_ACTION_STATES:
+        msg = (_('The requested action "%(action)s" could not be '
+                 'understood.') % {'action': target})
+        raise exception.InvalidStateRequested(message=msg)
+
+
 class BootDeviceController(rest.RestController):
 
     _custom_actions = {
@@ -124,11 +220,16 @@ class BootDeviceController(rest.RestController):
                           supported boot devices, if false return the
                           current boot device. Default: False.
         :returns: The current boot device or a list of the supported
-                  boot devices.
+                  boot devices, or a response with the job running the
+                  call if the client asked for an asynchronous response.
 
         """
         rpc_node = api_utils.get_rpc_node(node_ident)
         topic = pecan.request.rpcapi.get_topic_for(rpc_node)
+        if api_utils.use_async_job():
+            method = ('get_supported_boot_devices' if supported
+                      else 'get_boot_device')
+            return job.start_job(method, topic, node_id=rpc_node.uuid)
         if supported:
             return pecan.request.rpcapi.get_supported_boot_devices(
                 pecan.request.context, rpc_node.uuid, topic)
@@ -184,6 +285,8 @@ class BootDeviceController(rest.RestController):
 
         """
         boot_devices = self._get_boot_device(node_ident, supported=True)
+        if isinstance(boot_devices, wsme.api.Response):
+            return boot_devices
         return {'supported_boot_devices': boot_devices}
 
 
@@ -219,6 +322,9 @@ class NodeConsoleController(rest.RestController):
         """
         rpc_node = api_utils.get_rpc_node(node_ident)
         topic = pecan.request.rpcapi.get_topic_for(rpc_node)
+        if api_utils.use_async_job():
+            return job.start_job('get_console_information', topic,
+                                 node_id=rpc_node.uuid)
         try:
             console = pecan.request.rpcapi.get_console_information(
                 pecan.request.context, rpc_node.uuid, topic)
@@ -372,24 +478,9 @@ class NodeStatesController(rest.RestController):
                  state is not valid or if the node is in CLEANING state.
 
         """
-        # TODO(lucasagomes): Test if it's able to transition to the
-        #                    target state from the current one
         rpc_node = api_utils.get_rpc_node(node_ident)
         topic = pecan.request.rpcapi.get_topic_for(rpc_node)
-
-        if target not in [ir_states.POWER_ON,
-                          ir_states.POWER_OFF,
-                          ir_states.REBOOT]:
-            raise exception.InvalidStateRequested(
-                action=target, node=node_ident,
-                state=rpc_node.power_state)
-
-        # Don't change power state for nodes being cleaned
-        elif rpc_node.provision_state in (ir_states.CLEANWAIT,
-                                          ir_states.CLEANING):
-            raise exception.InvalidStateRequested(
-                action=target, node=node_ident,
-                state=rpc_node.provision_state)
+        check_power_target(rpc_node, node_ident, target)
 
         pecan.request.rpcapi.change_node_power_state(pecan.request.context,
                                                      rpc_node.uuid, target,
@@ -426,35 +517,7 @@ class NodeStatesController(rest.RestController):
         check_allow_management_verbs(target)
         rpc_node = api_utils.get_rpc_node(node_ident)
         topic = pecan.request.rpcapi.get_topic_for(rpc_node)
-
-        if (target in (ir_states.ACTIVE, ir_states.REBUILD)
-                and rpc_node.maintenance):
-            raise exception.NodeInMaintenance(op=_('provisioning'),
-                                              node=rpc_node.uuid)
-
-        m = ir_states.machine.copy()
-        m.initialize(rpc_node.provision_state)
-        if not m.is_actionable_event(ir_states.VERBS.get(target, target)):
-            # Normally, we let the task manager recognize and deal with
-            # NodeLocked exceptions. However, that isn't done until the RPC
-            # calls below.
-            # In order to main backward compatibility with our API HTTP
-            # response codes, we have this check here to deal with cases where
-            # a node is already being operated on (DEPLOYING or such) and we
-            # want to continue returning 409. Without it, we'd return 400.
-            if rpc_node.reservation:
-                raise exception.NodeLocked(node=rpc_node.uuid,
-                                           host=rpc_node.reservation)
-
-            raise exception.InvalidStateRequested(
-                action=target, node=rpc_node.uuid,
-                state=rpc_node.provision_state)
-
-        if configdrive and target != ir_states.ACTIVE:
-            msg = (_('Adding a config drive is only supported when setting '
-                     'provision state to %s') % ir_states.ACTIVE)
-            raise wsme.exc.ClientSideError(
-                msg, status_code=http_client.BAD_REQUEST)
+        check_provision_target(rpc_node, target, configdrive)
 
         # Note that there is a race condition. The node state(s) could change
         # by the time the RPC call is made and the TaskManager manager gets a
@@ -473,13 +536,9 @@ class NodeStatesController(rest.RestController):
         elif target == ir_states.VERBS['inspect']:
             pecan.request.rpcapi.inspect_hardware(
                 pecan.request.context, rpc_node.uuid, topic=topic)
-        elif target in PROVISION_ACTION_STATES:
+        else:
             pecan.request.rpcapi.do_provisioning_action(
                 pecan.request.context, rpc_node.uuid, target, topic)
-        else:
-            msg = (_('The requested action "%(action)s" could not be '
-                     'understood.') % {'action': target})
-            raise exception.InvalidStateRequested(message=msg)
 
         # Set the HTTP Location Header
         url_args = '/'.join([node_ident, 'states'])
@@ -735,6 +794,86 @@ class NodePatchType(types.JsonPatchType):
                            '/raid_config', '/target_raid_config']
 
 
+class BulkPort(base.APIBase):
+    """API representation of a port created along with its node.
+
+    See NodesController.bulk().
+    """
+
+    uuid = types.uuid
+    """Unique UUID for this port"""
+
+    address = wsme.wsattr(types.macaddress, mandatory=True)
+    """MAC Address for this port"""
+
+    extra = {wtypes.text: types.jsontype}
+    """This port's meta data"""
+
+
+class BulkNode(Node):
+    """API representation of a node created by a bulk request.
+
+    See NodesController.bulk().
+    """
+
+    ports = [BulkPort]
+    """The ports to create for this node"""
+
+
+class NodeBulkPatch(base.APIBase):
+    """API representation of the update of a node in a bulk request.
+
+    See NodesController.bulk_update().
+    """
+
+    _patch = None
+
+    def _get_patch(self):
+        return self._patch
+
+    def _set_patch(self, value):
+        # NOTE: the items were already validated when the request body was
+        # parsed, NodePatchType.validate() turned them into dicts which a
+        # wsattr would try to validate again.
+        self._patch = value
+
+    node_ident = wsme.wsattr(types.uuid_or_name, mandatory=True)
+    """The UUID or logical name of the node"""
+
+    patch = wsme.wsproperty([NodePatchType], _get_patch, _set_patch,
+                            mandatory=True)
+    """The JSON patch to apply to the node"""
+
+
+class NodesPowerState(base.APIBase):
+    """API representation of the power state change of several nodes.
+
+    See NodesController.bulk_power().
+    """
+
+    node_idents = wsme.wsattr([types.uuid_or_name], mandatory=True)
+    """The UUIDs or logical names of the nodes"""
+
+    target = wsme.wsattr(wtypes.text, mandatory=True)
+    """The desired power state of the nodes"""
+
+
+class NodesProvisionState(base.APIBase):
+    """API representation of the provision state change of several nodes.
+
+    See NodesController.bulk_provision().
+    """
+
+    node_idents = wsme.wsattr([types.uuid_or_name], mandatory=True)
+    """The UUIDs or logical names of the nodes"""
+
+    target = wsme.wsattr(wtypes.text, mandatory=True)
+    """The desired provision state of the nodes or verb"""
+
+    configdrive = wtypes.text
+    """A gzipped and base64 encoded configdrive for all the nodes"""
+
+
 class NodeCollection(collection.Collection):
     """API representation of a collection of nodes."""
 
@@ -760,6 +899,72 @@ class NodeCollection(collection.Collection):
         return sample
 
 
+class NodeSerializer(serializer.ResourceSerializer):
+    """Render RPC nodes like Node.convert_with_links() and WSME would."""
+
+    api_type = Node
+    collection_type = NodeCollection
+    resource = 'nodes'
+    link_attributes = ('links', 'ports', 'states')
+
+    def __init__(self, fields=None, url=None):
+        self._chassis_uuids = {}
+        self._show_password = pecan.request.context.show_password
+        self._show_states_links = (
+            api_utils.allow_links_node_states_and_driver_properties())
+        super(NodeSerializer, self).__init__(fields=fields, url=url)
+
+    def hidden_attributes(self):
+        return _hidden_fields()
+
+    def getter(self, key):
+        if key == 'chassis_uuid':
+            return self._get_chassis_uuid
+        if key == 'driver_info' and not self._show_password:
+            return self._get_masked_driver_info
+        if (key == 'provision_state' and pecan.request.version.minor <
+                versions.MINOR_2_AVAILABLE_STATE):
+            return self._get_juno_provision_state
+
+    def _get_chassis_uuid(self, rpc_node):
+        chassis_id = rpc_node.chassis_id
+        if not chassis_id:
+            # NOTE: Node.__init__() leaves chassis_uuid unset in this case
+            return wtypes.Unset
+        try:
+            return self._chassis_uuids[chassis_id]
+        except KeyError:
+            chassis = objects.Chassis.get(self.context, chassis_id)
+            self._chassis_uuids[chassis_id] = chassis.uuid
+            return chassis.uuid
+
+    @staticmethod
+    def _get_masked_driver_info(rpc_node):
+        return serializer.mask_secrets(rpc_node.driver_info)
+
+    @staticmethod
+    def _get_juno_provision_state(rpc_node):
+        if rpc_node.provision_state == ir_states.AVAILABLE:
+            return ir_states.NOSTATE
+        return rpc_node.provision_state
+
+    def links(self, uuid):
+        links = super(NodeSerializer, self).links(uuid)
+        if self.fields is None:
+            links['ports'] = [
+                serializer.make_link('self', self._self_url + uuid + '/ports'),
+                serializer.make_link('bookmark',
+                                     self._bookmark_url + uuid + '/ports')]
+            if self._show_states_links:
+                links['states'] = [
+                    serializer.make_link('self',
+                                         self._self_url + uuid + '/states'),
+                    serializer.make_link('bookmark',
+                                         self._bookmark_url + uuid +
+                                         '/states')]
+        return links
+
+
 class NodeVendorPassthruController(rest.RestController):
     """REST controller for VendorPassthru.
 
@@ -804,6 +1009,9 @@ class NodeVendorPassthruController(rest.RestController):
         # Raise an exception if node is not found
         rpc_node = api_utils.get_rpc_node(node_ident)
         topic = pecan.request.rpcapi.get_topic_for(rpc_node)
+        if api_utils.use_async_job():
+            return job.start_vendor_passthru_job(rpc_node.uuid, method,
+                                                 topic, data=data)
         return api_utils.vendor_passthru(rpc_node.uuid, method, topic,
                                          data=data)
 
@@ -822,6 +1030,7 @@ class NodeMaintenanceController(rest.RestController):
             raise e
         pecan.request.rpcapi.update_node(pecan.request.context,
                                          rpc_node, topic=topic)
+        api_utils.invalidate_response_cache()
 
     @expose.expose(None, types.uuid_or_name, wtypes.text,
                    status_code=http_client.ACCEPTED)
@@ -844,6 +1053,33 @@ class NodeMaintenanceController(rest.RestController):
         self._set_maintenance(node_ident, False)
 
 
+def _get_settled_changes(changes, since):
+    """Return the changes which cannot be preceded by a missing one.
+
+    The sequence numbers are allocated when the changes are inserted, not
+    when they are committed, so a missing number may still show up. The
+    changes following it are held back until they are older than
+    [api]changes_settle_time; a number still missing then was rolled back.
+    Consecutive numbers differ by [api]changes_seq_increment.
+
+    :param changes: the changes after "since", by sequence number.
+    :param since: the sequence number of the last change already seen.
+    :returns: the first changes, up to the first recent one following a
+              missing number.
+    """
+    settled_before = timeutils.utcnow() - datetime.timedelta(
+        seconds=CONF.api.changes_settle_time)
+    increment = CONF.api.changes_seq_increment
+    previous = since
+    for index, change in enumerate(changes):
+        if (change['seq'] - previous > increment and
+                change['changed_at'] is not None and
+                change['changed_at'] > settled_before):
+            return changes[:index]
+        previous = change['seq']
+    return changes
+
+
 class NodesController(rest.RestController):
     """REST controller for Nodes."""
 
@@ -874,6 +1110,12 @@ class NodesController(rest.RestController):
     _custom_actions = {
         'detail': ['GET'],
         'validate': ['GET'],
+        'bulk': ['POST'],
+        'bulk_update': ['POST'],
+        'bulk_power': ['POST'],
+        'bulk_provision': ['POST'],
+        'aggregates': ['GET'],
+        'changes': ['GET'],
     }
 
     invalid_sort_key_list = ['properties', 'driver_info', 'extra',
@@ -891,15 +1133,26 @@ class NodesController(rest.RestController):
         limit = api_utils.validate_limit(limit)
         sort_dir = api_utils.validate_sort_dir(sort_dir)
 
+        if sort_key in self.invalid_sort_key_list:
+            raise exception.InvalidParameterValue(
+                _("The sort_key value %(key)s is an invalid field for "
+                  "sorting") % {'key': sort_key})
+
+        cache_key = api_utils.response_cache_key()
+        response = api_utils.cached_response(cache_key)
+        if response is not None:
+            return response
+
         marker_obj = None
         if marker:
             marker_obj = objects.Node.get_by_uuid(pecan.request.context,
                                                   marker)
 
-        if sort_key in self.invalid_sort_key_list:
-            raise exception.InvalidParameterValue(
-                _("The sort_key value %(key)s is an invalid field for "
-                  "sorting") % {'key': sort_key})
+        parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
+        if associated:
+            parameters['associated'] = associated
+        if maintenance:
+            parameters['maintenance'] = maintenance
 
         if instance_uuid:
             nodes = self._get_nodes_by_instance(instance_uuid)
@@ -914,19 +1167,27 @@ class NodesController(rest.RestController):
             if provision_state:
                 filters['provision_state'] = provision_state
 
-            nodes = objects.Node.list(pecan.request.context, limit, marker_obj,
-                                      sort_key=sort_key, sort_dir=sort_dir,
-                                      filters=filters)
+            context = pecan.request.context
 
-        parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
-        if associated:
-            parameters['associated'] = associated
-        if maintenance:
-            parameters['maintenance'] = maintenance
-        return NodeCollection.convert_with_links(nodes, limit,
-                                                 url=resource_url,
-                                                 fields=fields,
-                                                 **parameters)
+            def fetch(limit, marker):
+                return objects.Node.list(context, limit, marker,
+                                         sort_key=sort_key,
+                                         sort_dir=sort_dir, filters=filters)
+
+            if api_utils.use_streaming(limit):
+                body = NodeSerializer(fields=fields).iter_collection_json(
+                    fetch, limit, CONF.api.stream_chunk_size,
+                    marker=marker_obj, url=resource_url, **parameters)
+                return api_utils.streaming_json_response(body)
+
+            nodes = fetch(limit, marker_obj)
+
+        body = NodeSerializer(fields=fields).collection_to_json(
+            nodes, limit, url=resource_url, **parameters)
+        etag = api_utils.make_etag(body)
+        if api_utils.is_not_modified(etag):
+            return api_utils.not_modified_response(etag)
+        return api_utils.cache_response(cache_key, etag, body)
 
     def _get_nodes_by_instance(self, instance_uuid):
         """Retrieve a node by its instance uuid.
@@ -1064,6 +1325,144 @@ class NodesController(rest.RestController):
                                           limit, sort_key, sort_dir,
                                           resource_url)
 
+    @expose.expose(None, types.listtype, types.uuid, types.boolean,
+                   types.boolean, wtypes.text, wtypes.text)
+    def aggregates(self, group_by=None, chassis_uuid=None, associated=None,
+                   maintenance=None, provision_state=None, driver=None):
+        """Count the nodes, grouped by the values of some of their fields.
+
+        The counting is done by the database. The results are cached for
+        [api]aggregates_cache_ttl seconds.
+
+        :param group_by: Optional, a list of the fields to group the nodes
+                         by, among driver, maintenance, power_state,
+                         provision_state, target_power_state and
+                         target_provision_state. Without it the total
+                         number of nodes is returned. The results are
+                         sorted by these fields, in the order above.
+        :param chassis_uuid: Optional UUID of a chassis, to count only nodes
+                             for that chassis.
+        :param associated: Optional boolean whether to count associated or
+                           unassociated nodes.
+        :param maintenance: Optional boolean value that indicates whether
+                            to count nodes in maintenance mode ("True"), or
+                            not in maintenance mode ("False").
+        :param provision_state: Optional string value to count only nodes in
+                                that provision state.
+        :param driver: Optional string value to count only nodes using that
+                       driver.
+        """
+        if self.from_chassis:
+            raise exception.OperationNotPermitted
+
+        if not api_utils.allow_node_aggregates():
+            raise exception.NotFound()
+
+        api_utils.check_for_invalid_state_and_allow_filter(provision_state)
+        group_by = group_by or []
+        invalid = [f for f in group_by if f not in _AGGREGATE_FIELDS]
+        if invalid:
+            raise exception.InvalidParameterValue(
+                _("Nodes cannot be grouped by %(invalid)s, valid fields are "
+                  "%(fields)s") % {'invalid': ', '.join(invalid),
+                                   'fields': ', '.join(_AGGREGATE_FIELDS)})
+        # NOTE: the order of the items of a listtype is not guaranteed, use
+        # the same order every time so that results are sorted consistently
+        group_by = [f for f in _AGGREGATE_FIELDS if f in group_by]
+
+        cache = api_utils.get_aggregates_cache()
+        cache_key = api_utils.response_cache_key()
+        body = cache.get(cache_key)
+        if body is None:
+            filters = {}
+            if chassis_uuid:
+                filters['chassis_uuid'] = chassis_uuid
+            if associated is not None:
+                filters['associated'] = associated
+            if maintenance is not None:
+                filters['maintenance'] = maintenance
+            if provision_state:
+                filters['provision_state'] = provision_state
+            if driver:
+                filters['driver'] = driver
+            aggregates = objects.Node.get_aggregates(
+                pecan.request.context, group_by, filters=filters)
+            body = json.dumps({'aggregates': aggregates})
+            cache.set(cache_key, body)
+        return api_utils.json_response(body)
+
+    @expose.expose(None, int, int, int)
+    def changes(self, since=None, wait=0, limit=None):
+        """Return the nodes whose state changed after a change sequence.
+
+        The power_state, target_power_state, provision_state and
+        target_provision_state of each node are returned as they were after
+        its last change, along with the sequence number to pass as "since"
+        in the next request.
+
+        :param since: Optional, the sequence number of the last change
+                      already seen. Without it, no node is returned and the
+                      current sequence number is.
+        :param wait: Optional, the maximum number of seconds to wait for a
+                     change, capped to [api]max_changes_wait. Defaults to
+                     0, returning immediately.
+        :param limit: Optional, the maximum number of changes to consider.
+                      This value cannot be larger than the value of
+                      max_limit in the [api] section of the ironic
+                      configuration, or only max_limit changes will be
+                      considered.
+        :raises: NodeChangesExpired (HTTP 410) if the changes after "since"
+                 were already deleted. The client must get the nodes again.
+        """
+        if self.from_chassis:
+            raise exception.OperationNotPermitted
+
+        if not api_utils.allow_node_changes():
+            raise exception.NotFound()
+
+        context = pecan.request.context
+        if since is None:
+            body = {'nodes': [],
+                    'since': objects.Node.get_last_change_seq(context)}
+            return api_utils.json_response(json.dumps(body))
+
+        if since < 0 or wait < 0:
+            raise exception.InvalidParameterValue(
+                _("The since and wait parameters cannot be negative"))
+
+        oldest = objects.Node.get_first_change_seq(context)
+        if oldest and since < oldest - CONF.api.changes_seq_increment:
+            raise exception.NodeChangesExpired(since=since, oldest=oldest)
+
+        limit = api_utils.validate_limit(limit)
+        # NOTE: the API service is monkey patched by eventlet, so waiting
+        # does not block the other requests served by this worker.
+        deadline = time.time() + min(wait, CONF.api.max_changes_wait)
+        while True:
+            changes = _get_settled_changes(
+                objects.Node.get_changes(context, since, limit=limit), since)
+            remaining = deadline - time.time()
+            if changes or remaining <= 0:
+                break
+            time.sleep(min(CONF.api.changes_poll_interval, remaining))
+
+        next_since = changes[-1]['seq'] if changes else since
+        # Only the last change of each node matters to the client
+        last_changes = {}
+        for change in changes:
+            last_changes[change['uuid']] = change
+        nodes = []
+        for change in sorted(last_changes.values(),
+                             key=lambda change: change['seq']):
+            changed_at = change.pop('changed_at')
+            change['changed_at'] = (changed_at.isoformat()
+                                    if changed_at is not None else None)
+            del change['seq']
+            nodes.append(change)
+
+        body = {'nodes': nodes, 'since': next_since}
+        return api_utils.json_response(json.dumps(body))
+
     @expose.expose(wtypes.text, types.uuid_or_name, types.uuid)
     def validate(self, node=None, node_uuid=None):
         """Validate the driver interfaces, using the node's UUID or name.
@@ -1084,6 +1483,9 @@ class NodesController(rest.RestController):
         rpc_node = api_utils.get_rpc_node(node_uuid or node)
 
         topic = pecan.request.rpcapi.get_topic_for(rpc_node)
+        if api_utils.use_async_job():
+            return job.start_job('validate_driver_interfaces', topic,
+                                 node_id=rpc_node.uuid)
         return pecan.request.rpcapi.validate_driver_interfaces(
             pecan.request.context, rpc_node.uuid, topic)
 
@@ -1100,18 +1502,24 @@ class NodesController(rest.RestController):
 
         api_utils.check_allow_specify_fields(fields)
 
+        cache_key = api_utils.response_cache_key()
+        response = api_utils.cached_response(cache_key)
+        if response is not None:
+            return response
+
         rpc_node = api_utils.get_rpc_node(node_ident)
-        return Node.convert_with_links(rpc_node, fields=fields)
+        body = NodeSerializer(fields=fields).to_json(rpc_node)
+        etag = api_utils.make_etag(body)
+        if api_utils.is_not_modified(etag):
+            return api_utils.not_modified_response(etag)
+        return api_utils.cache_response(cache_key, etag, body)
 
-    @expose.expose(Node, body=Node, status_code=http_client.CREATED)
-    def post(self, node):
-        """Create a new node.
+    def _new_node(self, node):
+        """Check a node to create and return the matching RPC object.
 
-        :param node: a node within the request body.
+        :param node: a Node API object.
+        :returns: a new RPC node object, not saved yet.
         """
-        if self.from_chassis:
-            raise exception.OperationNotPermitted
-
         # NOTE(deva): get_topic_for checks if node.driver is in the hash ring
         #             and raises NoValidHost if it is not.
         #             We need to ensure that node has a UUID before it can
@@ -1133,24 +1541,33 @@ class NodesController(rest.RestController):
         self._check_name_acceptable(node.name, error_msg)
         node.provision_state = api_utils.initial_node_provision_state()
 
-        new_node = objects.Node(pecan.request.context,
-                                **node.as_dict())
+        return objects.Node(pecan.request.context, **node.as_dict())
+
+    @expose.expose(Node, body=Node, status_code=http_client.CREATED)
+    def post(self, node):
+        """Create a new node.
+
+        :param node: a node within the request body.
+        """
+        if self.from_chassis:
+            raise exception.OperationNotPermitted
+
+        new_node = self._new_node(node)
         new_node.create()
+        api_utils.invalidate_response_cache()
         # Set the HTTP Location Header
         pecan.response.location = link.build_url('nodes', new_node.uuid)
         return Node.convert_with_links(new_node)
 
-    @wsme.validate(types.uuid, [NodePatchType])
-    @expose.expose(Node, types.uuid_or_name, body=[NodePatchType])
-    def patch(self, node_ident, patch):
-        """Update an existing node.
+    def _prepare_update(self, node_ident, patch):
+        """Check and apply a JSON patch to the RPC object of a node.
 
         :param node_ident: UUID or logical name of a node.
         :param patch: a json PATCH document to apply to this node.
+        :returns: a tuple with the changed (but not saved) RPC node object
+            and the RPC topic of the conductor which should update it. The
+            topic is None if the node should not be updated.
         """
-        if self.from_chassis:
-            raise exception.OperationNotPermitted
-
         rpc_node = api_utils.get_rpc_node(node_ident)
 
         # TODO(lucasagomes): This code is here for backward compatibility
@@ -1163,7 +1580,7 @@ class NodesController(rest.RestController):
             and patch == remove_inst_uuid_patch):
             # The instance_uuid is already removed as part of the node's
             # tear down, skip this update.
-            return Node.convert_with_links(rpc_node)
+            return rpc_node, None
         elif rpc_node.maintenance and patch == remove_inst_uuid_patch:
             LOG.debug('Removing instance uuid %(instance)s from node %(node)s',
                       {'instance': rpc_node.instance_uuid,
@@ -1205,11 +1622,311 @@ class NodesController(rest.RestController):
             e.code = http_client.BAD_REQUEST
             raise e
         self._check_driver_changed_and_console_enabled(rpc_node, node_ident)
+        return rpc_node, topic
+
+    @wsme.validate(types.uuid, [NodePatchType])
+    @expose.expose(Node, types.uuid_or_name, body=[NodePatchType])
+    def patch(self, node_ident, patch):
+        """Update an existing node.
+
+        :param node_ident: UUID or logical name of a node.
+        :param patch: a json PATCH document to apply to this node.
+        """
+        if self.from_chassis:
+            raise exception.OperationNotPermitted
+
+        rpc_node, topic = self._prepare_update(node_ident, patch)
+        if topic is None:
+            return Node.convert_with_links(rpc_node)
+
         new_node = pecan.request.rpcapi.update_node(
             pecan.request.context, rpc_node, topic)
+        api_utils.invalidate_response_cache()
 
         return Node.convert_with_links(new_node)
 
+    @expose.expose(None, body=[BulkNode])
+    def bulk(self, nodes):
+        """Create several nodes, and optionally their ports, at once.
+
+        All the nodes are checked first, then the valid ones are created in
+        a single transaction, and so are their ports.
+
+        :param nodes: a list of nodes, each one possibly with a list of
+            ports to create for it.
+        :returns: a document with, for each node, the HTTP status code and
+            either the new node and the results for its ports, or an error
+            message.
+        """
+        if self.from_chassis:
+            raise exception.OperationNotPermitted
+
+        if not api_utils.allow_bulk_operations():
+            raise exception.NotFound()
+
+        api_utils.validate_bulk_size(nodes)
+
+        results = [None] * len(nodes)
+        new_nodes = []
+        seen = {'uuid': set(), 'name': set(), 'instance_uuid': set()}
+        for index, node in enumerate(nodes):
+            try:
+                rpc_node = self._new_node(node)
+                self._check_bulk_duplicates(rpc_node, seen)
+            except (exception.IronicException, wsme.exc.ClientSideError) as e:
+                results[index] = api_utils.bulk_error(e)
+                continue
+            new_nodes.append((index, rpc_node))
+
+        errors = api_utils.create_many(objects.Node,
+                                       [n for _i, n in new_nodes])
+        created = []
+        for (index, rpc_node), error in zip(new_nodes, errors):
+            if error is None:
+                created.append((index, rpc_node))
+            else:
+                results[index] = api_utils.bulk_error(error)
+
+        new_ports = []
+        seen = {'uuid': set(), 'address': set()}
+        for index, rpc_node in created:
+            ports = nodes[index].ports or []
+            results[index] = {'status_code': http_client.CREATED,
+                              'ports': [None] * len(ports)}
+            for port_index, bulk_port in enumerate(ports):
+                try:
+                    rpc_port = self._new_bulk_port(bulk_port, rpc_node, seen)
+                except exception.IronicException as e:
+                    results[index]['ports'][port_index] = (
+                        api_utils.bulk_error(e))
+                    continue
+                new_ports.append((index, port_index, rpc_port))
+
+        errors = api_utils.create_many(objects.Port,
+                                       [p for _i, _j, p in new_ports])
+        port_serializer = port.PortSerializer(
+            nodes=[n for _i, n in created])
+        for (index, port_index, rpc_port), error in zip(new_ports, errors):
+            if error is None:
+                result = {'status_code': http_client.CREATED,
+                          'port': port_serializer.to_dict(rpc_port)}
+            else:
+                result = api_utils.bulk_error(error)
+            results[index]['ports'][port_index] = result
+
+        node_serializer = NodeSerializer()
+        for index, rpc_node in created:
+            results[index]['node'] = node_serializer.to_dict(rpc_node)
+            if nodes[index].ports in (None, wtypes.Unset):
+                del results[index]['ports']
+
+        if created:
+            api_utils.invalidate_response_cache()
+        return api_utils.json_response(json.dumps({'nodes': results}))
+
+    @staticmethod
+    def _check_bulk_duplicates(rpc_node, seen):
+        """Check that a node does not clash with another one of a request.
+
+        :param rpc_node: a new RPC node object.
+        :param seen: a dict mapping the unique fields of nodes to the set
+            of values already used by other nodes of the request.
+        """
+        if rpc_node.uuid in seen['uuid']:
+            raise exception.NodeAlreadyExists(uuid=rpc_node.uuid)
+        if rpc_node.name and rpc_node.name in seen['name']:
+            raise exception.DuplicateName(name=rpc_node.name)
+        if (rpc_node.instance_uuid and
+                rpc_node.instance_uuid in seen['instance_uuid']):
+            raise exception.InstanceAssociated(
+                instance_uuid=rpc_node.instance_uuid, node=rpc_node.uuid)
+        for field, values in seen.items():
+            values.add(rpc_node[field])
+
+    @staticmethod
+    def _new_bulk_port(bulk_port, rpc_node, seen):
+        """Return the RPC object of a port to create with its node.
+
+        :param bulk_port: a BulkPort API object.
+        :param rpc_node: the RPC object of the node of the port.
+        :param seen: a dict mapping the unique fields of ports to the set
+            of values already used by other ports of the request.
+        :returns: a new RPC port object, not saved yet.
+        """
+        port_uuid = bulk_port.uuid or uuidutils.generate_uuid()
+        if port_uuid in seen['uuid']:
+            raise exception.PortAlreadyExists(uuid=port_uuid)
+        if bulk_port.address in seen['address']:
+            raise exception.MACAlreadyExists(mac=bulk_port.address)
+        seen['uuid'].add(port_uuid)
+        seen['address'].add(bulk_port.address)
+
+        extra = bulk_port.extra
+        if extra in (None, wtypes.Unset):
+            extra = {}
+        return objects.Port(pecan.request.context, uuid=port_uuid,
+                            address=bulk_port.address, extra=extra,
+                            node_id=rpc_node.id)
+
+    @expose.expose(None, body=[NodeBulkPatch])
+    def bulk_update(self, updates):
+        """Update several existing nodes at once.
+
+        All the patches are checked and applied first, then the nodes are
+        sent to their conductors with one RPC call per conductor group, or
+        more for large groups, see [api]bulk_rpc_chunk_size.
+
+        :param updates: a list of node identifiers and of the JSON patch to
+            apply to each node.
+        :returns: a document with, for each node, the HTTP status code and
+            either the updated node or an error message.
+        """
+        if self.from_chassis:
+            raise exception.OperationNotPermitted
+
+        if not api_utils.allow_bulk_operations():
+            raise exception.NotFound()
+
+        api_utils.validate_bulk_size(updates)
+
+        results = [None] * len(updates)
+        by_topic = collections.OrderedDict()
+        for index, update in enumerate(updates):
+            try:
+                rpc_node, topic = self._prepare_update(update.node_ident,
+                                                       update.patch)
+            except (exception.IronicException, wsme.exc.ClientSideError) as e:
+                results[index] = api_utils.bulk_error(e)
+                continue
+            if topic is None:
+                results[index] = rpc_node
+            else:
+                by_topic.setdefault(topic, []).append((index, rpc_node))
+
+        def send(rpc_nodes, topic):
+            return pecan.request.rpcapi.update_nodes(
+                pecan.request.context, rpc_nodes, topic)
+
+        for index, result in api_utils.send_bulk(by_topic, send):
+            results[index] = result
+        if by_topic:
+            api_utils.invalidate_response_cache()
+
+        node_serializer = NodeSerializer()
+        for index, result in enumerate(results):
+            if isinstance(result, objects.Node):
+                results[index] = {'status_code': http_client.OK,
+                                  'node': node_serializer.to_dict(result)}
+        return api_utils.json_response(json.dumps({'nodes': results}))
+
+    @expose.expose(None, body=NodesPowerState)
+    def bulk_power(self, request):
+        """Set the power state of several nodes at once.
+
+        The nodes are checked like PUT /v1/nodes/<node>/states/power does,
+        then sent to their conductors with one RPC call per conductor
+        group. As with the single node endpoint, the power actions run in
+        the background.
+
+        :param request: the identifiers of the nodes and their desired
+            power state.
+        :returns: a document with, for each node, the HTTP status code,
+            202 if the power action was started, and an error message if
+            it was not.
+        """
+        if self.from_chassis:
+            raise exception.OperationNotPermitted
+
+        if not api_utils.allow_bulk_state_changes():
+            raise exception.NotFound()
+
+        def check(rpc_node, node_ident):
+            check_power_target(rpc_node, node_ident, request.target)
+
+        def send(node_ids, topic):
+            return pecan.request.rpcapi.change_nodes_power_state(
+                pecan.request.context, node_ids, request.target, topic)
+
+        return self._bulk_state_change(request.node_idents, check, send)
+
+    @expose.expose(None, body=NodesProvisionState)
+    def bulk_provision(self, request):
+        """Change the provision state of several nodes at once.
+
+        The nodes are checked like PUT /v1/nodes/<node>/states/provision
+        does, then sent to their conductors with one RPC call per conductor
+        group. As with the single node endpoint, the actions run in the
+        background.
+
+        :param request: the identifiers of the nodes, their desired
+            provision state or verb and, optionally, a configdrive for all
+            of them.
+        :returns: a document with, for each node, the HTTP status code,
+            202 if the action was started, and an error message if it was
+            not.
+        """
+        if self.from_chassis:
+            raise exception.OperationNotPermitted
+
+        if not api_utils.allow_bulk_state_changes():
+            raise exception.NotFound()
+
+        target = request.target
+        configdrive = request.configdrive or None
+        check_allow_management_verbs(target)
+
+        def check(rpc_node, node_ident):
+            check_provision_target(rpc_node, target, configdrive)
+
+        def send(node_ids, topic):
+            return pecan.request.rpcapi.do_nodes_provisioning_action(
+                pecan.request.context, node_ids, target,
+                configdrive=configdrive, topic=topic)
+
+        return self._bulk_state_change(request.node_idents, check, send)
+
+    def _bulk_state_change(self, node_idents, check, send):
+        """Change the state of several nodes, with one RPC per conductor.
+
+        Large conductor groups are sent in several RPC calls, see
+        [api]bulk_rpc_chunk_size. A failed RPC call fails its nodes only.
+
+        :param node_idents: the UUIDs or logical names of the nodes.
+        :param check: a callable taking the RPC object and the identifier
+            of a node, and raising an exception if the change is not
+            possible for this node.
+        :param send: a callable taking a list of node UUIDs and an RPC
+            topic, and returning the results of the RPC call.
+        :returns: A WSME response object with the result for each node.
+        """
+        api_utils.validate_bulk_size(node_idents)
+
+        results = [None] * len(node_idents)
+        rpc_nodes = []
+        for index, node_ident in enumerate(node_idents):
+            try:
+                rpc_node = api_utils.get_rpc_node(node_ident)
+                check(rpc_node, node_ident)
+            except (exception.IronicException, wsme.exc.ClientSideError) as e:
+                results[index] = api_utils.bulk_error(e)
+                continue
+            rpc_nodes.append((index, rpc_node))
+
+        by_topic = collections.OrderedDict()
+        topics = pecan.request.rpcapi.get_topics_for(
+            [n for _i, n in rpc_nodes])
+        for (index, rpc_node), topic in zip(rpc_nodes, topics):
+            if isinstance(topic, exception.IronicException):
+                results[index] = api_utils.bulk_error(topic)
+            else:
+                by_topic.setdefault(topic, []).append((index, rpc_node.uuid))
+
+        for index, result in api_utils.send_bulk(by_topic, send):
+            if result is None:
+                result = {'status_code': http_client.ACCEPTED}
+            results[index] = result
+        return api_utils.json_response(json.dumps({'nodes': results}))
+
     @expose.expose(None, types.uuid_or_name,
                    status_code=http_client.NO_CONTENT)
     def delete(self, node_ident):
@@ -1230,3 +1947,4 @@ class NodesController(rest.RestController):
 
         pecan.request.rpcapi.destroy_node(pecan.request.context,
                                           rpc_node.uuid, topic)
+        api_utils.invalidate_response_cache()
@@ -15,6 +15,7 @@
 
 import datetime
 
+from oslo_config import cfg
 from oslo_utils import uuidutils
 import pecan
 from pecan import rest
@@ -25,6 +26,7 @@ from wsme import types as wtypes
 from ironic.api.controllers import base
 from ironic.api.controllers import link
 from ironic.api.controllers.v1 import collection
+from ironic.api.controllers.v1 import serializer
 from ironic.api.controllers.v1 import types
 from ironic.api.controllers.v1 import utils as api_utils
 from ironic.api import expose
@@ -32,6 +34,7 @@ from ironic.common import exception
 from ironic.common.i18n import _
 from ironic import objects
 
+CONF = cfg.CONF
 
 _DEFAULT_RETURN_FIELDS = ('uuid', 'address')
 
@@ -176,6 +179,43 @@ class PortCollection(collection.Collection):
         return sample
 
 
+class PortSerializer(serializer.ResourceSerializer):
+    """Render RPC ports like Port.convert_with_links() and WSME would."""
+
+    api_type = Port
+    collection_type = PortCollection
+    resource = 'ports'
+
+    def __init__(self, fields=None, url=None, nodes=None):
+        """Prepare the serialization plan for the current request.
+
+        :param fields: Optional, a list with a specified set of fields
+            of the resource to be returned.
+        :param url: the base URL of the links.
+        :param nodes: Optional, RPC nodes the ports may belong to, which
+            then do not need to be looked up.
+        """
+        self._node_uuids = dict((node.id, node.uuid)
+                                for node in nodes or ())
+        super(PortSerializer, self).__init__(fields=fields, url=url)
+
+    def getter(self, key):
+        if key == 'node_uuid':
+            return self._get_node_uuid
+
+    def _get_node_uuid(self, rpc_port):
+        node_id = rpc_port.node_id
+        if not node_id:
+            # NOTE: Port.__init__() leaves node_uuid unset in this case
+            return wtypes.Unset
+        try:
+            return self._node_uuids[node_id]
+        except KeyError:
+            node = objects.Node.get(self.context, node_id)
+            self._node_uuids[node_id] = node.uuid
+            return node.uuid
+
+
 class PortsController(rest.RestController):
     """REST controller for Ports."""
 
@@ -209,28 +249,37 @@ class PortsController(rest.RestController):
                 _("The sort_key value %(key)s is an invalid field for "
                   "sorting") % {'key': sort_key})
 
+        context = pecan.request.context
         if node_ident:
             # FIXME(comstud): Since all we need is the node ID, we can
             #                 make this more efficient by only querying
             #                 for that column. This will get cleaned up
             #                 as we move to the object interface.
             node = api_utils.get_rpc_node(node_ident)
-            ports = objects.Port.list_by_node_id(pecan.request.context,
-                                                 node.id, limit, marker_obj,
-                                                 sort_key=sort_key,
-                                                 sort_dir=sort_dir)
+
+            def fetch(limit, marker):
+                return objects.Port.list_by_node_id(context, node.id, limit,
+                                                    marker, sort_key=sort_key,
+                                                    sort_dir=sort_dir)
         elif address:
-            ports = self._get_ports_by_address(address)
+            def fetch(limit, marker):
+                return self._get_ports_by_address(address)
         else:
-            ports = objects.Port.list(pecan.request.context, limit,
-                                      marker_obj, sort_key=sort_key,
-                                      sort_dir=sort_dir)
-
-        return PortCollection.convert_with_links(ports, limit,
-                                                 url=resource_url,
-                                                 fields=fields,
-                                                 sort_key=sort_key,
-                                                 sort_dir=sort_dir)
+            def fetch(limit, marker):
+                return objects.Port.list(context, limit, marker,
+                                         sort_key=sort_key, sort_dir=sort_dir)
+
+        port_serializer = PortSerializer(fields=fields)
+        if api_utils.use_streaming(limit) and not address:
+            body = port_serializer.iter_collection_json(
+                fetch, limit, CONF.api.stream_chunk_size, marker=marker_obj,
+                url=resource_url, sort_key=sort_key, sort_dir=sort_dir)
+            return api_utils.streaming_json_response(body)
+
+        body = port_serializer.collection_to_json(
+            fetch(limit, marker_obj), limit, url=resource_url,
+            sort_key=sort_key, sort_dir=sort_dir)
+        return api_utils.json_response(body)
 
     def _get_ports_by_address(self, address):
         """Retrieve a port by its address.
@@ -0,0 +1,306 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Render RPC objects to JSON without building WSME objects.
+
+Building one WSME object per row, validating every attribute on assignment
+and then converting it back with ``wsme.rest.json.tojson`` dominates the
+cost of large collection requests. The serializers below produce the very
+same documents by walking a per-request plan of the attributes of the API
+type, straight from the RPC objects.
+"""
+
+import datetime
+import json
+import operator
+
+from oslo_utils import strutils
+import pecan
+import six
+import wsme
+from wsme import types as wtypes
+
+from ironic.api.controllers import link
+from ironic.api.controllers.v1 import utils as api_utils
+from ironic.common import metrics
+from ironic.common import ttl_cache
+
+
+def _identity(value):
+    return value
+
+
+def _datetime_to_json(value):
+    if value is None:
+        return None
+    return value.isoformat()
+
+
+def make_link(rel, href):
+    """Return the API representation of a link."""
+    return {'href': href, 'rel': rel}
+
+
+class ResourceSerializer(object):
+    """Base class for the serializers of an API resource.
+
+    The output of :meth:`to_dict` is equal to what WSME produces for the API
+    representation of the same object, with attributes in the same order,
+    so the serialized JSON documents are byte-identical.
+    """
+
+    api_type = None
+    """The WSME type of the resource, e.g. ``node.Node``."""
+
+    collection_type = None
+    """The WSME type of a collection of the resource."""
+
+    resource = None
+    """The name of the resource in URLs and collections, e.g. 'nodes'."""
+
+    link_attributes = ('links',)
+    """Attributes of the API type holding lists of links."""
+
+    def __init__(self, fields=None, url=None):
+        """Prepare the serialization plan for the current request.
+
+        :param fields: Optional, a list with a specified set of fields
+            of the resource to be returned.
+        :param url: the base URL of the links. Defaults to the public URL
+            of the current request.
+        """
+        self.fields = fields
+        # NOTE: streamed responses are rendered after the controller has
+        # returned, so nothing should be read from pecan.request later on.
+        self.public_url = pecan.request.public_url
+        self.context = pecan.request.context
+        self.url = url or self.public_url
+        self._fields_checked = False
+        self._self_url, self._bookmark_url = self.link_templates(
+            self.resource)
+        hidden = self.hidden_attributes()
+        # A list of (name, getter, converter) tuples, in the order used by
+        # WSME. The getter of link attributes is None.
+        self._plan = []
+        for attr in wsme.types.list_attributes(self.api_type):
+            key = attr.key
+            if key in hidden:
+                continue
+            if key in self.link_attributes:
+                self._plan.append((attr.name, None, None))
+                continue
+            if fields is not None and key not in fields:
+                continue
+            if attr.datatype is datetime.datetime:
+                converter = _datetime_to_json
+            else:
+                converter = _identity
+            self._plan.append((attr.name,
+                               self.getter(key) or operator.attrgetter(key),
+                               converter))
+        self._collection_names = [attr.name
+                                  for attr in wsme.types.list_attributes(
+                                      self.collection_type)]
+
+    def hidden_attributes(self):
+        """Return the attributes hidden in the requested API version."""
+        return set()
+
+    def getter(self, key):
+        """Return a custom getter for an attribute, or None.
+
+        Subclasses use this for API-only attributes which do not exist in
+        the RPC object, or whose value needs to be adjusted.
+        """
+        return None
+
+    def exposed_fields(self):
+        """Return the names of the fields a client may ask for."""
+        return [attr.key
+                for attr in wsme.types.list_attributes(self.api_type)
+                if attr.key not in self.link_attributes]
+
+    def link_templates(self, resource):
+        """Return the prefixes of the self and bookmark links of a resource.
+
+        Links are built by appending the path of the object to them, which
+        is much cheaper than calling link.build_url() for every object.
+        """
+        return (link.build_url(resource, '', base_url=self.url),
+                link.build_url(resource, '', bookmark=True,
+                               base_url=self.url))
+
+    def links(self, uuid):
+        """Return a dict mapping link attributes to lists of links."""
+        return {'links': [make_link('self', self._self_url + uuid),
+                          make_link('bookmark', self._bookmark_url + uuid)]}
+
+    def check_fields(self):
+        """Raise InvalidParameterValue if unknown fields were requested."""
+        if self.fields is not None and not self._fields_checked:
+            api_utils.check_for_invalid_fields(self.fields,
+                                               self.exposed_fields())
+            self._fields_checked = True
+
+    def to_dict(self, rpc_obj):
+        """Return the API representation of an RPC object."""
+        self.check_fields()
+        links = self.links(rpc_obj.uuid)
+        result = {}
+        for name, get, converter in self._plan:
+            if get is None:
+                if name in links:
+                    result[name] = links[name]
+                continue
+            value = get(rpc_obj)
+            if value is not wtypes.Unset:
+                result[name] = converter(value)
+        return result
+
+    def to_json(self, rpc_obj):
+        """Return the JSON document representing an RPC object."""
+        with metrics.timed('render'):
+            return json.dumps(self.to_dict(rpc_obj))
+
+    def collection_to_dict(self, rpc_objs, limit, url=None, **kwargs):
+        """Return the API representation of a collection of RPC objects.
+
+        :param rpc_objs: the RPC objects in the collection.
+        :param limit: the maximum number of objects in the collection, used
+            to know whether a link to the next page has to be added.
+        :param url: the URL of the collection, used to build the link to
+            the next page. Defaults to the resource name.
+        :param kwargs: the query arguments to add to the next link.
+        """
+        items = [self.to_dict(obj) for obj in rpc_objs]
+        values = {self.resource: items}
+        if items and len(items) == limit:
+            values['next'] = self.next_link(items[-1], limit, url=url,
+                                            **kwargs)
+        return dict((name, values[name]) for name in self._collection_names
+                    if name in values)
+
+    def next_link(self, last, limit, url=None, **kwargs):
+        """Build the link to the next page of a collection.
+
+        :param last: the API representation of the last object of the
+            current page.
+        """
+        resource_url = url or self.resource
+        q_args = ''.join(['%s=%s&' % (key, kwargs[key]) for key in kwargs])
+        next_args = '?%(args)slimit=%(limit)d&marker=%(marker)s' % {
+            'args': q_args, 'limit': limit,
+            'marker': last.get('uuid', wtypes.Unset)}
+        return link.build_url(resource_url, next_args,
+                              base_url=self.public_url)
+
+    def collection_to_json(self, rpc_objs, limit, url=None, **kwargs):
+        """Return the JSON document representing a collection."""
+        with metrics.timed('render'):
+            return json.dumps(self.collection_to_dict(rpc_objs, limit,
+                                                      url=url, **kwargs))
+
+    def iter_collection_json(self, fetch, limit, chunk_size, marker=None,
+                             url=None, **kwargs):
+        """Return an iterator over the JSON document of a collection.
+
+        The objects are loaded and rendered ``chunk_size`` at a time, so
+        that only one chunk of the collection is held in memory. The
+        document produced is the same as the one of
+        :meth:`collection_to_json`.
+
+        The first chunk is loaded before returning, so that errors are
+        reported to the client with a proper status code.
+
+        :param fetch: a callable taking a limit and a marker object and
+            returning the list of the RPC objects following the marker.
+        :param limit: the maximum number of objects in the collection.
+        :param chunk_size: the number of objects to load at once.
+        :param marker: the RPC object after which the collection starts.
+        :param url: the URL of the collection, used to build the link to
+            the next page.
+        :param kwargs: the query arguments to add to the next link.
+        """
+        chunk_size = min(chunk_size, limit)
+        rpc_objs = fetch(chunk_size, marker)
+        if rpc_objs:
+            self.check_fields()
+        return self._iter_collection_json(rpc_objs, fetch, limit, chunk_size,
+                                          url, kwargs)
+
+    def _iter_collection_json(self, rpc_objs, fetch, limit, chunk_size,
+                              url, kwargs):
+        # NOTE: this relies on the objects being the first attribute of the
+        # collection, followed by the link to the next page.
+        yield ('{%s: [' % json.dumps(self.resource)).encode('utf-8')
+        count = 0
+        last = None
+        while rpc_objs:
+            items = [self.to_dict(obj) for obj in rpc_objs]
+            chunk = ', '.join(json.dumps(item) for item in items)
+            if count:
+                chunk = ', ' + chunk
+            yield chunk.encode('utf-8')
+            count += len(items)
+            last = items[-1]
+            if count >= limit or len(rpc_objs) < chunk_size:
+                break
+            rpc_objs = fetch(min(chunk_size, limit - count), rpc_objs[-1])
+
+        tail = ']'
+        if last is not None and count == limit:
+            tail += ', %s: %s' % (json.dumps('next'), json.dumps(
+                self.next_link(last, limit, url=url, **kwargs)))
+        yield (tail + '}').encode('utf-8')
+
+
+# Cache of whether the keys seen by mask_secrets() are secret. It is
+# bounded: the keys of the extra fields and of the driver information are
+# chosen by the clients.
+_SECRET_KEYS = ttl_cache.TTLCache(maxsize=1024, ttl=3600)
+
+
+def _is_secret_key(key):
+    secret = _SECRET_KEYS.get(key)
+    if secret is None:
+        # NOTE: ask mask_password() itself, so that the keys masked here
+        # are exactly the ones it masks in a string representation.
+        sample = "'%s': 'x'" % key
+        secret = strutils.mask_password(sample, '') != sample
+        _SECRET_KEYS.set(key, secret)
+    return secret
+
+
+def mask_secrets(value, secret='******'):
+    """Mask the secrets contained in a JSON-like value.
+
+    This is the structural equivalent of masking the string representation
+    of the value with ``oslo_utils.strutils.mask_password`` and evaluating
+    it back: string values of keys that look like a secret (for example
+    'ipmi_password') are replaced and other strings are masked with
+    ``mask_password``. Unlike the string based approach the whole value of
+    a secret is always replaced, even if it contains quotes.
+
+    :param value: the value to mask, usually a dict.
+    :param secret: the string to replace the secrets with.
+    :returns: a masked copy of the value.
+    """
+    if isinstance(value, dict):
+        return dict((k, secret if (isinstance(v, six.string_types) and
+                                   _is_secret_key(k))
+                     else mask_secrets(v, secret))
+                    for k, v in value.items())
+    if isinstance(value, list):
+        return [mask_secrets(item, secret) for item in value]
+    if isinstance(value, six.string_types):
+        return strutils.mask_password(value, secret)
+    return value
@@ -13,8 +13,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
+
 import jsonpatch
 from oslo_config import cfg
+from oslo_log import log
+import oslo_messaging as messaging
 from oslo_utils import uuidutils
 import pecan
 import six
@@ -25,13 +29,26 @@ import wsme
 from ironic.api.controllers.v1 import versions
 from ironic.common import exception
 from ironic.common.i18n import _
+from ironic.common.i18n import _LW
 from ironic.common import states
+from ironic.common import ttl_cache
 from ironic.common import utils
 from ironic import objects
 
 
 CONF = cfg.CONF
 
+LOG = log.getLogger(__name__)
+
+# Rendered responses, keyed by the request which produced them. It is
+# created on first use so that the configuration options are read once the
+# service is set up.
+_RESPONSE_CACHE = None
+
+# Node counts computed by GET /v1/nodes/aggregates, keyed like the rendered
+# responses.
+_AGGREGATES_CACHE = None
+
 
 JSONPATCH_EXCEPTIONS = (jsonpatch.JsonPatchException,
                         jsonpatch.JsonPointerException,
@@ -241,3 +258,310 @@ def allow_links_node_states_and_driver_properties():
     """
     return (pecan.request.version.minor >=
             versions.MINOR_14_LINKS_NODESTATES_DRIVERPROPERTIES)
+
+
+def allow_bulk_operations():
+    """Check if the bulk endpoints are available.
+
+    Version 1.15 of the API added the bulk endpoints for nodes.
+    """
+    return pecan.request.version.minor >= versions.MINOR_15_BULK_OPERATIONS
+
+
+def allow_node_aggregates():
+    """Check if the node aggregates endpoint is available.
+
+    Version 1.16 of the API added GET /v1/nodes/aggregates.
+    """
+    return pecan.request.version.minor >= versions.MINOR_16_NODE_AGGREGATES
+
+
+def allow_node_changes():
+    """Check if the node changes endpoint is available.
+
+    Version 1.18 of the API added GET /v1/nodes/changes.
+    """
+    return pecan.request.version.minor >= versions.MINOR_18_NODE_CHANGES
+
+
+def allow_bulk_state_changes():
+    """Check if the bulk power and provision state endpoints are available.
+
+    Version 1.19 of the API added POST /v1/nodes/bulk_power and
+    POST /v1/nodes/bulk_provision.
+    """
+    return pecan.request.version.minor >= versions.MINOR_19_BULK_STATES
+
+
+def allow_image_cache_prewarm():
+    """Check if the master image caches can be pre-warmed.
+
+    Version 1.20 of the API added POST /v1/image_cache/prewarm.
+    """
+    return (pecan.request.version.minor >=
+            versions.MINOR_20_IMAGE_CACHE_PREWARM)
+
+
+def allow_async_jobs():
+    """Check if asynchronous jobs are available.
+
+    Version 1.17 of the API added the jobs resource.
+    """
+    return pecan.request.version.minor >= versions.MINOR_17_ASYNC_JOBS
+
+
+def use_async_job():
+    """Check whether a synchronous call should be run as a job.
+
+    The client asks for it by sending the "Prefer: respond-async" header
+    (see RFC 7240).
+    """
+    if not allow_async_jobs():
+        return False
+    prefer = pecan.request.headers.get('Prefer', '')
+    return 'respond-async' in [p.strip().lower() for p in prefer.split(',')]
+
+
+def validate_bulk_size(items):
+    """Check the number of items of a bulk request.
+
+    :raises: ClientSideError if there are more than [api]max_limit items.
+    """
+    if len(items) > CONF.api.max_limit:
+        raise wsme.exc.ClientSideError(
+            _("Too many items in a bulk request: %(count)d, the maximum is "
+              "%(max)d.") % {'count': len(items), 'max': CONF.api.max_limit})
+
+
+def bulk_error(exc):
+    """Return the result of an item of a bulk request which failed.
+
+    :param exc: the IronicException or ClientSideError raised for the item,
+        or the MessagingException raised by the RPC call sending it.
+    :returns: a dict with the 'status_code' and the 'error' message.
+    """
+    if isinstance(exc, wsme.exc.ClientSideError):
+        return {'status_code': exc.code, 'error': exc.faultstring}
+    if isinstance(exc, messaging.MessagingTimeout):
+        return {'status_code': http_client.SERVICE_UNAVAILABLE,
+                'error': _("The conductor did not reply in time, the "
+                           "request may still be processed: %s") % exc}
+    if isinstance(exc, messaging.RemoteError):
+        # NOTE: the message of a RemoteError holds the remote traceback
+        return {'status_code': http_client.INTERNAL_SERVER_ERROR,
+                'error': _("The conductor failed: %(type)s: %(value)s") %
+                {'type': exc.exc_type, 'value': exc.value}}
+    if isinstance(exc, messaging.MessagingException):
+        return {'status_code': http_client.SERVICE_UNAVAILABLE,
+                'error': six.text_type(exc)}
+    return {'status_code': exc.code, 'error': six.text_type(exc)}
+
+
+def send_bulk(by_topic, send):
+    """Send the items of a bulk request to their conductors.
+
+    The items of each conductor are sent in chunks of up to
+    [api]bulk_rpc_chunk_size items, so that each RPC call completes within
+    the RPC timeout. A failed RPC call, e.g. timing out, fails the items of
+    its chunk only.
+
+    :param by_topic: a dict mapping the RPC topics to the lists of the
+        (index, item) tuples to send to them.
+    :param send: a callable taking a list of items and an RPC topic, and
+        returning the list of the results of the items, the errors being
+        dicts with the 'code' and the 'message' of the error.
+    :returns: a list of the (index, result) tuples, the errors being dicts
+        with the 'status_code' and the 'error' message.
+    """
+    chunk_size = CONF.api.bulk_rpc_chunk_size
+    results = []
+    for topic, items in by_topic.items():
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            try:
+                chunk_results = send([item for _i, item in chunk], topic)
+            except (exception.IronicException,
+                    messaging.MessagingException) as e:
+                LOG.warning(_LW('Failed to send %(count)d items of a bulk '
+                                'request to topic %(topic)s: %(error)s'),
+                            {'count': len(chunk), 'topic': topic,
+                             'error': e})
+                chunk_results = [bulk_error(e)] * len(chunk)
+            else:
+                chunk_results = [
+                    {'status_code': result['code'],
+                     'error': result['message']}
+                    if isinstance(result, dict) else result
+                    for result in chunk_results]
+            results.extend((index, result) for (index, _item), result
+                           in zip(chunk, chunk_results))
+    return results
+
+
+def create_many(obj_cls, rpc_objs):
+    """Create several RPC objects, telling the errors of each one apart.
+
+    The objects are created in a single transaction. If that fails, they
+    are created one by one, to find out which ones caused the failure.
+
+    :param obj_cls: the RPC object class, e.g. objects.Node.
+    :param rpc_objs: a list of new RPC objects of this class.
+    :returns: a list with, for each object, None if it was created or the
+        exception raised when creating it.
+    """
+    try:
+        obj_cls.create_many(pecan.request.context, rpc_objs)
+        return [None] * len(rpc_objs)
+    except exception.IronicException:
+        LOG.debug('Bulk creation of %d %s objects failed, creating them one '
+                  'by one.', len(rpc_objs), obj_cls.obj_name())
+
+    errors = []
+    for rpc_obj in rpc_objs:
+        try:
+            rpc_obj.create()
+        except exception.IronicException as e:
+            errors.append(e)
+        else:
+            errors.append(None)
+    return errors
+
+
+def _get_response_cache():
+    global _RESPONSE_CACHE
+    if _RESPONSE_CACHE is None:
+        _RESPONSE_CACHE = ttl_cache.TTLCache(CONF.api.response_cache_size,
+                                             CONF.api.response_cache_ttl)
+    return _RESPONSE_CACHE
+
+
+def invalidate_response_cache():
+    """Drop the responses and node counts cached by this API service.
+
+    Should be called whenever the API service itself changes a resource
+    whose representation may have been cached.
+    """
+    if _RESPONSE_CACHE is not None:
+        _RESPONSE_CACHE.clear()
+    if _AGGREGATES_CACHE is not None:
+        _AGGREGATES_CACHE.clear()
+
+
+def get_aggregates_cache():
+    """Return the cache of the node counts of GET /v1/nodes/aggregates."""
+    global _AGGREGATES_CACHE
+    if _AGGREGATES_CACHE is None:
+        _AGGREGATES_CACHE = ttl_cache.TTLCache(CONF.api.response_cache_size,
+                                               CONF.api.aggregates_cache_ttl)
+    return _AGGREGATES_CACHE
+
+
+def response_cache_key():
+    """Build the key identifying the representation requested.
+
+    Besides the path and query string, the representation of a resource
+    depends on the API version, on the URL used to build the links and on
+    whether the requester is allowed to see passwords.
+    """
+    return (pecan.request.path_qs, pecan.request.version.minor,
+            pecan.request.public_url, pecan.request.context.show_password)
+
+
+def make_etag(body):
+    """Compute an entity tag for a JSON representation.
+
+    The tag is derived from the content of the representation rather than
+    from the modification time of the objects, which has a resolution of
+    a second on some databases: two updates within the same second still
+    give two tags.
+
+    :param body: the JSON document being returned.
+    :returns: the entity tag (without the surrounding quotes).
+    """
+    if isinstance(body, six.text_type):
+        body = body.encode('utf-8')
+    return hashlib.sha1(body).hexdigest()
+
+
+def is_not_modified(etag):
+    """Check whether the If-None-Match request header matches the etag."""
+    return etag in pecan.request.if_none_match
+
+
+def not_modified_response(etag):
+    """Return a 304 (Not Modified) response for the given etag."""
+    pecan.response.etag = etag
+    return wsme.api.Response(None, status_code=http_client.NOT_MODIFIED,
+                             return_type=None)
+
+
+def json_response(body, status_code=http_client.OK):
+    """Return a response with an already serialized JSON body.
+
+    This bypasses the WSME serialization of the response.
+
+    :param body: the JSON document, as a string.
+    :param status_code: the HTTP status code of the response.
+    :returns: A WSME response object to be returned by the API.
+    """
+    if isinstance(body, six.text_type):
+        body = body.encode('utf-8')
+    pecan.response.body = body
+    pecan.override_template(None, 'application/json')
+    return wsme.api.Response(None, status_code=status_code, return_type=None)
+
+
+def use_streaming(limit):
+    """Check whether a collection of this size should be streamed.
+
+    :param limit: the maximum number of items in the collection, as
+        returned by validate_limit().
+    """
+    chunk_size = CONF.api.stream_chunk_size
+    return chunk_size > 0 and limit > chunk_size
+
+
+def streaming_json_response(app_iter, status_code=http_client.OK):
+    """Return a response whose JSON body is produced by an iterator.
+
+    The body is sent to the client while it is being produced, using
+    chunked transfer encoding.
+
+    :param app_iter: an iterator over the chunks of the JSON document,
+        as bytes.
+    :param status_code: the HTTP status code of the response.
+    :returns: A WSME response object to be returned by the API.
+    """
+    pecan.response.app_iter = app_iter
+    pecan.override_template(None, 'application/json')
+    return wsme.api.Response(None, status_code=status_code, return_type=None)
+
+
+def cached_response(key):
+    """Return the response for a request if it is in the response cache.
+
+    :param key: the request key, as returned by response_cache_key().
+    :returns: A WSME response object to be returned by the API, or None
+        if the response is not cached.
+    """
+    cached = _get_response_cache().get(key)
+    if cached is None:
+        return None
+    etag, body = cached
+    if is_not_modified(etag):
+        return not_modified_response(etag)
+    pecan.response.etag = etag
+    return json_response(body)
+
+
+def cache_response(key, etag, body):
+    """Tag a response and store its body in the response cache.
+
+    :param key: the request key, as returned by response_cache_key().
+    :param etag: the entity tag of the body, as returned by make_etag().
+    :param body: the JSON document being returned.
+    :returns: A WSME response object to be returned by the API.
+    """
+    pecan.response.etag = etag
+    _get_response_cache().set(key, (etag, body))
+    return json_response(body)
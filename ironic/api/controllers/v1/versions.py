@@ -44,6 +44,12 @@ BASE_VERSION = 1
 # v1.14: Make the following endpoints discoverable via API:
 #        1. '/v1/nodes/<uuid>/states'
 #        2. '/v1/drivers/<driver-name>/properties'
+# v1.15: Add bulk endpoints: POST /v1/nodes/bulk and
+#        POST /v1/nodes/bulk_update
+# v1.16: Add GET /v1/nodes/aggregates to count nodes
+# v1.17: Add asynchronous jobs and GET /v1/jobs/<uuid>
+# v1.18: Add GET /v1/nodes/changes
+# v1.19: Add POST /v1/nodes/bulk_power and POST /v1/nodes/bulk_provision
 
 MINOR_0_JUNO = 0
 MINOR_1_INITIAL_VERSION = 1
@@ -60,11 +66,17 @@ MINOR_11_ENROLL_STATE = 11
 MINOR_12_RAID_CONFIG = 12
 MINOR_13_ABORT_VERB = 13
 MINOR_14_LINKS_NODESTATES_DRIVERPROPERTIES = 14
+MINOR_15_BULK_OPERATIONS = 15
+MINOR_16_NODE_AGGREGATES = 16
+MINOR_17_ASYNC_JOBS = 17
+MINOR_18_NODE_CHANGES = 18
+MINOR_19_BULK_STATES = 19
+MINOR_20_IMAGE_CACHE_PREWARM = 20
 
 # When adding another version, update MINOR_MAX_VERSION and also update
 # doc/source/webapi/v1.rst with a detailed explanation of what the version has
 # changed.
-MINOR_MAX_VERSION = MINOR_14_LINKS_NODESTATES_DRIVERPROPERTIES
+MINOR_MAX_VERSION = MINOR_20_IMAGE_CACHE_PREWARM
 
 # String representations of the minor and maximum versions
 MIN_VERSION_STRING = '{}.{}'.format(BASE_VERSION, MINOR_1_INITIAL_VERSION)
@@ -0,0 +1,252 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Middleware and helpers measuring where the time of API requests goes.
+
+Each request is split into phases: authentication (auth), pecan hooks
+(hooks), policy checks (policy), database statements (db), waiting for
+RPC calls (rpc), rendering of WSME results (render) and everything else
+done by pecan and the controllers (app). The durations are aggregated per
+route as histograms, periodically logged, and optionally returned to the
+client in a Server-Timing header.
+"""
+
+import json
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_log import log
+from pecan import hooks
+from sqlalchemy import engine
+from sqlalchemy import event
+from wsmeext import pecan as wsme_pecan
+
+from ironic.common.i18n import _LI
+from ironic.common import metrics
+
+LOG = log.getLogger(__name__)
+
+CONF = cfg.CONF
+
+# The name of the metric of the request phases
+PHASE_METRIC = 'api.request.phase'
+
+_DB_LISTENERS_LOCK = threading.Lock()
+_DB_LISTENERS_INSTALLED = False
+
+
+class ProfilerMiddleware(object):
+    """Records the timings of the phases of each request.
+
+    This must be the outermost middleware.
+    """
+
+    def __init__(self, app, registry=None):
+        self.app = app
+        self.registry = registry or metrics.get_registry()
+        self._last_report = time.time()
+
+    def __call__(self, environ, start_response):
+        recorder = metrics.start_recording()
+        environ['ironic.profiler.recorder'] = recorder
+
+        def replacement_start_response(status, headers, exc_info=None):
+            if CONF.api.profiling_server_timing:
+                durations = recorder.current_durations()
+                durations['total'] = time.time() - recorder.start
+                headers = list(headers)
+                headers.append(('Server-Timing',
+                                metrics.format_server_timing(durations)))
+            return start_response(status, headers, exc_info)
+
+        try:
+            return self.app(environ, replacement_start_response)
+        finally:
+            metrics.stop_recording()
+            self._observe(environ, recorder)
+
+    def _observe(self, environ, recorder):
+        route = getattr(recorder, 'route', None)
+        if route is None:
+            route = '%s <unrouted>' % environ.get('REQUEST_METHOD')
+        total = time.time() - recorder.start
+        self.registry.observe(PHASE_METRIC, total * 1000, route=route,
+                              phase='total')
+        for phase, seconds in recorder.durations.items():
+            self.registry.observe(PHASE_METRIC, seconds * 1000, route=route,
+                                  phase=phase)
+        self._maybe_report()
+
+    def _maybe_report(self):
+        interval = CONF.api.profiling_report_interval
+        now = time.time()
+        if interval <= 0 or now - self._last_report < interval:
+            return
+        self._last_report = now
+        LOG.info(_LI('API request timings (ms): %s'),
+                 json.dumps(self.registry.snapshot(prefix=PHASE_METRIC),
+                            sort_keys=True))
+
+
+class PhaseMiddleware(object):
+    """Records the time spent in the wrapped application as a phase.
+
+    The time of the phases recorded by the wrapped application itself is
+    not included.
+    """
+
+    def __init__(self, app, phase):
+        self.app = app
+        self.phase = phase
+
+    def __call__(self, environ, start_response):
+        with metrics.timed(self.phase):
+            return self.app(environ, start_response)
+
+
+class ProfilerHook(hooks.PecanHook):
+    """Records the route of the request and times the RPC calls."""
+
+    def before(self, state):
+        recorder = metrics.get_recorder()
+        if recorder is None:
+            return
+        recorder.route = route_name(state)
+        rpcapi = getattr(state.request, 'rpcapi', None)
+        if rpcapi is not None:
+            rpcapi.client = TimedRPCClient(rpcapi.client)
+
+
+class TimedHook(hooks.PecanHook):
+    """Wraps a pecan hook to record the time spent in it."""
+
+    def __init__(self, hook):
+        self.hook = hook
+        self.priority = hook.priority
+
+    def _call(self, name, *args):
+        with metrics.timed('hooks'):
+            return getattr(self.hook, name)(*args)
+
+    def on_route(self, state):
+        return self._call('on_route', state)
+
+    def before(self, state):
+        return self._call('before', state)
+
+    def after(self, state):
+        return self._call('after', state)
+
+    def on_error(self, state, e):
+        return self._call('on_error', state, e)
+
+
+class TimedJSONRenderer(wsme_pecan.JSonRenderer):
+    """The WSME JSON renderer, recording the rendering time."""
+
+    @staticmethod
+    def render(template_path, namespace):
+        with metrics.timed('render'):
+            return wsme_pecan.JSonRenderer.render(template_path, namespace)
+
+
+class _TimedCallContext(object):
+
+    def __init__(self, call_context):
+        self._call_context = call_context
+
+    def call(self, ctxt, method, **kwargs):
+        with metrics.timed('rpc'):
+            return self._call_context.call(ctxt, method, **kwargs)
+
+    def cast(self, ctxt, method, **kwargs):
+        with metrics.timed('rpc'):
+            return self._call_context.cast(ctxt, method, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._call_context, name)
+
+
+class TimedRPCClient(object):
+    """Wraps an RPC client to record the time spent in RPC calls."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def prepare(self, *args, **kwargs):
+        return _TimedCallContext(self._client.prepare(*args, **kwargs))
+
+    def call(self, ctxt, method, **kwargs):
+        with metrics.timed('rpc'):
+            return self._client.call(ctxt, method, **kwargs)
+
+    def cast(self, ctxt, method, **kwargs):
+        with metrics.timed('rpc'):
+            return self._client.cast(ctxt, method, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def route_name(state):
+    """Return the name of the route of a request, e.g. 'GET Node.get_one'.
+
+    The name is built from the controller, so that all the requests
+    served by the same controller method share the same name whatever the
+    resources they are about.
+    """
+    controller = state.controller
+    owner = getattr(controller, '__self__', None)
+    if owner is not None:
+        name = '%s.%s' % (owner.__class__.__name__, controller.__name__)
+    else:
+        name = getattr(controller, '__name__', str(controller))
+    return '%s %s' % (state.request.method, name)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    if metrics.get_recorder() is not None:
+        conn.info.setdefault('ironic_query_start', []).append(time.time())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    starts = conn.info.get('ironic_query_start')
+    if not starts:
+        return
+    elapsed = time.time() - starts.pop()
+    recorder = metrics.get_recorder()
+    if recorder is not None:
+        recorder.add('db', elapsed)
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get('ironic_query_start')
+    if starts:
+        starts.pop()
+
+
+def install_db_listeners():
+    """Record the time of the database statements of profiled requests."""
+    global _DB_LISTENERS_INSTALLED
+    with _DB_LISTENERS_LOCK:
+        if _DB_LISTENERS_INSTALLED:
+            return
+        event.listen(engine.Engine, 'before_cursor_execute',
+                     _before_cursor_execute)
+        event.listen(engine.Engine, 'after_cursor_execute',
+                     _after_cursor_execute)
+        event.listen(engine.Engine, 'handle_error', _handle_error)
+        _DB_LISTENERS_INSTALLED = True
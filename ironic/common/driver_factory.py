@@ -13,10 +13,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+
 from oslo_concurrency import lockutils
 from oslo_config import cfg
 from oslo_log import log
-from stevedore import dispatch
+import pkg_resources
+from stevedore import extension
 
 from ironic.common import exception
 from ironic.common.i18n import _
@@ -56,6 +59,7 @@ def get_driver(driver_name):
               ironic.drivers.base.BaseDriver
     :raises: DriverNotFound if the requested driver_name could not be
              found in the "ironic.drivers" namespace.
+    :raises: DriverLoadError if the driver could not be loaded.
 
     """
 
@@ -67,18 +71,95 @@ def get_driver(driver_name):
 
 
 def drivers():
-    """Get all drivers as a dict name -> driver object."""
+    """Get all drivers as a dict name -> driver object.
+
+    Loads all the enabled drivers which are not loaded yet.
+
+    :raises: DriverLoadError if a driver could not be loaded.
+    """
     factory = DriverFactory()
     return {name: factory[name].obj for name in factory.names}
 
 
+class LazyExtensionManager(object):
+    """Loads the plugins of a namespace on first use.
+
+    Provides the parts of stevedore's NameDispatchExtensionManager used by
+    the DriverFactory. Only the entry points of the namespace are read when
+    it is created; the module of a plugin is imported and the plugin is
+    instantiated the first time it is requested. Unlike stevedore, the
+    plugins which are not enabled are never imported.
+    """
+
+    def __init__(self, namespace, names):
+        """Find the entry points of the enabled plugins.
+
+        :param namespace: the namespace of the entry points.
+        :param names: the names of the enabled plugins.
+        """
+        self.namespace = namespace
+        self._entry_points = {}
+        for ep in pkg_resources.iter_entry_points(namespace):
+            if ep.name in names and ep.name not in self._entry_points:
+                self._entry_points[ep.name] = ep
+        self._names = []
+        for name in names:
+            if name in self._entry_points and name not in self._names:
+                self._names.append(name)
+        self.by_name = {}
+        # Reentrant, as loading a plugin may require loading another one
+        self._lock = threading.RLock()
+
+    def names(self):
+        """The names of the enabled plugins found, loaded or not."""
+        return list(self._names)
+
+    def __getitem__(self, name):
+        """Return the extension of a plugin, loading it if needed.
+
+        :raises: KeyError if the plugin is not enabled or was not found.
+        :raises: DriverLoadError if the plugin could not be loaded.
+        """
+        ext = self.by_name.get(name)
+        if ext is not None:
+            return ext
+        ep = self._entry_points[name]
+        with self._lock:
+            ext = self.by_name.get(name)
+            if ext is None:
+                ext = self._load(ep)
+                self.by_name[name] = ext
+        return ext
+
+    @staticmethod
+    def _load(ep):
+        # Drivers raise "DriverLoadError" if they are unable to be loaded,
+        # eg. due to missing external dependencies. Other exceptions are
+        # wrapped in "DriverLoadError", providing the name of the driver that
+        # caused it.
+        try:
+            plugin = ep.resolve()
+            obj = plugin()
+        except exception.DriverLoadError:
+            raise
+        except Exception as e:
+            raise exception.DriverLoadError(driver=ep.name, reason=e)
+        LOG.debug('Loaded driver %s', ep.name)
+        return extension.Extension(ep.name, ep, plugin, obj)
+
+
 class DriverFactory(object):
-    """Discover, load and manage the drivers available."""
+    """Discover, load and manage the drivers available.
+
+    The enabled drivers are discovered from their entry points when the
+    first factory is created, which fails if one of them cannot be found.
+    A driver is loaded the first time it is requested.
+    """
 
     # NOTE(deva): loading the _extension_manager as a class member will break
     #             stevedore when it loads a driver, because the driver will
     #             import this file (and thus instantiate another factory).
-    #             Instead, we instantiate a NameDispatchExtensionManager only
+    #             Instead, we instantiate a LazyExtensionManager only
     #             once, the first time DriverFactory.__init__ is called.
     _extension_manager = None
 
@@ -96,48 +177,24 @@ class DriverFactory(object):
     def _init_extension_manager(cls):
         # NOTE(deva): In case multiple greenthreads queue up on this lock
         #             before _extension_manager is initialized, prevent
-        #             creation of multiple NameDispatchExtensionManagers.
+        #             creation of multiple extension managers.
         if cls._extension_manager:
             return
 
-        # NOTE(deva): Drivers raise "DriverLoadError" if they are unable to be
-        #             loaded, eg. due to missing external dependencies.
-        #             We capture that exception, and, only if it is for an
-        #             enabled driver, raise it from here. If enabled driver
-        #             raises other exception type, it is wrapped in
-        #             "DriverLoadError", providing the name of the driver that
-        #             caused it, and raised. If the exception is for a
-        #             non-enabled driver, we suppress it.
-        def _catch_driver_not_found(mgr, ep, exc):
-            # NOTE(deva): stevedore loads plugins *before* evaluating
-            #             _check_func, so we need to check here, too.
-            if ep.name in CONF.enabled_drivers:
-                if not isinstance(exc, exception.DriverLoadError):
-                    raise exception.DriverLoadError(driver=ep.name, reason=exc)
-                raise exc
-
-        def _check_func(ext):
-            return ext.name in CONF.enabled_drivers
-
-        cls._extension_manager = (
-            dispatch.NameDispatchExtensionManager(
-                'ironic.drivers',
-                _check_func,
-                invoke_on_load=True,
-                on_load_failure_callback=_catch_driver_not_found))
-
-        # NOTE(deva): if we were unable to load any configured driver, perhaps
+        extension_manager = LazyExtensionManager('ironic.drivers',
+                                                 CONF.enabled_drivers)
+
+        # NOTE(deva): if we were unable to find any configured driver, perhaps
         #             because it is not present on the system, raise an error.
-        if (sorted(CONF.enabled_drivers) !=
-                sorted(cls._extension_manager.names())):
-            found = cls._extension_manager.names()
-            names = [n for n in CONF.enabled_drivers if n not in found]
+        found = extension_manager.names()
+        names = [n for n in CONF.enabled_drivers if n not in found]
+        if names:
             # just in case more than one could not be found ...
             names = ', '.join(names)
             raise exception.DriverNotFound(driver_name=names)
 
-        LOG.info(_LI("Loaded the following drivers: %s"),
-                 cls._extension_manager.names())
+        cls._extension_manager = extension_manager
+        LOG.info(_LI("Found the following drivers: %s"), found)
 
     @property
     def names(self):
@@ -296,6 +296,14 @@ class ConductorNotFound(NotFound):
     _msg_fmt = _("Conductor %(conductor)s could not be found.")
 
 
+class JobNotFound(NotFound):
+    _msg_fmt = _("Job %(job)s could not be found.")
+
+
+class JobAlreadyExists(Conflict):
+    _msg_fmt = _("A job with UUID %(uuid)s already exists.")
+
+
 class ConductorAlreadyRegistered(IronicException):
     _msg_fmt = _("Conductor %(conductor)s already registered.")
 
@@ -380,6 +388,11 @@ class ImageDownloadFailed(IronicException):
     _msg_fmt = _("Failed to download image %(image_href)s, reason: %(reason)s")
 
 
+class ImageChecksumError(ImageDownloadFailed):
+    _msg_fmt = _("The %(algorithm)s checksum of the downloaded image "
+                 "%(image_href)s is %(actual)s instead of %(expected)s.")
+
+
 class KeystoneUnauthorized(IronicException):
     _msg_fmt = _("Not authorized in Keystone.")
 
@@ -429,6 +442,14 @@ class ConfigNotFound(IronicException):
     _msg_fmt = _("Could not find config at %(path)s")
 
 
+class NodeChangesExpired(IronicException):
+    _msg_fmt = _("The changes of the node states after sequence number "
+                 "%(since)s are no longer available, the oldest one "
+                 "available is %(oldest)s. Get the nodes again and watch "
+                 "the changes from the current sequence number.")
+    code = http_client.GONE
+
+
 class NodeLocked(Conflict):
     _msg_fmt = _("Node %(node)s is locked by host %(host)s, please retry "
                  "after the current operation is completed.")
@@ -30,6 +30,7 @@ import six.moves.urllib.parse as urlparse
 from ironic.common import exception
 from ironic.common.glance_service import service_utils
 from ironic.common.i18n import _LE
+from ironic.common import keystone
 
 
 LOG = log.getLogger(__name__)
@@ -83,8 +84,11 @@ def check_image_service(func):
         if CONF.glance.auth_strategy == 'keystone':
             params['token'] = self.context.auth_token
         endpoint = '%s://%s:%s' % (scheme, self.glance_host, self.glance_port)
-        self.client = client.Client(self.version,
-                                    endpoint, **params)
+        self._client_key = (self.version, endpoint, params.get('token'),
+                            params['insecure'])
+        self.client = keystone.get_client(
+            'image', self._client_key,
+            lambda: client.Client(self.version, endpoint, **params))
         return func(self, *args, **kwargs)
     return wrapper
 
@@ -95,6 +99,7 @@ class BaseImageService(object):
         self.client = client
         self.version = version
         self.context = context
+        self._client_key = None
 
     def call(self, method, *args, **kwargs):
         """Call a glance client method.
@@ -140,6 +145,9 @@ class BaseImageService(object):
                 time.sleep(1)
             except image_excs as e:
                 exc_type, exc_value, exc_trace = sys.exc_info()
+                if (isinstance(e, glance_exc.Unauthorized) and
+                        self._client_key is not None):
+                    keystone.invalidate_client('image', self._client_key)
                 if method == 'list':
                     new_exc = _translate_plain_exception(
                         exc_value)
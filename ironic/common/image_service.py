@@ -18,10 +18,13 @@
 import abc
 import datetime
 import os
-import shutil
+import time
 
+from eventlet import greenpool
 from oslo_config import cfg
+from oslo_log import log as logging
 from oslo_utils import importutils
+from oslo_utils import units
 import requests
 import sendfile
 import six
@@ -30,6 +33,8 @@ import six.moves.urllib.parse as urlparse
 
 from ironic.common import exception
 from ironic.common.i18n import _
+from ironic.common.i18n import _LI
+from ironic.common.i18n import _LW
 from ironic.common import keystone
 from ironic.common import utils
 
@@ -72,7 +77,53 @@ glance_opts = [
                       'supported by ironic.')),
 ]
 
+image_download_opts = [
+    cfg.IntOpt('segments',
+               default=4,
+               help=_('The maximum number of parts of an image downloaded '
+                      'concurrently from an HTTP(S) server supporting range '
+                      'requests. Each part uses its own connection. Set to 1 '
+                      'to download images with a single connection.')),
+    cfg.IntOpt('min_segment_size',
+               default=64,
+               help=_('The minimum size (in MiB) of a part of an image '
+                      'downloaded concurrently from an HTTP(S) server. '
+                      'Smaller images are downloaded with fewer '
+                      'connections.')),
+    cfg.IntOpt('retries',
+               default=3,
+               help=_('Number of times the download of a part of an image '
+                      'from an HTTP(S) server supporting range requests is '
+                      'resumed after a connection failure, from the last '
+                      'byte received.')),
+    cfg.IntOpt('timeout',
+               default=60,
+               help=_('Number of seconds without receiving data after which '
+                      'a connection to an HTTP(S) server downloading an '
+                      'image is considered failed.')),
+    cfg.ListOpt('checksum_algorithms',
+                default=['md5'],
+                help=_('The digests (as supported by hashlib) computed while '
+                       'an image is written to disk, in the same pass. They '
+                       'are compared with the checksums published for the '
+                       'image and recorded in the metadata of the image '
+                       'caches. The algorithm of the checksums published by '
+                       'the Image service (md5) is also computed for Glance '
+                       'images.')),
+    cfg.BoolOpt('http_checksum_sidecars',
+                default=False,
+                help=_('Look for the checksums of an image downloaded from '
+                       'an HTTP(S) server in files next to it, named after '
+                       'the image and the algorithm (for example '
+                       '"image.qcow2.sha256"), containing the hexadecimal '
+                       'digest optionally followed by other text, as '
+                       'written by the sha256sum utility.')),
+]
+
 CONF.register_opts(glance_opts, group='glance')
+CONF.register_opts(image_download_opts, group='image_download')
+
+LOG = logging.getLogger(__name__)
 
 
 def import_versioned_module(version, submodule=None):
@@ -152,6 +203,11 @@ class HttpImageService(BaseImageService):
     def download(self, image_href, image_file):
         """Downloads image to specified location.
 
+        If the server supports range requests, the image is split in up to
+        [image_download]segments parts downloaded concurrently, and the
+        download of a part is resumed from its last byte when the connection
+        fails.
+
         :param image_href: Image reference.
         :param image_file: File object to write data to.
         :raises: exception.ImageRefValidationFailed if GET request returned
@@ -161,18 +217,49 @@ class HttpImageService(BaseImageService):
             * GET request failed.
         """
         try:
-            response = requests.get(image_href, stream=True)
+            response = requests.get(image_href, stream=True,
+                                    timeout=CONF.image_download.timeout)
             if response.status_code != http_client.OK:
                 raise exception.ImageRefValidationFailed(
                     image_href=image_href,
                     reason=_("Got HTTP code %s instead of 200 in response to "
                              "GET request.") % response.status_code)
-            with response.raw as input_img:
-                shutil.copyfileobj(input_img, image_file, IMAGE_CHUNK_SIZE)
-        except (requests.RequestException, IOError) as e:
+            _HttpDownload(image_href, image_file, response).run()
+        except (requests.RequestException, IOError, OSError) as e:
             raise exception.ImageDownloadFailed(image_href=image_href,
                                                 reason=e)
 
+    def get_sidecar_checksums(self, image_href, algorithms):
+        """Get the checksums published next to an image.
+
+        :param image_href: Image reference.
+        :param algorithms: names of the hashlib algorithms to look for.
+        :raises: exception.ImageRefValidationFailed if a checksum file
+            cannot be downloaded.
+        :returns: dictionary of hexadecimal digests by algorithm, for the
+            checksum files found.
+        """
+        checksums = {}
+        for algorithm in algorithms:
+            checksum_href = '%s.%s' % (image_href, algorithm)
+            try:
+                response = requests.get(checksum_href,
+                                        timeout=CONF.image_download.timeout)
+            except requests.RequestException as e:
+                raise exception.ImageRefValidationFailed(
+                    image_href=checksum_href, reason=e)
+            if response.status_code == http_client.NOT_FOUND:
+                continue
+            if response.status_code != http_client.OK:
+                raise exception.ImageRefValidationFailed(
+                    image_href=checksum_href,
+                    reason=_("Got HTTP code %s instead of 200 in response to "
+                             "GET request.") % response.status_code)
+            digest = response.text.split()
+            if digest:
+                checksums[algorithm] = digest[0].lower()
+        return checksums
+
     def show(self, image_href):
         """Get dictionary of image properties.
 
@@ -217,6 +304,187 @@ class HttpImageService(BaseImageService):
         }
 
 
+class _Segment(object):
+    """A range of bytes of an image, downloaded with one connection."""
+
+    def __init__(self, start, end):
+        self.start = start
+        # The last byte of the range, None if the size is unknown
+        self.end = end
+        self.offset = start
+        self.retries = 0
+
+    @property
+    def done(self):
+        return self.end is not None and self.offset > self.end
+
+
+class _HttpDownload(object):
+    """Download of an image from an HTTP(S) server.
+
+    The response to the first GET request is used for the first segment.
+    When the server supports range requests, the other segments are
+    requested with a Range header and written concurrently at their offset
+    in the (preallocated) file, and a failed connection is resumed from the
+    last byte written. The range requests carry the validator of the first
+    response in an If-Range header, so that the parts of two versions of
+    an image changed on the server are never joined; without a validator
+    the image is neither split nor resumed.
+    """
+
+    def __init__(self, image_href, image_file, response):
+        self.image_href = image_href
+        self.image_file = image_file
+        self.response = response
+        self.size = None
+        length = response.headers.get('Content-Length')
+        if length is not None and length.isdigit():
+            self.size = int(length)
+        self.validator = self._get_validator(response)
+        self.resumable = (self.size is not None and
+                          self.validator is not None and
+                          response.headers.get('Accept-Ranges') == 'bytes')
+        self.segments = self._split()
+        self.failed = False
+
+    @staticmethod
+    def _get_validator(response):
+        etag = response.headers.get('ETag')
+        # NOTE: If-Range does not accept weak entity tags
+        if etag and not etag.startswith('W/'):
+            return etag
+        return response.headers.get('Last-Modified')
+
+    def _split(self):
+        if self.size is None:
+            return [_Segment(0, None)]
+        count = 1
+        # The segments are written with their own file descriptors, which
+        # requires a file name.
+        if self.resumable and getattr(self.image_file, 'name', None):
+            min_size = max(1, CONF.image_download.min_segment_size) * units.Mi
+            count = max(1, min(CONF.image_download.segments,
+                               self.size // min_size))
+        length = self.size // count
+        segments = [_Segment(i * length, (i + 1) * length - 1)
+                    for i in range(count)]
+        segments[-1].end = self.size - 1
+        return segments
+
+    def run(self):
+        start = time.time()
+        if len(self.segments) == 1:
+            self._download(self.segments[0], self.image_file.write,
+                           self.response)
+        else:
+            self.image_file.truncate(self.size)
+            self.image_file.flush()
+            pool = greenpool.GreenPool(len(self.segments))
+            threads = [pool.spawn(self._download_at_offset, segment,
+                                  self.response if segment.start == 0
+                                  else None)
+                       for segment in self.segments]
+            try:
+                for thread in threads:
+                    thread.wait()
+            except Exception:
+                self.failed = True
+                pool.waitall()
+                raise
+
+        elapsed = max(time.time() - start, 0.001)
+        received = sum(s.offset - s.start for s in self.segments)
+        LOG.info(_LI('Downloaded %(size)d bytes of image %(href)s in '
+                     '%(time).1f seconds (%(rate).1f MiB/s) with %(count)d '
+                     'connection(s) and %(retries)d retries.'),
+                 {'size': received, 'href': self.image_href,
+                  'time': elapsed, 'rate': received / elapsed / units.Mi,
+                  'count': len(self.segments),
+                  'retries': sum(s.retries for s in self.segments)})
+
+    def _download_at_offset(self, segment, response):
+        try:
+            fd = os.open(self.image_file.name, os.O_WRONLY)
+            try:
+                os.lseek(fd, segment.offset, os.SEEK_SET)
+
+                def write(data):
+                    while data:
+                        data = data[os.write(fd, data):]
+
+                self._download(segment, write, response)
+            finally:
+                os.close(fd)
+        except Exception:
+            # Abort the other segments now, rather than once the threads
+            # of the previous segments are waited for.
+            self.failed = True
+            raise
+
+    def _download(self, segment, write, response):
+        while not segment.done:
+            try:
+                if response is None:
+                    response = self._request(segment)
+                self._copy(segment, write, response)
+                if self.failed or segment.end is None:
+                    return
+            except requests.RequestException as e:
+                if (not self.resumable or self.failed or
+                        segment.retries >= CONF.image_download.retries):
+                    raise
+                segment.retries += 1
+                LOG.warning(_LW('Connection failure while downloading image '
+                                '%(href)s, resuming from byte %(offset)d '
+                                '(retry %(retry)d of %(retries)d): %(error)s'),
+                            {'href': self.image_href,
+                             'offset': segment.offset,
+                             'retry': segment.retries,
+                             'retries': CONF.image_download.retries,
+                             'error': e})
+            finally:
+                if response is not None:
+                    response.close()
+                response = None
+
+    def _request(self, segment):
+        response = requests.get(
+            self.image_href, stream=True,
+            timeout=CONF.image_download.timeout,
+            headers={'Range': 'bytes=%d-%d' % (segment.offset, segment.end),
+                     'If-Range': self.validator})
+        if response.status_code == http_client.OK:
+            response.close()
+            raise exception.ImageDownloadFailed(
+                image_href=self.image_href,
+                reason=_("The image changed on the server during the "
+                         "download."))
+        if response.status_code != http_client.PARTIAL_CONTENT:
+            response.close()
+            raise exception.ImageDownloadFailed(
+                image_href=self.image_href,
+                reason=_("Got HTTP code %s instead of 206 in response to GET "
+                         "request with a Range header.") %
+                response.status_code)
+        return response
+
+    def _copy(self, segment, write, response):
+        for chunk in response.iter_content(IMAGE_CHUNK_SIZE):
+            if self.failed:
+                # Another segment failed, the download is aborted
+                return
+            if segment.end is not None:
+                chunk = chunk[:segment.end + 1 - segment.offset]
+            write(chunk)
+            segment.offset += len(chunk)
+            if segment.done:
+                return
+        if segment.end is not None and not segment.done:
+            raise requests.ConnectionError(
+                _('Connection closed after %(offset)d of %(end)d bytes') %
+                {'offset': segment.offset, 'end': segment.end + 1})
+
+
 class FileImageService(BaseImageService):
     """Provides retrieval of disk images available locally on the conductor."""
 
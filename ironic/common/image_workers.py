@@ -0,0 +1,130 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""A pool of native threads for the heavy parts of the image work.
+
+A conductor runs on an eventlet hub: while Python code hashes, copies or
+builds an image, no other green thread runs, and the heartbeats and the
+RPC requests wait. execute() runs such code in native threads instead;
+hashing and file I/O release the GIL.
+
+The steps of the streamed downloads, run with execute_streaming(), have
+their own threads: they do not wait for the tasks run with execute(),
+which can take minutes for a whole image.
+
+The code run in the pool must not use eventlet (green sockets, green
+subprocesses, green locks) nor log. The external commands run with
+utils.execute() already wait for their completion without blocking the
+hub.
+"""
+
+import time
+
+from eventlet import semaphore
+from eventlet import tpool
+from oslo_config import cfg
+
+from ironic.common.i18n import _
+from ironic.common import metrics
+
+image_workers_opts = [
+    cfg.IntOpt('image_worker_pool_size',
+               default=4,
+               min=0,
+               help=_('Number of native threads of the conductor hashing, '
+                      'copying and building images (floppy images, boot '
+                      'ISO contents), so that the conductor keeps '
+                      'heartbeating and handling RPC requests during mass '
+                      'deployments. Image work exceeding this number '
+                      'waits. As many threads again hash and write the '
+                      'data of the images being downloaded. Set to 0 to '
+                      'do the image work in the eventlet hub of the '
+                      'conductor.')),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(image_workers_opts)
+
+# The names of the metrics of the pool
+QUEUE_METRIC = 'image_workers.queue'
+WAIT_METRIC = 'image_workers.wait'
+RUN_METRIC = 'image_workers.run'
+
+# The semaphores bounding the tasks and the streaming steps
+_SEMAPHORES = None
+_REPORTER = metrics.Reporter('image_workers.', 'Image worker pool: %s')
+
+
+def _get_semaphores():
+    global _SEMAPHORES
+    if _SEMAPHORES is None:
+        # NOTE: no effect if the eventlet native threads already run, the
+        # semaphores still bound the image work.
+        tpool.set_num_threads(2 * CONF.image_worker_pool_size)
+        _SEMAPHORES = (semaphore.Semaphore(CONF.image_worker_pool_size),
+                       semaphore.Semaphore(CONF.image_worker_pool_size))
+    return _SEMAPHORES
+
+
+def execute(func, *args, **kwargs):
+    """Run a function in the pool and wait for its result.
+
+    Only the calling green thread waits; the exceptions raised by the
+    function are raised again.
+
+    The number of calls waiting for a thread (when a call is made), the
+    time spent waiting and the time spent running (in milliseconds) are
+    recorded by function name.
+
+    :param func: the function to call, which must not use eventlet.
+    :param args: the positional arguments of the function.
+    :param kwargs: the keyword arguments of the function.
+    :returns: the result of the function.
+    """
+    return _execute(0, func, args, kwargs)
+
+
+def execute_streaming(func, *args, **kwargs):
+    """Run a step of a streamed transfer in the pool, see execute().
+
+    The steps do not wait for the threads running the tasks of execute().
+    They should handle at least a MiB of data each, for the hand-over to
+    a native thread to be worth it.
+    """
+    return _execute(1, func, args, kwargs)
+
+
+def _execute(lane, func, args, kwargs):
+    if not CONF.image_worker_pool_size:
+        return func(*args, **kwargs)
+
+    pool = _get_semaphores()[lane]
+    registry = metrics.get_registry()
+    task = getattr(func, '__name__', func.__class__.__name__)
+    registry.observe(QUEUE_METRIC, max(0, -pool.balance), task=task)
+    submitted_at = time.time()
+    with pool:
+        started_at = time.time()
+        registry.observe(WAIT_METRIC, (started_at - submitted_at) * 1000,
+                         task=task)
+        try:
+            return tpool.execute(func, *args, **kwargs)
+        finally:
+            registry.observe(RUN_METRIC, (time.time() - started_at) * 1000,
+                             task=task)
+            _REPORTER.maybe_report()
+
+
+def reset():
+    """Size the pool again from the configuration, on its next use."""
+    global _SEMAPHORES
+    _SEMAPHORES = None
@@ -19,24 +19,31 @@
 Handling of VM disk images.
 """
 
+import copy
+import hashlib
 import os
 import shutil
 
 from ironic_lib import disk_utils
-from ironic_lib import utils as ironic_utils
 import jinja2
 from oslo_concurrency import processutils
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import fileutils
+from oslo_utils import units
+import six
 
 from ironic.common import exception
 from ironic.common.glance_service import service_utils as glance_utils
 from ironic.common.i18n import _
 from ironic.common.i18n import _LE
 from ironic.common import image_service as service
+from ironic.common import image_workers
+from ironic.common import metrics
 from ironic.common import paths
+from ironic.common import ttl_cache
 from ironic.common import utils
+from ironic.common import vfat
 
 LOG = logging.getLogger(__name__)
 
@@ -54,12 +61,46 @@ image_opts = [
     cfg.StrOpt('grub_config_template',
                default=paths.basedir_def('common/grub_conf.template'),
                help=_('Template file for grub configuration file.')),
+    cfg.IntOpt('image_metadata_cache_size',
+               default=512,
+               help=_('The maximum number of image metadata (as returned '
+                      'by the image service for an image and a tenant) '
+                      'kept in memory, so that the operations on a node '
+                      'do not ask the image service about the same image '
+                      'again and again. Set to 0 to disable this cache.')),
+    cfg.IntOpt('image_metadata_cache_ttl',
+               default=60,
+               help=_('Number of seconds the metadata of an image is kept '
+                      'in memory. The changes of the images which are not '
+                      'Glance images, whose content cannot change, may be '
+                      'detected that much later. The metadata of an image '
+                      'is fetched again before each download of the image. '
+                      'Set to 0 to disable the cache.')),
+    cfg.IntOpt('image_metadata_negative_cache_ttl',
+               default=10,
+               help=_('Number of seconds an image which cannot be found or '
+                      'accessed is remembered as such, instead of asking '
+                      'the image service again. Set to 0 to disable the '
+                      'caching of these errors.')),
 ]
 
 
 CONF = cfg.CONF
 CONF.register_opts(image_opts)
 
+# The name of the metric of the image metadata cache
+METADATA_CACHE_METRIC = 'images.metadata_cache'
+
+# The minimum size of the blocks of a download hashed and written in the
+# image worker pool: handing a small chunk over to a native thread costs
+# more than hashing and writing it.
+HASHING_BUFFER_SIZE = units.Mi
+
+_METADATA_CACHE = None
+_NEGATIVE_METADATA_CACHE = None
+_REPORTER = metrics.Reporter('images.', 'Image metadata cache: %s',
+                             debug=True)
+
 
 def _create_root_fs(root_directory, files_info):
     """Creates a filesystem root in given directory.
@@ -115,48 +156,32 @@ def create_vfat_image(output_file, files_info=None, parameters=None,
     :param parameters: A dict containing key-value pairs of parameters.
     :param parameters_file: The filename for the parameters file.
     :param fs_size_kib: size of the vfat filesystem in KiB.
-    :raises: ImageCreationFailed, if image creation failed while doing any
-        of filesystem manipulation activities like creating dirs, mounting,
-        creating filesystem, copying files, etc.
+    :raises: ImageCreationFailed, if image creation failed while reading
+        the files to copy, laying the filesystem out or writing the image.
     """
     try:
-        ironic_utils.dd('/dev/zero', output_file, 'count=1',
-                        "bs=%dKiB" % fs_size_kib)
-    except processutils.ProcessExecutionError as e:
+        # The label helps ramdisks to find the partition containing
+        # the parameters (by using /dev/disk/by-label/ir-vfd-dev).
+        # NOTE: FAT filesystem label can be up to 11 characters long.
+        image = vfat.FatImage(fs_size_kib * 1024, label='ir-vfd-dev')
+        if files_info:
+            for src_file, path in files_info.items():
+                with open(src_file, 'rb') as f:
+                    image.add_file(path, f.read())
+
+        if parameters:
+            params_list = ['%(key)s=%(val)s' % {'key': k, 'val': v}
+                           for k, v in parameters.items()]
+            file_contents = '\n'.join(params_list)
+            if isinstance(file_contents, six.text_type):
+                file_contents = file_contents.encode('utf-8')
+            image.add_file(parameters_file, file_contents)
+
+        image_workers.execute(image.write, output_file)
+    except EnvironmentError as e:
+        LOG.exception(_LE("vfat image creation failed. Error: %s"), e)
         raise exception.ImageCreationFailed(image_type='vfat', error=e)
 
-    with utils.tempdir() as tmpdir:
-
-        try:
-            # The label helps ramdisks to find the partition containing
-            # the parameters (by using /dev/disk/by-label/ir-vfd-dev).
-            # NOTE: FAT filesystem label can be up to 11 characters long.
-            ironic_utils.mkfs('vfat', output_file, label="ir-vfd-dev")
-            utils.mount(output_file, tmpdir, '-o', 'umask=0')
-        except processutils.ProcessExecutionError as e:
-            raise exception.ImageCreationFailed(image_type='vfat', error=e)
-
-        try:
-            if files_info:
-                _create_root_fs(tmpdir, files_info)
-
-            if parameters:
-                parameters_file = os.path.join(tmpdir, parameters_file)
-                params_list = ['%(key)s=%(val)s' % {'key': k, 'val': v}
-                               for k, v in parameters.items()]
-                file_contents = '\n'.join(params_list)
-                utils.write_to_file(parameters_file, file_contents)
-
-        except Exception as e:
-            LOG.exception(_LE("vfat image creation failed. Error: %s"), e)
-            raise exception.ImageCreationFailed(image_type='vfat', error=e)
-
-        finally:
-            try:
-                utils.umount(tmpdir)
-            except processutils.ProcessExecutionError as e:
-                raise exception.ImageCreationFailed(image_type='vfat', error=e)
-
 
 def _generate_cfg(kernel_params, template, options):
     """Generates a isolinux or grub configuration file.
@@ -216,7 +241,7 @@ def create_isolinux_image_for_bios(output_file, kernel, ramdisk,
             CONF.isolinux_bin: ISOLINUX_BIN,
         }
         try:
-            _create_root_fs(tmpdir, files_info)
+            image_workers.execute(_create_root_fs, tmpdir, files_info)
         except (OSError, IOError) as e:
             LOG.exception(_LE("Creating the filesystem root failed."))
             raise exception.ImageCreationFailed(image_type='iso', error=e)
@@ -282,7 +307,8 @@ def create_isolinux_image_for_uefi(output_file, deploy_iso, kernel, ramdisk,
             # uefi efiboot.img cannot be created.
             files_info.update(uefi_path_info)
             try:
-                _create_root_fs(tmpdir, files_info)
+                image_workers.execute(_create_root_fs, tmpdir,
+                                      files_info)
             except (OSError, IOError) as e:
                 LOG.exception(_LE("Creating the filesystem root failed."))
                 raise exception.ImageCreationFailed(image_type='iso', error=e)
@@ -314,28 +340,198 @@ def create_isolinux_image_for_uefi(output_file, deploy_iso, kernel, ramdisk,
             raise exception.ImageCreationFailed(image_type='iso', error=e)
 
 
+class _HashingFile(object):
+    """A file object computing the digests of the data written to it.
+
+    The data is buffered, then hashed and written in the image worker pool
+    by blocks of at least HASHING_BUFFER_SIZE bytes. The buffer is flushed
+    by flush() and before any other use of the file.
+    """
+
+    def __init__(self, image_file, algorithms):
+        self._file = image_file
+        self._hashes = dict((algorithm, hashlib.new(algorithm))
+                            for algorithm in algorithms)
+        self._buffer = []
+        self._buffered = 0
+        self.written = 0
+
+    def write(self, data):
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= HASHING_BUFFER_SIZE:
+            self._write_buffer()
+
+    def flush(self):
+        self._write_buffer()
+        self._file.flush()
+
+    def _write_buffer(self):
+        if self._buffer:
+            chunks = self._buffer
+            self._buffer = []
+            self._buffered = 0
+            image_workers.execute_streaming(self._write, chunks)
+
+    def _write(self, chunks):
+        for data in chunks:
+            for digest in self._hashes.values():
+                digest.update(data)
+            self._file.write(data)
+            self.written += len(data)
+
+    def hexdigests(self):
+        self._write_buffer()
+        return dict((algorithm, digest.hexdigest())
+                    for algorithm, digest in self._hashes.items())
+
+    def __getattr__(self, name):
+        # NOTE: the file is used directly (its position, its descriptor),
+        # the data written so far must be in it.
+        self._write_buffer()
+        return getattr(self._file, name)
+
+
+def _hash_path(path, algorithms):
+    """Compute the digests of a file, reading it once."""
+    hashes = [(algorithm, hashlib.new(algorithm)) for algorithm in algorithms]
+    with open(path, 'rb') as image_file:
+        for chunk in iter(lambda: image_file.read(service.IMAGE_CHUNK_SIZE),
+                          b''):
+            for algorithm, digest in hashes:
+                digest.update(chunk)
+    return dict((algorithm, digest.hexdigest())
+                for algorithm, digest in hashes)
+
+
+def get_checksum_algorithms():
+    """Get the algorithms of [image_download]checksum_algorithms.
+
+    :raises: InvalidParameterValue if hashlib does not support one of them.
+    :returns: the list of the names of the algorithms.
+    """
+    algorithms = CONF.image_download.checksum_algorithms
+    unsupported = [algorithm for algorithm in algorithms
+                   if algorithm not in hashlib.algorithms_available]
+    if unsupported:
+        raise exception.InvalidParameterValue(
+            _('Unsupported digest algorithms %(unsupported)s in '
+              '[image_download]checksum_algorithms, the supported ones are '
+              '%(supported)s.') %
+            {'unsupported': ', '.join(unsupported),
+             'supported': ', '.join(sorted(hashlib.algorithms_available))})
+    return algorithms
+
+
+def _get_expected_checksums(context, image_service, image_href):
+    """Get the checksums published for an image, by algorithm."""
+    if glance_utils.is_glance_image(image_href):
+        checksum = image_show(context, image_href,
+                              image_service).get('checksum')
+        return {'md5': checksum.lower()} if checksum else {}
+    if (CONF.image_download.http_checksum_sidecars and
+            isinstance(image_service, service.HttpImageService)):
+        return image_service.get_sidecar_checksums(
+            image_href, get_checksum_algorithms())
+    return {}
+
+
+def download_verified(image_service, image_href, path, expected,
+                      algorithms=()):
+    """Download an image to a file and verify its checksums.
+
+    :param image_service: the image service to download the image from.
+    :param image_href: the reference of the image.
+    :param path: the path of the file to write.
+    :param expected: the expected hexadecimal digests by algorithm.
+    :param algorithms: other algorithms to compute the digests with.
+    :raises: ImageChecksumError if a checksum does not match.
+    :returns: a dictionary of the hexadecimal digests of the image by
+        algorithm, empty if the data did not go through this process and
+        no checksum was expected.
+    """
+    algorithms = set(algorithms)
+    algorithms.update(expected)
+    with open(path, "wb") as image_file:
+        hashing_file = _HashingFile(image_file, algorithms)
+        image_service.download(image_href, hashing_file)
+        hashing_file.flush()
+
+    if hashing_file.written == os.path.getsize(path):
+        digests = hashing_file.hexdigests()
+    elif expected:
+        # NOTE: the data did not go through write() (it was linked,
+        # copied with sendfile or downloaded in parallel parts), it has
+        # to be read again.
+        digests = image_workers.execute(_hash_path, path, algorithms)
+    else:
+        digests = {}
+
+    for algorithm, checksum in expected.items():
+        if digests[algorithm] != checksum:
+            raise exception.ImageChecksumError(
+                image_href=image_href, algorithm=algorithm,
+                actual=digests[algorithm], expected=checksum)
+    return digests
+
+
 def fetch(context, image_href, path, force_raw=False):
+    """Download an image and verify its checksums.
+
+    The data is hashed while it is written, with the algorithms set in
+    [image_download]checksum_algorithms, and compared with the checksums
+    published by the image service.
+
+    :param context: the request context.
+    :param image_href: the reference of the image.
+    :param path: the path of the file to write.
+    :param force_raw: whether to convert the image to the raw format.
+    :raises: ImageChecksumError if a checksum does not match.
+    :raises: InvalidParameterValue if an algorithm of
+        [image_download]checksum_algorithms is not supported.
+    :returns: a dictionary of the hexadecimal digests of the downloaded
+        image by algorithm, empty if the image was not written by this
+        process (for example hard-linked) and has no checksum to verify.
+    """
     # TODO(vish): Improve context handling and add owner and auth data
     #             when it is added to glance.  Right now there is no
     #             auth checking in glance, so we assume that access was
     #             checked before we got here.
+    algorithms = get_checksum_algorithms()
     image_service = service.get_image_service(image_href,
                                               context=context)
     LOG.debug("Using %(image_service)s to download image %(image_href)s." %
               {'image_service': image_service.__class__,
                'image_href': image_href})
 
+    # The download is verified against the current metadata of the image
+    invalidate_image_metadata(context, image_href, image_service)
     with fileutils.remove_path_on_error(path):
-        with open(path, "wb") as image_file:
-            image_service.download(image_href, image_file)
+        expected = _get_expected_checksums(context, image_service,
+                                           image_href)
+        digests = download_verified(image_service, image_href, path,
+                                    expected, algorithms)
 
     if force_raw:
         image_to_raw(image_href, path, "%s.part" % path)
+    return digests
 
 
-def image_to_raw(image_href, path, path_tmp):
+def image_to_raw(image_href, path, path_tmp, image_info=None):
+    """Convert an image to the raw format, if needed.
+
+    :param image_href: the reference of the image, for the error messages.
+    :param path: the path of the raw image to create.
+    :param path_tmp: the path of the image to convert, removed once it is
+        converted or moved to path.
+    :param image_info: the result of disk_utils.qemu_img_info() for
+        path_tmp, if it is already known.
+    :raises: ImageUnacceptable if the format of the image cannot be found
+        or if the image has a backing file.
+    :raises: ImageConvertFailed if the converted image is not raw.
+    """
     with fileutils.remove_path_on_error(path_tmp):
-        data = disk_utils.qemu_img_info(path_tmp)
+        data = image_info or disk_utils.qemu_img_info(path_tmp)
 
         fmt = data.file_format
         if fmt is None:
@@ -370,27 +566,110 @@ def image_to_raw(image_href, path, path_tmp):
             os.rename(path_tmp, path)
 
 
+def _get_metadata_caches():
+    global _METADATA_CACHE, _NEGATIVE_METADATA_CACHE
+    if _METADATA_CACHE is None:
+        _METADATA_CACHE = ttl_cache.TTLCache(
+            CONF.image_metadata_cache_size, CONF.image_metadata_cache_ttl)
+        _NEGATIVE_METADATA_CACHE = ttl_cache.TTLCache(
+            CONF.image_metadata_cache_size,
+            CONF.image_metadata_negative_cache_ttl)
+    return _METADATA_CACHE, _NEGATIVE_METADATA_CACHE
+
+
+def _get_metadata_key(context, image_href, image_service):
+    # The Glance API versions do not return the same metadata
+    return (image_href, getattr(context, 'tenant', None),
+            getattr(image_service, 'version', None))
+
+
 def image_show(context, image_href, image_service=None):
+    """Get the metadata of an image, from the cache if possible.
+
+    The metadata are cached for [DEFAULT]image_metadata_cache_ttl seconds,
+    by image and tenant. The images which cannot be found or accessed are
+    cached for [DEFAULT]image_metadata_negative_cache_ttl seconds.
+
+    :param context: the request context.
+    :param image_href: the reference of the image.
+    :param image_service: the image service to use, by default the one
+        handling image_href.
+    :returns: a dict of the metadata of the image, which the caller may
+        modify.
+    """
     if image_service is None:
         image_service = service.get_image_service(image_href, context=context)
-    return image_service.show(image_href)
+    cache, negative_cache = _get_metadata_caches()
+    key = _get_metadata_key(context, image_href, image_service)
+
+    error = negative_cache.get(key)
+    image_info = cache.get(key) if error is None else None
+    if error is not None:
+        result = 'negative_hit'
+    elif image_info is not None:
+        result = 'hit'
+    else:
+        result = 'miss'
+    metrics.get_registry().increment(
+        METADATA_CACHE_METRIC, service=image_service.__class__.__name__,
+        result=result)
+    _REPORTER.maybe_report()
+
+    if error is not None:
+        raise type(error)(six.text_type(error))
+    if image_info is None:
+        try:
+            image_info = image_service.show(image_href)
+        except (exception.ImageNotFound, exception.ImageNotAuthorized) as e:
+            negative_cache.set(key, e)
+            raise
+        cache.set(key, image_info)
+    return copy.deepcopy(image_info)
+
+
+def invalidate_image_metadata(context, image_href, image_service=None):
+    """Forget the cached metadata of an image.
+
+    :param context: the request context.
+    :param image_href: the reference of the image.
+    :param image_service: the image service used to get the metadata, by
+        default the one handling image_href.
+    """
+    if _METADATA_CACHE is None:
+        return
+    if image_service is None:
+        image_service = service.get_image_service(image_href, context=context)
+    key = _get_metadata_key(context, image_href, image_service)
+    _METADATA_CACHE.delete(key)
+    _NEGATIVE_METADATA_CACHE.delete(key)
+
+
+def clear_caches():
+    """Forget the metadata of all the images."""
+    global _METADATA_CACHE, _NEGATIVE_METADATA_CACHE
+    _METADATA_CACHE = None
+    _NEGATIVE_METADATA_CACHE = None
 
 
 def download_size(context, image_href, image_service=None):
     return image_show(context, image_href, image_service)['size']
 
 
-def converted_size(path):
+def converted_size(path, image_info=None):
     """Get size of converted raw image.
 
     The size of image converted to raw format can be growing up to the virtual
     size of the image.
 
     :param path: path to the image file.
+    :param image_info: the result of disk_utils.qemu_img_info() for path, if
+        it is already known.
     :returns: virtual size of the image or 0 if conversion not needed.
 
     """
-    data = disk_utils.qemu_img_info(path)
+    data = image_info or disk_utils.qemu_img_info(path)
+    if data.file_format == 'raw':
+        return 0
     return data.virtual_size
 
 
@@ -405,8 +684,7 @@ def get_image_properties(context, image_href, properties="all"):
     :returns: a dict of the values of the properties. A property not on the
         glance metadata will have a value of None.
     """
-    img_service = service.get_image_service(image_href, context=context)
-    iproperties = img_service.show(image_href)['properties']
+    iproperties = image_show(context, image_href)['properties']
 
     if properties == "all":
         return iproperties
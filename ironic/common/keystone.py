@@ -19,6 +19,8 @@ from six.moves.urllib import parse
 
 from ironic.common import exception
 from ironic.common.i18n import _
+from ironic.common import metrics
+from ironic.common import ttl_cache
 
 CONF = cfg.CONF
 
@@ -26,12 +28,44 @@ keystone_opts = [
     cfg.StrOpt('region_name',
                help=_('The region used for getting endpoints of OpenStack'
                       ' services.')),
+    cfg.IntOpt('client_cache_size',
+               default=32,
+               help=_('The maximum number of clients of other OpenStack '
+                      'services (glance, neutron) kept in memory by each '
+                      'ironic service to be reused. Reusing a client '
+                      'reuses its token and its HTTP connections.')),
+    cfg.IntOpt('client_cache_ttl',
+               default=300,
+               help=_('Number of seconds a client of another OpenStack '
+                      'service is reused. Set to 0 to create a new client '
+                      'for each operation.')),
+    cfg.IntOpt('catalog_cache_ttl',
+               default=600,
+               help=_('Number of seconds the endpoints found in the Keystone '
+                      'service catalog (like the URL of the Bare Metal API '
+                      'given to the deploy ramdisk) are kept in memory. '
+                      'An endpoint of the Networking service that cannot '
+                      'be reached is looked up again. Set to 0 to look '
+                      'the endpoints up every time.')),
 ]
 
 CONF.register_opts(keystone_opts, group='keystone')
 CONF.import_group('keystone_authtoken', 'keystonemiddleware.auth_token')
 
+# The names of the metrics of the caches
+ADMIN_CLIENT_METRIC = 'keystone.admin_client'
+CATALOG_CACHE_METRIC = 'keystone.catalog_cache'
+CLIENT_CACHE_METRIC = 'keystone.client_cache'
+
+# There is one entry per service, endpoint type and region
+_ENDPOINT_CACHE_SIZE = 64
+
 _KS_CLIENT = None
+_CLIENT_CACHE = None
+_ENDPOINT_CACHE = None
+_REPORTER = metrics.Reporter('keystone.',
+                             'Keystone token and client caches: %s',
+                             debug=True)
 
 
 def _is_apiv3(auth_url, auth_version):
@@ -86,6 +120,11 @@ def _get_ksclient_from_conf(client, **params):
     # given token is about to expire
     if _KS_CLIENT is None or _KS_CLIENT.auth_ref.will_expire_soon():
         _KS_CLIENT = client.Client(**params)
+        result = 'miss'
+    else:
+        result = 'hit'
+    metrics.get_registry().increment(ADMIN_CLIENT_METRIC, result=result)
+    _REPORTER.maybe_report()
     return _KS_CLIENT
 
 
@@ -113,10 +152,27 @@ def get_service_url(service_type='baremetal', endpoint_type='internal'):
     Given a service_type and an endpoint_type, this method queries keystone
     service catalog and provides the url for the desired endpoint.
 
+    The endpoints are cached for [keystone]catalog_cache_ttl seconds.
+
     :param service_type: the keystone service for which url is required.
     :param endpoint_type: the type of endpoint for the service.
     :returns: an http/https url for the desired endpoint.
     """
+    cache = _get_endpoint_cache()
+    key = (service_type, endpoint_type, CONF.keystone.region_name)
+    endpoint = cache.get(key)
+    if endpoint is None:
+        endpoint = _find_service_url(service_type, endpoint_type)
+        cache.set(key, endpoint)
+        result = 'miss'
+    else:
+        result = 'hit'
+    metrics.get_registry().increment(CATALOG_CACHE_METRIC, result=result)
+    _REPORTER.maybe_report()
+    return endpoint
+
+
+def _find_service_url(service_type, endpoint_type):
     ksclient = _get_ksclient()
 
     if not ksclient.has_service_catalog():
@@ -148,5 +204,86 @@ def token_expires_soon(token, duration=None):
     :param duration: time interval in seconds
     :returns: boolean : true if expiration is within the given duration
     """
-    ksclient = _get_ksclient(token=token)
+    # The expiration of the admin token is already known, do not ask
+    # Keystone again about it
+    ksclient = _KS_CLIENT
+    if ksclient is None or ksclient.auth_token != token:
+        ksclient = _get_ksclient(token=token)
     return ksclient.auth_ref.will_expire_soon(stale_duration=duration)
+
+
+def _get_client_cache():
+    global _CLIENT_CACHE
+    if _CLIENT_CACHE is None:
+        _CLIENT_CACHE = ttl_cache.TTLCache(CONF.keystone.client_cache_size,
+                                           CONF.keystone.client_cache_ttl)
+    return _CLIENT_CACHE
+
+
+def get_client(service_type, key, create):
+    """Return a client of an OpenStack service, reusing a cached one.
+
+    Clients are cached for [keystone]client_cache_ttl seconds. Callers must
+    include everything the client depends on, like the endpoint and the
+    token, in the key; an expired token must not be part of a valid key.
+
+    :param service_type: the type of the service, e.g. 'image'.
+    :param key: a tuple of hashable values identifying the client among the
+        clients of the service.
+    :param create: a callable without arguments returning a new client.
+    :returns: the client.
+    """
+    cache = _get_client_cache()
+    key = (service_type,) + tuple(key)
+    client = cache.get(key)
+    if client is None:
+        client = create()
+        cache.set(key, client)
+        result = 'miss'
+    else:
+        result = 'hit'
+    metrics.get_registry().increment(CLIENT_CACHE_METRIC,
+                                     service=service_type, result=result)
+    _REPORTER.maybe_report()
+    return client
+
+
+def _get_endpoint_cache():
+    global _ENDPOINT_CACHE
+    if _ENDPOINT_CACHE is None:
+        _ENDPOINT_CACHE = ttl_cache.TTLCache(_ENDPOINT_CACHE_SIZE,
+                                             CONF.keystone.catalog_cache_ttl)
+    return _ENDPOINT_CACHE
+
+
+def invalidate_service_url(service_type='baremetal',
+                           endpoint_type='internal'):
+    """Look an endpoint up in the service catalog again next time.
+
+    To be called when the endpoint returned by get_service_url() could not
+    be reached, in case it has been moved.
+
+    :param service_type: the keystone service of the endpoint.
+    :param endpoint_type: the type of the endpoint.
+    """
+    if _ENDPOINT_CACHE is not None:
+        _ENDPOINT_CACHE.delete((service_type, endpoint_type,
+                                CONF.keystone.region_name))
+
+
+def invalidate_client(service_type, key):
+    """Stop reusing a client, for example after an authentication failure.
+
+    :param service_type: the type of the service, e.g. 'image'.
+    :param key: the key of the client, as passed to get_client().
+    """
+    if _CLIENT_CACHE is not None:
+        _CLIENT_CACHE.delete((service_type,) + tuple(key))
+
+
+def clear_caches():
+    """Forget the cached admin client, endpoints and service clients."""
+    global _KS_CLIENT, _CLIENT_CACHE, _ENDPOINT_CACHE
+    _KS_CLIENT = None
+    _CLIENT_CACHE = None
+    _ENDPOINT_CACHE = None
@@ -0,0 +1,467 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Lightweight timing metrics.
+
+Timings are aggregated in memory as histograms by a :class:`Registry`, and
+the time spent in the phases of a unit of work (for example an API request)
+is recorded by a :class:`Recorder` attached to the current thread, which is
+a green thread in ironic services.
+
+Phases may be nested: the time of a phase excludes the time of the phases
+started while it was running, so that the durations of all the phases of a
+unit of work add up to its total duration.
+
+When [metrics]enable_rpc_metrics is True, the RPC clients and servers
+created by ironic.common.rpc record the duration and the outcome of each
+RPC request (see :class:`MeteredRPCClient` and :class:`MeteredEndpoint`),
+and these metrics are periodically logged.
+"""
+
+import bisect
+import contextlib
+import json
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_log import log
+import oslo_messaging as messaging
+import six
+
+from ironic.common.i18n import _
+from ironic.common.i18n import _LI
+
+LOG = log.getLogger(__name__)
+
+metrics_opts = [
+    cfg.BoolOpt('enable_rpc_metrics',
+                default=False,
+                help=_('Record the duration and the outcome (success, error '
+                       'or timeout) of the RPC requests, per method and '
+                       'conductor host, on both the client side (API and '
+                       'conductor services sending requests) and the server '
+                       'side (conductor services executing them). The '
+                       'difference between both durations is the time spent '
+                       'by a request in the message bus and in the queue of '
+                       'the conductor.')),
+    cfg.IntOpt('report_interval',
+               default=60,
+               help=_('Interval (seconds) between two logs of the RPC '
+                      'metrics (when enable_rpc_metrics is True) and of the '
+                      'statistics of the caches of clients and tokens '
+                      '(at the debug level), as JSON. Set to 0 to never log '
+                      'them.')),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(metrics_opts, group='metrics')
+
+# The names of the RPC metrics
+RPC_CLIENT_CALL_METRIC = 'rpc.client.call'
+RPC_CLIENT_CAST_METRIC = 'rpc.client.cast'
+RPC_SERVER_METRIC = 'rpc.server'
+
+# Upper bounds (in milliseconds) of the buckets of the histograms
+DEFAULT_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000,
+                   10000)
+
+
+class Histogram(object):
+    """Distribution of durations, in milliseconds."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # The last count is for the values above the highest bound
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """Add a duration to the histogram."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """Return an upper bound of a percentile of the durations.
+
+        :param percent: the percentile, between 0 and 100.
+        :returns: the upper bound of the bucket holding the percentile, or
+                  the maximum duration for the last bucket. None if the
+                  histogram is empty.
+        """
+        if not self.count:
+            return None
+        rank = self.count * percent / 100.0
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        """Return a summary of the histogram, suitable for JSON."""
+        buckets = dict(('le_%s' % bound, count)
+                       for bound, count in zip(self.buckets, self.counts))
+        buckets['inf'] = self.counts[-1]
+        return {'count': self.count,
+                'sum': round(self.sum, 3),
+                'max': round(self.max, 3),
+                'p50': self.percentile(50),
+                'p90': self.percentile(90),
+                'p99': self.percentile(99),
+                'buckets': buckets}
+
+
+class Counter(object):
+    """Number of occurrences of an event."""
+
+    def __init__(self):
+        self.count = 0
+
+    def increment(self, value=1):
+        self.count += value
+
+    def to_dict(self):
+        """Return a summary of the counter, suitable for JSON."""
+        return {'count': self.count}
+
+
+class Registry(object):
+    """A thread-safe collection of histograms and counters.
+
+    Each histogram or counter is identified by the name of its metric and
+    its labels.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._buckets = buckets
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        """Add a duration to a histogram.
+
+        :param name: the name of the metric, e.g. 'api.phase'.
+        :param value: the duration, in milliseconds.
+        :param labels: values identifying the histogram among the ones of
+                       the metric, e.g. route='GET NodesController.get_one'.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._metrics.get(key)
+            if histogram is None:
+                histogram = self._metrics[key] = Histogram(self._buckets)
+            histogram.observe(value)
+
+    def increment(self, name, value=1, **labels):
+        """Increment a counter.
+
+        :param name: the name of the metric, e.g. 'keystone.admin_client'.
+        :param value: the value to add to the counter.
+        :param labels: values identifying the counter among the ones of the
+                       metric, e.g. result='hit'.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            counter = self._metrics.get(key)
+            if counter is None:
+                counter = self._metrics[key] = Counter()
+            counter.increment(value)
+
+    def snapshot(self, prefix=None):
+        """Return the histograms and counters, suitable for JSON.
+
+        :param prefix: if set, only return the ones of the metrics whose
+                       name starts with this prefix.
+        :returns: a list of dicts with the 'name' and the 'labels' of each
+                  histogram or counter, and its summary as returned by
+                  Histogram.to_dict() or Counter.to_dict(), sorted by name
+                  and labels.
+        """
+        with self._lock:
+            items = sorted(self._metrics.items())
+            result = []
+            for (name, labels), metric in items:
+                if prefix is not None and not name.startswith(prefix):
+                    continue
+                summary = metric.to_dict()
+                summary['name'] = name
+                summary['labels'] = dict(labels)
+                result.append(summary)
+        return result
+
+    def reset(self):
+        """Remove all the histograms and counters."""
+        with self._lock:
+            self._metrics.clear()
+
+
+_REGISTRY = Registry()
+
+
+def get_registry():
+    """Return the registry of the process."""
+    return _REGISTRY
+
+
+class Recorder(object):
+    """Records the time spent in the phases of a unit of work."""
+
+    def __init__(self):
+        self.start = time.time()
+        self.durations = {}
+        # Stack of [phase, start time, time spent in nested phases]
+        self._frames = []
+
+    def push(self, phase):
+        """Start a phase, nested in the current one if any."""
+        self._frames.append([phase, time.time(), 0.0])
+
+    def pop(self):
+        """End the current phase.
+
+        :returns: the duration of the phase, including nested phases.
+        """
+        phase, start, nested = self._frames.pop()
+        elapsed = time.time() - start
+        self._add(phase, elapsed - nested)
+        if self._frames:
+            self._frames[-1][2] += elapsed
+        return elapsed
+
+    def add(self, phase, seconds):
+        """Add the duration of a phase measured by the caller."""
+        self._add(phase, seconds)
+        if self._frames:
+            self._frames[-1][2] += seconds
+
+    def _add(self, phase, seconds):
+        self.durations[phase] = self.durations.get(phase, 0.0) + seconds
+
+    def current_durations(self):
+        """Return the durations of the phases, including the running ones.
+
+        :returns: a dict mapping the phases to their durations so far, in
+                  seconds, excluding nested phases.
+        """
+        durations = dict(self.durations)
+        now = time.time()
+        nested_end = 0.0
+        for phase, start, nested in reversed(self._frames):
+            elapsed = now - start
+            durations[phase] = (durations.get(phase, 0.0) +
+                                elapsed - nested - nested_end)
+            nested_end = elapsed
+        return durations
+
+
+_LOCAL = threading.local()
+
+
+def start_recording():
+    """Attach a new recorder to the current thread and return it."""
+    recorder = Recorder()
+    _LOCAL.recorder = recorder
+    return recorder
+
+
+def stop_recording():
+    """Detach the recorder from the current thread and return it."""
+    recorder = getattr(_LOCAL, 'recorder', None)
+    _LOCAL.recorder = None
+    return recorder
+
+
+def get_recorder():
+    """Return the recorder of the current thread, or None."""
+    return getattr(_LOCAL, 'recorder', None)
+
+
+@contextlib.contextmanager
+def timed(phase):
+    """Record the time spent in a block as a phase of the current work.
+
+    Does nothing if no recorder is attached to the current thread.
+    """
+    recorder = get_recorder()
+    if recorder is None:
+        yield
+        return
+    recorder.push(phase)
+    try:
+        yield
+    finally:
+        recorder.pop()
+
+
+def format_server_timing(durations):
+    """Format durations as the value of a Server-Timing HTTP header.
+
+    :param durations: a dict mapping names to durations in seconds.
+    """
+    return ', '.join('%s;dur=%.1f' % (name, seconds * 1000)
+                     for name, seconds in sorted(six.iteritems(durations)))
+
+
+class Reporter(object):
+    """Logs some metrics of a registry, at most once per interval."""
+
+    def __init__(self, prefix, message, registry=None, debug=False):
+        """Create a reporter.
+
+        :param prefix: the prefix of the names of the metrics to log.
+        :param message: the log message, with a %s for the metrics.
+        :param registry: the registry, defaults to the one of the process.
+        :param debug: whether to log at the debug level instead of info.
+        """
+        self.prefix = prefix
+        self.message = message
+        self.registry = registry or get_registry()
+        self.debug = debug
+        self._last_report = time.time()
+        self._lock = threading.Lock()
+
+    def maybe_report(self):
+        """Log the metrics if the last report is old enough."""
+        interval = CONF.metrics.report_interval
+        now = time.time()
+        if interval <= 0 or now - self._last_report < interval:
+            return
+        with self._lock:
+            if now - self._last_report < interval:
+                return
+            self._last_report = now
+        log = LOG.debug if self.debug else LOG.info
+        log(self.message,
+            json.dumps(self.registry.snapshot(prefix=self.prefix),
+                       sort_keys=True))
+
+
+_RPC_REPORTER = Reporter('rpc.', _LI('RPC timings (ms): %s'))
+
+
+def _host_from_topic(base_topic, topic):
+    if topic and topic.startswith(base_topic + '.'):
+        return topic[len(base_topic) + 1:]
+    return ''
+
+
+class _MeteredCallContext(object):
+
+    def __init__(self, call_context, host, registry, reporter):
+        self._call_context = call_context
+        self._host = host
+        self._registry = registry
+        self._reporter = reporter
+
+    def _send(self, metric, send, ctxt, method, **kwargs):
+        result = 'error'
+        start = time.time()
+        try:
+            reply = send(ctxt, method, **kwargs)
+            result = 'ok'
+            return reply
+        except messaging.MessagingTimeout:
+            result = 'timeout'
+            raise
+        finally:
+            self._registry.observe(metric, (time.time() - start) * 1000,
+                                   method=method, host=self._host,
+                                   result=result)
+            self._reporter.maybe_report()
+
+    def call(self, ctxt, method, **kwargs):
+        return self._send(RPC_CLIENT_CALL_METRIC, self._call_context.call,
+                          ctxt, method, **kwargs)
+
+    def cast(self, ctxt, method, **kwargs):
+        return self._send(RPC_CLIENT_CAST_METRIC, self._call_context.cast,
+                          ctxt, method, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._call_context, name)
+
+
+class MeteredRPCClient(object):
+    """Wraps an RPC client to record the duration of its requests.
+
+    The duration of calls includes the time spent in the message bus, in
+    the queue of the server and executing the request; the duration of
+    casts is only the time needed to send the request. Both are recorded
+    per method, host of the destination topic (empty when the request is
+    not sent to a specific host) and result: 'ok', 'error' when the server
+    raised an exception or 'timeout'.
+    """
+
+    def __init__(self, client, registry=None, reporter=None):
+        self._client = client
+        self._registry = registry or get_registry()
+        self._reporter = reporter or _RPC_REPORTER
+
+    def _wrap(self, call_context, topic):
+        host = _host_from_topic(self._client.target.topic, topic)
+        return _MeteredCallContext(call_context, host, self._registry,
+                                   self._reporter)
+
+    def prepare(self, *args, **kwargs):
+        return self._wrap(self._client.prepare(*args, **kwargs),
+                          kwargs.get('topic'))
+
+    def call(self, ctxt, method, **kwargs):
+        return self._wrap(self._client, None).call(ctxt, method, **kwargs)
+
+    def cast(self, ctxt, method, **kwargs):
+        return self._wrap(self._client, None).cast(ctxt, method, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class MeteredEndpoint(object):
+    """Wraps an RPC endpoint to record the execution time of its methods.
+
+    The durations are recorded per method and result: 'ok' or 'error' when
+    the method raised an exception, expected or not.
+    """
+
+    def __init__(self, endpoint, registry=None, reporter=None):
+        self._endpoint = endpoint
+        self._registry = registry or get_registry()
+        self._reporter = reporter or _RPC_REPORTER
+
+    def __getattr__(self, name):
+        attr = getattr(self._endpoint, name)
+        # NOTE: messaging.Target objects are callable too
+        if (name.startswith('_') or name == 'target' or
+                not callable(attr)):
+            return attr
+
+        def metered(*args, **kwargs):
+            result = 'error'
+            start = time.time()
+            try:
+                reply = attr(*args, **kwargs)
+                result = 'ok'
+                return reply
+            finally:
+                self._registry.observe(RPC_SERVER_METRIC,
+                                       (time.time() - start) * 1000,
+                                       method=name, result=result)
+                self._reporter.maybe_report()
+
+        return metered
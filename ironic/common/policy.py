@@ -19,6 +19,8 @@ from oslo_concurrency import lockutils
 from oslo_config import cfg
 from oslo_policy import policy
 
+from ironic.common import metrics
+
 _ENFORCER = None
 CONF = cfg.CONF
 
@@ -64,5 +66,6 @@ def enforce(rule, target, creds, do_raise=False, exc=None, *args, **kwargs):
 
     """
     enforcer = get_enforcer()
-    return enforcer.enforce(rule, target, creds, do_raise=do_raise,
-                            exc=exc, *args, **kwargs)
+    with metrics.timed('policy'):
+        return enforcer.enforce(rule, target, creds, do_raise=do_raise,
+                                exc=exc, *args, **kwargs)
@@ -18,6 +18,7 @@ import oslo_messaging as messaging
 
 from ironic.common import context as ironic_context
 from ironic.common import exception
+from ironic.common import metrics
 
 
 CONF = cfg.CONF
@@ -104,15 +105,20 @@ def get_transport_url(url_str=None):
 def get_client(target, version_cap=None, serializer=None):
     assert TRANSPORT is not None
     serializer = RequestContextSerializer(serializer)
-    return messaging.RPCClient(TRANSPORT,
-                               target,
-                               version_cap=version_cap,
-                               serializer=serializer)
+    client = messaging.RPCClient(TRANSPORT,
+                                 target,
+                                 version_cap=version_cap,
+                                 serializer=serializer)
+    if CONF.metrics.enable_rpc_metrics:
+        client = metrics.MeteredRPCClient(client)
+    return client
 
 
 def get_server(target, endpoints, serializer=None):
     assert TRANSPORT is not None
     serializer = RequestContextSerializer(serializer)
+    if CONF.metrics.enable_rpc_metrics:
+        endpoints = [metrics.MeteredEndpoint(e) for e in endpoints]
     return messaging.get_rpc_server(TRANSPORT,
                                     target,
                                     endpoints,
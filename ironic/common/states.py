@@ -191,6 +191,23 @@ REBOOT = 'rebooting'
 """ Node is rebooting. """
 
 
+############
+# Job states
+############
+
+JOB_PENDING = 'pending'
+""" Job was accepted by a conductor and waits for a free worker. """
+
+JOB_RUNNING = 'running'
+""" Job is being run by a conductor. """
+
+JOB_SUCCEEDED = 'succeeded'
+""" Job finished, its result is available. """
+
+JOB_FAILED = 'failed'
+""" Job finished with an error. """
+
+
 #####################
 # State machine model
 #####################
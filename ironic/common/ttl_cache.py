@@ -0,0 +1,80 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""A small in-memory, size bounded cache with per-entry expiration."""
+
+import collections
+import threading
+import time
+
+
+class TTLCache(object):
+    """A least-recently-used cache whose entries expire after a TTL.
+
+    Entries are evicted either when they are older than ``ttl`` seconds or,
+    when the cache holds more than ``maxsize`` entries, in least recently
+    used order. A ``maxsize`` or ``ttl`` of 0 disables the cache: nothing
+    is stored and every lookup is a miss.
+    """
+
+    def __init__(self, maxsize, ttl):
+        """Create a new cache.
+
+        :param maxsize: the maximum number of entries to keep.
+        :param ttl: the number of seconds an entry stays valid.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key, default=None):
+        """Return the value cached for ``key`` or ``default``.
+
+        A hit marks the entry as the most recently used one.
+        """
+        with self._lock:
+            try:
+                expires_at, value = self._data.pop(key)
+            except KeyError:
+                return default
+            if expires_at < time.time():
+                return default
+            self._data[key] = (expires_at, value)
+            return value
+
+    def set(self, key, value):
+        """Store ``value`` under ``key``, evicting old entries if needed."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.time() + self.ttl, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove ``key`` from the cache if it is present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all the entries from the cache."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
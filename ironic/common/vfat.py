@@ -0,0 +1,436 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Writer of small FAT12 and FAT16 filesystem images.
+
+The images are built in memory, without formatting and mounting a loop
+device, with the layout mkfs.fat uses for a hard disk image: one reserved
+sector, two FATs, 512 root directory entries and clusters of 4 sectors
+(or more, for the images too big for FAT16 clusters of 2 KiB). File names
+which are not upper case 8.3 names are stored as VFAT long file names.
+"""
+
+import collections
+import string
+import struct
+import time
+
+import six
+
+from ironic.common import exception
+from ironic.common.i18n import _
+
+SECTOR_SIZE = 512
+DIR_ENTRY_SIZE = 32
+RESERVED_SECTORS = 1
+NUMBER_OF_FATS = 2
+ROOT_DIR_ENTRIES = 512
+MEDIA_DESCRIPTOR = 0xf8
+SECTORS_PER_TRACK = 32
+HEADS = 64
+MAX_SECTORS_PER_CLUSTER = 128
+MAX_LABEL_LENGTH = 11
+MAX_NAME_LENGTH = 255
+
+# The number of clusters decides of the FAT type.
+FAT12_MAX_CLUSTERS = 4084
+FAT16_MAX_CLUSTERS = 65524
+
+ATTR_VOLUME_ID = 0x08
+ATTR_DIRECTORY = 0x10
+ATTR_ARCHIVE = 0x20
+ATTR_LONG_NAME = 0x0f
+
+LFN_CHARS_PER_ENTRY = 13
+LFN_LAST_ENTRY = 0x40
+
+SHORT_NAME_CHARS = frozenset(string.ascii_uppercase + string.digits +
+                             "!#$%&'()-@^_`{}~")
+
+# The boot code mkfs.fat writes to non bootable filesystems.
+BOOT_CODE = (b'\x0e\x1f\xbe\x5b\x7c\xac\x22\xc0\x74\x0b\x56\xb4\x0e\xbb'
+             b'\x07\x00\xcd\x10\x5e\xeb\xf0\x32\xe4\xcd\x16\xcd\x19\xeb'
+             b'\xfe'
+             b'This is not a bootable disk.  Please insert a bootable '
+             b'floppy and\r\npress any key to try again ... \r\n')
+
+_BOOT_SECTOR = struct.Struct('<3s8sHBHBHHBHHHII')
+_EXTENDED_BOOT_RECORD = struct.Struct('<BBBI11s8s')
+_DIR_ENTRY = struct.Struct('<11sBBBHHHHHHHI')
+_LFN_ENTRY = struct.Struct('<B10sBBB12sH4s')
+
+
+def _cdiv(a, b):
+    return -(-a // b)
+
+
+def _error(msg, **kwargs):
+    return exception.ImageCreationFailed(image_type='vfat',
+                                         error=msg % kwargs)
+
+
+def _get_geometry(total_sectors):
+    """Find the FAT type and cluster size for a filesystem size.
+
+    As mkfs.fat does, start from clusters of 4 sectors and double their size
+    until the data area fits in the clusters a FAT12 or FAT16 can address.
+
+    :param total_sectors: the number of sectors of the filesystem.
+    :returns: a tuple (FAT bits, sectors per cluster, sectors per FAT,
+        number of clusters).
+    :raises: ImageCreationFailed if no FAT12 or FAT16 layout fits.
+    """
+    root_dir_sectors = ROOT_DIR_ENTRIES * DIR_ENTRY_SIZE // SECTOR_SIZE
+    fats_and_data = total_sectors - RESERVED_SECTORS - root_dir_sectors
+    sectors_per_cluster = 4
+    while sectors_per_cluster <= MAX_SECTORS_PER_CLUSTER:
+        for fat_bits, min_clusters, max_clusters in (
+                (12, 1, FAT12_MAX_CLUSTERS),
+                (16, FAT12_MAX_CLUSTERS + 1, FAT16_MAX_CLUSTERS)):
+            # The FAT has an entry for each cluster, plus 2 reserved ones
+            clusters = fats_and_data // sectors_per_cluster
+            sectors_per_fat = _cdiv((clusters + 2) * fat_bits,
+                                    SECTOR_SIZE * 8)
+            clusters = ((fats_and_data - NUMBER_OF_FATS * sectors_per_fat) //
+                        sectors_per_cluster)
+            if min_clusters <= clusters <= max_clusters:
+                return (fat_bits, sectors_per_cluster, sectors_per_fat,
+                        clusters)
+        sectors_per_cluster *= 2
+    raise _error(_('a FAT12 or FAT16 filesystem cannot have %(sectors)d '
+                   'sectors'), sectors=total_sectors)
+
+
+def _fat_datetime(timestamp):
+    """Convert a timestamp to FAT (date, time) values, in local time."""
+    tm = time.localtime(timestamp)
+    year = min(max(tm.tm_year, 1980), 2107)
+    fat_date = ((year - 1980) << 9) | (tm.tm_mon << 5) | tm.tm_mday
+    fat_time = (tm.tm_hour << 11) | (tm.tm_min << 5) | (tm.tm_sec // 2)
+    return fat_date, fat_time
+
+
+def _is_short_name(name):
+    base, dot, ext = name.partition('.')
+    return (0 < len(base) <= 8 and len(ext) <= 3 and
+            (ext or not dot) and
+            all(c in SHORT_NAME_CHARS for c in base + ext))
+
+
+def _pack_short_name(name):
+    base, _dot, ext = name.partition('.')
+    return (base.ljust(8) + ext.ljust(3)).encode('ascii')
+
+
+def _get_short_name(name, used):
+    """Generate the 8.3 alias of a long file name.
+
+    :param name: the long file name.
+    :param used: the set of the packed short names used in the directory.
+    :returns: the packed (11 bytes) short name.
+    """
+    def _clean(part):
+        return ''.join(c if c in SHORT_NAME_CHARS else '_'
+                       for c in part.upper() if c not in ' .')
+
+    stripped = name.lstrip('.')
+    if '.' in stripped:
+        base, ext = stripped.rsplit('.', 1)
+    else:
+        base, ext = stripped, ''
+    base = _clean(base) or '_'
+    ext = _clean(ext)[:3]
+    for number in range(1, 1000000):
+        tail = '~%d' % number
+        short_name = _pack_short_name(
+            '%s%s.%s' % (base[:8 - len(tail)], tail, ext))
+        if short_name not in used:
+            return short_name
+    raise _error(_('too many files named like %(name)s'), name=name)
+
+
+def _short_name_checksum(short_name):
+    checksum = 0
+    for c in six.iterbytes(short_name):
+        checksum = (((checksum & 1) << 7) + (checksum >> 1) + c) & 0xff
+    return checksum
+
+
+def _pack_long_name(name, short_name):
+    """Pack the VFAT long file name entries preceding a short name entry."""
+    checksum = _short_name_checksum(short_name)
+    count = _cdiv(len(name), LFN_CHARS_PER_ENTRY)
+    padded = name
+    if len(padded) % LFN_CHARS_PER_ENTRY:
+        padded += u'\0'
+    padded = padded.ljust(count * LFN_CHARS_PER_ENTRY, u'\uffff')
+    entries = []
+    for sequence in range(count, 0, -1):
+        start = (sequence - 1) * LFN_CHARS_PER_ENTRY
+        chars = padded[start:start + LFN_CHARS_PER_ENTRY].encode('utf-16-le')
+        order = sequence | LFN_LAST_ENTRY if sequence == count else sequence
+        entries.append(_LFN_ENTRY.pack(order, chars[:10], ATTR_LONG_NAME, 0,
+                                       checksum, chars[10:22], 0,
+                                       chars[22:26]))
+    return b''.join(entries)
+
+
+class _Directory(object):
+
+    def __init__(self):
+        # Long name -> _Directory or file content
+        self.children = collections.OrderedDict()
+        self.cluster = 0
+        self.entries = None
+
+
+class FatImage(object):
+    """A FAT12 or FAT16 filesystem image built in memory.
+
+    Usage::
+
+        image = FatImage(100 * 1024, label='ir-vfd-dev')
+        image.add_file('parameters.txt', b'key=value')
+        image.write('/path/to/image')
+    """
+
+    def __init__(self, size, label=None, volume_id=None):
+        """Create a new, empty, filesystem image.
+
+        :param size: the size of the filesystem in bytes, rounded down to
+            a whole number of sectors.
+        :param label: the volume label, up to 11 characters long.
+        :param volume_id: the 32 bits volume serial number. Derived from the
+            current time, like mkfs.fat does, if not given.
+        :raises: ImageCreationFailed if the size or the label is invalid.
+        """
+        self.total_sectors = size // SECTOR_SIZE
+        (self.fat_bits, self.sectors_per_cluster, self.sectors_per_fat,
+         self.clusters) = _get_geometry(self.total_sectors)
+        self.cluster_size = self.sectors_per_cluster * SECTOR_SIZE
+        if label is not None:
+            label = six.text_type(label)
+            try:
+                label = label.encode('ascii')
+            except UnicodeError:
+                raise _error(_('the label %(label)s is not ASCII'),
+                             label=label)
+            if not label or len(label) > MAX_LABEL_LENGTH:
+                raise _error(_('the label %(label)s is not 1 to 11 '
+                               'characters long'), label=label)
+        self.label = label
+        self.created_at = time.time()
+        if volume_id is None:
+            seconds = int(self.created_at)
+            micro_seconds = int((self.created_at - seconds) * 1000000)
+            volume_id = ((seconds << 20) | micro_seconds) & 0xffffffff
+        self.volume_id = volume_id
+        self._root = _Directory()
+
+    def add_file(self, path, data):
+        """Add a file to the image, creating its parent directories.
+
+        :param path: the path of the file within the image, using '/' as
+            separator.
+        :param data: the content of the file, as bytes.
+        :raises: ImageCreationFailed if the path is invalid or already used.
+        """
+        names = [six.text_type(name) for name in path.split('/') if name]
+        if not names:
+            raise _error(_('invalid file path %(path)s'), path=path)
+        directory = self._root
+        for index, name in enumerate(names):
+            if (name in ('.', '..') or len(name) > MAX_NAME_LENGTH or
+                    any(c in name for c in u'\\:*?"<>|') or
+                    any(ord(c) < 0x20 for c in name)):
+                raise _error(_('invalid file name %(name)s in %(path)s'),
+                             name=name, path=path)
+            existing = [child for child in directory.children
+                        if child.upper() == name.upper()]
+            last = index == len(names) - 1
+            if existing:
+                child = directory.children[existing[0]]
+                if last or not isinstance(child, _Directory):
+                    raise _error(_('%(path)s already exists'), path=path)
+                directory = child
+            elif last:
+                directory.children[name] = bytes(data)
+            else:
+                directory.children[name] = directory = _Directory()
+
+    def to_bytes(self):
+        """Return the content of the filesystem image.
+
+        :raises: ImageCreationFailed if the files do not fit in the image.
+        """
+        image = bytearray(self.total_sectors * SECTOR_SIZE)
+        fat = [(0xff00 | MEDIA_DESCRIPTOR) & self._end_of_chain,
+               self._end_of_chain]
+        fat_date, fat_time = _fat_datetime(self.created_at)
+
+        # Lay the directories and the files out on consecutive clusters,
+        # the content of a directory after its entries.
+        def _allocate(size):
+            count = _cdiv(size, self.cluster_size)
+            if not count:
+                return 0
+            first = len(fat)
+            if first - 2 + count > self.clusters:
+                raise _error(_('the files do not fit in %(size)d bytes'),
+                             size=len(image))
+            fat.extend(range(first + 1, first + count))
+            fat.append(self._end_of_chain)
+            return first
+
+        def _layout(directory, parent):
+            directory.entries = self._pack_entries(directory, fat_date,
+                                                   fat_time)
+            if directory is not self._root:
+                directory.cluster = _allocate(len(directory.entries))
+            placed = []
+            for name, child in directory.children.items():
+                if isinstance(child, _Directory):
+                    placed.append(_layout(child, directory))
+                else:
+                    placed.append(_allocate(len(child)))
+            directory.entries = self._pack_entries(
+                directory, fat_date, fat_time, placed, parent)
+            if directory is self._root:
+                if len(directory.entries) > ROOT_DIR_ENTRIES * DIR_ENTRY_SIZE:
+                    raise _error(_('too many files in the root directory'))
+                self._write(image, self._root_dir_offset, directory.entries)
+            else:
+                self._write_clusters(image, directory.cluster,
+                                     directory.entries)
+            for cluster, child in zip(placed, directory.children.values()):
+                if not isinstance(child, _Directory):
+                    self._write_clusters(image, cluster, child)
+            return directory.cluster
+
+        _layout(self._root, None)
+
+        self._write(image, 0, self._pack_boot_sector())
+        fat_bytes = self._pack_fat(fat)
+        for number in range(NUMBER_OF_FATS):
+            self._write(image, (RESERVED_SECTORS +
+                                number * self.sectors_per_fat) * SECTOR_SIZE,
+                        fat_bytes)
+        return bytes(image)
+
+    def write(self, output_file):
+        """Write the filesystem image to a file.
+
+        :param output_file: the path of the file, replaced if it exists.
+        :raises: ImageCreationFailed if the files do not fit in the image.
+        :raises: EnvironmentError if writing the file failed.
+        """
+        content = self.to_bytes()
+        with open(output_file, 'wb') as f:
+            f.write(content)
+
+    @property
+    def _end_of_chain(self):
+        return (1 << self.fat_bits) - 1
+
+    @property
+    def _root_dir_offset(self):
+        return ((RESERVED_SECTORS + NUMBER_OF_FATS * self.sectors_per_fat) *
+                SECTOR_SIZE)
+
+    @property
+    def _data_offset(self):
+        return self._root_dir_offset + ROOT_DIR_ENTRIES * DIR_ENTRY_SIZE
+
+    def _write(self, image, offset, data):
+        image[offset:offset + len(data)] = data
+
+    def _write_clusters(self, image, cluster, data):
+        if cluster:
+            self._write(image, self._data_offset +
+                        (cluster - 2) * self.cluster_size, data)
+
+    def _pack_boot_sector(self):
+        label = (self.label or b'NO NAME').ljust(MAX_LABEL_LENGTH)
+        fs_type = ('FAT%d' % self.fat_bits).ljust(8).encode('ascii')
+        # The total sector count uses the 32 bits field when too big for
+        # the 16 bits one.
+        small_total, total = self.total_sectors, 0
+        if small_total > 0xffff:
+            small_total, total = 0, self.total_sectors
+        boot_sector = bytearray(SECTOR_SIZE)
+        # Jump over the BIOS parameter block to the boot code
+        header = _BOOT_SECTOR.pack(
+            b'\xeb\x3c\x90', b'mkfs.fat', SECTOR_SIZE,
+            self.sectors_per_cluster, RESERVED_SECTORS, NUMBER_OF_FATS,
+            ROOT_DIR_ENTRIES, small_total, MEDIA_DESCRIPTOR,
+            self.sectors_per_fat, SECTORS_PER_TRACK, HEADS, 0, total)
+        header += _EXTENDED_BOOT_RECORD.pack(0x80, 0, 0x29, self.volume_id,
+                                             label, fs_type)
+        boot_sector[:len(header)] = header
+        boot_sector[len(header):len(header) + len(BOOT_CODE)] = BOOT_CODE
+        boot_sector[-2:] = b'\x55\xaa'
+        return boot_sector
+
+    def _pack_fat(self, fat):
+        if self.fat_bits == 16:
+            return struct.pack('<%dH' % len(fat), *fat)
+        # FAT12 packs two entries in three bytes
+        if len(fat) % 2:
+            fat = fat + [0]
+        packed = bytearray()
+        for index in range(0, len(fat), 2):
+            pair = fat[index] | (fat[index + 1] << 12)
+            packed += struct.pack('<I', pair)[:3]
+        return packed
+
+    def _pack_entries(self, directory, fat_date, fat_time, clusters=None,
+                      parent=None):
+        """Pack the entries of a directory.
+
+        Without clusters, only the size of the entries is meaningful.
+        """
+        def _entry(short_name, attr, cluster=0, size=0):
+            return _DIR_ENTRY.pack(short_name, attr, 0, 0, fat_time,
+                                   fat_date, fat_date, 0, fat_time,
+                                   fat_date, cluster, size)
+
+        entries = []
+        if directory is self._root:
+            if self.label:
+                entries.append(_entry(self.label.ljust(MAX_LABEL_LENGTH),
+                                      ATTR_VOLUME_ID))
+        else:
+            entries.append(_entry(b'.'.ljust(11), ATTR_DIRECTORY,
+                                  directory.cluster))
+            entries.append(_entry(b'..'.ljust(11), ATTR_DIRECTORY,
+                                  parent.cluster if parent else 0))
+
+        # The short names of the long names must not clash with the names
+        # which are short names already.
+        used = set(_pack_short_name(name) for name in directory.children
+                   if _is_short_name(name))
+        if clusters is None:
+            clusters = [0] * len(directory.children)
+        for cluster, (name, child) in zip(clusters,
+                                          directory.children.items()):
+            if _is_short_name(name):
+                short_name = _pack_short_name(name)
+            else:
+                short_name = _get_short_name(name, used)
+                entries.append(_pack_long_name(name, short_name))
+                used.add(short_name)
+            if isinstance(child, _Directory):
+                entries.append(_entry(short_name, ATTR_DIRECTORY, cluster))
+            else:
+                entries.append(_entry(short_name, ATTR_ARCHIVE, cluster,
+                                      len(child)))
+        return b''.join(entries)
@@ -36,6 +36,7 @@ from ironic.common import rpc
 from ironic.common import states
 from ironic.conductor import task_manager
 from ironic.db import api as dbapi
+from ironic.drivers.modules import image_cache
 
 
 conductor_opts = [
@@ -91,10 +92,9 @@ class BaseConductorManager(periodic_task.PeriodicTasks):
         self.ring_manager = hash.HashRingManager()
         """Consistent hash ring which maps drivers to conductors."""
 
-        # NOTE(deva): instantiating DriverFactory may raise DriverLoadError
-        #             or DriverNotFound
+        # NOTE(deva): instantiating DriverFactory may raise DriverNotFound
         self._driver_factory = driver_factory.DriverFactory()
-        """Driver factory loads all enabled drivers."""
+        """Driver factory which finds and loads the enabled drivers."""
 
         self.drivers = self._driver_factory.names
         """List of driver names which this conductor supports."""
@@ -106,7 +106,9 @@ class BaseConductorManager(periodic_task.PeriodicTasks):
             LOG.error(msg, self.host)
             raise exception.NoDriversLoaded(conductor=self.host)
 
-        # Collect driver-specific periodic tasks
+        # Collect driver-specific periodic tasks. This loads all the enabled
+        # drivers, so that the conductor does not start if one of them
+        # raises DriverLoadError.
         for driver_obj in driver_factory.drivers().values():
             self._collect_periodic_tasks(driver_obj)
             for iface_name in (driver_obj.core_interfaces +
@@ -116,6 +118,9 @@ class BaseConductorManager(periodic_task.PeriodicTasks):
                 if iface:
                     self._collect_periodic_tasks(iface)
 
+        # Share the master images with the other conductors, if enabled
+        image_cache.start_peer_server(self.host)
+
         # clear all locks held by this conductor before registering
         self.dbapi.clear_node_reservations_for_conductor(self.host)
         try:
@@ -172,6 +177,7 @@ class BaseConductorManager(periodic_task.PeriodicTasks):
         if not hasattr(self, 'conductor'):
             return
         self._keepalive_evt.set()
+        image_cache.stop_peer_server()
         if deregister:
             try:
                 # Inform the cluster that this conductor is shutting down.
@@ -44,14 +44,17 @@ a change, etc.
 import collections
 import datetime
 import tempfile
+import time
 
 import eventlet
+from eventlet import greenpool
 from oslo_config import cfg
 from oslo_log import log
 import oslo_messaging as messaging
 from oslo_service import periodic_task
 from oslo_utils import excutils
 from oslo_utils import uuidutils
+import six
 
 from ironic.common import dhcp_factory
 from ironic.common import exception
@@ -64,12 +67,14 @@ from ironic.common import images
 from ironic.common import states
 from ironic.common import swift
 from ironic.conductor import base_manager
+from ironic.conductor import options
 from ironic.conductor import task_manager
 from ironic.conductor import utils
+from ironic.drivers.modules import image_cache
 from ironic import objects
 from ironic.objects import base as objects_base
 
-MANAGER_TOPIC = 'ironic.conductor_manager'
+MANAGER_TOPIC = options.MANAGER_TOPIC
 
 LOG = log.getLogger(__name__)
 
@@ -78,11 +83,6 @@ conductor_opts = [
                help=_('URL of Ironic API service. If not set ironic can '
                       'get the current value from the keystone service '
                       'catalog.')),
-    cfg.IntOpt('heartbeat_timeout',
-               default=60,
-               help=_('Maximum time (in seconds) since the last check-in '
-                      'of a conductor. A conductor is considered inactive '
-                      'when this time has been exceeded.')),
     cfg.IntOpt('sync_power_state_interval',
                default=60,
                help=_('Interval between syncing the node power state to the '
@@ -174,17 +174,56 @@ conductor_opts = [
                       'ramdisk doing the cleaning. If the timeout is reached '
                       'the node will be put in the "clean failed" provision '
                       'state. Set to 0 to disable timeout.')),
+    cfg.IntOpt('job_result_ttl',
+               default=3600,
+               help=_('Number of seconds the state and result of a job, '
+                      'for example a vendor passthru call run in the '
+                      'background on behalf of the API, are kept after the '
+                      'last update of the job. Expired jobs are deleted '
+                      'periodically, at this interval.')),
+    cfg.IntOpt('node_change_ttl',
+               default=600,
+               help=_('Number of seconds the changes of the power and '
+                      'provision states of the nodes, returned by GET '
+                      '/v1/nodes/changes, are kept. Clients which did not '
+                      'watch the changes for longer than this will miss '
+                      'some of them. Old changes are deleted periodically, '
+                      'at this interval.')),
+    cfg.IntOpt('bulk_action_concurrency',
+               default=8,
+               help=_('Maximum number of nodes of a bulk power or '
+                      'provisioning request which are validated and locked '
+                      'concurrently before their action is started in a '
+                      'worker thread.')),
+    cfg.IntOpt('image_prewarm_concurrency',
+               default=4,
+               min=1,
+               help=_('Maximum number of images downloaded concurrently '
+                      'when the master image caches of the conductor are '
+                      'pre-warmed. The downloads only run in parallel if '
+                      '[DEFAULT]parallel_image_downloads is enabled.')),
+    cfg.IntOpt('image_prewarm_pin_time',
+               default=3600,
+               help=_('Default number of seconds during which the images '
+                      'pre-warmed into the master image caches are not '
+                      'evicted, even if the caches are larger than their '
+                      'maximum size.')),
 ]
 CONF = cfg.CONF
 CONF.register_opts(conductor_opts, 'conductor')
 SYNC_EXCLUDED_STATES = (states.DEPLOYWAIT, states.CLEANWAIT, states.ENROLL)
 
+# The RPC methods which can be run in the background by start_job()
+JOB_METHODS = ('driver_vendor_passthru', 'get_boot_device',
+               'get_console_information', 'get_supported_boot_devices',
+               'validate_driver_interfaces', 'vendor_passthru')
+
 
 class ConductorManager(base_manager.BaseConductorManager):
     """Ironic Conductor manager main class."""
 
     # NOTE(rloo): This must be in sync with rpcapi.ConductorAPI's.
-    RPC_API_VERSION = '1.31'
+    RPC_API_VERSION = '1.36'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
@@ -206,9 +245,35 @@ class ConductorManager(base_manager.BaseConductorManager):
         :param node_obj: a changed (but not saved) node object.
 
         """
-        node_id = node_obj.uuid
-        LOG.debug("RPC update_node called for node %s." % node_id)
+        LOG.debug("RPC update_node called for node %s." % node_obj.uuid)
+        return self._do_update_node(context, node_obj)
 
+    def update_nodes(self, context, node_objs):
+        """Update several nodes with the supplied data.
+
+        Each node is updated like update_node() does. A failure to update
+        a node does not prevent the others from being updated, it is
+        reported in the result instead.
+
+        :param context: an admin context
+        :param node_objs: a list of changed (but not saved) node objects.
+        :returns: a list with, for each node, either the updated node
+                  object or a dict with the 'code' and the 'message' of the
+                  error which prevented the update.
+
+        """
+        LOG.debug("RPC update_nodes called for nodes %s.",
+                  ', '.join(node_obj.uuid for node_obj in node_objs))
+        results = []
+        for node_obj in node_objs:
+            try:
+                results.append(self._do_update_node(context, node_obj))
+            except exception.IronicException as e:
+                results.append({'code': e.code, 'message': six.text_type(e)})
+        return results
+
+    def _do_update_node(self, context, node_obj):
+        node_id = node_obj.uuid
         # NOTE(jroll) clear maintenance_reason if node.update sets
         # maintenance to False for backwards compatibility, for tools
         # not using the maintenance endpoint.
@@ -224,6 +289,219 @@ class ConductorManager(base_manager.BaseConductorManager):
 
         return node_obj
 
+    @messaging.expected_exceptions(exception.NoFreeConductorWorker,
+                                   exception.InvalidParameterValue,
+                                   exception.NodeNotFound)
+    def start_job(self, context, job_method, kwargs):
+        """Run a synchronous RPC method in the background.
+
+        A job recording the call is created, and the method is called by a
+        worker of this conductor. The caller does not wait for the method
+        to return, it polls the job to get the result instead.
+
+        :param context: an admin context.
+        :param job_method: the name of the RPC method, one of JOB_METHODS.
+        :param kwargs: the arguments of the RPC method, except the context.
+        :raises: InvalidParameterValue if the method cannot be run as a job.
+        :raises: NodeNotFound if the node given in kwargs does not exist.
+        :raises: NoFreeConductorWorker when there is no free worker to run
+                 the job.
+        :returns: the new job object.
+
+        """
+        LOG.debug("RPC start_job called for method %s.", job_method)
+        if job_method not in JOB_METHODS:
+            raise exception.InvalidParameterValue(
+                _('Method %s cannot be run as a job') % job_method)
+
+        node_id = None
+        if 'node_id' in kwargs:
+            node_id = objects.Node.get(context, kwargs['node_id']).id
+
+        job = objects.Job(context, uuid=uuidutils.generate_uuid(),
+                          node_id=node_id, method=job_method,
+                          state=states.JOB_PENDING)
+        job.create()
+        self._spawn_job_worker(job, self._run_job, context, job, job_method,
+                               kwargs)
+        return job
+
+    def _spawn_job_worker(self, job, func, *args):
+        """Spawn a worker running a job, failing the job if there is none."""
+        try:
+            self._spawn_worker(func, *args)
+        except exception.NoFreeConductorWorker:
+            with excutils.save_and_reraise_exception():
+                job.state = states.JOB_FAILED
+                job.status_code = exception.NoFreeConductorWorker.code
+                job.last_error = _('No free conductor worker available')
+                job.save()
+
+    def _run_job(self, context, job, method, kwargs):
+        """Call an RPC method and store its outcome in a job."""
+        job.state = states.JOB_RUNNING
+        job.save()
+        try:
+            result = getattr(self, method)(context, **kwargs)
+        except Exception as e:
+            if isinstance(e, messaging.ExpectedException):
+                e = e.exc_info[1]
+            else:
+                LOG.exception(_LE('Job %(job)s running %(method)s failed.'),
+                              {'job': job.uuid, 'method': method})
+            if (method == 'get_console_information' and
+                    isinstance(e, exception.NodeConsoleNotEnabled)):
+                # NOTE: the synchronous API call reports a disabled console
+                # in its body, the job succeeds without console information.
+                job.state = states.JOB_SUCCEEDED
+                job.status_code = 200
+                job.result = {'return': None}
+            else:
+                job.state = states.JOB_FAILED
+                job.status_code = getattr(e, 'code', 500)
+                job.last_error = six.text_type(e)
+        else:
+            job.state = states.JOB_SUCCEEDED
+            job.status_code = 200
+            if (method in ('vendor_passthru', 'driver_vendor_passthru') and
+                    result.get('async')):
+                # NOTE: the vendor method goes on in the background, the
+                # synchronous API call returns 202 (Accepted) for it.
+                job.status_code = 202
+            job.result = {'return': result}
+        try:
+            job.save()
+        except exception.JobNotFound:
+            LOG.warning(_LW('Job %s expired before it finished.'), job.uuid)
+        except Exception as e:
+            # NOTE: e.g. a result which cannot be serialized; do not leave
+            # the job running forever, nor expose the details of the error.
+            LOG.exception(_LE('Unable to save the outcome of job %(job)s '
+                              'running %(method)s.'),
+                          {'job': job.uuid, 'method': method})
+            job.state = states.JOB_FAILED
+            job.status_code = 500
+            job.result = {}
+            job.last_error = (_('Unable to save the outcome of the job: %s')
+                              % e.__class__.__name__)
+            try:
+                job.save()
+            except Exception:
+                LOG.exception(_LE('Unable to save job %s as failed.'),
+                              job.uuid)
+
+    @messaging.expected_exceptions(exception.NoFreeConductorWorker)
+    def prewarm_image_cache(self, context, images, deploy_images,
+                            pin_time=None):
+        """Download images into the master image caches of this conductor.
+
+        Before many nodes are deployed with the same images, downloading
+        them in advance saves the first deployments from waiting for the
+        download, and from serializing on it. The images are downloaded by
+        a worker of this conductor, up to
+        [conductor]image_prewarm_concurrency at a time, into the caches of
+        the drivers loaded by the conductor. The progress is reported by a
+        job.
+
+        :param context: an admin context.
+        :param images: a list of UUIDs or hrefs of instance images.
+        :param deploy_images: a list of dicts with the 'deploy_kernel' and
+                              'deploy_ramdisk' UUIDs or hrefs of deploy
+                              images.
+        :param pin_time: number of seconds during which the images are not
+                         evicted from the caches, defaults to
+                         [conductor]image_prewarm_pin_time.
+        :raises: NoFreeConductorWorker when there is no free worker to
+                 download the images.
+        :returns: the job reporting the progress of the downloads.
+
+        """
+        LOG.debug("RPC prewarm_image_cache called for images %(images)s "
+                  "and deploy images %(deploy)s.",
+                  {'images': images, 'deploy': deploy_images})
+        if pin_time is None:
+            pin_time = CONF.conductor.image_prewarm_pin_time
+        deploy_hrefs = [deploy[key] for deploy in deploy_images
+                        for key in ('deploy_kernel', 'deploy_ramdisk')
+                        if deploy.get(key)]
+        work = []
+        for image_kind, hrefs in ((image_cache.INSTANCE_IMAGES, images),
+                                  (image_cache.DEPLOY_IMAGES, deploy_hrefs)):
+            hrefs = sorted(set(hrefs), key=hrefs.index)
+            for cache in image_cache.get_caches(image_kind):
+                work.extend((cache, href) for href in hrefs)
+
+        job = objects.Job(context, uuid=uuidutils.generate_uuid(),
+                          method='prewarm_image_cache',
+                          state=states.JOB_PENDING,
+                          result={'return': {'total': len(work), 'done': 0,
+                                             'downloaded': 0, 'failed': {}}})
+        job.create()
+        self._spawn_job_worker(job, self._prewarm_image_cache, context, job,
+                               work, time.time() + pin_time)
+        return job
+
+    def _prewarm_image_cache(self, context, job, work, pin_until):
+        """Download images into caches, and report the progress in a job.
+
+        :param context: an admin context.
+        :param job: the job reporting the progress.
+        :param work: a list of tuples (ImageCache object, image href).
+        :param pin_until: time until which the images are not evicted.
+        """
+        def _cache_image(item):
+            cache, href = item
+            try:
+                return href, cache.cache_image(
+                    href, ctx=context, force_raw=CONF.force_raw_images,
+                    pin_until=pin_until), None
+            except Exception as e:
+                LOG.warning(_LW('Unable to pre-warm the master image cache '
+                                '%(dir)s with image %(href)s: %(err)s'),
+                            {'dir': cache.master_dir, 'href': href, 'err': e})
+                return href, False, six.text_type(e)
+
+        done = downloaded = 0
+        failed = {}
+        expired = False
+        job.state = states.JOB_RUNNING
+        job.save()
+        pool = greenpool.GreenPool(CONF.conductor.image_prewarm_concurrency)
+        for href, was_downloaded, error in pool.imap(_cache_image, work):
+            done += 1
+            if error is not None:
+                failed[href] = error
+            elif was_downloaded:
+                downloaded += 1
+            job.result = {'return': {'total': len(work), 'done': done,
+                                     'downloaded': downloaded,
+                                     'failed': dict(failed)}}
+            if expired:
+                # NOTE: still download the images, for the deployments
+                continue
+            try:
+                job.save()
+            except exception.JobNotFound:
+                LOG.warning(_LW('Job %s expired before it finished.'),
+                            job.uuid)
+                expired = True
+
+        if expired:
+            return
+        if failed:
+            job.state = states.JOB_FAILED
+            job.status_code = 500
+            job.last_error = (_('Unable to pre-warm the master image caches '
+                                'with %(count)d of %(total)d images') %
+                              {'count': len(failed), 'total': len(work)})
+        else:
+            job.state = states.JOB_SUCCEEDED
+            job.status_code = 200
+        try:
+            job.save()
+        except exception.JobNotFound:
+            LOG.warning(_LW('Job %s expired before it finished.'), job.uuid)
+
     @messaging.expected_exceptions(exception.InvalidParameterValue,
                                    exception.MissingParameterValue,
                                    exception.NoFreeConductorWorker,
@@ -265,6 +543,61 @@ class ConductorManager(base_manager.BaseConductorManager):
             task.spawn_after(self._spawn_worker, utils.node_power_action,
                              task, new_state)
 
+    def change_nodes_power_state(self, context, node_ids, new_state):
+        """RPC method to change the power state of several nodes.
+
+        Each node is handled like change_node_power_state() does, several
+        nodes at once. A failure for a node does not prevent the others
+        from being handled, it is reported in the result instead.
+
+        :param context: an admin context.
+        :param node_ids: a list of ids or uuids of nodes.
+        :param new_state: the desired power state of the nodes.
+        :returns: a list with, for each node, either None if the power
+                  action was started or a dict with the 'code' and the
+                  'message' of the error which prevented it.
+
+        """
+        LOG.debug("RPC change_nodes_power_state called for nodes %(nodes)s. "
+                  "The desired new state is %(state)s.",
+                  {'nodes': ', '.join(node_ids), 'state': new_state})
+        return self._do_bulk_node_action(context, node_ids,
+                                         'change_node_power_state',
+                                         new_state)
+
+    def _do_bulk_node_action(self, context, node_ids, method, *args):
+        """Call a per-node RPC method for several nodes concurrently.
+
+        The synchronous part of the method (locking and validating the
+        node) is run for up to [conductor]bulk_action_concurrency nodes at
+        a time; as usual, the method spawns a worker for the actual action.
+
+        :param context: an admin context.
+        :param node_ids: a list of ids or uuids of nodes.
+        :param method: the name of the RPC method, called with the context,
+                       the id of a node and args.
+        :returns: a list with, for each node, either None if the method
+                  succeeded or a dict with the 'code' and the 'message' of
+                  the error it raised.
+        """
+        func = getattr(self, method)
+
+        def _call(node_id):
+            try:
+                func(context, node_id, *args)
+            except Exception as e:
+                if isinstance(e, messaging.ExpectedException):
+                    e = e.exc_info[1]
+                elif not isinstance(e, exception.IronicException):
+                    LOG.exception(_LE('Bulk %(method)s failed for node '
+                                      '%(node)s.'),
+                                  {'method': method, 'node': node_id})
+                return {'code': getattr(e, 'code', 500),
+                        'message': six.text_type(e)}
+
+        pool = greenpool.GreenPool(CONF.conductor.bulk_action_concurrency)
+        return list(pool.imap(_call, node_ids))
+
     @messaging.expected_exceptions(exception.NoFreeConductorWorker,
                                    exception.NodeLocked,
                                    exception.InvalidParameterValue,
@@ -1026,6 +1359,47 @@ class ConductorManager(base_manager.BaseConductorManager):
                     action=action, node=task.node.uuid,
                     state=task.node.provision_state)
 
+    def do_nodes_provisioning_action(self, context, node_ids, target,
+                                     configdrive=None):
+        """RPC method to change the provision state of several nodes.
+
+        Each node is handled like the RPC method matching the target does
+        (do_node_deploy, do_node_tear_down, inspect_hardware or
+        do_provisioning_action), several nodes at once. A failure for a
+        node does not prevent the others from being handled, it is reported
+        in the result instead.
+
+        :param context: an admin context.
+        :param node_ids: a list of ids or uuids of nodes.
+        :param target: the desired provision state of the nodes or verb,
+                       as accepted by the API.
+        :param configdrive: Optional. A gzipped and base64 encoded
+                            configdrive for all the nodes. Only valid when
+                            the target is "active".
+        :returns: a list with, for each node, either None if the action was
+                  started or a dict with the 'code' and the 'message' of
+                  the error which prevented it.
+
+        """
+        LOG.debug("RPC do_nodes_provisioning_action called for nodes "
+                  "%(nodes)s. The target is %(target)s.",
+                  {'nodes': ', '.join(node_ids), 'target': target})
+        if target == states.ACTIVE:
+            return self._do_bulk_node_action(context, node_ids,
+                                             'do_node_deploy', False,
+                                             configdrive)
+        if target == states.REBUILD:
+            return self._do_bulk_node_action(context, node_ids,
+                                             'do_node_deploy', True)
+        if target == states.DELETED:
+            return self._do_bulk_node_action(context, node_ids,
+                                             'do_node_tear_down')
+        if target == states.VERBS['inspect']:
+            return self._do_bulk_node_action(context, node_ids,
+                                             'inspect_hardware')
+        return self._do_bulk_node_action(context, node_ids,
+                                         'do_provisioning_action', target)
+
     @periodic_task.periodic_task(
         spacing=CONF.conductor.sync_power_state_interval)
     def _sync_power_states(self, context):
@@ -1227,6 +1601,28 @@ class ConductorManager(base_manager.BaseConductorManager):
                                'provision_updated_at',
                                last_error=last_error)
 
+    @periodic_task.periodic_task(spacing=CONF.conductor.job_result_ttl)
+    def _cleanup_expired_jobs(self, context):
+        """Periodically deletes the jobs which expired.
+
+        :param context: request context.
+        """
+        count = objects.Job.destroy_expired(context,
+                                            CONF.conductor.job_result_ttl)
+        if count:
+            LOG.debug('Deleted %d expired jobs.', count)
+
+    @periodic_task.periodic_task(spacing=CONF.conductor.node_change_ttl)
+    def _cleanup_old_node_changes(self, context):
+        """Periodically deletes the old changes of the node states.
+
+        :param context: request context.
+        """
+        count = objects.Node.destroy_old_changes(
+            context, CONF.conductor.node_change_ttl)
+        if count:
+            LOG.debug('Deleted %d old node changes.', count)
+
     @periodic_task.periodic_task(
         spacing=CONF.conductor.sync_local_state_interval)
     def _sync_local_state(self, context):
@@ -0,0 +1,35 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Constants and options of the conductor also used by its clients.
+
+The API service needs them, but should not import ironic.conductor.manager,
+which imports the task manager, the driver factory and many other modules
+only used by the conductor. Keep this module free of such imports.
+"""
+
+from oslo_config import cfg
+
+from ironic.common.i18n import _
+
+MANAGER_TOPIC = 'ironic.conductor_manager'
+
+conductor_opts = [
+    cfg.IntOpt('heartbeat_timeout',
+               default=60,
+               help=_('Maximum time (in seconds) since the last check-in '
+                      'of a conductor. A conductor is considered inactive '
+                      'when this time has been exceeded.')),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(conductor_opts, 'conductor')
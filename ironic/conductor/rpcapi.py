@@ -26,7 +26,7 @@ from ironic.common import exception
 from ironic.common import hash_ring
 from ironic.common.i18n import _
 from ironic.common import rpc
-from ironic.conductor import manager
+from ironic.conductor import options
 from ironic.objects import base as objects_base
 
 
@@ -78,17 +78,23 @@ class ConductorAPI(object):
     |    1.31 - Added Versioned Objects indirection API methods:
     |           object_class_action_versions, object_action and
     |           object_backport_versions
+    |    1.32 - Added update_nodes
+    |    1.33 - Added start_job
+    |    1.34 - update_node and object_action accept objects serialized as
+    |           deltas, see IronicObject.obj_to_delta_primitive()
+    |    1.35 - Added change_nodes_power_state and do_nodes_provisioning_action
+    |    1.36 - Added prewarm_image_cache
 
     """
 
     # NOTE(rloo): This must be in sync with manager.ConductorManager's.
-    RPC_API_VERSION = '1.31'
+    RPC_API_VERSION = '1.36'
 
     def __init__(self, topic=None):
         super(ConductorAPI, self).__init__()
         self.topic = topic
         if self.topic is None:
-            self.topic = manager.MANAGER_TOPIC
+            self.topic = options.MANAGER_TOPIC
 
         target = messaging.Target(topic=self.topic,
                                   version='1.0')
@@ -99,6 +105,12 @@ class ConductorAPI(object):
         # NOTE(deva): this is going to be buggy
         self.ring_manager = hash_ring.HashRingManager()
 
+    def _can_send_delta(self, obj):
+        """Whether an object can be sent as a delta to the conductors."""
+        return (isinstance(obj, objects_base.IronicObject) and
+                obj.obj_can_send_delta() and
+                self.client.can_send_version('1.34'))
+
     def get_topic_for(self, node):
         """Get the RPC topic for the conductor service the node is mapped to.
 
@@ -108,7 +120,9 @@ class ConductorAPI(object):
 
         """
         self.ring_manager.reset()
+        return self._get_topic_for(node)
 
+    def _get_topic_for(self, node):
         try:
             ring = self.ring_manager[node.driver]
             dest = ring.get_hosts(node.uuid)
@@ -118,6 +132,27 @@ class ConductorAPI(object):
                         'driver %s.') % node.driver)
             raise exception.NoValidHost(reason=reason)
 
+    def get_topics_for(self, nodes):
+        """Get the RPC topics for the conductor services of several nodes.
+
+        Like get_topic_for(), but the hash ring is rebuilt only once for all
+        the nodes.
+
+        :param nodes: a list of node objects.
+        :returns: a list with, for each node, either its RPC topic string or
+                  the NoValidHost exception telling why there is none.
+
+        """
+        self.ring_manager.reset()
+
+        topics = []
+        for node in nodes:
+            try:
+                topics.append(self._get_topic_for(node))
+            except exception.NoValidHost as e:
+                topics.append(e)
+        return topics
+
     def get_topic_for_driver(self, driver_name):
         """Get RPC topic name for a conductor supporting the given driver.
 
@@ -136,6 +171,20 @@ class ConductorAPI(object):
         host = random.choice(list(hash_ring.hosts))
         return self.topic + "." + host
 
+    def get_conductor_topics(self):
+        """Get the RPC topics of all the conductor services.
+
+        :returns: a dict with the RPC topic of each conductor service, by
+                  hostname.
+
+        """
+        self.ring_manager.reset()
+
+        hosts = set()
+        for ring in self.ring_manager.ring.values():
+            hosts.update(ring.hosts)
+        return {host: self.topic + "." + host for host in hosts}
+
     def update_node(self, context, node_obj, topic=None):
         """Synchronously, have a conductor update the node's information.
 
@@ -154,9 +203,50 @@ class ConductorAPI(object):
         :returns: updated node object, including all fields.
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.1')
+        version = '1.1'
+        if self._can_send_delta(node_obj):
+            # NOTE: only send the changes, the conductor loads the node
+            version = '1.34'
+            node_obj = node_obj.obj_to_delta_primitive()
+        cctxt = self.client.prepare(topic=topic or self.topic, version=version)
         return cctxt.call(context, 'update_node', node_obj=node_obj)
 
+    def update_nodes(self, context, node_objs, topic=None):
+        """Synchronously, have a conductor update several nodes.
+
+        Like update_node(), for several nodes at once. All the nodes must
+        be managed by the conductors of the given topic.
+
+        :param context: request context.
+        :param node_objs: a list of changed (but not saved) node objects.
+        :param topic: RPC topic. Defaults to self.topic.
+        :returns: a list with, for each node, either the updated node
+                  object or a dict with the 'code' and the 'message' of the
+                  error which prevented the update.
+
+        """
+        cctxt = self.client.prepare(topic=topic or self.topic, version='1.32')
+        return cctxt.call(context, 'update_nodes', node_objs=node_objs)
+
+    def start_job(self, context, job_method, kwargs, topic=None):
+        """Have a conductor run a synchronous method in the background.
+
+        :param context: request context.
+        :param job_method: the name of the RPC method to run, for example
+                           'vendor_passthru'.
+        :param kwargs: the arguments of the RPC method, except the context.
+        :param topic: RPC topic. Defaults to self.topic.
+        :raises: InvalidParameterValue if the method cannot be run as a job.
+        :raises: NodeNotFound if the node given in kwargs does not exist.
+        :raises: NoFreeConductorWorker when there is no free worker to run
+                 the job.
+        :returns: the job object.
+
+        """
+        cctxt = self.client.prepare(topic=topic or self.topic, version='1.33')
+        return cctxt.call(context, 'start_job', job_method=job_method,
+                          kwargs=kwargs)
+
     def change_node_power_state(self, context, node_id, new_state, topic=None):
         """Change a node's power state.
 
@@ -175,6 +265,26 @@ class ConductorAPI(object):
         return cctxt.call(context, 'change_node_power_state', node_id=node_id,
                           new_state=new_state)
 
+    def change_nodes_power_state(self, context, node_ids, new_state,
+                                 topic=None):
+        """Change the power state of several nodes.
+
+        Like change_node_power_state(), for several nodes at once. All the
+        nodes must be managed by the conductors of the given topic.
+
+        :param context: request context.
+        :param node_ids: a list of node ids or uuids.
+        :param new_state: one of ironic.common.states power state values
+        :param topic: RPC topic. Defaults to self.topic.
+        :returns: a list with, for each node, either None if the power
+                  action was started or a dict with the 'code' and the
+                  'message' of the error which prevented it.
+
+        """
+        cctxt = self.client.prepare(topic=topic or self.topic, version='1.35')
+        return cctxt.call(context, 'change_nodes_power_state',
+                          node_ids=node_ids, new_state=new_state)
+
     def vendor_passthru(self, context, node_id, driver_method, http_method,
                         info, topic=None):
         """Receive requests for vendor-specific actions.
@@ -343,6 +453,55 @@ class ConductorAPI(object):
         return cctxt.call(context, 'do_provisioning_action',
                           node_id=node_id, action=action)
 
+    def do_nodes_provisioning_action(self, context, node_ids, target,
+                                     configdrive=None, topic=None):
+        """Change the provision state of several nodes.
+
+        Like do_node_deploy(), do_node_tear_down(), inspect_hardware() or
+        do_provisioning_action(), depending on the target, for several
+        nodes at once. All the nodes must be managed by the conductors of
+        the given topic.
+
+        :param context: request context.
+        :param node_ids: a list of node ids or uuids.
+        :param target: the desired provision state of the nodes or verb,
+                       as accepted by the API.
+        :param configdrive: Optional. A gzipped and base64 encoded
+                            configdrive for all the nodes. Only valid when
+                            the target is "active".
+        :param topic: RPC topic. Defaults to self.topic.
+        :returns: a list with, for each node, either None if the action was
+                  started or a dict with the 'code' and the 'message' of
+                  the error which prevented it.
+
+        """
+        cctxt = self.client.prepare(topic=topic or self.topic, version='1.35')
+        return cctxt.call(context, 'do_nodes_provisioning_action',
+                          node_ids=node_ids, target=target,
+                          configdrive=configdrive)
+
+    def prewarm_image_cache(self, context, images, deploy_images,
+                            pin_time=None, topic=None):
+        """Have a conductor download images into its master image caches.
+
+        :param context: request context.
+        :param images: a list of UUIDs or hrefs of instance images.
+        :param deploy_images: a list of dicts with the 'deploy_kernel' and
+                              'deploy_ramdisk' UUIDs or hrefs of deploy
+                              images.
+        :param pin_time: number of seconds during which the images are not
+                         evicted from the caches. Defaults to the
+                         configuration of the conductor.
+        :param topic: RPC topic. Defaults to self.topic.
+        :raises: NoFreeConductorWorker when there is no free worker to
+                 download the images.
+        :returns: the job reporting the progress of the downloads.
+
+        """
+        cctxt = self.client.prepare(topic=topic or self.topic, version='1.36')
+        return cctxt.call(context, 'prewarm_image_cache', images=images,
+                          deploy_images=deploy_images, pin_time=pin_time)
+
     def continue_node_clean(self, context, node_id, topic=None):
         """Signal to conductor service to start the next cleaning action.
 
@@ -641,7 +800,11 @@ class ConductorAPI(object):
             raise NotImplementedError(_('Incompatible conductor version - '
                                         'please upgrade ironic-conductor '
                                         'first'))
-        cctxt = self.client.prepare(topic=self.topic, version='1.31')
+        version = '1.31'
+        if self._can_send_delta(objinst):
+            version = '1.34'
+            objinst = objinst.obj_to_delta_primitive()
+        cctxt = self.client.prepare(topic=self.topic, version=version)
         return cctxt.call(context, 'object_action', objinst=objinst,
                           objmethod=objmethod, args=args, kwargs=kwargs)
 
@@ -97,6 +97,59 @@ class Connection(object):
                          (asc, desc)
         """
 
+    @abc.abstractmethod
+    def get_node_aggregates(self, group_by, filters=None):
+        """Count the nodes for each combination of values of some columns.
+
+        The counting is done by the database, no node is loaded.
+
+        :param group_by: List of column names to group the nodes by.
+        :param filters: Filters to apply, the same as for get_node_list().
+                        Defaults to None.
+        :returns: A list of tuples, each one with the values of the
+                  group_by columns followed by the number of matching
+                  nodes. An empty group_by returns a single tuple with
+                  the number of matching nodes.
+        """
+
+    @abc.abstractmethod
+    def get_node_changes(self, since, limit=None):
+        """Return the changes of the state of the nodes after a sequence.
+
+        A change is recorded by update_node() whenever it modifies the
+        power_state, target_power_state, provision_state or
+        target_provision_state of a node.
+
+        :param since: The sequence number of the last change already seen.
+        :param limit: Maximum number of changes to return.
+        :returns: A list of changes, ordered by sequence number (their id).
+        """
+
+    @abc.abstractmethod
+    def get_last_node_change_seq(self):
+        """Return the sequence number of the last change of a node state.
+
+        :returns: The sequence number, 0 if no change was recorded.
+        """
+
+    @abc.abstractmethod
+    def get_first_node_change_seq(self):
+        """Return the sequence number of the oldest change still recorded.
+
+        :returns: The sequence number, 0 if no change was recorded.
+        """
+
+    @abc.abstractmethod
+    def destroy_old_node_changes(self, ttl):
+        """Delete the changes of the state of the nodes older than a TTL.
+
+        The last change is never deleted, so that its sequence number is
+        still known.
+
+        :param ttl: Number of seconds after which a change is deleted.
+        :returns: The number of changes deleted.
+        """
+
     @abc.abstractmethod
     def reserve_node(self, tag, node_id):
         """Reserve a node.
@@ -146,6 +199,16 @@ class Connection(object):
         :returns: A node.
         """
 
+    @abc.abstractmethod
+    def create_nodes(self, values_list):
+        """Create several nodes in a single transaction.
+
+        :param values_list: A list of dicts, as accepted by create_node().
+        :returns: A list of nodes, in the same order.
+        :raises: The exceptions raised by create_node(), in which case none
+                 of the nodes is created.
+        """
+
     @abc.abstractmethod
     def get_node_by_id(self, node_id):
         """Return a node.
@@ -267,6 +330,16 @@ class Connection(object):
         :param values: Dict of values.
         """
 
+    @abc.abstractmethod
+    def create_ports(self, values_list):
+        """Create several ports in a single transaction.
+
+        :param values_list: A list of dicts, as accepted by create_port().
+        :returns: A list of ports, in the same order.
+        :raises: The exceptions raised by create_port(), in which case none
+                 of the ports is created.
+        """
+
     @abc.abstractmethod
     def update_port(self, port_id, values):
         """Update properties of an port.
@@ -412,3 +485,109 @@ class Connection(object):
         :param node_id: The id of a node.
         :raises: NodeNotFound
         """
+
+    @abc.abstractmethod
+    def create_job(self, values):
+        """Create a new job.
+
+        :param values: A dict containing several items used to identify
+                       and track the job. For example:
+
+                       ::
+
+                        {
+                         'uuid': uuidutils.generate_uuid(),
+                         'node_id': 1,
+                         'method': 'get_boot_device',
+                         'state': states.JOB_PENDING,
+                        }
+        :returns: A job.
+        :raises: JobAlreadyExists
+        """
+
+    @abc.abstractmethod
+    def get_job_by_uuid(self, job_uuid):
+        """Return a job.
+
+        :param job_uuid: The uuid of a job.
+        :returns: A job.
+        :raises: JobNotFound
+        """
+
+    @abc.abstractmethod
+    def update_job(self, job_id, values):
+        """Update properties of a job.
+
+        :param job_id: The id or uuid of a job.
+        :param values: Dict of values to update.
+        :returns: A job.
+        :raises: JobNotFound
+        """
+
+    @abc.abstractmethod
+    def destroy_expired_jobs(self, ttl):
+        """Delete the jobs which were not updated for some time.
+
+        :param ttl: Number of seconds since the last update of a job after
+                    which it is deleted, whatever its state.
+        :returns: The number of jobs deleted.
+        """
+
+    @abc.abstractmethod
+    def announce_cached_image(self, values):
+        """Record that a conductor holds an image in a master image cache.
+
+        The previous record of the same image by the same conductor, if any,
+        is replaced.
+
+        :param values: A dict describing the image. For example:
+
+                       ::
+
+                        {
+                         'hostname': 'conductor1',
+                         'kind': 'instance',
+                         'file_name': '2a2b5f6f-77c0-4b44-a1e3-3d7e2ba1d63c',
+                         'raw': True,
+                         'size': 2147483648,
+                         'url': 'http://192.0.2.1:6388/<token>/instance/...',
+                         'checksums': {'md5': '...'},
+                         'file_checksums': {'sha256': '...'},
+                        }
+
+                       The checksums are those of the image as it was
+                       downloaded, the file checksums those of the file
+                       served to the other conductors, which differ if
+                       the image was converted to the raw format.
+        :returns: A cached image record.
+        """
+
+    @abc.abstractmethod
+    def withdraw_cached_image(self, hostname, kind, file_name):
+        """Delete the record of an image deleted from a master image cache.
+
+        :param hostname: The hostname of the conductor.
+        :param kind: The kind of images held by the cache.
+        :param file_name: The name of the image in the cache.
+        """
+
+    @abc.abstractmethod
+    def withdraw_cached_images(self, hostname):
+        """Delete the records of all the images cached by a conductor.
+
+        :param hostname: The hostname of the conductor.
+        :returns: The number of records deleted.
+        """
+
+    @abc.abstractmethod
+    def get_cached_image_peers(self, kind, file_name, raw,
+                               exclude_hostname=None):
+        """Get the records of an image held by the conductors alive.
+
+        :param kind: The kind of images held by the cache.
+        :param file_name: The name of the image in the cache.
+        :param raw: Whether the image was converted to the raw format.
+        :param exclude_hostname: The hostname of a conductor whose record
+                                 is not returned, usually the caller.
+        :returns: A list of cached image records.
+        """
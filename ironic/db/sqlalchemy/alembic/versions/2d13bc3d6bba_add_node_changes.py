@@ -0,0 +1,51 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add node_changes
+
+Revision ID: 2d13bc3d6bba
+Revises: 60cf717201bc
+Create Date: 2016-01-25 10:12:44.518203
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '2d13bc3d6bba'
+down_revision = '60cf717201bc'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'node_changes',
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('node_uuid', sa.String(length=36), nullable=True),
+        sa.Column('power_state', sa.String(length=15), nullable=True),
+        sa.Column('target_power_state', sa.String(length=15),
+                  nullable=True),
+        sa.Column('provision_state', sa.String(length=15), nullable=True),
+        sa.Column('target_provision_state', sa.String(length=15),
+                  nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        mysql_ENGINE='InnoDB',
+        mysql_DEFAULT_CHARSET='UTF8'
+    )
+    op.create_index('node_changes_created_at_idx', 'node_changes',
+                    ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_table('node_changes')
@@ -0,0 +1,35 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add file_checksums to cached_images
+
+Revision ID: 3f6b0d2a9c41
+Revises: e294876e8028
+Create Date: 2016-02-22 10:12:47.318205
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3f6b0d2a9c41'
+down_revision = 'e294876e8028'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('cached_images', sa.Column('file_checksums', sa.Text(),
+                                             nullable=True))
+
+
+def downgrade():
+    op.drop_column('cached_images', 'file_checksums')
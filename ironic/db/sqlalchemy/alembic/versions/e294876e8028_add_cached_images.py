@@ -0,0 +1,53 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add cached_images
+
+Revision ID: e294876e8028
+Revises: 2d13bc3d6bba
+Create Date: 2016-02-08 16:05:31.207354
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'e294876e8028'
+down_revision = '2d13bc3d6bba'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'cached_images',
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('hostname', sa.String(length=255), nullable=False),
+        sa.Column('kind', sa.String(length=15), nullable=False),
+        sa.Column('file_name', sa.String(length=255), nullable=False),
+        sa.Column('raw', sa.Boolean(), nullable=True),
+        sa.Column('size', sa.BigInteger(), nullable=True),
+        sa.Column('url', sa.Text(), nullable=True),
+        sa.Column('checksums', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('hostname', 'kind', 'file_name',
+                            name='uniq_cached_images0hostname0kind0file_name'),
+        mysql_ENGINE='InnoDB',
+        mysql_DEFAULT_CHARSET='UTF8'
+    )
+    op.create_index('cached_images_file_name_idx', 'cached_images',
+                    ['file_name'], unique=False)
+
+
+def downgrade():
+    op.drop_table('cached_images')
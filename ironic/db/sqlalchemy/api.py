@@ -41,7 +41,7 @@ from ironic.db.sqlalchemy import models
 
 CONF = cfg.CONF
 CONF.import_opt('heartbeat_timeout',
-                'ironic.conductor.manager',
+                'ironic.conductor.options',
                 group='conductor')
 
 LOG = log.getLogger(__name__)
@@ -49,6 +49,10 @@ LOG = log.getLogger(__name__)
 
 _CONTEXT = threading.local()
 
+# The node fields whose modification is recorded as a node change
+_NODE_CHANGE_FIELDS = ('power_state', 'target_power_state',
+                       'provision_state', 'target_provision_state')
+
 
 def get_backend():
     """The backend is this module itself."""
@@ -143,6 +147,20 @@ def _paginate_query(model, limit=None, marker=None, sort_key=None,
     return query.all()
 
 
+def _find_duplicate(exc, values_list):
+    """Find the values which caused a DBDuplicateEntry error.
+
+    Only some database backends report the duplicate value, fall back to
+    the first values otherwise.
+    """
+    if exc.value is not None:
+        for values in values_list:
+            if any(values.get(column) == exc.value
+                   for column in exc.columns):
+                return values
+    return values_list[0]
+
+
 class Connection(api.Connection):
     """SqlAlchemy connection."""
 
@@ -210,6 +228,48 @@ class Connection(api.Connection):
         return _paginate_query(models.Node, limit, marker,
                                sort_key, sort_dir, query)
 
+    def get_node_aggregates(self, group_by, filters=None):
+        columns = []
+        for name in group_by:
+            if name not in models.Node.__table__.columns:
+                raise exception.InvalidParameterValue(
+                    _('Cannot group nodes by %s') % name)
+            columns.append(getattr(models.Node, name))
+
+        query = model_query(models.Node).with_entities(
+            *(columns + [sql.func.count(models.Node.id)]))
+        query = self._add_nodes_filters(query, filters)
+        if columns:
+            query = query.group_by(*columns).order_by(*columns)
+        return [tuple(row) for row in query.all()]
+
+    def get_node_changes(self, since, limit=None):
+        query = (model_query(models.NodeChange)
+                 .filter(models.NodeChange.id > since)
+                 .order_by(models.NodeChange.id.asc()))
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def get_last_node_change_seq(self):
+        query = model_query(models.NodeChange).with_entities(
+            sql.func.max(models.NodeChange.id))
+        return query.scalar() or 0
+
+    def get_first_node_change_seq(self):
+        query = model_query(models.NodeChange).with_entities(
+            sql.func.min(models.NodeChange.id))
+        return query.scalar() or 0
+
+    def destroy_old_node_changes(self, ttl):
+        limit = timeutils.utcnow() - datetime.timedelta(seconds=ttl)
+        last_seq = self.get_last_node_change_seq()
+        with _session_for_write():
+            query = model_query(models.NodeChange).filter(
+                models.NodeChange.created_at < limit,
+                models.NodeChange.id < last_seq)
+            return query.delete(synchronize_session=False)
+
     def reserve_node(self, tag, node_id):
         with _session_for_write():
             query = model_query(models.Node)
@@ -247,21 +307,29 @@ class Connection(api.Connection):
                 raise exception.NodeNotFound(node_id)
 
     def create_node(self, values):
-        # ensure defaults are present for new nodes
-        if 'uuid' not in values:
-            values['uuid'] = uuidutils.generate_uuid()
-        if 'power_state' not in values:
-            values['power_state'] = states.NOSTATE
-        if 'provision_state' not in values:
-            values['provision_state'] = states.ENROLL
+        return self.create_nodes([values])[0]
+
+    def create_nodes(self, values_list):
+        nodes = []
+        for values in values_list:
+            # ensure defaults are present for new nodes
+            if 'uuid' not in values:
+                values['uuid'] = uuidutils.generate_uuid()
+            if 'power_state' not in values:
+                values['power_state'] = states.NOSTATE
+            if 'provision_state' not in values:
+                values['provision_state'] = states.ENROLL
+
+            node = models.Node()
+            node.update(values)
+            nodes.append(node)
 
-        node = models.Node()
-        node.update(values)
         with _session_for_write() as session:
             try:
-                session.add(node)
+                session.add_all(nodes)
                 session.flush()
             except db_exc.DBDuplicateEntry as exc:
+                values = _find_duplicate(exc, values_list)
                 if 'name' in exc.columns:
                     raise exception.DuplicateName(name=values['name'])
                 elif 'instance_uuid' in exc.columns:
@@ -269,7 +337,7 @@ class Connection(api.Connection):
                         instance_uuid=values['instance_uuid'],
                         node=values['uuid'])
                 raise exception.NodeAlreadyExists(uuid=values['uuid'])
-            return node
+            return nodes
 
     def get_node_by_id(self, node_id):
         query = model_query(models.Node).filter_by(id=node_id)
@@ -325,6 +393,9 @@ class Connection(api.Connection):
             port_query = add_port_filter_by_node(port_query, node_id)
             port_query.delete()
 
+            job_query = model_query(models.Job).filter_by(node_id=node_id)
+            job_query.delete()
+
             query.delete()
 
     def update_node(self, node_id, values):
@@ -348,7 +419,7 @@ class Connection(api.Connection):
                 raise e
 
     def _do_update_node(self, node_id, values):
-        with _session_for_write():
+        with _session_for_write() as session:
             query = model_query(models.Node)
             query = add_identity_filter(query, node_id)
             try:
@@ -374,7 +445,19 @@ class Connection(api.Connection):
                       values['provision_state'] == states.INSPECTFAIL):
                     values['inspection_started_at'] = None
 
+            changed = any(name in values and values[name] != ref[name]
+                          for name in _NODE_CHANGE_FIELDS)
             ref.update(values)
+            if changed:
+                # NOTE: the sequence number is allocated by the database
+                # when the change is inserted, so a change may become
+                # visible after another one with a higher number. The API
+                # holds the changes following a missing number back for
+                # [api]changes_settle_time seconds.
+                change = models.NodeChange(node_uuid=ref.uuid)
+                for name in _NODE_CHANGE_FIELDS:
+                    change[name] = ref[name]
+                session.add(change)
         return ref
 
     def get_port_by_id(self, port_id):
@@ -411,20 +494,28 @@ class Connection(api.Connection):
                                sort_key, sort_dir, query)
 
     def create_port(self, values):
-        if not values.get('uuid'):
-            values['uuid'] = uuidutils.generate_uuid()
+        return self.create_ports([values])[0]
+
+    def create_ports(self, values_list):
+        ports = []
+        for values in values_list:
+            if not values.get('uuid'):
+                values['uuid'] = uuidutils.generate_uuid()
+
+            port = models.Port()
+            port.update(values)
+            ports.append(port)
 
-        port = models.Port()
-        port.update(values)
         with _session_for_write() as session:
             try:
-                session.add(port)
+                session.add_all(ports)
                 session.flush()
             except db_exc.DBDuplicateEntry as exc:
+                values = _find_duplicate(exc, values_list)
                 if 'address' in exc.columns:
                     raise exception.MACAlreadyExists(mac=values['address'])
                 raise exception.PortAlreadyExists(uuid=values['uuid'])
-            return port
+            return ports
 
     def update_port(self, port_id, values):
         # NOTE(dtantsur): this can lead to very strange errors
@@ -614,3 +705,89 @@ class Connection(api.Connection):
             count = query.update({'provision_updated_at': timeutils.utcnow()})
             if count == 0:
                 raise exception.NodeNotFound(node_id)
+
+    def create_job(self, values):
+        if not values.get('uuid'):
+            values['uuid'] = uuidutils.generate_uuid()
+
+        job = models.Job()
+        job.update(values)
+        with _session_for_write() as session:
+            try:
+                session.add(job)
+                session.flush()
+            except db_exc.DBDuplicateEntry:
+                raise exception.JobAlreadyExists(uuid=values['uuid'])
+            return job
+
+    def get_job_by_uuid(self, job_uuid):
+        query = model_query(models.Job).filter_by(uuid=job_uuid)
+        try:
+            return query.one()
+        except NoResultFound:
+            raise exception.JobNotFound(job=job_uuid)
+
+    def update_job(self, job_id, values):
+        if 'uuid' in values:
+            msg = _("Cannot overwrite UUID for an existing Job.")
+            raise exception.InvalidParameterValue(err=msg)
+
+        with _session_for_write():
+            query = model_query(models.Job)
+            query = add_identity_filter(query, job_id)
+
+            count = query.update(values)
+            if count != 1:
+                raise exception.JobNotFound(job=job_id)
+            ref = query.one()
+        return ref
+
+    def destroy_expired_jobs(self, ttl):
+        limit = timeutils.utcnow() - datetime.timedelta(seconds=ttl)
+        with _session_for_write():
+            query = model_query(models.Job).filter(
+                sql.func.coalesce(models.Job.updated_at,
+                                  models.Job.created_at) < limit)
+            return query.delete(synchronize_session=False)
+
+    def announce_cached_image(self, values):
+        image = models.CachedImage()
+        image.update(values)
+        with _session_for_write() as session:
+            query = model_query(models.CachedImage).filter_by(
+                hostname=values['hostname'], kind=values['kind'],
+                file_name=values['file_name'])
+            query.delete()
+            session.add(image)
+            session.flush()
+            return image
+
+    def withdraw_cached_image(self, hostname, kind, file_name):
+        with _session_for_write():
+            query = model_query(models.CachedImage).filter_by(
+                hostname=hostname, kind=kind, file_name=file_name)
+            query.delete()
+
+    def withdraw_cached_images(self, hostname):
+        with _session_for_write():
+            query = model_query(models.CachedImage).filter_by(
+                hostname=hostname)
+            return query.delete()
+
+    def get_cached_image_peers(self, kind, file_name, raw,
+                               exclude_hostname=None):
+        interval = CONF.conductor.heartbeat_timeout
+        limit = timeutils.utcnow() - datetime.timedelta(seconds=interval)
+        query = (model_query(models.CachedImage)
+                 .join(models.Conductor,
+                       models.CachedImage.hostname ==
+                       models.Conductor.hostname)
+                 .filter(models.CachedImage.kind == kind,
+                         models.CachedImage.file_name == file_name,
+                         models.CachedImage.raw == raw,
+                         models.Conductor.online == sql.true(),
+                         models.Conductor.updated_at >= limit))
+        if exclude_hostname is not None:
+            query = query.filter(
+                models.CachedImage.hostname != exclude_hostname)
+        return query.all()
@@ -23,7 +23,7 @@ from oslo_db import options as db_options
 from oslo_db.sqlalchemy import models
 from oslo_db.sqlalchemy import types as db_types
 import six.moves.urllib.parse as urlparse
-from sqlalchemy import Boolean, Column, DateTime, Index
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Index
 from sqlalchemy import ForeignKey, Integer
 from sqlalchemy import schema, String, Text
 from sqlalchemy.ext.declarative import declarative_base
@@ -167,6 +167,63 @@ class Port(Base):
     extra = Column(db_types.JsonEncodedDict)
 
 
+class Job(Base):
+    """Represents an RPC call run in the background by a conductor."""
+
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        schema.UniqueConstraint('uuid', name='uniq_jobs0uuid'),
+        Index('jobs_updated_at_idx', 'updated_at'),
+        table_args())
+    id = Column(Integer, primary_key=True)
+    uuid = Column(String(36))
+    node_id = Column(Integer, ForeignKey('nodes.id'), nullable=True)
+    method = Column(String(255))
+    state = Column(String(15))
+    status_code = Column(Integer, nullable=True)
+    result = Column(db_types.JsonEncodedDict)
+    last_error = Column(Text, nullable=True)
+
+
+class NodeChange(Base):
+    """Represents a change of the state of a node.
+
+    The id is the sequence number of the change.
+    """
+
+    __tablename__ = 'node_changes'
+    __table_args__ = (
+        Index('node_changes_created_at_idx', 'created_at'),
+        table_args())
+    id = Column(Integer, primary_key=True)
+    node_uuid = Column(String(36))
+    power_state = Column(String(15), nullable=True)
+    target_power_state = Column(String(15), nullable=True)
+    provision_state = Column(String(15), nullable=True)
+    target_provision_state = Column(String(15), nullable=True)
+
+
+class CachedImage(Base):
+    """Represents a master image held in the image cache of a conductor."""
+
+    __tablename__ = 'cached_images'
+    __table_args__ = (
+        schema.UniqueConstraint('hostname', 'kind', 'file_name',
+                                name='uniq_cached_images0hostname0kind0'
+                                     'file_name'),
+        Index('cached_images_file_name_idx', 'file_name'),
+        table_args())
+    id = Column(Integer, primary_key=True)
+    hostname = Column(String(255), nullable=False)
+    kind = Column(String(15), nullable=False)
+    file_name = Column(String(255), nullable=False)
+    raw = Column(Boolean)
+    size = Column(BigInteger)
+    url = Column(Text)
+    checksums = Column(db_types.JsonEncodedDict)
+    file_checksums = Column(db_types.JsonEncodedDict)
+
+
 class NodeTag(Base):
     """Represents a tag of a bare metal node."""
 
@@ -89,7 +89,18 @@ def _build_client(token=None):
             params['region_name'] = CONF.keystone.region_name
         params['token'] = token
 
-    return clientv20.Client(**params)
+    # NOTE: a client created without a token authenticates once and then
+    # reuses its token, refreshing it when it is rejected, so reusing the
+    # clients saves an authentication per operation.
+    key = tuple(sorted(params.items()))
+    return keystone.get_client('network', key,
+                               lambda: clientv20.Client(**params))
+
+
+def _check_connection_failure(exc):
+    """Look the Neutron endpoint up again if it could not be reached."""
+    if isinstance(exc, neutron_client_exc.ConnectionFailed):
+        keystone.invalidate_service_url(service_type='network')
 
 
 class NeutronDHCPApi(base.BaseDHCP):
@@ -121,7 +132,8 @@ class NeutronDHCPApi(base.BaseDHCP):
         port_req_body = {'port': {'extra_dhcp_opts': dhcp_options}}
         try:
             _build_client(token).update_port(port_id, port_req_body)
-        except neutron_client_exc.NeutronClientException:
+        except neutron_client_exc.NeutronClientException as e:
+            _check_connection_failure(e)
             LOG.exception(_LE("Failed to update Neutron port %s."), port_id)
             raise exception.FailedToUpdateDHCPOptOnPort(port_id=port_id)
 
@@ -136,7 +148,8 @@ class NeutronDHCPApi(base.BaseDHCP):
         port_req_body = {'port': {'mac_address': address}}
         try:
             _build_client(token).update_port(port_id, port_req_body)
-        except neutron_client_exc.NeutronClientException:
+        except neutron_client_exc.NeutronClientException as e:
+            _check_connection_failure(e)
             LOG.exception(_LE("Failed to update MAC address on Neutron "
                               "port %s."), port_id)
             raise exception.FailedToUpdateMacOnPort(port_id=port_id)
@@ -209,7 +222,8 @@ class NeutronDHCPApi(base.BaseDHCP):
         ip_address = None
         try:
             neutron_port = client.show_port(port_uuid).get('port')
-        except neutron_client_exc.NeutronClientException:
+        except neutron_client_exc.NeutronClientException as e:
+            _check_connection_failure(e)
             LOG.exception(_LE("Failed to Get IP address on Neutron port %s."),
                           port_uuid)
             raise exception.FailedToGetIPAddressOnPort(port_id=port_uuid)
@@ -306,6 +320,7 @@ class NeutronDHCPApi(base.BaseDHCP):
             try:
                 port = neutron_client.create_port(body)
             except neutron_client_exc.ConnectionFailed as e:
+                _check_connection_failure(e)
                 self._rollback_cleaning_ports(task)
                 msg = (_('Could not create cleaning port on network %(net)s '
                          'from %(node)s. %(exc)s') %
@@ -337,6 +352,7 @@ class NeutronDHCPApi(base.BaseDHCP):
         try:
             ports = neutron_client.list_ports(**params)
         except neutron_client_exc.ConnectionFailed as e:
+            _check_connection_failure(e)
             msg = (_('Could not get cleaning network vif for %(node)s '
                      'from Neutron, possible network issue. %(exc)s') %
                    {'node': task.node.uuid,
@@ -351,6 +367,7 @@ class NeutronDHCPApi(base.BaseDHCP):
                 try:
                     neutron_client.delete_port(neutron_port.get('id'))
                 except neutron_client_exc.ConnectionFailed as e:
+                    _check_connection_failure(e)
                     msg = (_('Could not remove cleaning ports on network '
                              '%(net)s from %(node)s, possible network issue. '
                              '%(exc)s') %
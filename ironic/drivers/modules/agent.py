@@ -112,7 +112,7 @@ def build_instance_info_for_deploy(task):
     if service_utils.is_glance_image(image_source):
         glance = image_service.GlanceImageService(version=2,
                                                   context=task.context)
-        image_info = glance.show(image_source)
+        image_info = images.image_show(task.context, image_source, glance)
         swift_temp_url = glance.swift_temp_url(image_info)
         LOG.debug('Got image info: %(info)s for node %(node)s.',
                   {'info': image_info, 'node': node.uuid})
@@ -37,11 +37,16 @@ from ironic.conductor import utils as manager_utils
 from ironic.drivers import base
 from ironic.drivers.modules import deploy_utils
 from ironic.drivers.modules.ilo import common as ilo_common
+from ironic.drivers.modules import image_cache
 
 LOG = logging.getLogger(__name__)
 
 CONF = cfg.CONF
 
+# NOTE: only the conductors running the virtual media drivers build boot
+# images, and need their cache.
+image_cache.cleanup(priority=40)(image_cache.BootImageCache)
+
 REQUIRED_PROPERTIES = {
     'ilo_deploy_iso': _("UUID (from Glance) of the deployment ISO. "
                         "Required.")
@@ -174,10 +179,9 @@ def _get_boot_iso(task, root_uuid):
     kernel_params = CONF.pxe.pxe_append_params
     with tempfile.NamedTemporaryFile(dir=CONF.tempdir) as fileobj:
         boot_iso_tmp_file = fileobj.name
-        images.create_boot_iso(task.context, boot_iso_tmp_file,
-                               kernel_href, ramdisk_href,
-                               deploy_iso_uuid, root_uuid,
-                               kernel_params, boot_mode)
+        image_cache.BootImageCache().create_boot_iso(
+            task.context, boot_iso_tmp_file, kernel_href, ramdisk_href,
+            deploy_iso_uuid, root_uuid, kernel_params, boot_mode)
 
         if CONF.ilo.use_web_server_for_images:
             boot_iso_url = (
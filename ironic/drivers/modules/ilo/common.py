@@ -34,6 +34,7 @@ from ironic.common.i18n import _
 from ironic.common.i18n import _LE
 from ironic.common.i18n import _LI
 from ironic.common.i18n import _LW
+from ironic.common import image_workers
 from ironic.common import images
 from ironic.common import swift
 from ironic.common import utils
@@ -126,7 +127,8 @@ def copy_image_to_web_server(source_file_path, destination):
     image_url = urljoin(CONF.deploy.http_url, destination)
     image_path = os.path.join(CONF.deploy.http_root, destination)
     try:
-        shutil.copyfile(source_file_path, image_path)
+        image_workers.execute(shutil.copyfile, source_file_path,
+                              image_path)
     except IOError as exc:
         raise exception.ImageUploadFailed(image_name=destination,
                                           web_server=CONF.deploy.http_url,
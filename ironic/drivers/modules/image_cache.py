@@ -18,25 +18,47 @@
 Utility for caching master images.
 """
 
+import errno
+import hashlib
+import hmac
+import json
 import os
+import random
+import shutil
+import stat
 import tempfile
 import time
 import uuid
 
+import eventlet
+from eventlet import wsgi
+from ironic_lib import disk_utils
+from ironic_lib import utils as ironic_utils
 from oslo_concurrency import lockutils
 from oslo_config import cfg
+from oslo_db import exception as db_exception
 from oslo_log import log as logging
+from oslo_log import loggers
 from oslo_utils import fileutils
+from oslo_utils import netutils
+from oslo_utils import uuidutils
 import six
+import webob
+from webob import exc as webob_exc
+from webob import static as webob_static
 
 from ironic.common import exception
 from ironic.common.glance_service import service_utils
 from ironic.common.i18n import _
+from ironic.common.i18n import _LE
 from ironic.common.i18n import _LI
 from ironic.common.i18n import _LW
 from ironic.common import image_service
+from ironic.common import image_workers
 from ironic.common import images
+from ironic.common import metrics
 from ironic.common import utils
+from ironic.db import api as dbapi
 
 
 LOG = logging.getLogger(__name__)
@@ -46,10 +68,88 @@ img_cache_opts = [
                 default=False,
                 help=_('Run image downloads and raw format conversions in '
                        'parallel.')),
+    cfg.IntOpt('image_cache_low_watermark',
+               default=80,
+               min=0,
+               max=100,
+               help=_('Percentage of the maximum size of a master image '
+                      'cache to which the least recently used images are '
+                      'evicted, once the cache has grown above its maximum '
+                      'size. Evicting more than strictly needed avoids '
+                      'evicting images again after each download.')),
+    cfg.StrOpt('boot_image_master_path',
+               default='/var/lib/ironic/master_boot_images',
+               help=_('On the ironic-conductor node, directory where the '
+                      'boot ISOs built for the nodes booted from virtual '
+                      'media are stored, so that the nodes needing the '
+                      'same image share it. Setting to <None> disables '
+                      'the caching of built images.')),
+    cfg.IntOpt('boot_image_cache_size',
+               default=2048,
+               help=_('Maximum size (in MiB) of the cache of built boot '
+                      'images, including those in use.')),
+    cfg.IntOpt('boot_image_cache_ttl',
+               default=10080,
+               help=_('Maximum TTL (in minutes) for old built boot images '
+                      'in cache.')),
+]
+
+peer_opts = [
+    cfg.BoolOpt('enabled',
+                default=False,
+                help=_('Share the images of the master image caches with '
+                       'the other conductors. The conductor serves the '
+                       'images of its caches over HTTP and, on a cache '
+                       'miss, copies an image from a conductor holding it '
+                       'before downloading it from the image service. Only '
+                       'Glance images are shared, as their content cannot '
+                       'change.')),
+    cfg.StrOpt('host_ip',
+               default='0.0.0.0',
+               help=_('The IP address on which the conductor serves the '
+                      'images of its master image caches.')),
+    cfg.PortOpt('port',
+                default=6388,
+                help=_('The TCP port on which the conductor serves the '
+                       'images of its master image caches.')),
+    cfg.StrOpt('url',
+               help=_('The URL at which the other conductors reach this '
+                      'conductor, e.g. http://192.0.2.1:6388. Defaults to '
+                      'http://[DEFAULT]my_ip:[image_cache_peers]port.')),
+    cfg.IntOpt('max_attempts',
+               default=2,
+               min=1,
+               help=_('Maximum number of conductors an image is copied '
+                      'from, one after the other when copying fails, '
+                      'before it is downloaded from the image service.')),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(img_cache_opts)
+CONF.register_opts(peer_opts, group='image_cache_peers')
+CONF.import_opt('my_ip', 'ironic.netconf')
+
+# The directory of a master cache holding the metadata of its images
+_METADATA_DIR = '.metadata'
+
+# Indexes of the master image caches, by directory
+_indexes = {}
+
+# Kinds of images held by the master image caches, see get_caches()
+INSTANCE_IMAGES = 'instance'
+DEPLOY_IMAGES = 'deploy'
+
+# Directories of the master image caches shared with the other conductors,
+# by kind of images
+_peer_dirs = {}
+
+# The server sharing the master images of this conductor, if it is running
+_peer_server = None
+
+# The name of the metric counting the images copied from other conductors,
+# and of the one counting the bytes copied
+PEER_FETCH_METRIC = 'image_cache.peer_fetch'
+PEER_BYTES_METRIC = 'image_cache.peer_bytes'
 
 # This would contain a sorted list of instances of ImageCache to be
 # considered for cleanup. This list will be kept sorted in non-increasing
@@ -60,6 +160,11 @@ _cache_cleanup_list = []
 class ImageCache(object):
     """Class handling access to cache for master images."""
 
+    # The kind of images held by the cache, INSTANCE_IMAGES or
+    # DEPLOY_IMAGES, None if the cache can neither be pre-warmed nor
+    # shared with the other conductors.
+    image_kind = None
+
     def __init__(self, master_dir, cache_size, cache_ttl):
         """Constructor.
 
@@ -73,6 +178,12 @@ class ImageCache(object):
         self._cache_ttl = cache_ttl
         if master_dir is not None:
             fileutils.ensure_tree(master_dir)
+            if self.image_kind is not None:
+                _peer_dirs[self.image_kind] = os.path.abspath(master_dir)
+
+    @property
+    def _index(self):
+        return _get_index(self.master_dir)
 
     def fetch_image(self, href, dest_path, ctx=None, force_raw=True):
         """Fetch image by given href to the destination path.
@@ -90,11 +201,10 @@ class ImageCache(object):
         :param force_raw: boolean value, whether to convert the image to raw
                           format
         """
-        img_download_lock_name = 'download-image'
         if self.master_dir is None:
             # NOTE(ghe): We don't share images between instances/hosts
             if not CONF.parallel_image_downloads:
-                with lockutils.lock(img_download_lock_name, 'ironic-'):
+                with lockutils.lock('download-image', 'ironic-'):
                     _fetch(ctx, href, dest_path, force_raw)
             else:
                 _fetch(ctx, href, dest_path, force_raw)
@@ -102,23 +212,12 @@ class ImageCache(object):
 
         # TODO(ghe): have hard links and counts the same behaviour in all fs
 
-        # NOTE(vdrok): File name is converted to UUID if it's not UUID already,
-        # so that two images with same file names do not collide
-        if service_utils.is_glance_image(href):
-            master_file_name = service_utils.parse_image_ref(href)[0]
-        else:
-            # NOTE(vdrok): Doing conversion of href in case it's unicode
-            # string, UUID cannot be generated for unicode strings on python 2.
-            href_encoded = href.encode('utf-8') if six.PY2 else href
-            master_file_name = str(uuid.uuid5(uuid.NAMESPACE_URL,
-                                              href_encoded))
+        master_file_name = _get_master_file_name(href)
         master_path = os.path.join(self.master_dir, master_file_name)
 
-        if CONF.parallel_image_downloads:
-            img_download_lock_name = 'download-image:%s' % master_file_name
-
         # TODO(dtantsur): lock expiration time
-        with lockutils.lock(img_download_lock_name, 'ironic-'):
+        with lockutils.lock(_get_download_lock_name(master_file_name),
+                            'ironic-'):
             # NOTE(vdrok): After rebuild requested image can change, so we
             # should ensure that dest_path and master_path (if exists) are
             # pointing to the same file and their content is up to date
@@ -128,6 +227,7 @@ class ImageCache(object):
                                                          dest_path)
 
             if cache_up_to_date and dest_up_to_date:
+                self._index.touch(master_file_name)
                 LOG.debug("Destination %(dest)s already exists "
                           "for image %(href)s",
                           {'href': href, 'dest': dest_path})
@@ -137,6 +237,7 @@ class ImageCache(object):
                 # NOTE(dtantsur): ensure we're not in the middle of clean up
                 with lockutils.lock('master_image', 'ironic-'):
                     os.link(master_path, dest_path)
+                self._index.touch(master_file_name)
                 LOG.debug("Master cache hit for image %(href)s",
                           {'href': href})
                 return
@@ -148,7 +249,46 @@ class ImageCache(object):
                 href, master_path, dest_path, ctx=ctx, force_raw=force_raw)
 
         # NOTE(dtantsur): we increased cache size - time to clean up
-        self.clean_up()
+        self._clean_up_in_background()
+
+    def cache_image(self, href, ctx=None, force_raw=True, pin_until=None):
+        """Make sure an image is in the cache, without linking to it.
+
+        Used to pre-warm the cache, so that the deployments using the image
+        later only link to it.
+
+        :param href: image UUID or href to fetch
+        :param ctx: context
+        :param force_raw: boolean value, whether to convert the image to raw
+                          format
+        :param pin_until: if not None, time until which the image must not
+                          be evicted from the cache
+        :returns: True if the image was downloaded, False if it was already
+                  in the cache
+        """
+        if self.master_dir is None:
+            return False
+
+        master_file_name = _get_master_file_name(href)
+        master_path = os.path.join(self.master_dir, master_file_name)
+        with lockutils.lock(_get_download_lock_name(master_file_name),
+                            'ironic-'):
+            downloaded = not _delete_master_path_if_stale(master_path, href,
+                                                          ctx)
+            if downloaded:
+                LOG.info(_LI("Pre-warming master image cache %(dir)s with "
+                             "image %(href)s"),
+                         {'href': href, 'dir': self.master_dir})
+                self._download_image(href, master_path, None, ctx=ctx,
+                                     force_raw=force_raw)
+            else:
+                self._index.touch(master_file_name)
+            if pin_until is not None:
+                self._index.pin(master_file_name, pin_until)
+
+        if downloaded:
+            self._clean_up_in_background()
+        return downloaded
 
     def _download_image(self, href, master_path, dest_path, ctx=None,
                         force_raw=True):
@@ -158,7 +298,8 @@ class ImageCache(object):
 
         :param href: image UUID or href to fetch
         :param master_path: destination master path
-        :param dest_path: destination file path
+        :param dest_path: destination file path, None to only store the
+                          image in the cache
         :param ctx: context
         :param force_raw: boolean value, whether to convert the image to raw
                           format
@@ -167,23 +308,92 @@ class ImageCache(object):
         # TODO(ghe): logging when image cannot be created
         tmp_dir = tempfile.mkdtemp(dir=self.master_dir)
         tmp_path = os.path.join(tmp_dir, href.split('/')[-1])
+        file_name = os.path.basename(master_path)
+        shared = self._is_shared(href)
 
         try:
-            _fetch(ctx, href, tmp_path, force_raw)
+            checksums = file_checksums = None
+            if shared:
+                copied = _fetch_from_peers(self.image_kind, file_name,
+                                           force_raw, tmp_path)
+                if copied is not None:
+                    checksums, file_checksums = copied
+            if checksums is None:
+                checksums = _fetch(ctx, href, tmp_path, force_raw)
             # NOTE(dtantsur): no need for global lock here - master_path
             # will have link count >1 at any moment, so won't be cleaned up
             os.link(tmp_path, master_path)
-            os.link(master_path, dest_path)
+            if dest_path is not None:
+                os.link(master_path, dest_path)
         finally:
             utils.rmtree_without_raise(tmp_dir)
+        _write_metadata(master_path, {'checksums': checksums})
+        self._index.add(file_name, checksums)
+        if shared and _peer_server is not None:
+            if file_checksums is None:
+                file_checksums = _get_file_checksums(master_path, checksums,
+                                                     force_raw)
+            _peer_server.announce(self.image_kind, master_path, force_raw,
+                                  checksums, file_checksums)
+
+    def _is_shared(self, href):
+        """Whether an image is shared with the other conductors."""
+        return (CONF.image_cache_peers.enabled and
+                self.image_kind is not None and
+                service_utils.is_glance_image(href))
+
+    def get_checksums(self, href):
+        """Get the checksums of a cached image, as it was downloaded.
+
+        They are computed while the image is downloaded, before its
+        conversion to the raw format, and verified against the checksums
+        published by the image service, so they can be trusted without
+        reading the image again.
+
+        :param href: image UUID or href
+        :returns: a dictionary of hexadecimal digests by algorithm, empty if
+            the image is not cached or its checksums are not known.
+        """
+        if self.master_dir is None:
+            return {}
+        return self._index.get_checksums(_get_master_file_name(href))
+
+    def _clean_up_in_background(self):
+        """Start evicting images in the background, if it is needed.
+
+        Nothing is done if the cache is not larger than its maximum size
+        and has no image older than its TTL, or if an eviction is already
+        running for the cache.
+        """
+        index = self._index
+        if index.evicting or not index.needs_eviction(self._cache_size,
+                                                      self._cache_ttl):
+            return
+        index.evicting = True
+        eventlet.spawn_n(self._evict_in_background)
+
+    def _evict_in_background(self):
+        try:
+            self.clean_up()
+        except Exception:
+            LOG.exception(_LE("Unable to clean up the master image cache "
+                              "%(dir)s"), {'dir': self.master_dir})
+        finally:
+            self._index.evicting = False
 
-    @lockutils.synchronized('master_image', 'ironic-')
     def clean_up(self, amount=None):
         """Clean up directory with images, keeping cache of the latest images.
 
-        Files with link count >1 are never deleted.
-        Protected by global lock, so that no one messes with master images
-        after we get listing and before we actually delete files.
+        Files with link count >1 are never deleted, nor the images pinned
+        when the cache was pre-warmed.
+        The images are found in the index of the cache, the directory is not
+        listed. Each image is checked and deleted under a global lock, so
+        that no one links to it in the meantime; the lock is not held for
+        the whole clean up, so that cache hits are not blocked by it.
+
+        Once the cache is larger than its maximum size, the least recently
+        used images are deleted until it is not larger than the low
+        watermark ([DEFAULT]image_cache_low_watermark).
 
         :param amount: if present, amount of space to reclaim in bytes,
                        cleaning will stop, if this goal was reached,
@@ -196,7 +406,7 @@ class ImageCache(object):
                   {'dir': self.master_dir})
 
         amount_copy = amount
-        listing = _find_candidates_for_deletion(self.master_dir)
+        listing = self._index.listing()
         survived, amount = self._clean_up_too_old(listing, amount)
         if amount is not None and amount <= 0:
             return
@@ -216,7 +426,8 @@ class ImageCache(object):
         it starts removing files older than TTL seconds,
         oldest first, until the required 'amount' of space is reclaimed.
 
-        :param listing: list of tuples (file name, last used time)
+        :param listing: list of tuples (file name, last used time, size),
+                        the least recently used first
         :param amount: if not None, amount of space to reclaim in bytes,
                        cleaning will stop, if this goal was reached,
                        even if it is possible to clean up more files
@@ -225,22 +436,15 @@ class ImageCache(object):
         """
         threshold = time.time() - self._cache_ttl
         survived = []
-        for file_name, last_used, stat in listing:
-            if last_used < threshold:
-                try:
-                    os.unlink(file_name)
-                except EnvironmentError as exc:
-                    LOG.warning(_LW("Unable to delete file %(name)s from "
-                                    "master image cache: %(exc)s"),
-                                {'name': file_name, 'exc': exc})
-                else:
-                    if amount is not None:
-                        amount -= stat.st_size
-                        if amount <= 0:
-                            amount = 0
-                            break
-            else:
-                survived.append((file_name, last_used, stat))
+        for file_name, last_used, size in listing:
+            if last_used >= threshold:
+                survived.append((file_name, last_used, size))
+            elif self._evict(file_name, threshold):
+                if amount is not None:
+                    amount -= size
+                    if amount <= 0:
+                        amount = 0
+                        break
         return survived, amount
 
     def _clean_up_ensure_cache_size(self, listing, amount):
@@ -249,34 +453,26 @@ class ImageCache(object):
         Try to delete the oldest files until conditions is satisfied
         or no more files are eligible for deletion.
 
-        :param listing: list of tuples (file name, last used time)
+        :param listing: list of tuples (file name, last used time, size),
+                        the least recently used first
         :param amount: amount of space to reclaim, if possible.
                        if amount is not None, it has higher priority than
                        cache size in settings
         :returns: amount of space still required after clean up
         """
-        # NOTE(dtantsur): Sort listing to delete the oldest files first
-        listing = sorted(listing,
-                         key=lambda entry: entry[1],
-                         reverse=True)
-        total_listing = (os.path.join(self.master_dir, f)
-                         for f in os.listdir(self.master_dir))
-        total_size = sum(os.path.getsize(f)
-                         for f in total_listing)
-        while listing and (total_size > self._cache_size or
+        index = self._index
+        target_size = self._cache_size
+        if index.total_size > self._cache_size:
+            target_size = (self._cache_size *
+                           CONF.image_cache_low_watermark // 100)
+        listing = list(reversed(listing))
+        while listing and (index.total_size > target_size or
                            (amount is not None and amount > 0)):
-            file_name, last_used, stat = listing.pop()
-            try:
-                os.unlink(file_name)
-            except EnvironmentError as exc:
-                LOG.warning(_LW("Unable to delete file %(name)s from "
-                                "master image cache: %(exc)s"),
-                            {'name': file_name, 'exc': exc})
-            else:
-                total_size -= stat.st_size
-                if amount is not None:
-                    amount -= stat.st_size
+            file_name, last_used, size = listing.pop()
+            if self._evict(file_name) and amount is not None:
+                amount -= size
 
+        total_size = index.total_size
         if total_size > self._cache_size:
             LOG.info(_LI("After cleaning up cache dir %(dir)s "
                          "cache size %(actual)d is still larger than "
@@ -285,23 +481,462 @@ class ImageCache(object):
                       'expected': self._cache_size})
         return max(amount, 0) if amount is not None else 0
 
+    def _evict(self, file_name, threshold=None):
+        """Delete an image from the cache, unless it is in use.
+
+        The image is checked under the same lock as the one taken to link
+        to it, so that its link count cannot change before it is deleted.
+        Its last use is updated from the file, as removing a link to it
+        changes its status change time.
+
+        :param file_name: name of the image in the cache directory
+        :param threshold: if not None, the image is only deleted if it was
+                          last used before this time
+        :returns: True if the image was deleted, False otherwise
+        """
+        if self._index.is_pinned(file_name):
+            return False
+        master_path = os.path.join(self.master_dir, file_name)
+        with lockutils.lock('master_image', 'ironic-'):
+            try:
+                file_stat = os.stat(master_path)
+                if file_stat.st_nlink > 1:
+                    self._index.touch(file_name)
+                    return False
+                last_used = _last_used_time(file_stat)
+                if threshold is not None and last_used >= threshold:
+                    self._index.touch(file_name, last_used)
+                    return False
+                _unlink_master(master_path)
+            except EnvironmentError as exc:
+                if exc.errno == errno.ENOENT:
+                    self._index.remove(file_name)
+                else:
+                    LOG.warning(_LW("Unable to delete file %(name)s from "
+                                    "master image cache: %(exc)s"),
+                                {'name': master_path, 'exc': exc})
+                return False
+        return True
+
+
+class _CacheIndex(object):
+    """Index of the images of a master image cache.
+
+    The index is built once from the content of the cache directory, then
+    kept up to date by the cache when images are downloaded, used and
+    deleted, so that neither a cache hit nor an eviction lists the
+    directory. It is persisted by the cache itself: the sizes and last uses
+    of the images come from their files, their checksums from the metadata
+    recorded when they were downloaded. The link counts of the images
+    change when their users delete their links, so they are only read
+    from the files being evicted.
+    """
+
+    def __init__(self, master_dir):
+        self.master_dir = master_dir
+        self.evicting = False
+        # File name -> [size, last used time, checksums or None if not read,
+        #               time until which the image is pinned]
+        self._entries = {}
+        self.total_size = 0
+        for file_name in os.listdir(master_dir):
+            self._add_from_file(file_name)
+
+    def _add_from_file(self, file_name):
+        try:
+            file_stat = os.stat(os.path.join(self.master_dir, file_name))
+        except EnvironmentError:
+            return None
+        if not stat.S_ISREG(file_stat.st_mode):
+            return None
+        entry = [file_stat.st_size, _last_used_time(file_stat), None, 0]
+        self._set(file_name, entry)
+        return entry
+
+    def _set(self, file_name, entry):
+        self.remove(file_name)
+        self._entries[file_name] = entry
+        self.total_size += entry[0]
+
+    def add(self, file_name, checksums=None):
+        """Add an image just stored in the cache."""
+        entry = self._add_from_file(file_name)
+        if entry is not None:
+            entry[1] = time.time()
+            entry[2] = checksums or {}
+
+    def remove(self, file_name):
+        """Remove an image deleted from the cache."""
+        entry = self._entries.pop(file_name, None)
+        if entry is not None:
+            self.total_size -= entry[0]
+
+    def touch(self, file_name, last_used=None):
+        """Record a use of an image of the cache.
+
+        An image stored by another process is added to the index.
+        """
+        entry = self._entries.get(file_name)
+        if entry is None:
+            entry = self._add_from_file(file_name)
+            if entry is None:
+                return
+        entry[1] = max(entry[1], last_used or time.time())
+
+    def pin(self, file_name, until):
+        """Protect an image from eviction until a given time.
+
+        Pins are not persisted, they are lost when the process restarts.
+        """
+        entry = self._entries.get(file_name)
+        if entry is None:
+            entry = self._add_from_file(file_name)
+            if entry is None:
+                return
+        entry[3] = max(entry[3], until)
+
+    def is_pinned(self, file_name):
+        """Whether an image is protected from eviction."""
+        entry = self._entries.get(file_name)
+        return entry is not None and entry[3] > time.time()
+
+    def get_checksums(self, file_name):
+        """Get the checksums of an image, {} if they are not known."""
+        entry = self._entries.get(file_name)
+        if entry is None:
+            entry = self._add_from_file(file_name)
+            if entry is None:
+                return {}
+        if entry[2] is None:
+            master_path = os.path.join(self.master_dir, file_name)
+            entry[2] = _read_metadata(master_path).get('checksums', {})
+        return entry[2]
+
+    def listing(self):
+        """List the images, the least recently used first.
+
+        :returns: list of tuples (file name, last used time, size)
+        """
+        return sorted(((file_name, entry[1], entry[0])
+                       for file_name, entry in self._entries.items()),
+                      key=lambda item: item[1])
+
+    def needs_eviction(self, cache_size, cache_ttl):
+        """Whether images have to be evicted from the cache.
+
+        :param cache_size: maximum size of the cache in bytes
+        :param cache_ttl: TTL of the images of the cache in seconds
+        """
+        if self.total_size > cache_size:
+            return True
+        now = time.time()
+        threshold = now - cache_ttl
+        return any(entry[1] < threshold and entry[3] <= now
+                   for entry in self._entries.values())
+
+
+class PeerServer(object):
+    """Serves the images of the master image caches to other conductors.
+
+    The images held by the caches are announced in the database, with the
+    URL at which they are served; other conductors copy them from there
+    instead of downloading them from the image service. The URLs contain a
+    random token generated when the server starts, so that the images are
+    only served to the conductors, which read them from the database.
+    Range requests are supported, so that an image is copied in parallel
+    parts like from an HTTP image service.
+    """
+
+    def __init__(self, hostname):
+        self.hostname = hostname
+        self.token = uuidutils.generate_uuid()
+        self.url = None
+        self._thread = None
+
+    def start(self):
+        """Start serving the images, forgetting the previous announces."""
+        _withdraw_all(self.hostname)
+        sock = eventlet.listen((CONF.image_cache_peers.host_ip,
+                                CONF.image_cache_peers.port))
+        self.url = CONF.image_cache_peers.url
+        if not self.url:
+            host = CONF.my_ip
+            if netutils.is_valid_ipv6(host):
+                host = '[%s]' % host
+            self.url = 'http://%s:%d' % (host, sock.getsockname()[1])
+        self.url = self.url.rstrip('/')
+        self._thread = eventlet.spawn(
+            wsgi.server, sock, self, log_output=False,
+            log=loggers.WritableLogger(LOG, logging.DEBUG))
+        LOG.info(_LI("Sharing the master images of conductor %(host)s at "
+                     "%(url)s"), {'host': self.hostname, 'url': self.url})
+
+    def stop(self):
+        """Stop serving the images and withdraw their announces."""
+        if self._thread is not None:
+            self._thread.kill()
+            self._thread = None
+        _withdraw_all(self.hostname)
+
+    def get_image_url(self, image_kind, file_name):
+        return '%s/%s/%s/%s' % (self.url, self.token, image_kind, file_name)
+
+    def announce(self, image_kind, master_path, raw, checksums,
+                 file_checksums):
+        """Announce an image just stored in a master image cache.
+
+        Failing to announce it is not an error, other conductors simply do
+        not copy it.
+
+        :param image_kind: the kind of images of the cache.
+        :param master_path: the path of the image in the cache.
+        :param raw: whether the image was converted to the raw format.
+        :param checksums: the checksums of the image, as it was downloaded.
+        :param file_checksums: the checksums of the file served to the
+            other conductors, which verify their copy against them.
+        """
+        file_name = os.path.basename(master_path)
+        try:
+            dbapi.get_instance().announce_cached_image({
+                'hostname': self.hostname,
+                'kind': image_kind,
+                'file_name': file_name,
+                'raw': raw,
+                'size': os.path.getsize(master_path),
+                'url': self.get_image_url(image_kind, file_name),
+                'checksums': checksums or {},
+                'file_checksums': file_checksums or {}})
+        except (db_exception.DBError, EnvironmentError) as exc:
+            LOG.warning(_LW("Unable to announce the master image %(name)s "
+                            "to the other conductors: %(exc)s"),
+                        {'name': master_path, 'exc': exc})
+
+    def __call__(self, environ, start_response):
+        request = webob.Request(environ)
+        parts = request.path_info.strip('/').split('/')
+        master_dir = None
+        if (len(parts) == 3 and request.method in ('GET', 'HEAD') and
+                hmac.compare_digest(parts[0], self.token)):
+            master_dir = _peer_dirs.get(parts[1])
+        if master_dir is None or not _is_master_file_name(parts[2]):
+            return webob_exc.HTTPNotFound()(environ, start_response)
+        master_path = os.path.join(master_dir, parts[2])
+        if not os.path.isfile(master_path):
+            return webob_exc.HTTPNotFound()(environ, start_response)
+        LOG.debug("Serving master image %(name)s to %(peer)s",
+                  {'name': master_path, 'peer': request.remote_addr})
+        return webob_static.FileApp(
+            master_path, content_type='application/octet-stream')(
+                environ, start_response)
+
+
+def start_peer_server(hostname):
+    """Start sharing the master images of this conductor, if enabled.
+
+    :param hostname: the hostname of the conductor.
+    """
+    global _peer_server
+    if not CONF.image_cache_peers.enabled or _peer_server is not None:
+        return
+    server = PeerServer(hostname)
+    server.start()
+    _peer_server = server
+
+
+def stop_peer_server():
+    """Stop sharing the master images of this conductor."""
+    global _peer_server
+    if _peer_server is not None:
+        _peer_server.stop()
+        _peer_server = None
+
+
+def _withdraw_all(hostname):
+    try:
+        dbapi.get_instance().withdraw_cached_images(hostname)
+    except db_exception.DBError as exc:
+        LOG.warning(_LW("Unable to withdraw the master images of conductor "
+                        "%(host)s: %(exc)s"), {'host': hostname, 'exc': exc})
+
+
+def _withdraw(master_path):
+    """Withdraw the announce of a master image deleted from its cache."""
+    master_dir, file_name = os.path.split(master_path)
+    for image_kind, shared_dir in _peer_dirs.items():
+        if shared_dir == master_dir:
+            break
+    else:
+        return
+    try:
+        dbapi.get_instance().withdraw_cached_image(_peer_server.hostname,
+                                                   image_kind, file_name)
+    except db_exception.DBError as exc:
+        LOG.warning(_LW("Unable to withdraw the master image %(name)s: "
+                        "%(exc)s"), {'name': master_path, 'exc': exc})
 
-def _find_candidates_for_deletion(master_dir):
-    """Find files eligible for deletion i.e. with link count ==1.
 
-    :param master_dir: directory to operate on
-    :returns: iterator yielding tuples (file name, last used time, stat)
+def _is_master_file_name(file_name):
+    """Whether a name can be the one of an image in a master cache."""
+    return (bool(file_name) and not file_name.startswith('.') and
+            os.path.basename(file_name) == file_name)
+
+
+def _fetch_from_peers(image_kind, file_name, raw, path):
+    """Copy an image from the master image cache of another conductor.
+
+    The conductors holding the image are tried in a random order, up to
+    [image_cache_peers]max_attempts of them.
+
+    The copy is hashed while it is written, and rejected if its digests do
+    not match the file checksums announced by the conductor; the
+    conductors which did not announce any are not tried.
+
+    :param image_kind: the kind of images of the cache.
+    :param file_name: the name of the image in the cache.
+    :param raw: whether the image must have been converted to raw format.
+    :param path: the path to copy the image to.
+    :returns: a tuple with the checksums of the image, as it was downloaded
+        by the conductor it was copied from, and the checksums of the
+        copy, or None if it could not be copied.
     """
-    for filename in os.listdir(master_dir):
-        filename = os.path.join(master_dir, filename)
-        stat = os.stat(filename)
-        if not os.path.isfile(filename) or stat.st_nlink > 1:
+    registry = metrics.get_registry()
+    try:
+        peers = dbapi.get_instance().get_cached_image_peers(
+            image_kind, file_name, raw, exclude_hostname=CONF.host)
+    except db_exception.DBError as exc:
+        LOG.warning(_LW("Unable to find the conductors holding image "
+                        "%(name)s: %(exc)s"), {'name': file_name, 'exc': exc})
+        peers = []
+    peers = [peer for peer in peers if _get_verifiable_checksums(peer)]
+    random.shuffle(peers)
+    for peer in peers[:CONF.image_cache_peers.max_attempts]:
+        start = time.time()
+        expected = _get_verifiable_checksums(peer)
+        try:
+            file_checksums = images.download_verified(
+                image_service.HttpImageService(), peer.url, path, expected)
+            size = os.path.getsize(path)
+        except (exception.IronicException, EnvironmentError) as exc:
+            LOG.warning(_LW("Unable to copy image %(name)s from conductor "
+                            "%(host)s: %(exc)s"),
+                        {'name': file_name, 'host': peer.hostname,
+                         'exc': exc})
+            registry.increment(PEER_FETCH_METRIC, result='error')
+            continue
+        if peer.size is not None and size != peer.size:
+            LOG.warning(_LW("Image %(name)s copied from conductor %(host)s "
+                            "has %(size)d bytes instead of %(expected)d"),
+                        {'name': file_name, 'host': peer.hostname,
+                         'size': size, 'expected': peer.size})
+            registry.increment(PEER_FETCH_METRIC, result='error')
             continue
-        # NOTE(dtantsur): Detect most recently accessed files,
-        # seeing atime can be disabled by the mount option
-        # Also include ctime as it changes when image is linked to
-        last_used_time = max(stat.st_mtime, stat.st_atime, stat.st_ctime)
-        yield filename, last_used_time, stat
+        LOG.info(_LI("Image %(name)s copied from conductor %(host)s, time "
+                     "spent (seconds): %(time).1f"),
+                 {'name': file_name, 'host': peer.hostname,
+                  'time': time.time() - start})
+        registry.increment(PEER_FETCH_METRIC, result='hit')
+        registry.increment(PEER_BYTES_METRIC, size)
+        return peer.checksums or {}, file_checksums
+    if not peers:
+        registry.increment(PEER_FETCH_METRIC, result='miss')
+    ironic_utils.unlink_without_raise(path)
+    return None
+
+
+def _get_verifiable_checksums(peer):
+    """Get the file checksums announced by a peer which can be verified."""
+    return dict((algorithm, checksum)
+                for algorithm, checksum in (peer.file_checksums or {}).items()
+                if algorithm in hashlib.algorithms_available)
+
+
+def _get_file_checksums(master_path, checksums, raw):
+    """Get the checksums of a master image file, to announce it.
+
+    :param master_path: the path of the image in the cache.
+    :param checksums: the checksums of the image, as it was downloaded.
+    :param raw: whether the image was converted to the raw format.
+    :returns: the checksums of the file, which are those of the download
+        unless the image was converted or they are not known.
+    """
+    if checksums and not raw:
+        return checksums
+    return image_workers.execute(
+        images._hash_path, master_path, images.get_checksum_algorithms())
+
+
+def _get_download_lock_name(master_file_name):
+    """Get the name of the lock taken to download an image."""
+    if CONF.parallel_image_downloads:
+        return 'download-image:%s' % master_file_name
+    return 'download-image'
+
+
+def _get_index(master_dir):
+    """Get the index of a master image cache, building it if needed."""
+    master_dir = os.path.abspath(master_dir)
+    index = _indexes.get(master_dir)
+    if index is None:
+        index = _indexes[master_dir] = _CacheIndex(master_dir)
+    return index
+
+
+def _last_used_time(file_stat):
+    # NOTE(dtantsur): Detect most recently accessed files,
+    # seeing atime can be disabled by the mount option
+    # Also include ctime as it changes when image is linked to
+    return max(file_stat.st_mtime, file_stat.st_atime, file_stat.st_ctime)
+
+
+def _get_master_file_name(href):
+    """Get the name of the file of an image in a master cache."""
+    # NOTE(vdrok): File name is converted to UUID if it's not UUID already,
+    # so that two images with same file names do not collide
+    if service_utils.is_glance_image(href):
+        return service_utils.parse_image_ref(href)[0]
+    # NOTE(vdrok): Doing conversion of href in case it's unicode
+    # string, UUID cannot be generated for unicode strings on python 2.
+    href_encoded = href.encode('utf-8') if six.PY2 else href
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, href_encoded))
+
+
+def _get_metadata_path(master_path):
+    master_dir, file_name = os.path.split(master_path)
+    return os.path.join(master_dir, _METADATA_DIR, '%s.json' % file_name)
+
+
+def _write_metadata(master_path, metadata):
+    """Record the metadata of a master image, next to the cache."""
+    metadata_path = _get_metadata_path(master_path)
+    try:
+        fileutils.ensure_tree(os.path.dirname(metadata_path))
+        with open(metadata_path, 'w') as metadata_file:
+            json.dump(metadata, metadata_file)
+    except EnvironmentError as exc:
+        LOG.warning(_LW("Unable to record the metadata of the master image "
+                        "%(name)s: %(exc)s"),
+                    {'name': master_path, 'exc': exc})
+
+
+def _read_metadata(master_path):
+    """Get the metadata of a master image, or {} if it is not known."""
+    try:
+        with open(_get_metadata_path(master_path)) as metadata_file:
+            return json.load(metadata_file)
+    except (EnvironmentError, ValueError):
+        return {}
+
+
+def _unlink_master(master_path):
+    """Delete a master image and its metadata."""
+    os.unlink(master_path)
+    ironic_utils.unlink_without_raise(_get_metadata_path(master_path))
+    master_dir, file_name = os.path.split(os.path.abspath(master_path))
+    index = _indexes.get(master_dir)
+    if index is not None:
+        index.remove(file_name)
+    if _peer_server is not None:
+        _withdraw(os.path.abspath(master_path))
 
 
 def _free_disk_space_for(path):
@@ -311,18 +946,38 @@ def _free_disk_space_for(path):
 
 
 def _fetch(context, image_href, path, force_raw=False):
-    """Fetch image and convert to raw format if needed."""
+    """Fetch image and convert to raw format if needed.
+
+    :returns: the checksums of the downloaded image, see images.fetch().
+    """
     path_tmp = "%s.part" % path
-    images.fetch(context, image_href, path_tmp, force_raw=False)
-    # Notes(yjiang5): If glance can provide the virtual size information,
-    # then we can firstly clean cache and then invoke images.fetch().
+    timings = []
+    start = time.time()
+    checksums = images.fetch(context, image_href, path_tmp, force_raw=False)
+    timings.append(('download', time.time() - start))
     if force_raw:
-        required_space = images.converted_size(path_tmp)
-        directory = os.path.dirname(path_tmp)
-        _clean_up_caches(directory, required_space)
-        images.image_to_raw(image_href, path, path_tmp)
+        # NOTE: the image is probed once, for both the space it needs and
+        # the checks done before its conversion.
+        start = time.time()
+        image_info = disk_utils.qemu_img_info(path_tmp)
+        timings.append(('probe', time.time() - start))
+        # Notes(yjiang5): If glance can provide the virtual size information,
+        # then we can firstly clean cache and then invoke images.fetch().
+        required_space = images.converted_size(path_tmp, image_info)
+        if required_space:
+            start = time.time()
+            directory = os.path.dirname(path_tmp)
+            _clean_up_caches(directory, required_space)
+            timings.append(('clean up', time.time() - start))
+        start = time.time()
+        images.image_to_raw(image_href, path, path_tmp, image_info)
+        timings.append(('conversion', time.time() - start))
     else:
         os.rename(path_tmp, path)
+    LOG.info(_LI('Image %(href)s cached, time spent (seconds): %(timings)s'),
+             {'href': image_href,
+              'timings': ', '.join('%s %.1f' % timing for timing in timings)})
+    return checksums
 
 
 def _clean_up_caches(directory, amount):
@@ -376,9 +1031,26 @@ def clean_up_caches(ctx, directory, images_info):
     _clean_up_caches(directory, total_size)
 
 
+def get_caches(image_kind):
+    """Get the master image caches holding a kind of images.
+
+    Only the caches of the modules already imported, i.e. of the drivers
+    loaded, are known. The caches disabled by their configuration are
+    skipped.
+
+    :param image_kind: INSTANCE_IMAGES or DEPLOY_IMAGES.
+    :returns: a list of ImageCache objects.
+    """
+    caches = (cls() for _priority, cls in _cache_cleanup_list
+              if cls.image_kind == image_kind)
+    return [cache for cache in caches if cache.master_dir is not None]
+
+
 def cleanup(priority):
     """Decorator method for adding cleanup priority to a class."""
     def _add_property_to_class_func(cls):
+        if (priority, cls) in _cache_cleanup_list:
+            return cls
         _cache_cleanup_list.append((priority, cls))
         _cache_cleanup_list.sort(reverse=True, key=lambda tuple_: tuple_[0])
         return cls
@@ -386,6 +1058,170 @@ def cleanup(priority):
     return _add_property_to_class_func
 
 
+class BootImageCache(ImageCache):
+    """Cache of the boot ISOs built for the nodes.
+
+    An image is named after a digest of everything it is built from: the
+    images it contains, its parameters and the templates used. Nodes
+    booting the same kernel and ramdisk with the same parameters share
+    the same image, built once and hard-linked for each of them.
+
+    The floppy images are not cached: their parameters are specific to
+    each deployment, and they are built in memory.
+
+    The modules of the drivers using this cache register it for the
+    clean-up with cleanup(), so that the other conductors do not create
+    its directory.
+    """
+
+    def __init__(self):
+        super(BootImageCache, self).__init__(
+            CONF.boot_image_master_path,
+            # MiB -> B
+            cache_size=CONF.boot_image_cache_size * 1024 * 1024,
+            # min -> sec
+            cache_ttl=CONF.boot_image_cache_ttl * 60)
+
+    def create_boot_iso(self, context, output_filename, kernel_href,
+                        ramdisk_href, deploy_iso_href, root_uuid=None,
+                        kernel_params=None, boot_mode=None):
+        """Create a bootable ISO image for a node, reusing a cached one.
+
+        See images.create_boot_iso() for the parameters. The kernel, the
+        ramdisk and the deploy ISO are identified by their Glance UUID, or
+        by their size and last modification time for the other image
+        services; the ISO is built without cache if they are not known.
+
+        :raises: ImageCreationFailed, if creating boot ISO failed.
+        """
+        def build(path):
+            images.create_boot_iso(context, path, kernel_href, ramdisk_href,
+                                   deploy_iso_href, root_uuid=root_uuid,
+                                   kernel_params=kernel_params,
+                                   boot_mode=boot_mode)
+
+        key = None
+        if self.master_dir is not None:
+            key = _get_boot_iso_key(context, kernel_href, ramdisk_href,
+                                    deploy_iso_href, root_uuid,
+                                    kernel_params, boot_mode)
+        if key is None:
+            build(output_filename)
+        else:
+            self.fetch_built_image(key, output_filename, build)
+
+    def fetch_built_image(self, key, dest_path, build):
+        """Link to a built image, building it if it is not cached.
+
+        The destination is replaced if it exists. It is a copy of the
+        cached image if it is on another filesystem.
+
+        :param key: the digest identifying the image.
+        :param dest_path: destination file path.
+        :param build: a function building the image to the path it is
+                      given.
+        :returns: True if the image was built, False if it was cached.
+        """
+        master_path = os.path.join(self.master_dir, key)
+        with lockutils.lock(_get_download_lock_name(key), 'ironic-'):
+            if os.path.exists(master_path):
+                _link_or_copy(master_path, dest_path)
+                self._index.touch(key)
+                LOG.debug("Master cache hit for built image %(key)s",
+                          {'key': key})
+                return False
+
+            LOG.debug("Master cache miss for built image %(key)s, "
+                      "building it", {'key': key})
+            tmp_dir = tempfile.mkdtemp(dir=self.master_dir)
+            try:
+                tmp_path = os.path.join(tmp_dir, key)
+                build(tmp_path)
+                os.link(tmp_path, master_path)
+                _link_or_copy(master_path, dest_path)
+            finally:
+                utils.rmtree_without_raise(tmp_dir)
+            self._index.add(key)
+
+        self._clean_up_in_background()
+        return True
+
+
+def _link_or_copy(master_path, dest_path):
+    """Link to a master image, or copy it across filesystems."""
+    with lockutils.lock('master_image', 'ironic-'):
+        ironic_utils.unlink_without_raise(dest_path)
+        try:
+            os.link(master_path, dest_path)
+            return
+        except OSError as exc:
+            if exc.errno != errno.EXDEV:
+                raise
+        # NOTE: the open file is not affected if the image is evicted
+        # once the lock is released.
+        master_file = open(master_path, 'rb')
+    with master_file, open(dest_path, 'wb') as dest_file:
+        image_workers.execute(shutil.copyfileobj, master_file, dest_file)
+
+
+def _get_key(inputs):
+    """Get the digest of the inputs of a built image."""
+    data = json.dumps(inputs, sort_keys=True, default=six.text_type)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def _get_file_digest(path):
+    """Get the digest of a small file, None if it cannot be read."""
+    try:
+        with open(path, 'rb') as file_to_hash:
+            return hashlib.sha256(file_to_hash.read()).hexdigest()
+    except EnvironmentError:
+        return None
+
+
+def _get_image_identity(context, href):
+    """Identify the content of an image without downloading it.
+
+    :returns: the UUID of a Glance image, whose content cannot change, the
+        reference, size and last modification time of another image, or
+        None if the latter is unknown.
+    """
+    if service_utils.is_glance_image(href):
+        return service_utils.parse_image_ref(href)[0]
+    try:
+        properties = images.image_show(context, href)
+    except exception.IronicException:
+        return None
+    if not properties.get('updated_at'):
+        return None
+    return [href, properties.get('size'),
+            properties['updated_at'].isoformat()]
+
+
+def _get_boot_iso_key(context, kernel_href, ramdisk_href, deploy_iso_href,
+                      root_uuid, kernel_params, boot_mode):
+    """Get the digest identifying a boot ISO, see images.create_boot_iso().
+
+    :returns: the digest, or None if an input of the ISO is unknown, in
+        which case the ISO is not cached.
+    """
+    inputs = {'type': 'iso',
+              'kernel': _get_image_identity(context, kernel_href),
+              'ramdisk': _get_image_identity(context, ramdisk_href),
+              'isolinux_bin': _get_file_digest(CONF.isolinux_bin),
+              'isolinux_config_template': _get_file_digest(
+                  CONF.isolinux_config_template)}
+    if boot_mode == 'uefi':
+        inputs['deploy_iso'] = _get_image_identity(context, deploy_iso_href)
+        inputs['grub_config_template'] = _get_file_digest(
+            CONF.grub_config_template)
+    if any(value is None for value in inputs.values()):
+        return None
+    inputs.update(root_uuid=root_uuid, kernel_params=kernel_params,
+                  boot_mode=boot_mode)
+    return _get_key(inputs)
+
+
 def _delete_master_path_if_stale(master_path, href, ctx):
     """Delete image from cache if it is not up to date with href contents.
 
@@ -399,8 +1235,7 @@ def _delete_master_path_if_stale(master_path, href, ctx):
         # Glance image contents cannot be updated without changing image's UUID
         return os.path.exists(master_path)
     if os.path.exists(master_path):
-        img_service = image_service.get_image_service(href, context=ctx)
-        img_mtime = img_service.show(href).get('updated_at')
+        img_mtime = images.image_show(ctx, href).get('updated_at')
         if not img_mtime:
             # This means that href is not a glance image and doesn't have an
             # updated_at attribute
@@ -418,7 +1253,7 @@ def _delete_master_path_if_stale(master_path, href, ctx):
                  {'href': href, 'remote_time': img_mtime,
                   'local_time': master_mtime, 'cached_file': master_path})
 
-        os.unlink(master_path)
+        _unlink_master(master_path)
     return False
 
 
@@ -31,11 +31,13 @@ from ironic.common.glance_service import service_utils
 from ironic.common.i18n import _
 from ironic.common.i18n import _LE
 from ironic.common.i18n import _LI
+from ironic.common import image_workers
 from ironic.common import images
 from ironic.common import states
 from ironic.conductor import utils as manager_utils
 from ironic.drivers import base
 from ironic.drivers.modules import deploy_utils
+from ironic.drivers.modules import image_cache
 from ironic.drivers.modules.irmc import common as irmc_common
 
 
@@ -74,6 +76,10 @@ CONF.register_opts(opts, group='irmc')
 
 LOG = logging.getLogger(__name__)
 
+# NOTE: only the conductors running the virtual media drivers build boot
+# images, and need their cache.
+image_cache.cleanup(priority=40)(image_cache.BootImageCache)
+
 REQUIRED_PROPERTIES = {
     'irmc_deploy_iso': _("Deployment ISO image file name. "
                          "Required."),
@@ -293,10 +299,9 @@ def _prepare_boot_iso(task, root_uuid):
         boot_iso_fullpathname = os.path.join(
             CONF.irmc.remote_image_share_root, boot_iso_filename)
 
-        images.create_boot_iso(task.context, boot_iso_fullpathname,
-                               kernel_href, ramdisk_href,
-                               deploy_iso, root_uuid,
-                               kernel_params, boot_mode)
+        image_cache.BootImageCache().create_boot_iso(
+            task.context, boot_iso_fullpathname, kernel_href, ramdisk_href,
+            deploy_iso, root_uuid, kernel_params, boot_mode)
 
         driver_internal_info['irmc_boot_iso'] = boot_iso_filename
 
@@ -335,8 +340,9 @@ def _prepare_floppy_image(task, params):
         images.create_vfat_image(vfat_image_tmpfile_obj.name,
                                  parameters=params)
         try:
-            shutil.copyfile(vfat_image_tmpfile_obj.name,
-                            floppy_fullpathname)
+            image_workers.execute(shutil.copyfile,
+                                  vfat_image_tmpfile_obj.name,
+                                  floppy_fullpathname)
         except IOError as e:
             operation = _("Copying floppy image file")
             raise exception.IRMCOperationError(
@@ -88,6 +88,8 @@ DISK_LAYOUT_PARAMS = ('root_gb', 'swap_mb', 'ephemeral_gb')
 @image_cache.cleanup(priority=50)
 class InstanceImageCache(image_cache.ImageCache):
 
+    image_kind = image_cache.INSTANCE_IMAGES
+
     def __init__(self):
         super(self.__class__, self).__init__(
             CONF.pxe.instance_master_path,
@@ -30,7 +30,7 @@ from ironic.common.glance_service import service_utils
 from ironic.common.i18n import _
 from ironic.common.i18n import _LE
 from ironic.common.i18n import _LW
-from ironic.common import image_service as service
+from ironic.common import images
 from ironic.common import paths
 from ironic.common import pxe_utils
 from ironic.common import states
@@ -189,8 +189,8 @@ def _get_instance_image_info(node, ctx):
     labels = ('kernel', 'ramdisk')
     d_info = deploy_utils.get_image_instance_info(node)
     if not (i_info.get('kernel') and i_info.get('ramdisk')):
-        glance_service = service.GlanceImageService(version=1, context=ctx)
-        iproperties = glance_service.show(d_info['image_source'])['properties']
+        iproperties = images.get_image_properties(ctx,
+                                                  d_info['image_source'])
         for label in labels:
             i_info[label] = str(iproperties[label + '_id'])
         node.instance_info = i_info
@@ -328,6 +328,9 @@ def validate_boot_parameters_for_trusted_boot(node):
 
 @image_cache.cleanup(priority=25)
 class TFTPImageCache(image_cache.ImageCache):
+
+    image_kind = image_cache.DEPLOY_IMAGES
+
     def __init__(self):
         super(TFTPImageCache, self).__init__(
             CONF.pxe.tftp_master_path,
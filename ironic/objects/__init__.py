@@ -26,5 +26,6 @@ def register_all():
     # need to receive it via RPC.
     __import__('ironic.objects.chassis')
     __import__('ironic.objects.conductor')
+    __import__('ironic.objects.job')
     __import__('ironic.objects.node')
     __import__('ironic.objects.port')
@@ -57,6 +57,11 @@ class IronicObject(object_base.VersionedObject):
         'updated_at': object_fields.DateTimeField(nullable=True),
     }
 
+    # The name of the field identifying a persisted object, for which a
+    # get_by_<field> classmethod exists. Objects of classes which set it can
+    # be sent over RPC as deltas, see obj_to_delta_primitive().
+    delta_identity_field = None
+
     def as_dict(self):
         return dict((k, getattr(self, k))
                     for k in self.fields
@@ -74,6 +79,63 @@ class IronicObject(object_base.VersionedObject):
                     self[field] != loaded_object[field]):
                 self[field] = loaded_object[field]
 
+    def obj_can_send_delta(self):
+        """Whether this object can be serialized as a delta.
+
+        Only objects which are already in the database can, since the
+        receiver loads them back from it.
+        """
+        return (self.delta_identity_field is not None and
+                self.obj_attr_is_set('id') and
+                self.obj_attr_is_set(self.delta_identity_field))
+
+    def obj_to_delta_primitive(self):
+        """Serialize the changes made to this object.
+
+        Unlike obj_to_primitive(), only the fields which changed are
+        serialized, along with the field identifying the object. The
+        receiver loads the object from the database and applies the changes
+        to it, see obj_from_delta_primitive(). This is much smaller than
+        the full object when it has large unchanged fields, like the JSON
+        fields of a node.
+
+        :returns: a primitive, to be sent over RPC in place of the object.
+        """
+        changes = self.obj_what_changed()
+        data = {}
+        for name in changes | {self.delta_identity_field}:
+            if self.obj_attr_is_set(name):
+                data[name] = self.fields[name].to_primitive(
+                    self, name, getattr(self, name))
+        key = self._obj_primitive_key
+        return {key('name'): self.obj_name(),
+                key('namespace'): self.OBJ_PROJECT_NAMESPACE,
+                key('version'): self.VERSION,
+                key('data'): data,
+                key('changes'): list(changes),
+                key('delta'): True}
+
+    @classmethod
+    def obj_from_delta_primitive(cls, primitive, context):
+        """Load an object from the database and apply serialized changes.
+
+        :param primitive: a primitive returned by obj_to_delta_primitive().
+        :param context: security context.
+        :returns: the object, with the changes applied but not saved.
+        """
+        objname = cls._obj_primitive_field(primitive, 'name')
+        objver = cls._obj_primitive_field(primitive, 'version')
+        objclass = cls.obj_class_from_name(objname, objver)
+        data = cls._obj_primitive_field(primitive, 'data')
+        identity = objclass.delta_identity_field
+        getter = getattr(objclass, 'get_by_%s' % identity)
+        obj = getter(context, data[identity])
+        for name in cls._obj_primitive_field(primitive, 'changes'):
+            if name in obj.fields and name in data:
+                setattr(obj, name, obj.fields[name].from_primitive(
+                    obj, name, data[name]))
+        return obj
+
 
 class IronicObjectIndirectionAPI(object_base.VersionedObjectIndirectionAPI):
     def __init__(self):
@@ -108,3 +170,10 @@ class IronicObjectIndirectionAPI(object_base.VersionedObjectIndirectionAPI):
 class IronicObjectSerializer(object_base.VersionedObjectSerializer):
     # Base class to use for object hydration
     OBJ_BASE_CLASS = IronicObject
+
+    def _process_object(self, context, objprim):
+        if self.OBJ_BASE_CLASS._obj_primitive_field(objprim, 'delta', False):
+            return self.OBJ_BASE_CLASS.obj_from_delta_primitive(objprim,
+                                                                context)
+        return super(IronicObjectSerializer, self)._process_object(context,
+                                                                   objprim)
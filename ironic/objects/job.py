@@ -0,0 +1,147 @@
+# coding=utf-8
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_versionedobjects import base as object_base
+
+from ironic.db import api as dbapi
+from ironic.objects import base
+from ironic.objects import fields as object_fields
+
+
+@base.IronicObjectRegistry.register
+class Job(base.IronicObject, object_base.VersionedObjectDictCompat):
+    # Version 1.0: Initial version
+    VERSION = '1.0'
+
+    dbapi = dbapi.get_instance()
+
+    fields = {
+        'id': object_fields.IntegerField(),
+        'uuid': object_fields.UUIDField(nullable=True),
+        'node_id': object_fields.IntegerField(nullable=True),
+        'method': object_fields.StringField(nullable=True),
+        'state': object_fields.StringField(nullable=True),
+        'status_code': object_fields.IntegerField(nullable=True),
+        'result': object_fields.FlexibleDictField(nullable=True),
+        'last_error': object_fields.StringField(nullable=True),
+    }
+
+    @staticmethod
+    def _from_db_object(job, db_job):
+        """Converts a database entity to a formal object."""
+        for field in job.fields:
+            job[field] = db_job[field]
+
+        job.obj_reset_changes()
+        return job
+
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable_classmethod
+    @classmethod
+    def get_by_uuid(cls, context, uuid):
+        """Find a job based on uuid and return a :class:`Job` object.
+
+        :param uuid: the uuid of a job.
+        :param context: Security context
+        :returns: a :class:`Job` object.
+        :raises: JobNotFound
+
+        """
+        db_job = cls.dbapi.get_job_by_uuid(uuid)
+        job = Job._from_db_object(cls(context), db_job)
+        return job
+
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable_classmethod
+    @classmethod
+    def destroy_expired(cls, context, ttl):
+        """Delete the jobs which were not updated for some time.
+
+        :param context: Security context.
+        :param ttl: Number of seconds since the last update of a job after
+                    which it is deleted.
+        :returns: the number of jobs deleted.
+
+        """
+        return cls.dbapi.destroy_expired_jobs(ttl)
+
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable
+    def create(self, context=None):
+        """Create a Job record in the DB.
+
+        :param context: Security context. NOTE: This should only
+                        be used internally by the indirection_api.
+                        Unfortunately, RPC requires context as the first
+                        argument, even though we don't use it.
+                        A context should be set when instantiating the
+                        object, e.g.: Job(context)
+        :raises: JobAlreadyExists if 'uuid' column is not unique
+
+        """
+        values = self.obj_get_changes()
+        db_job = self.dbapi.create_job(values)
+        self._from_db_object(self, db_job)
+
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable
+    def save(self, context=None):
+        """Save updates to this Job.
+
+        Updates will be made column by column based on the result
+        of self.what_changed().
+
+        :param context: Security context. NOTE: This should only
+                        be used internally by the indirection_api.
+                        Unfortunately, RPC requires context as the first
+                        argument, even though we don't use it.
+                        A context should be set when instantiating the
+                        object, e.g.: Job(context)
+        :raises: JobNotFound
+
+        """
+        updates = self.obj_get_changes()
+        updated_job = self.dbapi.update_job(self.uuid, updates)
+        self._from_db_object(self, updated_job)
+
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable
+    def refresh(self, context=None):
+        """Loads updates for this Job.
+
+        Loads a job with the same uuid from the database and
+        checks for updated attributes. Updates are applied from
+        the loaded job column by column, if there are any updates.
+
+        :param context: Security context. NOTE: This should only
+                        be used internally by the indirection_api.
+                        Unfortunately, RPC requires context as the first
+                        argument, even though we don't use it.
+                        A context should be set when instantiating the
+                        object, e.g.: Job(context)
+        :raises: JobNotFound
+
+        """
+        current = self.__class__.get_by_uuid(self._context, uuid=self.uuid)
+        self.obj_refresh(current)
@@ -45,10 +45,16 @@ class Node(base.IronicObject, object_base.VersionedObjectDictCompat):
     # Version 1.13: Add touch_provisioning()
     # Version 1.14: Add _validate_property_values() and make create()
     #               and save() validate the input of property values.
-    VERSION = '1.14'
+    # Version 1.15: Add create_many()
+    # Version 1.16: Add get_aggregates()
+    # Version 1.17: Add get_changes(), get_last_change_seq() and
+    #               destroy_old_changes()
+    VERSION = '1.17'
 
     dbapi = db_api.get_instance()
 
+    delta_identity_field = 'uuid'
+
     fields = {
         'id': object_fields.IntegerField(),
 
@@ -239,6 +245,104 @@ class Node(base.IronicObject, object_base.VersionedObjectDictCompat):
                                            sort_dir=sort_dir)
         return [Node._from_db_object(cls(context), obj) for obj in db_nodes]
 
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable_classmethod
+    @classmethod
+    def get_aggregates(cls, context, group_by, filters=None):
+        """Count the nodes for each combination of values of some fields.
+
+        :param context: Security context.
+        :param group_by: a list of the names of the fields to group the
+                         nodes by.
+        :param filters: Filters to apply.
+        :returns: a list of dicts, each one mapping the group_by fields to
+                  their values and 'count' to the number of nodes having
+                  these values.
+
+        """
+        rows = cls.dbapi.get_node_aggregates(group_by, filters=filters)
+        aggregates = []
+        for row in rows:
+            aggregate = dict(zip(group_by, row))
+            aggregate['count'] = row[-1]
+            aggregates.append(aggregate)
+        return aggregates
+
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable_classmethod
+    @classmethod
+    def get_changes(cls, context, since, limit=None):
+        """Return the changes of the state of the nodes after a sequence.
+
+        A change is recorded whenever the power_state, target_power_state,
+        provision_state or target_provision_state of a node is modified.
+
+        :param context: Security context.
+        :param since: the sequence number of the last change already seen.
+        :param limit: maximum number of changes to return.
+        :returns: a list of dicts, ordered by sequence number, each one with
+                  the sequence number of the change ('seq'), the UUID of
+                  the node ('uuid'), the state fields after the change and
+                  the time of the change ('changed_at').
+
+        """
+        changes = []
+        for row in cls.dbapi.get_node_changes(since, limit=limit):
+            change = {'seq': row.id, 'uuid': row.node_uuid,
+                      'changed_at': row.created_at}
+            for name in ('power_state', 'target_power_state',
+                         'provision_state', 'target_provision_state'):
+                change[name] = getattr(row, name)
+            changes.append(change)
+        return changes
+
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable_classmethod
+    @classmethod
+    def get_last_change_seq(cls, context):
+        """Return the sequence number of the last change of a node state.
+
+        :param context: Security context.
+        :returns: the sequence number, 0 if there was no change.
+
+        """
+        return cls.dbapi.get_last_node_change_seq()
+
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable_classmethod
+    @classmethod
+    def get_first_change_seq(cls, context):
+        """Return the sequence number of the oldest change still recorded.
+
+        :param context: Security context.
+        :returns: the sequence number, 0 if there was no change.
+
+        """
+        return cls.dbapi.get_first_node_change_seq()
+
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable_classmethod
+    @classmethod
+    def destroy_old_changes(cls, context, ttl):
+        """Delete the changes of the state of the nodes older than a TTL.
+
+        :param context: Security context.
+        :param ttl: Number of seconds after which a change is deleted.
+        :returns: the number of changes deleted.
+
+        """
+        return cls.dbapi.destroy_old_node_changes(ttl)
+
     # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
     # methods can be used in the future to replace current explicit RPC calls.
     # Implications of calling new remote procedures should be thought through.
@@ -302,6 +406,29 @@ class Node(base.IronicObject, object_base.VersionedObjectDictCompat):
         db_node = self.dbapi.create_node(values)
         self._from_db_object(self, db_node)
 
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable_classmethod
+    @classmethod
+    def create_many(cls, context, nodes):
+        """Create the DB records of several Nodes in a single transaction.
+
+        :param context: Security context.
+        :param nodes: a list of new Node objects.
+        :raises: InvalidParameterValue if some property values are invalid.
+        :raises: the exceptions raised by create(), in which case none of
+                 the nodes is created.
+        """
+        values_list = []
+        for node in nodes:
+            values = node.obj_get_changes()
+            node._validate_property_values(values.get('properties'))
+            values_list.append(values)
+        db_nodes = cls.dbapi.create_nodes(values_list)
+        for node, db_node in zip(nodes, db_nodes):
+            cls._from_db_object(node, db_node)
+
     # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
     # methods can be used in the future to replace current explicit RPC calls.
     # Implications of calling new remote procedures should be thought through.
@@ -32,7 +32,8 @@ class Port(base.IronicObject, object_base.VersionedObjectDictCompat):
     # Version 1.2: Add create() and destroy()
     # Version 1.3: Add list()
     # Version 1.4: Add list_by_node_id()
-    VERSION = '1.4'
+    # Version 1.5: Add create_many()
+    VERSION = '1.5'
 
     dbapi = dbapi.get_instance()
 
@@ -202,6 +203,24 @@ class Port(base.IronicObject, object_base.VersionedObjectDictCompat):
         db_port = self.dbapi.create_port(values)
         self._from_db_object(self, db_port)
 
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable_classmethod
+    @classmethod
+    def create_many(cls, context, ports):
+        """Create the DB records of several Ports in a single transaction.
+
+        :param context: Security context.
+        :param ports: a list of new Port objects.
+        :raises: MACAlreadyExists if 'address' column is not unique
+        :raises: PortAlreadyExists if 'uuid' column is not unique
+        """
+        db_ports = cls.dbapi.create_ports([port.obj_get_changes()
+                                           for port in ports])
+        for port, db_port in zip(ports, db_ports):
+            cls._from_db_object(port, db_port)
+
     # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
     # methods can be used in the future to replace current explicit RPC calls.
     # Implications of calling new remote procedures should be thought through.
@@ -35,6 +35,8 @@ from oslo_log import log as logging
 import testtools
 
 from ironic.common import hash_ring
+from ironic.common import images
+from ironic.common import keystone
 from ironic.objects import base as objects_base
 from ironic.tests.unit import conf_fixture
 from ironic.tests.unit import policy_fixture
@@ -109,6 +111,8 @@ class TestCase(testtools.TestCase):
 
         self.addCleanup(self._clear_attrs)
         self.addCleanup(hash_ring.HashRingManager().reset)
+        self.addCleanup(keystone.clear_caches)
+        self.addCleanup(images.clear_caches)
         self.useFixture(fixtures.EnvironmentVariable('http_proxy'))
         self.policy = self.useFixture(policy_fixture.PolicyFixture())
         CONF.set_override('fatal_exception_format_errors', True)
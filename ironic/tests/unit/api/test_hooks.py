@@ -165,6 +165,14 @@ class TestNoExceptionTracebackHook(base.BaseApiTest):
         cfg.CONF.set_override('debug_tracebacks_in_api', True)
         self._test_hook_without_traceback()
 
+    def test_hook_success_body_not_read(self):
+        # NOTE: reading the body of a streamed response would consume it
+        response = mock.Mock(status_int=http_client.OK)
+        body = mock.PropertyMock(return_value=b'{}')
+        type(response).body = body
+        hooks.NoExceptionTracebackHook().after(mock.Mock(response=response))
+        self.assertFalse(body.called)
+
     def _test_hook_on_serverfault(self):
         self.root_convert_mock.side_effect = Exception(self.MSG_WITH_TRACE)
 
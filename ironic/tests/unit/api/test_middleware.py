@@ -15,11 +15,19 @@
 Tests to assert that various incorporated middleware works as expected.
 """
 
+import time
+
+import mock
 from oslo_config import cfg
 import oslo_middleware.cors as cors_middleware
 from six.moves import http_client
 
+from ironic.api.middleware import profiler
+from ironic.common import metrics
+from ironic.common import rpc
+from ironic.conductor import rpcapi
 from ironic.tests.unit.api import base
+from ironic.tests.unit.objects import utils as obj_utils
 
 
 class TestCORSMiddleware(base.BaseApiTest):
@@ -102,3 +110,73 @@ class TestCORSMiddleware(base.BaseApiTest):
         self.assertEqual(
             self._response_string(http_client.OK), response.status)
         self.assertNotIn('Access-Control-Allow-Origin', response.headers)
+
+
+class TestProfilerMiddleware(base.BaseApiTest):
+
+    def setUp(self):
+        cfg.CONF.set_override('enable_profiling', True, group='api')
+        self.registry = metrics.get_registry()
+        self.registry.reset()
+        self.addCleanup(self.registry.reset)
+        super(TestProfilerMiddleware, self).setUp()
+
+    def _phases(self):
+        phases = {}
+        for histogram in self.registry.snapshot():
+            phases.setdefault(histogram['labels']['route'], set()).add(
+                histogram['labels']['phase'])
+        return phases
+
+    def test_phases_recorded(self):
+        obj_utils.create_test_node(self.context)
+        self.get_json('/nodes')
+        phases = self._phases()
+        self.assertIn('GET NodesController.get_all', phases)
+        self.assertTrue({'total', 'app', 'hooks', 'db', 'render'}.issubset(
+            phases['GET NodesController.get_all']))
+        self.assertIsNone(metrics.get_recorder())
+
+    def test_unrouted(self):
+        self.get_json('/nodes/foo/bar/baz', expect_errors=True)
+        self.assertIn('total', self._phases()['GET <unrouted>'])
+
+    def test_no_server_timing_by_default(self):
+        response = self.app.get('/v1/nodes')
+        self.assertNotIn('Server-Timing', response.headers)
+
+    def test_server_timing(self):
+        cfg.CONF.set_override('profiling_server_timing', True, group='api')
+        response = self.app.get('/v1/nodes')
+        header = response.headers['Server-Timing']
+        self.assertIn('total;dur=', header)
+        self.assertIn('app;dur=', header)
+
+    @mock.patch.object(profiler.LOG, 'info', autospec=True)
+    def test_report(self, mock_log):
+        cfg.CONF.set_override('profiling_report_interval', 1, group='api')
+        with mock.patch.object(profiler.time, 'time',
+                               return_value=time.time() + 10):
+            self.app.get('/v1/nodes')
+        self.assertTrue(mock_log.called)
+
+    @mock.patch.object(rpc, 'get_client', autospec=True)
+    @mock.patch.object(rpcapi.ConductorAPI, 'get_topic_for', autospec=True)
+    def test_rpc_timed(self, mock_topic, mock_get_client):
+        mock_topic.return_value = 'test-topic'
+        client = mock_get_client.return_value
+        client.prepare.return_value.call.return_value = {
+            'boot_device': 'pxe', 'persistent': False}
+        node = obj_utils.create_test_node(self.context)
+        self.get_json('/nodes/%s/management/boot_device' % node.uuid)
+        self.assertTrue(client.prepare.return_value.call.called)
+        phases = self._phases()
+        self.assertIn('rpc', phases['GET BootDeviceController.get'])
+
+
+class TestProfilerMiddlewareDisabled(base.BaseApiTest):
+
+    def test_no_profiler(self):
+        self.assertNotIsInstance(self.app.app, profiler.ProfilerMiddleware)
+        response = self.app.get('/v1/nodes')
+        self.assertNotIn('Server-Timing', response.headers)
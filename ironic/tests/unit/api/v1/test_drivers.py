@@ -25,6 +25,7 @@ from ironic.api.controllers.v1 import driver
 from ironic.common import exception
 from ironic.conductor import rpcapi
 from ironic.tests.unit.api import base
+from ironic.tests.unit.objects import utils as obj_utils
 
 
 class TestListDrivers(base.BaseApiTest):
@@ -127,6 +128,30 @@ class TestListDrivers(base.BaseApiTest):
         self.assertEqual(mocked_driver_vendor_passthru.return_value['return'],
                          response.json)
 
+    @mock.patch.object(rpcapi.ConductorAPI, 'driver_vendor_passthru')
+    @mock.patch.object(rpcapi.ConductorAPI, 'start_job')
+    def test_driver_vendor_passthru_job(self, mock_start_job,
+                                        mocked_driver_vendor_passthru):
+        self.register_fake_conductors()
+        job = obj_utils.create_test_job(self.context, node_id=None,
+                                        method='driver_vendor_passthru')
+        mock_start_job.return_value = job
+        response = self.post_json(
+            '/drivers/%s/vendor_passthru/do_test' % self.d1,
+            {'test_key': 'test_value'},
+            headers={api_base.Version.string: '1.17',
+                     'Prefer': 'respond-async'})
+        self.assertEqual(http_client.ACCEPTED, response.status_int)
+        self.assertEqual(job.uuid, response.json['uuid'])
+        self.assertIsNone(response.json['node_uuid'])
+        self.assertIn('/v1/jobs/%s' % job.uuid, response.location)
+        mock_start_job.assert_called_once_with(
+            mock.ANY, 'driver_vendor_passthru',
+            {'driver_name': self.d1, 'driver_method': 'do_test',
+             'http_method': 'POST', 'info': {'test_key': 'test_value'}},
+            topic=mock.ANY)
+        self.assertFalse(mocked_driver_vendor_passthru.called)
+
     @mock.patch.object(rpcapi.ConductorAPI, 'driver_vendor_passthru')
     def test_driver_vendor_passthru_async(self, mocked_driver_vendor_passthru):
         self.register_fake_conductors()
@@ -0,0 +1,116 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Tests for the API /image_cache/ methods.
+"""
+
+import mock
+from oslo_config import cfg
+import oslo_messaging as messaging
+from six.moves import http_client
+
+from ironic.api.controllers import base as api_base
+from ironic.common import exception
+from ironic.common import states
+from ironic.conductor import rpcapi
+from ironic.tests.unit.api import base as test_api_base
+from ironic.tests.unit.objects import utils as obj_utils
+
+
+@mock.patch.object(rpcapi.ConductorAPI, 'prewarm_image_cache')
+@mock.patch.object(rpcapi.ConductorAPI, 'get_conductor_topics')
+class TestPrewarm(test_api_base.BaseApiTest):
+
+    headers = {api_base.Version.string: '1.20'}
+
+    def setUp(self):
+        super(TestPrewarm, self).setUp()
+        self.job = obj_utils.create_test_job(self.context, node_id=None,
+                                             method='prewarm_image_cache',
+                                             state=states.JOB_PENDING)
+
+    def test_prewarm(self, mock_topics, mock_prewarm):
+        mock_topics.return_value = {'host2': 'topic.host2',
+                                    'host1': 'topic.host1'}
+        mock_prewarm.side_effect = [
+            self.job, exception.NoFreeConductorWorker()]
+        deploy = {'deploy_kernel': 'kernel', 'deploy_ramdisk': 'ramdisk'}
+        response = self.post_json('/image_cache/prewarm',
+                                  {'images': ['image'],
+                                   'deploy_images': [deploy],
+                                   'pin_time': 600},
+                                  headers=self.headers)
+        self.assertEqual(http_client.ACCEPTED, response.status_int)
+        jobs = response.json['jobs']
+        self.assertEqual('host1', jobs[0]['conductor'])
+        self.assertEqual(http_client.ACCEPTED, jobs[0]['status_code'])
+        self.assertEqual(self.job.uuid, jobs[0]['job']['uuid'])
+        self.assertEqual('host2', jobs[1]['conductor'])
+        self.assertEqual(http_client.SERVICE_UNAVAILABLE,
+                         jobs[1]['status_code'])
+        self.assertTrue(jobs[1]['error'])
+        self.assertEqual(
+            [mock.call(mock.ANY, ['image'], [deploy], pin_time=600,
+                       topic='topic.host1'),
+             mock.call(mock.ANY, ['image'], [deploy], pin_time=600,
+                       topic='topic.host2')],
+            mock_prewarm.call_args_list)
+
+    def test_prewarm_rpc_error(self, mock_topics, mock_prewarm):
+        mock_topics.return_value = {'host1': 'topic.host1',
+                                    'host2': 'topic.host2'}
+        mock_prewarm.side_effect = [messaging.MessagingTimeout('timeout'),
+                                    self.job]
+        response = self.post_json('/image_cache/prewarm',
+                                  {'images': ['image']},
+                                  headers=self.headers)
+        self.assertEqual(http_client.ACCEPTED, response.status_int)
+        jobs = response.json['jobs']
+        self.assertEqual('host1', jobs[0]['conductor'])
+        self.assertEqual(http_client.SERVICE_UNAVAILABLE,
+                         jobs[0]['status_code'])
+        self.assertIn('timeout', jobs[0]['error'])
+        self.assertEqual(http_client.ACCEPTED, jobs[1]['status_code'])
+        self.assertEqual(self.job.uuid, jobs[1]['job']['uuid'])
+
+    def test_prewarm_default_pin_time(self, mock_topics, mock_prewarm):
+        mock_topics.return_value = {'host1': 'topic.host1'}
+        mock_prewarm.return_value = self.job
+        response = self.post_json('/image_cache/prewarm',
+                                  {'images': ['image']},
+                                  headers=self.headers)
+        self.assertEqual(http_client.ACCEPTED, response.status_int)
+        mock_prewarm.assert_called_once_with(mock.ANY, ['image'], [],
+                                             pin_time=None,
+                                             topic='topic.host1')
+
+    def test_prewarm_no_image(self, mock_topics, mock_prewarm):
+        response = self.post_json('/image_cache/prewarm', {'images': []},
+                                  headers=self.headers, expect_errors=True)
+        self.assertEqual(http_client.BAD_REQUEST, response.status_int)
+        self.assertFalse(mock_prewarm.called)
+
+    def test_prewarm_too_many_images(self, mock_topics, mock_prewarm):
+        cfg.CONF.set_override('max_limit', 1, 'api')
+        response = self.post_json('/image_cache/prewarm',
+                                  {'images': ['image1', 'image2']},
+                                  headers=self.headers, expect_errors=True)
+        self.assertEqual(http_client.BAD_REQUEST, response.status_int)
+        self.assertFalse(mock_prewarm.called)
+
+    def test_prewarm_old_version(self, mock_topics, mock_prewarm):
+        response = self.post_json('/image_cache/prewarm',
+                                  {'images': ['image']},
+                                  headers={api_base.Version.string: '1.19'},
+                                  expect_errors=True)
+        self.assertEqual(http_client.NOT_FOUND, response.status_int)
+        self.assertFalse(mock_prewarm.called)
@@ -0,0 +1,136 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Tests for the API /jobs/ methods.
+"""
+
+from oslo_utils import uuidutils
+from six.moves import http_client
+
+from ironic.api.controllers import base as api_base
+from ironic.api.controllers.v1 import job as api_job
+from ironic.common import states
+from ironic.tests import base
+from ironic.tests.unit.api import base as test_api_base
+from ironic.tests.unit.objects import utils as obj_utils
+
+
+class TestJobObject(base.TestCase):
+
+    def test_job_sample(self):
+        sample = api_job.Job.sample()
+        self.assertEqual('get_boot_device', sample.method)
+        self.assertEqual(2, len(sample.links))
+
+
+class TestGetJob(test_api_base.BaseApiTest):
+
+    headers = {api_base.Version.string: '1.17'}
+
+    def setUp(self):
+        super(TestGetJob, self).setUp()
+        self.node = obj_utils.create_test_node(self.context)
+
+    def _create_job(self, method, state=states.JOB_SUCCEEDED, **kwargs):
+        return obj_utils.create_test_job(self.context,
+                                         uuid=uuidutils.generate_uuid(),
+                                         node_id=self.node.id, method=method,
+                                         state=state, **kwargs)
+
+    def test_get_one(self):
+        result = {'boot_device': 'pxe', 'persistent': False}
+        job = self._create_job('get_boot_device', status_code=200,
+                               result={'return': result})
+        data = self.get_json('/jobs/%s' % job.uuid, headers=self.headers)
+        self.assertEqual(job.uuid, data['uuid'])
+        self.assertEqual(self.node.uuid, data['node_uuid'])
+        self.assertEqual('get_boot_device', data['method'])
+        self.assertEqual(states.JOB_SUCCEEDED, data['state'])
+        self.assertEqual(200, data['status_code'])
+        self.assertEqual(result, data['result'])
+        self.assertIsNone(data['last_error'])
+        self.assertIn('created_at', data)
+        self.assertIn(job.uuid, data['links'][0]['href'])
+
+    def test_get_one_supported_boot_devices(self):
+        job = self._create_job('get_supported_boot_devices',
+                               result={'return': ['pxe', 'disk']})
+        data = self.get_json('/jobs/%s' % job.uuid, headers=self.headers)
+        self.assertEqual({'supported_boot_devices': ['pxe', 'disk']},
+                         data['result'])
+
+    def test_get_one_console_information(self):
+        info = {'type': 'shellinabox', 'url': 'http://localhost:4201'}
+        job = self._create_job('get_console_information',
+                               result={'return': info})
+        data = self.get_json('/jobs/%s' % job.uuid, headers=self.headers)
+        self.assertEqual({'console_enabled': True, 'console_info': info},
+                         data['result'])
+
+    def test_get_one_console_not_enabled(self):
+        job = self._create_job('get_console_information',
+                               result={'return': None})
+        data = self.get_json('/jobs/%s' % job.uuid, headers=self.headers)
+        self.assertEqual({'console_enabled': False, 'console_info': None},
+                         data['result'])
+
+    def test_get_one_vendor_passthru(self):
+        job = self._create_job('vendor_passthru',
+                               result={'return': {'return': {'foo': 'bar'},
+                                                  'async': False,
+                                                  'attach': False}})
+        data = self.get_json('/jobs/%s' % job.uuid, headers=self.headers)
+        self.assertEqual({'foo': 'bar'}, data['result'])
+
+    def test_get_one_pending(self):
+        job = self._create_job('get_boot_device', state=states.JOB_PENDING)
+        data = self.get_json('/jobs/%s' % job.uuid, headers=self.headers)
+        self.assertEqual(states.JOB_PENDING, data['state'])
+        self.assertIsNone(data['status_code'])
+        self.assertIsNone(data['result'])
+
+    def test_get_one_failed(self):
+        job = self._create_job('get_boot_device', state=states.JOB_FAILED,
+                               status_code=400, last_error='boom')
+        data = self.get_json('/jobs/%s' % job.uuid, headers=self.headers)
+        self.assertEqual(states.JOB_FAILED, data['state'])
+        self.assertEqual(400, data['status_code'])
+        self.assertEqual('boom', data['last_error'])
+        self.assertIsNone(data['result'])
+
+    def test_get_one_progress(self):
+        progress = {'total': 2, 'done': 1, 'downloaded': 1, 'failed': {}}
+        job = obj_utils.create_test_job(self.context, node_id=None,
+                                        method='prewarm_image_cache',
+                                        state=states.JOB_RUNNING,
+                                        result={'return': progress})
+        data = self.get_json('/jobs/%s' % job.uuid, headers=self.headers)
+        self.assertEqual(states.JOB_RUNNING, data['state'])
+        self.assertEqual(progress, data['result'])
+
+    def test_get_one_without_node(self):
+        job = obj_utils.create_test_job(self.context, node_id=None,
+                                        method='driver_vendor_passthru')
+        data = self.get_json('/jobs/%s' % job.uuid, headers=self.headers)
+        self.assertIsNone(data['node_uuid'])
+
+    def test_get_one_not_found(self):
+        response = self.get_json('/jobs/%s' % uuidutils.generate_uuid(),
+                                 headers=self.headers, expect_errors=True)
+        self.assertEqual(http_client.NOT_FOUND, response.status_int)
+        self.assertTrue(response.json['error_message'])
+
+    def test_get_one_old_version(self):
+        job = self._create_job('get_boot_device')
+        response = self.get_json('/jobs/%s' % job.uuid, expect_errors=True,
+                                 headers={api_base.Version.string: '1.16'})
+        self.assertEqual(http_client.NOT_FOUND, response.status_int)
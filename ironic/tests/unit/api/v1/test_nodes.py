@@ -20,6 +20,7 @@ import json
 
 import mock
 from oslo_config import cfg
+import oslo_messaging as messaging
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
 import six
@@ -836,6 +837,461 @@ class TestListNodes(test_api_base.BaseApiTest):
         # rpc_node lookup and pass that downwards
         mock_vdi.assert_called_once_with(mock.ANY, node.uuid, 'test-topic')
 
+    def _test_start_job(self, mock_start_job, path, method):
+        node = obj_utils.create_test_node(self.context)
+        job = obj_utils.create_test_job(self.context, node_id=node.id,
+                                        method=method)
+        mock_start_job.return_value = job
+        response = self.get_json(path % node.uuid, expect_errors=True,
+                                 headers={api_base.Version.string: '1.17',
+                                          'Prefer': 'respond-async'})
+        self.assertEqual(http_client.ACCEPTED, response.status_int)
+        self.assertEqual('respond-async',
+                         response.headers['Preference-Applied'])
+        self.assertEqual('/v1/jobs/%s' % job.uuid,
+                         urlparse.urlparse(response.location).path)
+        self.assertEqual(job.uuid, response.json['uuid'])
+        self.assertEqual(states.JOB_PENDING, response.json['state'])
+        mock_start_job.assert_called_once_with(
+            mock.ANY, method, {'node_id': node.uuid}, topic='test-topic')
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'start_job')
+    def test_get_boot_device_job(self, mock_start_job):
+        self._test_start_job(mock_start_job,
+                             '/nodes/%s/management/boot_device',
+                             'get_boot_device')
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'start_job')
+    def test_get_supported_boot_devices_job(self, mock_start_job):
+        self._test_start_job(mock_start_job,
+                             '/nodes/%s/management/boot_device/supported',
+                             'get_supported_boot_devices')
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'start_job')
+    def test_get_console_information_job(self, mock_start_job):
+        self._test_start_job(mock_start_job, '/nodes/%s/states/console',
+                             'get_console_information')
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'start_job')
+    def test_validate_job(self, mock_start_job):
+        self._test_start_job(mock_start_job, '/nodes/validate?node=%s',
+                             'validate_driver_interfaces')
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'start_job')
+    @mock.patch.object(rpcapi.ConductorAPI, 'get_boot_device')
+    def test_get_boot_device_prefer_async_old_version(self, mock_gbd,
+                                                      mock_start_job):
+        node = obj_utils.create_test_node(self.context)
+        expected_data = {'boot_device': boot_devices.PXE, 'persistent': True}
+        mock_gbd.return_value = expected_data
+        data = self.get_json('/nodes/%s/management/boot_device' % node.uuid,
+                             headers={api_base.Version.string: '1.16',
+                                      'Prefer': 'respond-async'})
+        self.assertEqual(expected_data, data)
+        self.assertFalse(mock_start_job.called)
+
+    def test_get_one_etag(self):
+        node = obj_utils.create_test_node(self.context)
+        response = self.get_json('/nodes/%s' % node.uuid,
+                                 expect_errors=True)
+        self.assertEqual(http_client.OK, response.status_int)
+        self.assertTrue(response.etag)
+        self.assertEqual(node.uuid, response.json['uuid'])
+
+    def test_get_one_not_modified(self):
+        node = obj_utils.create_test_node(self.context)
+        response = self.get_json('/nodes/%s' % node.uuid,
+                                 expect_errors=True)
+        etag = response.headers['ETag']
+        response = self.get_json('/nodes/%s' % node.uuid,
+                                 headers={'If-None-Match': etag},
+                                 expect_errors=True)
+        self.assertEqual(http_client.NOT_MODIFIED, response.status_int)
+        self.assertEqual(b'', response.body)
+        self.assertEqual(etag, response.headers['ETag'])
+
+    def test_get_one_etag_changes_on_update(self):
+        node = obj_utils.create_test_node(self.context)
+        response = self.get_json('/nodes/%s' % node.uuid,
+                                 expect_errors=True)
+        etag = response.headers['ETag']
+        node.extra = {'foo': 'bar'}
+        node.save()
+        response = self.get_json('/nodes/%s' % node.uuid,
+                                 headers={'If-None-Match': etag},
+                                 expect_errors=True)
+        self.assertEqual(http_client.OK, response.status_int)
+        self.assertNotEqual(etag, response.headers['ETag'])
+        self.assertEqual({'foo': 'bar'}, response.json['extra'])
+
+    def test_get_one_etag_changes_on_update_same_second(self):
+        node = obj_utils.create_test_node(self.context,
+                                          provision_state=states.DEPLOYING)
+        response = self.get_json('/nodes/%s' % node.uuid,
+                                 expect_errors=True)
+        etag = response.headers['ETag']
+        updated_at = node.updated_at
+        node.provision_state = states.ACTIVE
+        node.save()
+        # NOTE: MySQL stores the time with a resolution of a second
+        self.dbapi.update_node(node.id, {'updated_at': updated_at})
+        response = self.get_json('/nodes/%s' % node.uuid,
+                                 headers={'If-None-Match': etag},
+                                 expect_errors=True)
+        self.assertEqual(http_client.OK, response.status_int)
+        self.assertNotEqual(etag, response.headers['ETag'])
+        self.assertEqual(states.ACTIVE, response.json['provision_state'])
+
+    def test_get_one_etag_depends_on_version(self):
+        node = obj_utils.create_test_node(self.context)
+        response = self.get_json('/nodes/%s' % node.uuid,
+                                 expect_errors=True)
+        etag = response.headers['ETag']
+        response = self.get_json(
+            '/nodes/%s' % node.uuid,
+            headers={'If-None-Match': etag,
+                     api_base.Version.string: str(api_v1.MAX_VER)},
+            expect_errors=True)
+        self.assertEqual(http_client.OK, response.status_int)
+        self.assertNotEqual(etag, response.headers['ETag'])
+
+    def test_collection_not_modified(self):
+        obj_utils.create_test_node(self.context)
+        response = self.get_json('/nodes/detail', expect_errors=True)
+        etag = response.headers['ETag']
+        response = self.get_json('/nodes/detail',
+                                 headers={'If-None-Match': etag},
+                                 expect_errors=True)
+        self.assertEqual(http_client.NOT_MODIFIED, response.status_int)
+
+    def test_collection_etag_changes_on_new_node(self):
+        obj_utils.create_test_node(self.context)
+        response = self.get_json('/nodes', expect_errors=True)
+        etag = response.headers['ETag']
+        obj_utils.create_test_node(self.context,
+                                   uuid=uuidutils.generate_uuid())
+        response = self.get_json('/nodes', headers={'If-None-Match': etag},
+                                 expect_errors=True)
+        self.assertEqual(http_client.OK, response.status_int)
+        self.assertNotEqual(etag, response.headers['ETag'])
+        self.assertThat(response.json['nodes'], HasLength(2))
+
+    @mock.patch.object(api_utils, '_RESPONSE_CACHE', None)
+    @mock.patch.object(api_utils, 'get_rpc_node',
+                       wraps=api_utils.get_rpc_node)
+    def test_get_one_response_cache(self, mock_get):
+        cfg.CONF.set_override('response_cache_ttl', 60, 'api')
+        node = obj_utils.create_test_node(self.context)
+        first = self.get_json('/nodes/%s' % node.uuid, expect_errors=True)
+        second = self.get_json('/nodes/%s' % node.uuid, expect_errors=True)
+        self.assertEqual(1, mock_get.call_count)
+        self.assertEqual(first.body, second.body)
+        self.assertEqual(first.headers['ETag'], second.headers['ETag'])
+        self.assertEqual('application/json', second.content_type)
+        response = self.get_json('/nodes/%s' % node.uuid,
+                                 headers={'If-None-Match': first.etag},
+                                 expect_errors=True)
+        self.assertEqual(http_client.NOT_MODIFIED, response.status_int)
+        self.assertEqual(1, mock_get.call_count)
+
+    @mock.patch.object(api_utils, '_RESPONSE_CACHE', None)
+    def test_collection_response_cache(self):
+        cfg.CONF.set_override('response_cache_ttl', 60, 'api')
+        node = obj_utils.create_test_node(self.context)
+        first = self.get_json('/nodes/detail', expect_errors=True)
+        with mock.patch.object(objects.Node, 'list',
+                               autospec=True) as mock_list:
+            second = self.get_json('/nodes/detail', expect_errors=True)
+            self.assertFalse(mock_list.called)
+        self.assertEqual(first.body, second.body)
+        self.assertEqual(node.uuid, second.json['nodes'][0]['uuid'])
+
+    @mock.patch.object(api_utils, '_RESPONSE_CACHE', None)
+    def test_response_cache_disabled(self):
+        node = obj_utils.create_test_node(self.context)
+        self.get_json('/nodes/%s' % node.uuid)
+        self.assertFalse(api_utils._RESPONSE_CACHE.enabled)
+        self.assertEqual(0, len(api_utils._RESPONSE_CACHE))
+
+    def test_collection_streaming(self):
+        cfg.CONF.set_override('stream_chunk_size', 2, 'api')
+        uuids = []
+        for id_ in range(5):
+            node = obj_utils.create_test_node(self.context, id=id_,
+                                              uuid=uuidutils.generate_uuid())
+            uuids.append(node.uuid)
+        with mock.patch.object(objects.Node, 'list',
+                               wraps=objects.Node.list) as mock_list:
+            response = self.get_json('/nodes', expect_errors=True)
+        self.assertEqual(http_client.OK, response.status_int)
+        self.assertEqual('application/json', response.content_type)
+        self.assertIsNone(response.etag)
+        self.assertEqual(uuids, [n['uuid'] for n in response.json['nodes']])
+        self.assertNotIn('next', response.json)
+        self.assertEqual([2, 2, 2],
+                         [c[0][1] for c in mock_list.call_args_list])
+
+    def test_collection_streaming_next_link(self):
+        cfg.CONF.set_override('stream_chunk_size', 2, 'api')
+        uuids = []
+        for id_ in range(5):
+            node = obj_utils.create_test_node(self.context, id=id_,
+                                              uuid=uuidutils.generate_uuid())
+            uuids.append(node.uuid)
+        data = self.get_json('/nodes/?limit=3&marker=%s' % uuids[0])
+        self.assertEqual(uuids[1:4], [n['uuid'] for n in data['nodes']])
+        self.assertIn('marker=%s' % uuids[3], data['next'])
+
+    def test_collection_streaming_empty(self):
+        cfg.CONF.set_override('stream_chunk_size', 2, 'api')
+        data = self.get_json('/nodes/detail')
+        self.assertEqual({'nodes': []}, data)
+
+    def test_collection_streaming_invalid_fields(self):
+        cfg.CONF.set_override('stream_chunk_size', 2, 'api')
+        obj_utils.create_test_node(self.context)
+        response = self.get_json(
+            '/nodes?fields=uuid,spongebob',
+            headers={api_base.Version.string: str(api_v1.MAX_VER)},
+            expect_errors=True)
+        self.assertEqual(http_client.BAD_REQUEST, response.status_int)
+        self.assertEqual('application/json', response.content_type)
+
+
+class TestAggregates(test_api_base.BaseApiTest):
+
+    def setUp(self):
+        super(TestAggregates, self).setUp()
+        p = mock.patch.object(api_utils, '_AGGREGATES_CACHE', None)
+        p.start()
+        self.addCleanup(p.stop)
+        self.headers = {api_base.Version.string: str(api_v1.MAX_VER)}
+        for driver, state, maintenance in (
+                ('fake', states.AVAILABLE, False),
+                ('fake', states.AVAILABLE, True),
+                ('fake', states.ACTIVE, False),
+                ('fake_power', states.ACTIVE, False)):
+            obj_utils.create_test_node(self.context,
+                                       uuid=uuidutils.generate_uuid(),
+                                       driver=driver, provision_state=state,
+                                       maintenance=maintenance)
+
+    def _get_aggregates(self, query, **kwargs):
+        return self.get_json('/nodes/aggregates%s' % query,
+                             headers=self.headers, **kwargs)
+
+    def test_group_by(self):
+        data = self._get_aggregates('?group_by=provision_state,driver')
+        self.assertEqual(
+            [{'provision_state': states.ACTIVE, 'driver': 'fake',
+              'count': 1},
+             {'provision_state': states.AVAILABLE, 'driver': 'fake',
+              'count': 2},
+             {'provision_state': states.ACTIVE, 'driver': 'fake_power',
+              'count': 1}],
+            data['aggregates'])
+
+    def test_total(self):
+        data = self._get_aggregates('')
+        self.assertEqual([{'count': 4}], data['aggregates'])
+
+    def test_filters(self):
+        data = self._get_aggregates('?group_by=maintenance&driver=fake'
+                                    '&provision_state=available')
+        self.assertEqual([{'maintenance': False, 'count': 1},
+                          {'maintenance': True, 'count': 1}],
+                         data['aggregates'])
+
+    def test_invalid_group_by(self):
+        for group_by in ('uuid', 'driver,properties'):
+            response = self._get_aggregates('?group_by=%s' % group_by,
+                                            expect_errors=True)
+            self.assertEqual(http_client.BAD_REQUEST, response.status_int)
+
+    def test_old_version(self):
+        response = self.get_json('/nodes/aggregates',
+                                 headers={api_base.Version.string: '1.15'},
+                                 expect_errors=True)
+        self.assertEqual(http_client.NOT_FOUND, response.status_int)
+
+    @mock.patch.object(objects.Node, 'get_aggregates')
+    def test_cached(self, mock_aggregates):
+        mock_aggregates.return_value = [{'count': 4}]
+        self._get_aggregates('?group_by=driver')
+        data = self._get_aggregates('?group_by=driver')
+        self.assertEqual([{'count': 4}], data['aggregates'])
+        self.assertEqual(1, mock_aggregates.call_count)
+        self._get_aggregates('?group_by=maintenance')
+        self.assertEqual(2, mock_aggregates.call_count)
+
+        api_utils.invalidate_response_cache()
+        self._get_aggregates('?group_by=driver')
+        self.assertEqual(3, mock_aggregates.call_count)
+
+    @mock.patch.object(objects.Node, 'get_aggregates')
+    def test_cache_disabled(self, mock_aggregates):
+        cfg.CONF.set_override('aggregates_cache_ttl', 0, 'api')
+        mock_aggregates.return_value = [{'count': 4}]
+        self._get_aggregates('')
+        self._get_aggregates('')
+        self.assertEqual(2, mock_aggregates.call_count)
+
+
+class TestChanges(test_api_base.BaseApiTest):
+
+    def setUp(self):
+        super(TestChanges, self).setUp()
+        self.headers = {api_base.Version.string: str(api_v1.MAX_VER)}
+        self.node = obj_utils.create_test_node(self.context,
+                                               provision_state=states.ENROLL,
+                                               power_state=states.NOSTATE)
+
+    def _get_changes(self, query, **kwargs):
+        return self.get_json('/nodes/changes%s' % query,
+                             headers=self.headers, **kwargs)
+
+    def _change(self, node, **values):
+        for name, value in values.items():
+            setattr(node, name, value)
+        node.save()
+
+    def test_current_seq(self):
+        self.assertEqual({'nodes': [], 'since': 0}, self._get_changes(''))
+        self._change(self.node, power_state=states.POWER_OFF)
+        data = self._get_changes('')
+        self.assertEqual([], data['nodes'])
+        self.assertTrue(data['since'] > 0)
+
+    def test_changes(self):
+        since = self._get_changes('')['since']
+        node2 = obj_utils.create_test_node(self.context,
+                                           uuid=uuidutils.generate_uuid())
+        self._change(self.node, provision_state=states.VERIFYING,
+                     target_provision_state=states.MANAGEABLE)
+        self._change(node2, power_state=states.POWER_OFF)
+        self._change(self.node, provision_state=states.MANAGEABLE,
+                     target_provision_state=None)
+        # Not a change of state
+        self._change(node2, extra={'foo': 'bar'})
+
+        data = self._get_changes('?since=%d' % since)
+        self.assertEqual([node2.uuid, self.node.uuid],
+                         [n['uuid'] for n in data['nodes']])
+        self.assertEqual(states.POWER_OFF, data['nodes'][0]['power_state'])
+        self.assertEqual(states.MANAGEABLE,
+                         data['nodes'][1]['provision_state'])
+        self.assertIsNone(data['nodes'][1]['target_provision_state'])
+        self.assertTrue(data['nodes'][1]['changed_at'])
+        self.assertEqual(self._get_changes('')['since'], data['since'])
+
+        data = self._get_changes('?since=%d' % data['since'])
+        self.assertEqual([], data['nodes'])
+
+    def test_changes_limit(self):
+        since = self._get_changes('')['since']
+        self._change(self.node, power_state=states.POWER_OFF)
+        self._change(self.node, power_state=states.POWER_ON)
+        data = self._get_changes('?since=%d&limit=1' % since)
+        self.assertEqual(states.POWER_OFF, data['nodes'][0]['power_state'])
+        data = self._get_changes('?since=%d&limit=1' % data['since'])
+        self.assertEqual(states.POWER_ON, data['nodes'][0]['power_state'])
+
+    @mock.patch.object(api_node, 'time', autospec=True)
+    @mock.patch.object(objects.Node, 'get_changes')
+    def test_wait(self, mock_changes, mock_time):
+        mock_time.time.return_value = 100
+        change = {'seq': 9, 'uuid': self.node.uuid, 'power_state': 'power on',
+                  'target_power_state': None, 'provision_state': 'enroll',
+                  'target_provision_state': None, 'changed_at': None}
+        mock_changes.side_effect = [[], [], [change]]
+        data = self._get_changes('?since=8&wait=30')
+        self.assertEqual(9, data['since'])
+        self.assertEqual([self.node.uuid], [n['uuid'] for n in data['nodes']])
+        self.assertEqual(3, mock_changes.call_count)
+        self.assertEqual(2, mock_time.sleep.call_count)
+
+    @mock.patch.object(api_node, 'time', autospec=True)
+    @mock.patch.object(objects.Node, 'get_changes')
+    def test_wait_timeout(self, mock_changes, mock_time):
+        cfg.CONF.set_override('max_changes_wait', 2, 'api')
+        mock_changes.return_value = []
+        mock_time.time.side_effect = [100, 100, 101, 102]
+        data = self._get_changes('?since=8&wait=30')
+        self.assertEqual({'nodes': [], 'since': 8}, data)
+        self.assertEqual(3, mock_changes.call_count)
+        mock_time.sleep.assert_called_with(1)
+        self.assertEqual(2, mock_time.sleep.call_count)
+
+    def _fake_change(self, seq, changed_at):
+        return {'seq': seq, 'uuid': self.node.uuid,
+                'power_state': 'power on', 'target_power_state': None,
+                'provision_state': 'enroll', 'target_provision_state': None,
+                'changed_at': changed_at}
+
+    @mock.patch.object(objects.Node, 'get_changes')
+    def test_changes_after_gap_held_back(self, mock_changes):
+        now = timeutils.utcnow()
+        old = now - datetime.timedelta(seconds=60)
+        # Change 10 may still be committed
+        mock_changes.return_value = [self._fake_change(9, old),
+                                     self._fake_change(11, now)]
+        data = self._get_changes('?since=8')
+        self.assertEqual(9, data['since'])
+        self.assertEqual(1, len(data['nodes']))
+
+        mock_changes.return_value = [self._fake_change(11, now)]
+        self.assertEqual({'nodes': [], 'since': 9},
+                         self._get_changes('?since=9'))
+
+    @mock.patch.object(objects.Node, 'get_changes')
+    def test_changes_after_old_gap(self, mock_changes):
+        old = timeutils.utcnow() - datetime.timedelta(seconds=60)
+        # Change 10 was rolled back
+        mock_changes.return_value = [self._fake_change(9, old),
+                                     self._fake_change(11, old)]
+        self.assertEqual(11, self._get_changes('?since=8')['since'])
+
+    @mock.patch.object(objects.Node, 'get_changes')
+    def test_changes_increment(self, mock_changes):
+        cfg.CONF.set_override('changes_seq_increment', 3, 'api')
+        now = timeutils.utcnow()
+        mock_changes.return_value = [self._fake_change(11, now),
+                                     self._fake_change(14, now),
+                                     self._fake_change(20, now)]
+        # Change 17 may still be committed
+        self.assertEqual(14, self._get_changes('?since=8')['since'])
+
+    @mock.patch.object(objects.Node, 'get_first_change_seq')
+    def test_changes_expired_increment(self, mock_first):
+        cfg.CONF.set_override('changes_seq_increment', 3, 'api')
+        mock_first.return_value = 11
+        self.assertEqual({'nodes': [], 'since': 8},
+                         self._get_changes('?since=8'))
+        mock_first.return_value = 14
+        response = self._get_changes('?since=8', expect_errors=True)
+        self.assertEqual(http_client.GONE, response.status_int)
+
+    @mock.patch.object(objects.Node, 'get_first_change_seq')
+    def test_changes_expired(self, mock_first):
+        mock_first.return_value = 10
+        response = self._get_changes('?since=8', expect_errors=True)
+        self.assertEqual(http_client.GONE, response.status_int)
+        mock_first.assert_called_once_with(mock.ANY)
+
+        mock_first.return_value = 9
+        self.assertEqual({'nodes': [], 'since': 8},
+                         self._get_changes('?since=8'))
+
+    def test_negative(self):
+        for query in ('?since=-1', '?since=0&wait=-1'):
+            response = self._get_changes(query, expect_errors=True)
+            self.assertEqual(http_client.BAD_REQUEST, response.status_int)
+
+    def test_old_version(self):
+        response = self.get_json('/nodes/changes', expect_errors=True,
+                                 headers={api_base.Version.string: '1.17'})
+        self.assertEqual(http_client.NOT_FOUND, response.status_int)
+
 
 class TestPatch(test_api_base.BaseApiTest):
 
@@ -1504,6 +1960,27 @@ class TestPost(test_api_base.BaseApiTest):
         self.assertEqual(http_client.BAD_REQUEST, response.status_code)
         self.assertTrue(response.json['error_message'])
 
+    @mock.patch.object(rpcapi.ConductorAPI, 'vendor_passthru')
+    @mock.patch.object(rpcapi.ConductorAPI, 'start_job')
+    def test_vendor_passthru_job(self, mock_start_job, mock_vendor):
+        node = obj_utils.create_test_node(self.context)
+        job = obj_utils.create_test_job(self.context, node_id=node.id,
+                                        method='vendor_passthru')
+        mock_start_job.return_value = job
+        info = {'foo': 'bar'}
+        response = self.post_json('/nodes/%s/vendor_passthru/test' % node.uuid,
+                                  info,
+                                  headers={api_base.Version.string: '1.17',
+                                           'Prefer': 'respond-async'})
+        self.assertEqual(http_client.ACCEPTED, response.status_int)
+        self.assertEqual(job.uuid, response.json['uuid'])
+        mock_start_job.assert_called_once_with(
+            mock.ANY, 'vendor_passthru',
+            {'node_id': node.uuid, 'driver_method': 'test',
+             'http_method': 'POST', 'info': info},
+            topic='test-topic')
+        self.assertFalse(mock_vendor.called)
+
     def test_post_ports_subresource(self):
         node = obj_utils.create_test_node(self.context)
         pdict = test_api_utils.port_post_data(node_id=None)
@@ -1592,6 +2069,374 @@ class TestPost(test_api_base.BaseApiTest):
         self.assertFalse(get_methods_mock.called)
 
 
+class TestBulk(test_api_base.BaseApiTest):
+
+    def setUp(self):
+        super(TestBulk, self).setUp()
+        self.chassis = obj_utils.create_test_chassis(self.context)
+        p = mock.patch.object(rpcapi.ConductorAPI, 'get_topic_for')
+        self.mock_gtf = p.start()
+        self.mock_gtf.return_value = 'test-topic'
+        self.addCleanup(p.stop)
+        self.headers = {api_base.Version.string: str(api_v1.MAX_VER)}
+
+    def _node(self, ports=None, **kw):
+        kw.setdefault('uuid', uuidutils.generate_uuid())
+        kw.setdefault('name', None)
+        kw.setdefault('instance_uuid', None)
+        node = test_api_utils.post_get_test_node(**kw)
+        if ports is not None:
+            node['ports'] = ports
+        return node
+
+    def test_bulk_create(self):
+        ports = [{'address': '52:54:00:cf:2d:31', 'extra': {'foo': 'bar'}},
+                 {'address': '52:54:00:cf:2d:32'}]
+        nodes = [self._node(name='node-1', ports=ports), self._node()]
+        response = self.post_json('/nodes/bulk', nodes, headers=self.headers)
+        self.assertEqual(http_client.OK, response.status_int)
+        results = response.json['nodes']
+        self.assertEqual(2, len(results))
+        self.assertEqual(http_client.CREATED, results[0]['status_code'])
+        self.assertEqual(nodes[0]['uuid'], results[0]['node']['uuid'])
+        self.assertEqual(states.ENROLL, results[0]['node']['provision_state'])
+        self.assertEqual(
+            [http_client.CREATED] * 2,
+            [port['status_code'] for port in results[0]['ports']])
+        self.assertEqual(
+            nodes[0]['uuid'], results[0]['ports'][0]['port']['node_uuid'])
+        self.assertEqual({'foo': 'bar'},
+                         results[0]['ports'][0]['port']['extra'])
+        self.assertEqual(http_client.CREATED, results[1]['status_code'])
+        self.assertNotIn('ports', results[1])
+
+        result = self.get_json('/nodes/%s/ports' % nodes[0]['uuid'])
+        self.assertEqual(sorted(port['address'] for port in ports),
+                         sorted(port['address'] for port in result['ports']))
+        self.get_json('/nodes/%s' % nodes[1]['uuid'])
+
+    def test_bulk_create_uses_one_transaction(self):
+        nodes = [self._node(), self._node()]
+        with mock.patch.object(self.dbapi, 'create_nodes',
+                               wraps=self.dbapi.create_nodes) as cn_mock, \
+                mock.patch.object(self.dbapi, 'create_node',
+                                  wraps=self.dbapi.create_node) as c_mock:
+            self.post_json('/nodes/bulk', nodes, headers=self.headers)
+            self.assertEqual(1, cn_mock.call_count)
+            self.assertEqual(2, len(cn_mock.call_args[0][0]))
+            self.assertFalse(c_mock.called)
+
+    def test_bulk_create_errors(self):
+        existing = obj_utils.create_test_node(self.context, name='existing')
+        self.mock_gtf.side_effect = [exception.NoValidHost('no host')] + (
+            ['test-topic'] * 4)
+        nodes = [self._node(driver='unknown'),
+                 self._node(name='twice'),
+                 self._node(name='twice'),
+                 self._node(uuid=existing.uuid),
+                 self._node(ports=[{'address': '52:54:00:cf:2d:31'},
+                                   {'address': '52:54:00:cf:2d:31'}])]
+        response = self.post_json('/nodes/bulk', nodes, headers=self.headers)
+        results = response.json['nodes']
+        self.assertEqual(http_client.BAD_REQUEST, results[0]['status_code'])
+        self.assertIn('error', results[0])
+        self.assertEqual(http_client.CREATED, results[1]['status_code'])
+        self.assertEqual(http_client.CONFLICT, results[2]['status_code'])
+        self.assertEqual(http_client.CONFLICT, results[3]['status_code'])
+        self.assertEqual(http_client.CREATED, results[4]['status_code'])
+        self.assertEqual(
+            [http_client.CREATED, http_client.CONFLICT],
+            [port['status_code'] for port in results[4]['ports']])
+
+        self.get_json('/nodes/%s' % nodes[1]['uuid'])
+        self.get_json('/nodes/%s' % nodes[4]['uuid'])
+        response = self.get_json('/nodes/%s' % nodes[0]['uuid'],
+                                 expect_errors=True)
+        self.assertEqual(http_client.NOT_FOUND, response.status_int)
+
+    def test_bulk_create_conflict_in_database(self):
+        existing = obj_utils.create_test_node(
+            self.context, instance_uuid=uuidutils.generate_uuid())
+        nodes = [self._node(instance_uuid=existing.instance_uuid),
+                 self._node()]
+        response = self.post_json('/nodes/bulk', nodes, headers=self.headers)
+        results = response.json['nodes']
+        self.assertEqual(http_client.CONFLICT, results[0]['status_code'])
+        self.assertEqual(http_client.CREATED, results[1]['status_code'])
+        self.get_json('/nodes/%s' % nodes[1]['uuid'])
+
+    def test_bulk_create_too_many(self):
+        cfg.CONF.set_override('max_limit', 1, 'api')
+        response = self.post_json('/nodes/bulk',
+                                  [self._node(), self._node()],
+                                  headers=self.headers, expect_errors=True)
+        self.assertEqual(http_client.BAD_REQUEST, response.status_int)
+
+    def test_bulk_create_old_version(self):
+        response = self.post_json('/nodes/bulk', [self._node()],
+                                  headers={api_base.Version.string: '1.14'},
+                                  expect_errors=True)
+        self.assertEqual(http_client.NOT_FOUND, response.status_int)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'update_nodes')
+    def test_bulk_update(self, mock_update):
+        node1 = obj_utils.create_test_node(self.context)
+        node2 = obj_utils.create_test_node(self.context,
+                                           uuid=uuidutils.generate_uuid(),
+                                           name='node-2')
+        self.mock_gtf.side_effect = ['topic-1', 'topic-2', 'topic-1']
+        error = {'code': http_client.CONFLICT, 'message': 'locked'}
+
+        def update_nodes(context, node_objs, topic):
+            if topic == 'topic-2':
+                return [error]
+            return node_objs
+        mock_update.side_effect = update_nodes
+
+        node3 = obj_utils.create_test_node(self.context,
+                                           uuid=uuidutils.generate_uuid())
+        patch = [{'path': '/extra/foo', 'value': 'bar', 'op': 'add'}]
+        updates = [{'node_ident': node1.uuid, 'patch': patch},
+                   {'node_ident': 'node-2', 'patch': patch},
+                   {'node_ident': uuidutils.generate_uuid(), 'patch': patch},
+                   {'node_ident': node3.uuid, 'patch': patch}]
+        response = self.post_json('/nodes/bulk_update', updates,
+                                  headers=self.headers)
+        self.assertEqual(http_client.OK, response.status_int)
+        results = response.json['nodes']
+        self.assertEqual(http_client.OK, results[0]['status_code'])
+        self.assertEqual({'foo': 'bar'}, results[0]['node']['extra'])
+        self.assertEqual({'status_code': http_client.CONFLICT,
+                          'error': 'locked'}, results[1])
+        self.assertEqual(http_client.NOT_FOUND, results[2]['status_code'])
+        self.assertEqual(node3.uuid, results[3]['node']['uuid'])
+
+        self.assertEqual(2, mock_update.call_count)
+        self.assertEqual(
+            [node1.uuid, node3.uuid],
+            [n.uuid for n in mock_update.call_args_list[0][0][1]])
+        self.assertEqual('topic-1', mock_update.call_args_list[0][0][2])
+        self.assertEqual(
+            [node2.uuid],
+            [n.uuid for n in mock_update.call_args_list[1][0][1]])
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'update_nodes')
+    def test_bulk_update_rpc_error(self, mock_update):
+        cfg.CONF.set_override('bulk_rpc_chunk_size', 1, 'api')
+        nodes = [obj_utils.create_test_node(self.context,
+                                            uuid=uuidutils.generate_uuid())
+                 for i in range(3)]
+        self.mock_gtf.side_effect = ['topic-1', 'topic-2', 'topic-1']
+
+        def update_nodes(context, node_objs, topic):
+            if topic == 'topic-2':
+                raise messaging.MessagingTimeout('timed out')
+            return node_objs
+        mock_update.side_effect = update_nodes
+
+        patch = [{'path': '/extra/foo', 'value': 'bar', 'op': 'add'}]
+        response = self.post_json('/nodes/bulk_update',
+                                  [{'node_ident': node.uuid, 'patch': patch}
+                                   for node in nodes],
+                                  headers=self.headers)
+        self.assertEqual(http_client.OK, response.status_int)
+        results = response.json['nodes']
+        self.assertEqual([http_client.OK, http_client.SERVICE_UNAVAILABLE,
+                          http_client.OK],
+                         [result['status_code'] for result in results])
+        self.assertIn('timed out', results[1]['error'])
+        # One call per node
+        self.assertEqual(3, mock_update.call_count)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'update_nodes')
+    def test_bulk_update_invalid_patch(self, mock_update):
+        node = obj_utils.create_test_node(self.context)
+        patch = [{'path': '/extra/foo', 'op': 'remove'}]
+        response = self.post_json('/nodes/bulk_update',
+                                  [{'node_ident': node.uuid,
+                                    'patch': patch}],
+                                  headers=self.headers)
+        results = response.json['nodes']
+        self.assertEqual(http_client.BAD_REQUEST, results[0]['status_code'])
+        self.assertFalse(mock_update.called)
+
+    def test_bulk_update_old_version(self):
+        response = self.post_json('/nodes/bulk_update', [],
+                                  headers={api_base.Version.string: '1.14'},
+                                  expect_errors=True)
+        self.assertEqual(http_client.NOT_FOUND, response.status_int)
+
+
+class TestBulkStates(test_api_base.BaseApiTest):
+
+    def setUp(self):
+        super(TestBulkStates, self).setUp()
+        self.node1 = obj_utils.create_test_node(
+            self.context, provision_state=states.AVAILABLE, name='node-1')
+        self.node2 = obj_utils.create_test_node(
+            self.context, uuid=uuidutils.generate_uuid(),
+            provision_state=states.AVAILABLE)
+        self.node3 = obj_utils.create_test_node(
+            self.context, uuid=uuidutils.generate_uuid(),
+            provision_state=states.AVAILABLE)
+        p = mock.patch.object(rpcapi.ConductorAPI, 'get_topics_for')
+        self.mock_gtf = p.start()
+        self.mock_gtf.side_effect = lambda nodes: ['test-topic'] * len(nodes)
+        self.addCleanup(p.stop)
+        self.headers = {api_base.Version.string: str(api_v1.MAX_VER)}
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'change_nodes_power_state')
+    def test_bulk_power(self, mock_cnps):
+        self.mock_gtf.side_effect = None
+        self.mock_gtf.return_value = ['topic-1', 'topic-2', 'topic-1']
+        error = {'code': http_client.CONFLICT, 'message': 'locked'}
+
+        def change_nodes_power_state(context, node_ids, new_state, topic):
+            if topic == 'topic-2':
+                return [error]
+            return [None] * len(node_ids)
+        mock_cnps.side_effect = change_nodes_power_state
+
+        node_idents = ['node-1', self.node2.uuid, uuidutils.generate_uuid(),
+                       self.node3.uuid]
+        response = self.post_json('/nodes/bulk_power',
+                                  {'node_idents': node_idents,
+                                   'target': states.POWER_ON},
+                                  headers=self.headers)
+        self.assertEqual(http_client.OK, response.status_int)
+        results = response.json['nodes']
+        self.assertEqual({'status_code': http_client.ACCEPTED}, results[0])
+        self.assertEqual({'status_code': http_client.CONFLICT,
+                          'error': 'locked'}, results[1])
+        self.assertEqual(http_client.NOT_FOUND, results[2]['status_code'])
+        self.assertEqual({'status_code': http_client.ACCEPTED}, results[3])
+        self.assertEqual(
+            [mock.call(mock.ANY, [self.node1.uuid, self.node3.uuid],
+                       states.POWER_ON, 'topic-1'),
+             mock.call(mock.ANY, [self.node2.uuid], states.POWER_ON,
+                       'topic-2')],
+            mock_cnps.call_args_list)
+        self.mock_gtf.assert_called_once_with(mock.ANY)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'change_nodes_power_state')
+    def test_bulk_power_rpc_error(self, mock_cnps):
+        cfg.CONF.set_override('bulk_rpc_chunk_size', 2, 'api')
+        mock_cnps.side_effect = [
+            messaging.RemoteError('ValueError', 'boom', 'Traceback...'),
+            [None]]
+        node_idents = [self.node1.uuid, self.node2.uuid, self.node3.uuid]
+        response = self.post_json('/nodes/bulk_power',
+                                  {'node_idents': node_idents,
+                                   'target': states.POWER_ON},
+                                  headers=self.headers)
+        self.assertEqual(http_client.OK, response.status_int)
+        results = response.json['nodes']
+        self.assertEqual([http_client.INTERNAL_SERVER_ERROR] * 2,
+                         [result['status_code'] for result in results[:2]])
+        self.assertNotIn('Traceback', results[0]['error'])
+        self.assertEqual({'status_code': http_client.ACCEPTED}, results[2])
+        self.assertEqual(
+            [mock.call(mock.ANY, [self.node1.uuid, self.node2.uuid],
+                       states.POWER_ON, 'test-topic'),
+             mock.call(mock.ANY, [self.node3.uuid], states.POWER_ON,
+                       'test-topic')],
+            mock_cnps.call_args_list)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'change_nodes_power_state')
+    def test_bulk_power_invalid_state(self, mock_cnps):
+        response = self.post_json('/nodes/bulk_power',
+                                  {'node_idents': [self.node1.uuid],
+                                   'target': 'foo'},
+                                  headers=self.headers)
+        results = response.json['nodes']
+        self.assertEqual(http_client.BAD_REQUEST, results[0]['status_code'])
+        self.assertFalse(mock_cnps.called)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'change_nodes_power_state')
+    def test_bulk_power_no_valid_host(self, mock_cnps):
+        self.mock_gtf.side_effect = None
+        self.mock_gtf.return_value = [exception.NoValidHost(reason='none')]
+        response = self.post_json('/nodes/bulk_power',
+                                  {'node_idents': [self.node1.uuid],
+                                   'target': states.POWER_OFF},
+                                  headers=self.headers)
+        results = response.json['nodes']
+        self.assertEqual(http_client.NOT_FOUND, results[0]['status_code'])
+        self.assertFalse(mock_cnps.called)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'do_nodes_provisioning_action')
+    def test_bulk_provision(self, mock_dnpa):
+        mock_dnpa.side_effect = (
+            lambda context, node_ids, target, configdrive, topic:
+                [None] * len(node_ids))
+        node4 = obj_utils.create_test_node(
+            self.context, uuid=uuidutils.generate_uuid(),
+            provision_state=states.AVAILABLE, maintenance=True)
+        node_idents = [self.node1.uuid, node4.uuid, self.node2.uuid]
+        response = self.post_json('/nodes/bulk_provision',
+                                  {'node_idents': node_idents,
+                                   'target': states.ACTIVE,
+                                   'configdrive': 'foo'},
+                                  headers=self.headers)
+        results = response.json['nodes']
+        self.assertEqual(http_client.ACCEPTED, results[0]['status_code'])
+        self.assertEqual(http_client.BAD_REQUEST, results[1]['status_code'])
+        self.assertEqual(http_client.ACCEPTED, results[2]['status_code'])
+        mock_dnpa.assert_called_once_with(
+            mock.ANY, [self.node1.uuid, self.node2.uuid], states.ACTIVE,
+            configdrive='foo', topic='test-topic')
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'do_nodes_provisioning_action')
+    def test_bulk_provision_invalid_transition(self, mock_dnpa):
+        response = self.post_json('/nodes/bulk_provision',
+                                  {'node_idents': [self.node1.uuid],
+                                   'target': states.VERBS['provide']},
+                                  headers=self.headers)
+        results = response.json['nodes']
+        self.assertEqual(http_client.BAD_REQUEST, results[0]['status_code'])
+        self.assertFalse(mock_dnpa.called)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'do_nodes_provisioning_action')
+    def test_bulk_provision_verb_not_allowed(self, mock_dnpa):
+        response = self.post_json('/nodes/bulk_provision',
+                                  {'node_idents': [self.node1.uuid],
+                                   'target': states.VERBS['abort']},
+                                  headers={api_base.Version.string: '1.19'})
+        self.assertEqual(http_client.OK, response.status_int)
+        response = self.post_json('/nodes/bulk_provision',
+                                  {'node_idents': [self.node1.uuid],
+                                   'target': 'foo'},
+                                  headers=self.headers)
+        results = response.json['nodes']
+        self.assertEqual(http_client.BAD_REQUEST, results[0]['status_code'])
+        self.assertFalse(mock_dnpa.called)
+
+    def test_bulk_power_old_version(self):
+        response = self.post_json('/nodes/bulk_power',
+                                  {'node_idents': [self.node1.uuid],
+                                   'target': states.POWER_ON},
+                                  headers={api_base.Version.string: '1.18'},
+                                  expect_errors=True)
+        self.assertEqual(http_client.NOT_FOUND, response.status_int)
+
+    def test_bulk_provision_old_version(self):
+        response = self.post_json('/nodes/bulk_provision',
+                                  {'node_idents': [self.node1.uuid],
+                                   'target': states.ACTIVE},
+                                  headers={api_base.Version.string: '1.18'},
+                                  expect_errors=True)
+        self.assertEqual(http_client.NOT_FOUND, response.status_int)
+
+    def test_bulk_power_too_many_nodes(self):
+        cfg.CONF.set_override('max_limit', 1, 'api')
+        response = self.post_json('/nodes/bulk_power',
+                                  {'node_idents': [self.node1.uuid,
+                                                   self.node2.uuid],
+                                   'target': states.POWER_ON},
+                                  headers=self.headers, expect_errors=True)
+        self.assertEqual(http_client.BAD_REQUEST, response.status_int)
+
+
 class TestDelete(test_api_base.BaseApiTest):
 
     def setUp(self):
@@ -204,6 +204,23 @@ class TestListPorts(test_api_base.BaseApiTest):
         next_marker = data['ports'][-1]['uuid']
         self.assertIn(next_marker, data['next'])
 
+    def test_collection_streaming(self):
+        cfg.CONF.set_override('stream_chunk_size', 2, 'api')
+        ports = []
+        for id_ in range(5):
+            port = obj_utils.create_test_port(
+                self.context,
+                node_id=self.node.id,
+                uuid=uuidutils.generate_uuid(),
+                address='52:54:00:cf:2d:3%s' % id_)
+            ports.append(port.uuid)
+        data = self.get_json('/ports/?limit=4')
+        self.assertEqual(ports[:4], [p['uuid'] for p in data['ports']])
+        self.assertIn('marker=%s' % ports[3], data['next'])
+        data = self.get_json('/nodes/%s/ports' % self.node.uuid)
+        self.assertEqual(ports, [p['uuid'] for p in data['ports']])
+        self.assertNotIn('next', data)
+
     def test_collection_links_default_limit(self):
         cfg.CONF.set_override('max_limit', 3, 'api')
         ports = []
@@ -0,0 +1,221 @@
+# -*- encoding: utf-8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Tests for the serializers rendering API resources without WSME.
+"""
+
+import ast
+import datetime
+
+import mock
+from oslo_config import cfg
+from oslo_utils import strutils
+from oslo_utils import uuidutils
+from six.moves import http_client
+from wsme.rest import json as wsme_json
+
+from ironic.api.controllers import base as api_base
+from ironic.api.controllers import v1 as api_v1
+from ironic.api.controllers.v1 import node as api_node
+from ironic.api.controllers.v1 import port as api_port
+from ironic.api.controllers.v1 import serializer
+from ironic.api.controllers.v1 import utils as api_utils
+from ironic.common import states
+from ironic.tests import base
+from ironic.tests.unit.api import base as test_api_base
+from ironic.tests.unit.objects import utils as obj_utils
+
+
+def _wsme_node_collection(self, rpc_nodes, limit, url=None, **kwargs):
+    collection = api_node.NodeCollection.convert_with_links(
+        rpc_nodes, limit, url=url, fields=self.fields, **kwargs)
+    return wsme_json.encode_result(collection, api_node.NodeCollection)
+
+
+def _wsme_node(self, rpc_node):
+    node = api_node.Node.convert_with_links(rpc_node, fields=self.fields)
+    return wsme_json.encode_result(node, api_node.Node)
+
+
+def _wsme_port_collection(self, rpc_ports, limit, url=None, **kwargs):
+    collection = api_port.PortCollection.convert_with_links(
+        rpc_ports, limit, url=url, fields=self.fields, **kwargs)
+    return wsme_json.encode_result(collection, api_port.PortCollection)
+
+
+class SerializerTestCase(test_api_base.BaseApiTest):
+    """Compare the serializers output with the one of WSME."""
+
+    versions = ('1.1', '1.2', '1.5', '1.8', str(api_v1.MAX_VER))
+
+    def setUp(self):
+        super(SerializerTestCase, self).setUp()
+        self.chassis = obj_utils.create_test_chassis(self.context)
+        time = datetime.datetime(2000, 1, 1, 12, 0, 0)
+        driver_info = {
+            'ipmi_address': '1.2.3.4',
+            'ipmi_username': 'admin',
+            'ipmi_password': 'secret',
+            'ipmi_port': 623,
+            'deploy_kernel': 'glance://kernel',
+            'nested': {'auth_token': 'abc', 'args': ['password=foo', 1]},
+            'cmd': '--password bar',
+        }
+        self.node = obj_utils.create_test_node(
+            self.context, chassis_id=self.chassis.id, name='node-1',
+            provision_state=states.AVAILABLE, driver_info=driver_info,
+            extra={'description': u'été', 'rack': 4},
+            maintenance=True, maintenance_reason='broken',
+            provision_updated_at=time, inspection_started_at=time,
+            clean_step={'step': 'erase_devices'},
+            raid_config={'logical_disks': []})
+        self.node2 = obj_utils.create_test_node(
+            self.context, uuid=uuidutils.generate_uuid(), id=456,
+            instance_uuid=uuidutils.generate_uuid())
+        for address in ('52:54:00:cf:2d:31', '52:54:00:cf:2d:32'):
+            obj_utils.create_test_port(self.context,
+                                       uuid=uuidutils.generate_uuid(),
+                                       node_id=self.node.id,
+                                       address=address)
+
+    def _assert_identical(self, path, version, headers=None):
+        headers = dict(headers or {})
+        headers[api_base.Version.string] = version
+        response = self.get_json(path, headers=headers, expect_errors=True)
+        with mock.patch.object(api_node.NodeSerializer,
+                               'collection_to_json',
+                               new=_wsme_node_collection), \
+                mock.patch.object(api_node.NodeSerializer, 'to_json',
+                                  new=_wsme_node), \
+                mock.patch.object(api_port.PortSerializer,
+                                  'collection_to_json',
+                                  new=_wsme_port_collection), \
+                mock.patch.object(api_utils, 'use_streaming',
+                                  return_value=False):
+            expected = self.get_json(path, headers=headers,
+                                     expect_errors=True)
+        self.assertEqual(http_client.OK, expected.status_int)
+        self.assertEqual(expected.status_int, response.status_int)
+        self.assertEqual(expected.content_type, response.content_type)
+        self.assertEqual(expected.body, response.body,
+                         'Output differs for %s (API %s)' % (path, version))
+
+    def test_nodes(self):
+        for version in self.versions:
+            self._assert_identical('/nodes', version)
+            self._assert_identical('/nodes/detail', version)
+            self._assert_identical('/nodes/%s' % self.node.uuid, version)
+            self._assert_identical('/nodes/%s' % self.node2.uuid, version)
+
+    def test_nodes_pagination(self):
+        for version in self.versions:
+            self._assert_identical('/nodes?limit=1', version)
+            self._assert_identical('/nodes/detail?limit=1&maintenance=True',
+                                   version)
+            self._assert_identical('/nodes/detail?limit=1&sort_dir=desc',
+                                   version)
+
+    def test_nodes_fields(self):
+        version = str(api_v1.MAX_VER)
+        self._assert_identical('/nodes?fields=uuid,driver_info,extra',
+                               version)
+        self._assert_identical('/nodes?fields=name,chassis_uuid&limit=1',
+                               version)
+        self._assert_identical('/nodes/%s?fields=created_at,'
+                               'provision_updated_at' % self.node.uuid,
+                               version)
+
+    def test_nodes_show_password(self):
+        for version in self.versions:
+            self._assert_identical('/nodes/detail', version,
+                                   headers={'X-Tenant': 'admin'})
+
+    def test_chassis_nodes(self):
+        self._assert_identical('/chassis/%s/nodes' % self.chassis.uuid,
+                               str(api_v1.MAX_VER))
+
+    def test_ports(self):
+        for version in self.versions:
+            self._assert_identical('/ports', version)
+            self._assert_identical('/ports/detail', version)
+            self._assert_identical('/ports/detail?limit=1', version)
+            self._assert_identical('/nodes/%s/ports' % self.node.uuid,
+                                   version)
+
+    def test_ports_without_node(self):
+        obj_utils.create_test_port(self.context,
+                                   uuid=uuidutils.generate_uuid(),
+                                   node_id=None, address='52:54:00:cf:2d:33')
+        self._assert_identical('/ports/detail', str(api_v1.MAX_VER))
+
+    def test_ports_fields(self):
+        self._assert_identical('/ports?fields=node_uuid,extra',
+                               str(api_v1.MAX_VER))
+
+    def test_streaming(self):
+        version = str(api_v1.MAX_VER)
+        for chunk_size in (1, 2):
+            cfg.CONF.set_override('stream_chunk_size', chunk_size, 'api')
+            self._assert_identical('/nodes', version)
+            self._assert_identical('/nodes/detail?limit=2', version)
+            self._assert_identical('/nodes/detail?limit=3', version)
+            self._assert_identical('/nodes?fields=uuid,extra',
+                                   version)
+            self._assert_identical('/ports/detail', version)
+            self._assert_identical('/ports?limit=2', version)
+            self._assert_identical('/nodes/%s/ports' % self.node.uuid,
+                                   version)
+
+
+class MaskSecretsTestCase(base.TestCase):
+
+    def _string_mask(self, value):
+        return ast.literal_eval(strutils.mask_password(value, '******'))
+
+    def test_mask_secrets(self):
+        value = {
+            'ipmi_password': 'secret',
+            'ipmi_username': 'admin',
+            'ipmi_port': 623,
+            'token': 'abc',
+            'nested': {'auth_password': 'foo', 'other': ['x', 'secret=bar']},
+            'cmd': 'ipmitool --password bar',
+            'password_file': '/etc/password',
+            'empty_password': '',
+        }
+        self.assertEqual(self._string_mask(value),
+                         serializer.mask_secrets(value))
+
+    def test_mask_secrets_non_string_secret(self):
+        value = {'password': 1234, 'secret': None, 'token': ['a']}
+        self.assertEqual(self._string_mask(value),
+                         serializer.mask_secrets(value))
+
+    def test_mask_secrets_quotes(self):
+        # NOTE: the string based masking only masks up to the first quote
+        value = {'password': "it's a secret"}
+        self.assertEqual({'password': '******'},
+                         serializer.mask_secrets(value))
+
+    def test_mask_secrets_none(self):
+        self.assertIsNone(serializer.mask_secrets(None))
+
+    def test_mask_secrets_cache_bounded(self):
+        self.addCleanup(serializer._SECRET_KEYS.clear)
+        value = dict(('key%d_password' % i, 'secret')
+                     for i in range(2 * serializer._SECRET_KEYS.maxsize))
+        self.assertEqual(dict.fromkeys(value, '******'),
+                         serializer.mask_secrets(value))
+        self.assertEqual(serializer._SECRET_KEYS.maxsize,
+                         len(serializer._SECRET_KEYS))
@@ -16,6 +16,7 @@
 
 import mock
 from oslo_config import cfg
+import oslo_messaging as messaging
 from oslo_utils import uuidutils
 import pecan
 from six.moves import http_client
@@ -86,6 +87,47 @@ class TestApiUtils(base.TestCase):
         mock_request.version.minor = 10
         self.assertFalse(utils.allow_links_node_states_and_driver_properties())
 
+    def test_bulk_error(self):
+        self.assertEqual(
+            {'status_code': http_client.NOT_FOUND,
+             'error': 'Node foo could not be found.'},
+            utils.bulk_error(exception.NodeNotFound(node='foo')))
+        result = utils.bulk_error(messaging.MessagingTimeout('timed out'))
+        self.assertEqual(http_client.SERVICE_UNAVAILABLE,
+                         result['status_code'])
+        self.assertIn('timed out', result['error'])
+        self.assertEqual(
+            {'status_code': http_client.INTERNAL_SERVER_ERROR,
+             'error': 'The conductor failed: ValueError: boom'},
+            utils.bulk_error(messaging.RemoteError('ValueError', 'boom',
+                                                   'Traceback...')))
+
+    def test_send_bulk(self):
+        CONF.set_override('bulk_rpc_chunk_size', 2, 'api')
+        error = {'code': http_client.CONFLICT, 'message': 'locked'}
+
+        def send(items, topic):
+            if topic == 'topic-2':
+                raise messaging.MessagingTimeout('timed out')
+            return [error if item == 'c' else item.upper()
+                    for item in items]
+        send = mock.Mock(side_effect=send)
+
+        results = dict(utils.send_bulk(
+            {'topic-1': [(0, 'a'), (2, 'b'), (3, 'c')],
+             'topic-2': [(1, 'd'), (4, 'e')]}, send))
+        self.assertEqual('A', results[0])
+        self.assertEqual('B', results[2])
+        self.assertEqual({'status_code': http_client.CONFLICT,
+                          'error': 'locked'}, results[3])
+        for index in (1, 4):
+            self.assertEqual(http_client.SERVICE_UNAVAILABLE,
+                             results[index]['status_code'])
+        self.assertEqual(3, send.call_count)
+        send.assert_any_call(['a', 'b'], 'topic-1')
+        send.assert_any_call(['c'], 'topic-1')
+        send.assert_any_call(['d', 'e'], 'topic-2')
+
 
 class TestNodeIdent(base.TestCase):
 
@@ -0,0 +1,33 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import subprocess
+import sys
+
+from ironic.tests import base
+
+TOOL = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir,
+                    os.pardir, os.pardir, 'tools', 'check_api_imports.py')
+
+
+class ApiImportsTestCase(base.TestCase):
+
+    def test_no_conductor_modules_imported(self):
+        # The API service must not import the conductor manager, the
+        # drivers and the modules only they need.
+        process = subprocess.Popen([sys.executable, TOOL, '--repeat', '1',
+                                    '--top', '0'],
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+        _out, err = process.communicate()
+        self.assertEqual(0, process.returncode, err)
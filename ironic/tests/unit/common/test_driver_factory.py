@@ -13,7 +13,7 @@
 #    under the License.
 
 import mock
-from stevedore import dispatch
+import pkg_resources
 
 from ironic.common import driver_factory
 from ironic.common import exception
@@ -21,44 +21,84 @@ from ironic.tests import base
 
 
 class FakeEp(object):
-    name = 'fake'
 
+    def __init__(self, name, plugin=None):
+        self.name = name
+        self.plugin = plugin or mock.Mock(name=name)
+        self.resolve = mock.Mock(return_value=self.plugin)
 
+
+@mock.patch.object(pkg_resources, 'iter_entry_points', autospec=True)
 class DriverLoadTestCase(base.TestCase):
 
     def setUp(self):
         super(DriverLoadTestCase, self).setUp()
         driver_factory.DriverFactory._extension_manager = None
+        self.addCleanup(setattr, driver_factory.DriverFactory,
+                        '_extension_manager', None)
+        self.fake_ep = FakeEp('fake')
+        self.other_ep = FakeEp('other')
+
+    def test_drivers_loaded_on_first_use(self, mock_eps):
+        mock_eps.return_value = [self.fake_ep, self.other_ep]
+        self.config(enabled_drivers=['fake', 'other'])
+        factory = driver_factory.DriverFactory()
+        self.assertEqual(['fake', 'other'], factory.names)
+        self.assertFalse(self.fake_ep.resolve.called)
+        self.assertFalse(self.other_ep.resolve.called)
 
-    def _fake_init_name_err(self, *args, **kwargs):
-        kwargs['on_load_failure_callback'](None, FakeEp, NameError('aaa'))
+        driver = driver_factory.get_driver('fake')
+        self.assertIs(self.fake_ep.plugin.return_value, driver)
+        self.assertIs(driver, driver_factory.get_driver('fake'))
+        self.fake_ep.resolve.assert_called_once_with()
+        self.fake_ep.plugin.assert_called_once_with()
+        self.assertFalse(self.other_ep.resolve.called)
+        mock_eps.assert_called_once_with('ironic.drivers')
 
-    def _fake_init_driver_err(self, *args, **kwargs):
-        kwargs['on_load_failure_callback'](None, FakeEp,
-                                           exception.DriverLoadError(
-                                               driver='aaa', reason='bbb'))
+    def test_drivers(self, mock_eps):
+        mock_eps.return_value = [self.fake_ep, self.other_ep]
+        self.config(enabled_drivers=['fake', 'other'])
+        self.assertEqual({'fake': self.fake_ep.plugin.return_value,
+                          'other': self.other_ep.plugin.return_value},
+                         driver_factory.drivers())
+
+    def test_disabled_driver_never_loaded(self, mock_eps):
+        mock_eps.return_value = [self.fake_ep, self.other_ep]
+        self.config(enabled_drivers=['fake'])
+        self.assertEqual(['fake'], driver_factory.DriverFactory().names)
+        self.assertRaises(exception.DriverNotFound,
+                          driver_factory.get_driver, 'other')
+        self.assertFalse(self.other_ep.resolve.called)
+
+    def test_driver_not_found(self, mock_eps):
+        mock_eps.return_value = [self.fake_ep]
+        self.config(enabled_drivers=['fake', 'missing'])
+        exc = self.assertRaises(
+            exception.DriverNotFound,
+            driver_factory.DriverFactory._init_extension_manager)
+        self.assertIn('missing', str(exc))
+        self.assertIsNone(driver_factory.DriverFactory._extension_manager)
+
+    def test_driver_load_error_if_driver_enabled(self, mock_eps):
+        self.fake_ep.plugin.side_effect = exception.DriverLoadError(
+            driver='fake', reason='bbb')
+        mock_eps.return_value = [self.fake_ep]
+        self.config(enabled_drivers=['fake'])
+        driver_factory.DriverFactory()
+        self.assertRaises(exception.DriverLoadError,
+                          driver_factory.get_driver, 'fake')
 
-    def test_driver_load_error_if_driver_enabled(self):
+    def test_wrap_in_driver_load_error_if_driver_enabled(self, mock_eps):
+        self.fake_ep.resolve.side_effect = NameError('aaa')
+        mock_eps.return_value = [self.fake_ep]
         self.config(enabled_drivers=['fake'])
-        with mock.patch.object(dispatch.NameDispatchExtensionManager,
-                               '__init__', self._fake_init_driver_err):
-            self.assertRaises(
-                exception.DriverLoadError,
-                driver_factory.DriverFactory._init_extension_manager)
+        exc = self.assertRaises(exception.DriverLoadError,
+                                driver_factory.get_driver, 'fake')
+        self.assertIn('aaa', str(exc))
 
-    def test_wrap_in_driver_load_error_if_driver_enabled(self):
+    def test_no_driver_load_error_if_driver_disabled(self, mock_eps):
+        self.other_ep.resolve.side_effect = NameError('aaa')
+        mock_eps.return_value = [self.fake_ep, self.other_ep]
         self.config(enabled_drivers=['fake'])
-        with mock.patch.object(dispatch.NameDispatchExtensionManager,
-                               '__init__', self._fake_init_name_err):
-            self.assertRaises(
-                exception.DriverLoadError,
-                driver_factory.DriverFactory._init_extension_manager)
-
-    @mock.patch.object(dispatch.NameDispatchExtensionManager, 'names',
-                       autospec=True)
-    def test_no_driver_load_error_if_driver_disabled(self, mock_em):
-        self.config(enabled_drivers=[])
-        with mock.patch.object(dispatch.NameDispatchExtensionManager,
-                               '__init__', self._fake_init_driver_err):
-            driver_factory.DriverFactory._init_extension_manager()
-            self.assertEqual(2, mock_em.call_count)
+        driver_factory.drivers()
+        self.assertFalse(self.other_ep.resolve.called)
@@ -627,6 +627,41 @@ class TestGlanceImageService(base.TestCase):
         self.assertEqual(('https://123.123.123.123:9292', (), params),
                          wrapped_func(self.service, **params))
 
+    @mock.patch.object(base_image_service.client, 'Client', autospec=True)
+    def test_check_image_service_reuses_client(self, mock_client):
+        def func(service, *args, **kwargs):
+            return service.client
+
+        self.context.auth_token = 'fake-token'
+        params = {'image_href': 'http://123.123.123.123:9292/image_uuid'}
+        wrapped_func = base_image_service.check_image_service(func)
+        self.service.client = None
+        client1 = wrapped_func(self.service, **params)
+        service2 = service.GlanceImageService(None, 1, self.context)
+        self.assertIs(client1, wrapped_func(service2, **params))
+        self.assertEqual(1, mock_client.call_count)
+
+        # another token gets another client
+        self.context.auth_token = 'other-token'
+        service3 = service.GlanceImageService(None, 1, self.context)
+        wrapped_func(service3, **params)
+        self.assertEqual(2, mock_client.call_count)
+
+    @mock.patch.object(base_image_service.keystone, 'invalidate_client',
+                       autospec=True)
+    def test_client_unauthorized_invalidates_client(self, mock_invalidate):
+        class MyGlanceStubClient(stubs.StubGlanceClient):
+            """A client that raises an Unauthorized exception."""
+            def get(self, image_id):
+                raise glance_exc.Unauthorized(image_id)
+
+        stub_service = service.GlanceImageService(MyGlanceStubClient(), 1,
+                                                  self.context)
+        stub_service._client_key = ('key',)
+        self.assertRaises(exception.ImageNotAuthorized, stub_service.call,
+                          'get', 'image-uuid')
+        mock_invalidate.assert_called_once_with('image', ('key',))
+
 
 def _create_failing_glance_client(info):
     class MyGlanceStubClient(stubs.StubGlanceClient):
@@ -12,9 +12,11 @@
 
 import datetime
 import os
-import shutil
 
+import eventlet
+import fixtures
 import mock
+from oslo_utils import units
 import requests
 import sendfile
 import six
@@ -99,19 +101,35 @@ class HttpImageServiceTestCase(base.TestCase):
                           self.service.show, self.href)
         head_mock.assert_called_with(self.href)
 
-    @mock.patch.object(shutil, 'copyfileobj', autospec=True)
     @mock.patch.object(requests, 'get', autospec=True)
-    def test_download_success(self, req_get_mock, shutil_mock):
-        response_mock = req_get_mock.return_value
-        response_mock.status_code = http_client.OK
-        response_mock.raw = mock.MagicMock(spec=file)
+    def test_get_sidecar_checksums(self, req_get_mock):
+        found = mock.Mock(status_code=http_client.OK,
+                          text='ABCDEF  fedora.qcow2\n')
+        not_found = mock.Mock(status_code=http_client.NOT_FOUND)
+        req_get_mock.side_effect = [not_found, found]
+        self.assertEqual({'sha256': 'abcdef'},
+                         self.service.get_sidecar_checksums(
+                             self.href, ['md5', 'sha256']))
+        req_get_mock.assert_has_calls([
+            mock.call(self.href + '.md5', timeout=60),
+            mock.call(self.href + '.sha256', timeout=60)])
+
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_get_sidecar_checksums_error(self, req_get_mock):
+        req_get_mock.return_value.status_code = http_client.FORBIDDEN
+        self.assertRaises(exception.ImageRefValidationFailed,
+                          self.service.get_sidecar_checksums, self.href,
+                          ['sha256'])
+
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_success(self, req_get_mock):
+        req_get_mock.return_value = FakeResponse(b'image data')
         file_mock = mock.Mock(spec=file)
         self.service.download(self.href, file_mock)
-        shutil_mock.assert_called_once_with(
-            response_mock.raw.__enter__(), file_mock,
-            image_service.IMAGE_CHUNK_SIZE
-        )
-        req_get_mock.assert_called_once_with(self.href, stream=True)
+        self.assertEqual([mock.call(b'imag'), mock.call(b'e da'),
+                          mock.call(b'ta')], file_mock.write.call_args_list)
+        req_get_mock.assert_called_once_with(self.href, stream=True,
+                                             timeout=60)
 
     @mock.patch.object(requests, 'get', autospec=True)
     def test_download_fail_connerror(self, req_get_mock):
@@ -120,17 +138,191 @@ class HttpImageServiceTestCase(base.TestCase):
         self.assertRaises(exception.ImageDownloadFailed,
                           self.service.download, self.href, file_mock)
 
-    @mock.patch.object(shutil, 'copyfileobj', autospec=True)
     @mock.patch.object(requests, 'get', autospec=True)
-    def test_download_fail_ioerror(self, req_get_mock, shutil_mock):
-        response_mock = req_get_mock.return_value
-        response_mock.status_code = http_client.OK
-        response_mock.raw = mock.MagicMock(spec=file)
+    def test_download_fail_ioerror(self, req_get_mock):
+        req_get_mock.return_value = FakeResponse(b'image data')
+        file_mock = mock.Mock(spec=file)
+        file_mock.write.side_effect = IOError
+        self.assertRaises(exception.ImageDownloadFailed,
+                          self.service.download, self.href, file_mock)
+        req_get_mock.assert_called_once_with(self.href, stream=True,
+                                             timeout=60)
+
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_fail_not_resumable(self, req_get_mock):
+        req_get_mock.return_value = FakeResponse(b'image data', fail_after=4)
         file_mock = mock.Mock(spec=file)
-        shutil_mock.side_effect = IOError
         self.assertRaises(exception.ImageDownloadFailed,
                           self.service.download, self.href, file_mock)
-        req_get_mock.assert_called_once_with(self.href, stream=True)
+        self.assertEqual(1, req_get_mock.call_count)
+
+    def _ranged_get(self, data, fail_after=None, status=None, chunk=4):
+        """Serve data to requests.get(), supporting Range headers.
+
+        Only the first response fails after fail_after bytes.
+        """
+        def get(url, stream, timeout, headers=None):
+            self.assertEqual(self.href, url)
+            if headers is None:
+                return FakeResponse(data, accept_ranges=True, chunk=chunk,
+                                    fail_after=fail_after)
+            start, end = headers['Range'][len('bytes='):].split('-')
+            return FakeResponse(data[int(start):int(end) + 1], chunk=chunk,
+                                status=status or http_client.PARTIAL_CONTENT)
+        return get
+
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_segments(self, req_get_mock):
+        self.config(min_segment_size=1, group='image_download')
+        data = b''.join(six.int2byte(i % 256) for i in range(3 * units.Mi))
+        req_get_mock.side_effect = self._ranged_get(data, chunk=units.Ki)
+        image_path = os.path.join(self.useFixture(
+            fixtures.TempDir()).path, 'image')
+        with open(image_path, 'wb') as image_file:
+            self.service.download(self.href, image_file)
+        with open(image_path, 'rb') as image_file:
+            self.assertEqual(data, image_file.read())
+        self.assertEqual(
+            [None, {'Range': 'bytes=%d-%d' % (units.Mi, 2 * units.Mi - 1),
+                    'If-Range': '"v1"'},
+             {'Range': 'bytes=%d-%d' % (2 * units.Mi, 3 * units.Mi - 1),
+              'If-Range': '"v1"'}],
+            [c[1].get('headers') for c in req_get_mock.call_args_list])
+
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_no_validator(self, req_get_mock):
+        self.config(min_segment_size=1, group='image_download')
+        req_get_mock.return_value = FakeResponse(
+            b'x' * (3 * units.Mi), accept_ranges=True, chunk=units.Ki,
+            fail_after=units.Mi, etag=None)
+        image_path = os.path.join(self.useFixture(
+            fixtures.TempDir()).path, 'image')
+        with open(image_path, 'wb') as image_file:
+            # Neither split nor resumed
+            self.assertRaises(exception.ImageDownloadFailed,
+                              self.service.download, self.href, image_file)
+        self.assertEqual(1, req_get_mock.call_count)
+
+    def test_validator(self):
+        response = FakeResponse(b'data', accept_ranges=True, etag='W/"v1"')
+        response.headers['Last-Modified'] = 'Tue, 15 Nov 1994 12:45:26 GMT'
+        download = image_service._HttpDownload(self.href, mock.Mock(),
+                                               response)
+        # Weak entity tags cannot be used in If-Range
+        self.assertEqual('Tue, 15 Nov 1994 12:45:26 GMT', download.validator)
+        self.assertTrue(download.resumable)
+
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_segments_fail(self, req_get_mock):
+        self.config(min_segment_size=1, group='image_download')
+        data = b'x' * (3 * units.Mi)
+        req_get_mock.side_effect = self._ranged_get(data, chunk=units.Ki,
+                                                    status=http_client.OK)
+        image_path = os.path.join(self.useFixture(
+            fixtures.TempDir()).path, 'image')
+        with open(image_path, 'wb') as image_file:
+            self.assertRaises(exception.ImageDownloadFailed,
+                              self.service.download, self.href, image_file)
+
+    @mock.patch.object(image_service._HttpDownload, '_request',
+                       autospec=True)
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_segments_fail_aborts_others(self, req_get_mock,
+                                                  request_mock):
+        self.config(min_segment_size=1, group='image_download')
+        received = []
+
+        class SlowResponse(FakeResponse):
+            def iter_content(self, chunk_size):
+                for chunk in super(SlowResponse, self).iter_content(
+                        chunk_size):
+                    received.append(len(chunk))
+                    eventlet.sleep(0)
+                    yield chunk
+
+        req_get_mock.return_value = SlowResponse(
+            b'x' * (3 * units.Mi), accept_ranges=True, chunk=units.Ki)
+        request_mock.side_effect = exception.ImageDownloadFailed(
+            image_href=self.href, reason='boom')
+        image_path = os.path.join(self.useFixture(
+            fixtures.TempDir()).path, 'image')
+        with open(image_path, 'wb') as image_file:
+            self.assertRaises(exception.ImageDownloadFailed,
+                              self.service.download, self.href, image_file)
+        # The first segment stopped without waiting for its end
+        self.assertLess(sum(received), units.Mi)
+
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_resume(self, req_get_mock):
+        req_get_mock.side_effect = self._ranged_get(b'image data',
+                                                    fail_after=4)
+        file_mock = mock.Mock(spec=file)
+        self.service.download(self.href, file_mock)
+        self.assertEqual(b'image data', b''.join(
+            c[0][0] for c in file_mock.write.call_args_list))
+        self.assertEqual({'Range': 'bytes=4-9', 'If-Range': '"v1"'},
+                         req_get_mock.call_args[1]['headers'])
+
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_resume_too_many_retries(self, req_get_mock):
+        self.config(retries=1, group='image_download')
+        req_get_mock.return_value = FakeResponse(b'image data',
+                                                 accept_ranges=True,
+                                                 fail_after=4)
+        file_mock = mock.Mock(spec=file)
+        with mock.patch.object(image_service._HttpDownload, '_request',
+                               autospec=True) as request_mock:
+            request_mock.return_value = FakeResponse(
+                b'age data', status=http_client.PARTIAL_CONTENT, fail_after=0)
+            self.assertRaises(exception.ImageDownloadFailed,
+                              self.service.download, self.href, file_mock)
+            self.assertEqual(1, request_mock.call_count)
+
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_range_not_supported(self, req_get_mock):
+        req_get_mock.side_effect = self._ranged_get(
+            b'image data', fail_after=4,
+            status=http_client.REQUESTED_RANGE_NOT_SATISFIABLE)
+        file_mock = mock.Mock(spec=file)
+        self.assertRaisesRegexp(exception.ImageDownloadFailed, '206',
+                                self.service.download, self.href, file_mock)
+        self.assertEqual(2, req_get_mock.call_count)
+
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_image_changed(self, req_get_mock):
+        # The server ignores the Range header when If-Range does not match
+        req_get_mock.side_effect = self._ranged_get(b'image data',
+                                                    fail_after=4,
+                                                    status=http_client.OK)
+        file_mock = mock.Mock(spec=file)
+        self.assertRaisesRegexp(exception.ImageDownloadFailed, 'changed',
+                                self.service.download, self.href, file_mock)
+        self.assertEqual(2, req_get_mock.call_count)
+
+
+class FakeResponse(object):
+    """A streamed response of requests, failing after some bytes."""
+
+    def __init__(self, data, status=http_client.OK, chunk=4,
+                 accept_ranges=False, fail_after=None, etag='"v1"'):
+        self.status_code = status
+        self.headers = {'Content-Length': str(len(data))}
+        if accept_ranges:
+            self.headers['Accept-Ranges'] = 'bytes'
+            if etag:
+                self.headers['ETag'] = etag
+        self.data = data
+        self.chunk = chunk
+        self.fail_after = fail_after
+
+    def iter_content(self, chunk_size):
+        for offset in range(0, len(self.data), self.chunk):
+            if self.fail_after is not None and offset >= self.fail_after:
+                raise requests.ConnectionError('Connection reset')
+            yield self.data[offset:offset + self.chunk]
+
+    def close(self):
+        pass
 
 
 class FileImageServiceTestCase(base.TestCase):
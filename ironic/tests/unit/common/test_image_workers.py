@@ -0,0 +1,111 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+from eventlet import patcher
+
+from ironic.common import image_workers
+from ironic.common import metrics
+from ironic.tests import base
+
+native_threading = patcher.original('threading')
+native_time = patcher.original('time')
+
+
+def _get_thread_id():
+    return native_threading.current_thread().ident
+
+
+class ImageWorkersTestCase(base.TestCase):
+
+    def setUp(self):
+        super(ImageWorkersTestCase, self).setUp()
+        image_workers.reset()
+        self.addCleanup(image_workers.reset)
+        metrics.get_registry().reset()
+        self.addCleanup(metrics.get_registry().reset)
+
+    def _get_counts(self, name):
+        return dict((s['labels']['task'], s['count'])
+                    for s in metrics.get_registry().snapshot(prefix=name))
+
+    def test_execute(self):
+        self.assertNotEqual(_get_thread_id(),
+                            image_workers.execute(_get_thread_id))
+        for name in (image_workers.QUEUE_METRIC, image_workers.WAIT_METRIC,
+                     image_workers.RUN_METRIC):
+            self.assertEqual({'_get_thread_id': 1}, self._get_counts(name))
+
+    def test_execute_arguments(self):
+        self.assertEqual(((1, 2), {'c': 3}),
+                         image_workers.execute(lambda *a, **kw: (a, kw),
+                                               1, 2, c=3))
+
+    def test_execute_error(self):
+        def _fail():
+            raise IOError('boom')
+
+        self.assertRaisesRegexp(IOError, 'boom', image_workers.execute,
+                                _fail)
+        self.assertEqual({'_fail': 1},
+                         self._get_counts(image_workers.RUN_METRIC))
+
+    def test_execute_disabled(self):
+        self.config(image_worker_pool_size=0)
+        self.assertEqual(_get_thread_id(),
+                         image_workers.execute(_get_thread_id))
+        self.assertEqual([], metrics.get_registry().snapshot())
+
+    def test_execute_streaming(self):
+        self.assertNotEqual(_get_thread_id(),
+                            image_workers.execute_streaming(_get_thread_id))
+        self.assertEqual({'_get_thread_id': 1},
+                         self._get_counts(image_workers.RUN_METRIC))
+
+    def test_execute_streaming_does_not_wait_for_tasks(self):
+        self.config(image_worker_pool_size=1)
+        task_done = native_threading.Event()
+        task = eventlet.spawn(image_workers.execute, task_done.wait, 5)
+        eventlet.sleep(0.05)
+        try:
+            # The thread of the tasks is busy
+            self.assertEqual(0, image_workers._get_semaphores()[0].balance)
+            with eventlet.Timeout(1):
+                self.assertEqual(42, image_workers.execute_streaming(
+                    lambda: 42))
+        finally:
+            task_done.set()
+            task.wait()
+
+    def test_execute_bounded(self):
+        self.config(image_worker_pool_size=2)
+        lock = native_threading.Lock()
+        running = [0, 0]
+
+        def _work():
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            native_time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+
+        threads = [eventlet.spawn(image_workers.execute, _work)
+                   for i in range(5)]
+        for thread in threads:
+            thread.wait()
+        self.assertEqual(2, running[1])
+        queue = metrics.get_registry().snapshot(
+            prefix=image_workers.QUEUE_METRIC)[0]
+        # The 5th call found the 3rd and the 4th ones waiting
+        self.assertEqual(5, queue['count'])
+        self.assertEqual(2, queue['max'])
@@ -15,22 +15,26 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
 import os
 import shutil
 
+import fixtures
 from ironic_lib import disk_utils
-from ironic_lib import utils as ironic_utils
 import mock
 from oslo_concurrency import processutils
 from oslo_config import cfg
 import six
-import six.moves.builtins as __builtin__
 
+from ironic.common import context
 from ironic.common import exception
 from ironic.common.glance_service import service_utils as glance_utils
 from ironic.common import image_service
+from ironic.common import image_workers
 from ironic.common import images
+from ironic.common import metrics
 from ironic.common import utils
+from ironic.common import vfat
 from ironic.tests import base
 
 if six.PY3:
@@ -45,37 +49,167 @@ class IronicImagesTestCase(base.TestCase):
     class FakeImgInfo(object):
         pass
 
+    def _fake_download(self, data):
+        def download(image_href, image_file):
+            image_file.write(data)
+        return download
+
     @mock.patch.object(image_service, 'get_image_service', autospec=True)
-    @mock.patch.object(__builtin__, 'open', autospec=True)
-    def test_fetch_image_service(self, open_mock, image_service_mock):
-        mock_file_handle = mock.MagicMock(spec=file)
-        mock_file_handle.__enter__.return_value = 'file'
-        open_mock.return_value = mock_file_handle
+    def test_fetch_image_service(self, image_service_mock):
+        image_service_mock.return_value.download.side_effect = (
+            self._fake_download(b'image data'))
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'img')
 
-        images.fetch('context', 'image_href', 'path')
+        digests = images.fetch('context', 'image_href', path)
 
-        open_mock.assert_called_once_with('path', 'wb')
         image_service_mock.assert_called_once_with('image_href',
                                                    context='context')
         image_service_mock.return_value.download.assert_called_once_with(
-            'image_href', 'file')
+            'image_href', mock.ANY)
+        with open(path, 'rb') as image_file:
+            self.assertEqual(b'image data', image_file.read())
+        self.assertEqual({'md5': hashlib.md5(b'image data').hexdigest()},
+                         digests)
 
     @mock.patch.object(image_service, 'get_image_service', autospec=True)
     @mock.patch.object(images, 'image_to_raw', autospec=True)
-    @mock.patch.object(__builtin__, 'open', autospec=True)
-    def test_fetch_image_service_force_raw(self, open_mock, image_to_raw_mock,
+    def test_fetch_image_service_force_raw(self, image_to_raw_mock,
                                            image_service_mock):
-        mock_file_handle = mock.MagicMock(spec=file)
-        mock_file_handle.__enter__.return_value = 'file'
-        open_mock.return_value = mock_file_handle
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'img')
 
-        images.fetch('context', 'image_href', 'path', force_raw=True)
+        images.fetch('context', 'image_href', path, force_raw=True)
 
-        open_mock.assert_called_once_with('path', 'wb')
         image_service_mock.return_value.download.assert_called_once_with(
-            'image_href', 'file')
+            'image_href', mock.ANY)
         image_to_raw_mock.assert_called_once_with(
-            'image_href', 'path', 'path.part')
+            'image_href', path, '%s.part' % path)
+
+    @mock.patch.object(image_service, 'get_image_service', autospec=True)
+    def test_fetch_unsupported_algorithm(self, image_service_mock):
+        self.config(checksum_algorithms=['sha256', 'bogus'],
+                    group='image_download')
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'img')
+
+        self.assertRaisesRegexp(exception.InvalidParameterValue, 'bogus',
+                                images.fetch, 'context', 'image_href', path)
+        self.assertFalse(image_service_mock.called)
+        self.assertFalse(os.path.exists(path))
+
+    @mock.patch.object(image_service, 'get_image_service', autospec=True)
+    def test_fetch_several_algorithms(self, image_service_mock):
+        self.config(checksum_algorithms=['sha1', 'sha256'],
+                    group='image_download')
+        image_service_mock.return_value.download.side_effect = (
+            self._fake_download(b'image data'))
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'img')
+
+        digests = images.fetch('context', 'image_href', path)
+
+        self.assertEqual(
+            {'sha1': hashlib.sha1(b'image data').hexdigest(),
+             'sha256': hashlib.sha256(b'image data').hexdigest()},
+            digests)
+
+    @mock.patch.object(image_service, 'get_image_service', autospec=True)
+    def test_fetch_glance_checksum(self, image_service_mock):
+        self.config(checksum_algorithms=['sha256'], group='image_download')
+        image_service_mock.return_value.download.side_effect = (
+            self._fake_download(b'image data'))
+        image_service_mock.return_value.show.return_value = {
+            'checksum': hashlib.md5(b'image data').hexdigest().upper()}
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'img')
+
+        digests = images.fetch('context', 'glance://image-uuid', path)
+
+        image_service_mock.return_value.show.assert_called_once_with(
+            'glance://image-uuid')
+        self.assertEqual(
+            {'md5': hashlib.md5(b'image data').hexdigest(),
+             'sha256': hashlib.sha256(b'image data').hexdigest()},
+            digests)
+
+    @mock.patch.object(image_service, 'get_image_service', autospec=True)
+    def test_fetch_glance_checksum_mismatch(self, image_service_mock):
+        image_service_mock.return_value.download.side_effect = (
+            self._fake_download(b'corrupted data'))
+        image_service_mock.return_value.show.return_value = {
+            'checksum': hashlib.md5(b'image data').hexdigest()}
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'img')
+
+        self.assertRaises(exception.ImageChecksumError, images.fetch,
+                          'context', 'glance://image-uuid', path)
+        self.assertFalse(os.path.exists(path))
+
+    @mock.patch.object(image_service, 'get_image_service', autospec=True)
+    def test_fetch_not_written_verified(self, image_service_mock):
+        image_service_mock.return_value.show.return_value = {
+            'checksum': hashlib.md5(b'image data').hexdigest()}
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'img')
+
+        def download(image_href, image_file):
+            # like a hard link or sendfile, bypassing write()
+            with open(image_file.name, 'wb') as other_file:
+                other_file.write(b'image data')
+        image_service_mock.return_value.download.side_effect = download
+
+        digests = images.fetch('context', 'glance://image-uuid', path)
+
+        self.assertEqual({'md5': hashlib.md5(b'image data').hexdigest()},
+                         digests)
+
+    @mock.patch.object(image_workers, 'execute_streaming', autospec=True)
+    def test_hashing_file_buffers(self, mock_execute):
+        mock_execute.side_effect = lambda func, chunks: func(chunks)
+        chunk = b'x' * (64 * 1024)
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'img')
+        with open(path, 'wb') as image_file:
+            hashing_file = images._HashingFile(image_file, ['md5'])
+            for i in range(40):
+                hashing_file.write(chunk)
+            # Two blocks of 1 MiB went to the pool, 512 KiB are buffered
+            self.assertEqual(2, mock_execute.call_count)
+            self.assertEqual(2 * images.HASHING_BUFFER_SIZE,
+                             hashing_file.written)
+            # Using the file flushes the buffer
+            self.assertEqual(40 * len(chunk), hashing_file.tell())
+            self.assertEqual(3, mock_execute.call_count)
+            hashing_file.write(b'end')
+            hashing_file.flush()
+        self.assertEqual(4, mock_execute.call_count)
+        self.assertEqual(40 * len(chunk) + 3, hashing_file.written)
+        self.assertEqual(
+            {'md5': hashlib.md5(chunk * 40 + b'end').hexdigest()},
+            hashing_file.hexdigests())
+        self.assertEqual(40 * len(chunk) + 3, os.path.getsize(path))
+
+    @mock.patch.object(image_service, 'get_image_service', autospec=True)
+    def test_fetch_not_written_not_verified(self, image_service_mock):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'img')
+
+        def download(image_href, image_file):
+            with open(image_file.name, 'wb') as other_file:
+                other_file.write(b'image data')
+        image_service_mock.return_value.download.side_effect = download
+
+        self.assertEqual({}, images.fetch('context', 'image_href', path))
+
+    @mock.patch.object(image_service.HttpImageService,
+                       'get_sidecar_checksums', autospec=True)
+    @mock.patch.object(image_service.HttpImageService, 'download',
+                       autospec=True)
+    def test_fetch_http_sidecar_checksum(self, download_mock, sidecar_mock):
+        self.config(http_checksum_sidecars=True,
+                    checksum_algorithms=['sha256'], group='image_download')
+        download_mock.side_effect = (
+            lambda service, href, image_file: image_file.write(b'data'))
+        sidecar_mock.return_value = {'sha256': 'wrong'}
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'img')
+
+        self.assertRaises(exception.ImageChecksumError, images.fetch,
+                          'context', 'http://host/image.qcow2', path)
+        sidecar_mock.assert_called_once_with(mock.ANY,
+                                             'http://host/image.qcow2',
+                                             ['sha256'])
 
     @mock.patch.object(disk_utils, 'qemu_img_info', autospec=True)
     def test_image_to_raw_no_file_format(self, qemu_img_info_mock):
@@ -125,6 +259,38 @@ class IronicImagesTestCase(base.TestCase):
         unlink_mock.assert_called_once_with('path_tmp')
         rename_mock.assert_called_once_with('path.converted', 'path')
 
+    @mock.patch.object(os, 'rename', autospec=True)
+    @mock.patch.object(os, 'unlink', autospec=True)
+    @mock.patch.object(disk_utils, 'convert_image', autospec=True)
+    @mock.patch.object(disk_utils, 'qemu_img_info', autospec=True)
+    def test_image_to_raw_image_info(self, qemu_img_info_mock,
+                                     convert_image_mock, unlink_mock,
+                                     rename_mock):
+        info = self.FakeImgInfo()
+        info.file_format = 'qcow2'
+        info.backing_file = None
+        converted_info = self.FakeImgInfo()
+        converted_info.file_format = 'raw'
+        qemu_img_info_mock.return_value = converted_info
+
+        images.image_to_raw('image_href', 'path', 'path_tmp', info)
+
+        # The image is not probed again before its conversion
+        qemu_img_info_mock.assert_called_once_with('path.converted')
+        convert_image_mock.assert_called_once_with('path_tmp',
+                                                   'path.converted', 'raw')
+        rename_mock.assert_called_once_with('path.converted', 'path')
+
+    @mock.patch.object(disk_utils, 'qemu_img_info', autospec=True)
+    def test_image_to_raw_image_info_backing_file(self, qemu_img_info_mock):
+        info = self.FakeImgInfo()
+        info.file_format = 'qcow2'
+        info.backing_file = 'backing_file'
+
+        self.assertRaises(exception.ImageUnacceptable, images.image_to_raw,
+                          'image_href', 'path', 'path_tmp', info)
+        self.assertFalse(qemu_img_info_mock.called)
+
     @mock.patch.object(os, 'unlink', autospec=True)
     @mock.patch.object(disk_utils, 'convert_image', autospec=True)
     @mock.patch.object(disk_utils, 'qemu_img_info', autospec=True)
@@ -172,6 +338,83 @@ class IronicImagesTestCase(base.TestCase):
         images.image_show('context', 'image_href', image_service_mock)
         image_service_mock.show.assert_called_once_with('image_href')
 
+    def _get_cache_counts(self):
+        return dict((s['labels']['result'], s['count'])
+                    for s in metrics.get_registry().snapshot(
+                        prefix=images.METADATA_CACHE_METRIC))
+
+    def test_image_show_cached(self):
+        metrics.get_registry().reset()
+        self.addCleanup(metrics.get_registry().reset)
+        image_service_mock = mock.MagicMock(version=1)
+        image_service_mock.show.return_value = {'properties': {'p1': 'v1'}}
+        ctx = context.RequestContext(tenant='tenant')
+
+        image_info = images.image_show(ctx, 'image_href', image_service_mock)
+        image_info['properties']['p1'] = 'changed'
+        self.assertEqual({'properties': {'p1': 'v1'}},
+                         images.image_show(ctx, 'image_href',
+                                           image_service_mock))
+        image_service_mock.show.assert_called_once_with('image_href')
+        self.assertEqual({'hit': 1, 'miss': 1}, self._get_cache_counts())
+
+    def test_image_show_cached_by_tenant_and_version(self):
+        service_v1 = mock.MagicMock(version=1)
+        service_v2 = mock.MagicMock(version=2)
+        for ctx in (context.RequestContext(tenant='tenant1'),
+                    context.RequestContext(tenant='tenant2')):
+            for image_service_mock in (service_v1, service_v2):
+                images.image_show(ctx, 'image_href', image_service_mock)
+                images.image_show(ctx, 'image_href', image_service_mock)
+        self.assertEqual(2, service_v1.show.call_count)
+        self.assertEqual(2, service_v2.show.call_count)
+
+    def test_image_show_cache_disabled(self):
+        self.config(image_metadata_cache_ttl=0)
+        image_service_mock = mock.MagicMock()
+        images.image_show('context', 'image_href', image_service_mock)
+        images.image_show('context', 'image_href', image_service_mock)
+        self.assertEqual(2, image_service_mock.show.call_count)
+
+    def test_image_show_not_found_cached(self):
+        metrics.get_registry().reset()
+        self.addCleanup(metrics.get_registry().reset)
+        image_service_mock = mock.MagicMock()
+        image_service_mock.show.side_effect = exception.ImageNotFound(
+            image_id='image_href')
+        for attempt in range(2):
+            self.assertRaisesRegexp(exception.ImageNotFound, 'image_href',
+                                    images.image_show, 'context',
+                                    'image_href', image_service_mock)
+        image_service_mock.show.assert_called_once_with('image_href')
+        self.assertEqual({'negative_hit': 1, 'miss': 1},
+                         self._get_cache_counts())
+
+    def test_image_show_error_not_cached(self):
+        image_service_mock = mock.MagicMock()
+        image_service_mock.show.side_effect = (
+            exception.GlanceConnectionFailed(host='host', port=9292,
+                                             reason='reason'))
+        for attempt in range(2):
+            self.assertRaises(exception.GlanceConnectionFailed,
+                              images.image_show, 'context', 'image_href',
+                              image_service_mock)
+        self.assertEqual(2, image_service_mock.show.call_count)
+
+    @mock.patch.object(image_service, 'get_image_service', autospec=True)
+    def test_fetch_refreshes_image_metadata(self, image_service_mock):
+        image_service_mock.return_value.download.side_effect = (
+            self._fake_download(b'image data'))
+        image_service_mock.return_value.show.return_value = {
+            'checksum': hashlib.md5(b'image data').hexdigest()}
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'img')
+
+        images.image_show('context', 'glance://image-uuid')
+        images.fetch('context', 'glance://image-uuid', path)
+        images.image_show('context', 'glance://image-uuid')
+
+        self.assertEqual(2, image_service_mock.return_value.show.call_count)
+
     @mock.patch.object(images, 'image_show', autospec=True)
     def test_download_size(self, show_mock):
         show_mock.return_value = {'size': 123456}
@@ -183,12 +426,21 @@ class IronicImagesTestCase(base.TestCase):
     @mock.patch.object(disk_utils, 'qemu_img_info', autospec=True)
     def test_converted_size(self, qemu_img_info_mock):
         info = self.FakeImgInfo()
+        info.file_format = 'qcow2'
         info.virtual_size = 1
         qemu_img_info_mock.return_value = info
         size = images.converted_size('path')
         qemu_img_info_mock.assert_called_once_with('path')
         self.assertEqual(1, size)
 
+    @mock.patch.object(disk_utils, 'qemu_img_info', autospec=True)
+    def test_converted_size_raw(self, qemu_img_info_mock):
+        info = self.FakeImgInfo()
+        info.file_format = 'raw'
+        info.virtual_size = 1
+        self.assertEqual(0, images.converted_size('path', info))
+        self.assertFalse(qemu_img_info_mock.called)
+
     @mock.patch.object(images, 'get_image_properties', autospec=True)
     @mock.patch.object(glance_utils, 'is_glance_image', autospec=True)
     def test_is_whole_disk_image_no_img_src(self, mock_igi, mock_gip):
@@ -282,101 +534,50 @@ class FsImageTestCase(base.TestCase):
         dirname_mock.assert_any_call('root_dir/sub_dir/b3')
         mkdir_mock.assert_called_once_with('root_dir/sub_dir')
 
-    @mock.patch.object(images, '_create_root_fs', autospec=True)
-    @mock.patch.object(utils, 'tempdir', autospec=True)
-    @mock.patch.object(utils, 'write_to_file', autospec=True)
-    @mock.patch.object(ironic_utils, 'dd', autospec=True)
-    @mock.patch.object(utils, 'umount', autospec=True)
-    @mock.patch.object(utils, 'mount', autospec=True)
-    @mock.patch.object(ironic_utils, 'mkfs', autospec=True)
-    def test_create_vfat_image(
-            self, mkfs_mock, mount_mock, umount_mock, dd_mock, write_mock,
-            tempdir_mock, create_root_fs_mock):
-
-        mock_file_handle = mock.MagicMock(spec=file)
-        mock_file_handle.__enter__.return_value = 'tempdir'
-        tempdir_mock.return_value = mock_file_handle
+    @mock.patch.object(vfat, 'FatImage', autospec=True)
+    def test_create_vfat_image(self, image_mock):
+        src_file = self.useFixture(fixtures.TempDir()).join('src')
+        with open(src_file, 'wb') as f:
+            f.write(b'content')
 
         parameters = {'p1': 'v1'}
-        files_info = {'a': 'b'}
+        files_info = {src_file: 'b/c'}
         images.create_vfat_image('tgt_file', parameters=parameters,
                                  files_info=files_info, parameters_file='qwe',
                                  fs_size_kib=1000)
 
-        dd_mock.assert_called_once_with('/dev/zero',
-                                        'tgt_file',
-                                        'count=1',
-                                        'bs=1000KiB')
-
-        mkfs_mock.assert_called_once_with('vfat', 'tgt_file',
-                                          label="ir-vfd-dev")
-        mount_mock.assert_called_once_with('tgt_file', 'tempdir',
-                                           '-o', 'umask=0')
-
-        parameters_file_path = os.path.join('tempdir', 'qwe')
-        write_mock.assert_called_once_with(parameters_file_path, 'p1=v1')
-        create_root_fs_mock.assert_called_once_with('tempdir', files_info)
-        umount_mock.assert_called_once_with('tempdir')
-
-    @mock.patch.object(images, '_create_root_fs', autospec=True)
-    @mock.patch.object(utils, 'tempdir', autospec=True)
-    @mock.patch.object(ironic_utils, 'dd', autospec=True)
-    @mock.patch.object(utils, 'umount', autospec=True)
-    @mock.patch.object(utils, 'mount', autospec=True)
-    @mock.patch.object(ironic_utils, 'mkfs', autospec=True)
-    def test_create_vfat_image_always_umount(
-            self, mkfs_mock, mount_mock, umount_mock, dd_mock,
-            tempdir_mock, create_root_fs_mock):
-
-        mock_file_handle = mock.MagicMock(spec=file)
-        mock_file_handle.__enter__.return_value = 'tempdir'
-        tempdir_mock.return_value = mock_file_handle
-        files_info = {'a': 'b'}
-        create_root_fs_mock.side_effect = OSError()
+        image_mock.assert_called_once_with(1000 * 1024, label='ir-vfd-dev')
+        image_mock.return_value.add_file.assert_has_calls(
+            [mock.call('b/c', b'content'), mock.call('qwe', b'p1=v1')])
+        image_mock.return_value.write.assert_called_once_with('tgt_file')
+
+    def test_create_vfat_image_writes_image(self):
+        tmpdir = self.useFixture(fixtures.TempDir()).path
+        output_file = os.path.join(tmpdir, 'image')
+        images.create_vfat_image(output_file, parameters={'p1': 'v1'})
+        with open(output_file, 'rb') as f:
+            content = f.read()
+        self.assertEqual(100 * 1024, len(content))
+        # Label of the volume in the boot sector and in the root directory
+        self.assertEqual(b'ir-vfd-dev ', content[43:54])
+        self.assertEqual(2, content.count(b'ir-vfd-dev '))
+        self.assertIn(b'p1=v1', content)
+
+    def test_create_vfat_image_read_fails(self):
         self.assertRaises(exception.ImageCreationFailed,
                           images.create_vfat_image, 'tgt_file',
-                          files_info=files_info)
-
-        umount_mock.assert_called_once_with('tempdir')
-
-    @mock.patch.object(ironic_utils, 'dd', autospec=True)
-    def test_create_vfat_image_dd_fails(self, dd_mock):
-
-        dd_mock.side_effect = processutils.ProcessExecutionError
-        self.assertRaises(exception.ImageCreationFailed,
-                          images.create_vfat_image, 'tgt_file')
-
-    @mock.patch.object(utils, 'tempdir', autospec=True)
-    @mock.patch.object(ironic_utils, 'dd', autospec=True)
-    @mock.patch.object(ironic_utils, 'mkfs', autospec=True)
-    def test_create_vfat_image_mkfs_fails(self, mkfs_mock, dd_mock,
-                                          tempdir_mock):
-
-        mock_file_handle = mock.MagicMock(spec=file)
-        mock_file_handle.__enter__.return_value = 'tempdir'
-        tempdir_mock.return_value = mock_file_handle
+                          files_info={'/nonexistent/file': 'a'})
 
-        mkfs_mock.side_effect = processutils.ProcessExecutionError
+    @mock.patch.object(vfat.FatImage, 'write', autospec=True)
+    def test_create_vfat_image_write_fails(self, write_mock):
+        write_mock.side_effect = IOError()
         self.assertRaises(exception.ImageCreationFailed,
                           images.create_vfat_image, 'tgt_file')
 
-    @mock.patch.object(images, '_create_root_fs', autospec=True)
-    @mock.patch.object(utils, 'tempdir', autospec=True)
-    @mock.patch.object(ironic_utils, 'dd', autospec=True)
-    @mock.patch.object(utils, 'umount', autospec=True)
-    @mock.patch.object(utils, 'mount', autospec=True)
-    @mock.patch.object(ironic_utils, 'mkfs', autospec=True)
-    def test_create_vfat_image_umount_fails(
-            self, mkfs_mock, mount_mock, umount_mock, dd_mock,
-            tempdir_mock, create_root_fs_mock):
-
-        mock_file_handle = mock.MagicMock(spec=file)
-        mock_file_handle.__enter__.return_value = 'tempdir'
-        tempdir_mock.return_value = mock_file_handle
-        umount_mock.side_effect = processutils.ProcessExecutionError
-
+    def test_create_vfat_image_too_small(self):
         self.assertRaises(exception.ImageCreationFailed,
-                          images.create_vfat_image, 'tgt_file')
+                          images.create_vfat_image, 'tgt_file',
+                          parameters={'p1': 'v1'}, fs_size_kib=1)
 
     @mock.patch.object(utils, 'umount', autospec=True)
     def test__umount_without_raise(self, umount_mock):
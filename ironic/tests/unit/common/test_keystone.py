@@ -17,6 +17,7 @@ import mock
 
 from ironic.common import exception
 from ironic.common import keystone
+from ironic.common import metrics
 from ironic.tests import base
 
 
@@ -26,7 +27,7 @@ class FakeCatalog(object):
 
 
 class FakeAccessInfo(object):
-    def will_expire_soon(self):
+    def will_expire_soon(self, stale_duration=None):
         pass
 
 
@@ -34,6 +35,7 @@ class FakeClient(object):
     def __init__(self, **kwargs):
         self.service_catalog = FakeCatalog()
         self.auth_ref = FakeAccessInfo()
+        self.auth_token = kwargs.get('token', 'admin-token')
 
     def has_service_catalog(self):
         return True
@@ -62,6 +64,50 @@ class KeystoneTestCase(base.TestCase):
         res = keystone.get_service_url()
         self.assertEqual(fake_url, res)
 
+    @mock.patch.object(FakeCatalog, 'url_for', autospec=True)
+    @mock.patch('keystoneclient.v2_0.client.Client', autospec=True)
+    def test_get_url_cached(self, mock_ks, mock_uf):
+        mock_uf.return_value = 'http://127.0.0.1:6385'
+        mock_ks.return_value = FakeClient()
+        for i in range(3):
+            self.assertEqual('http://127.0.0.1:6385',
+                             keystone.get_service_url())
+        self.assertEqual(1, mock_uf.call_count)
+        # other endpoint types and regions are looked up separately
+        keystone.get_service_url(endpoint_type='public')
+        self.config(group='keystone', region_name='other')
+        keystone.get_service_url()
+        self.assertEqual(3, mock_uf.call_count)
+
+    @mock.patch.object(FakeCatalog, 'url_for', autospec=True)
+    @mock.patch('keystoneclient.v2_0.client.Client', autospec=True)
+    def test_get_url_cache_disabled(self, mock_ks, mock_uf):
+        self.config(group='keystone', catalog_cache_ttl=0)
+        mock_uf.return_value = 'http://127.0.0.1:6385'
+        mock_ks.return_value = FakeClient()
+        keystone.get_service_url()
+        keystone.get_service_url()
+        self.assertEqual(2, mock_uf.call_count)
+
+    @mock.patch.object(FakeCatalog, 'url_for', autospec=True)
+    @mock.patch('keystoneclient.v2_0.client.Client', autospec=True)
+    def test_invalidate_service_url(self, mock_ks, mock_uf):
+        mock_uf.side_effect = ['http://old:9696', 'http://new:9696']
+        mock_ks.return_value = FakeClient()
+        self.assertEqual('http://old:9696',
+                         keystone.get_service_url(service_type='network'))
+        keystone.invalidate_service_url(service_type='network')
+        self.assertEqual('http://new:9696',
+                         keystone.get_service_url(service_type='network'))
+
+    @mock.patch.object(FakeCatalog, 'url_for', autospec=True)
+    @mock.patch('keystoneclient.v2_0.client.Client', autospec=True)
+    def test_url_not_found_not_cached(self, mock_ks, mock_uf):
+        mock_uf.side_effect = [ksexception.EndpointNotFound, 'http://url']
+        mock_ks.return_value = FakeClient()
+        self.assertRaises(exception.CatalogNotFound, keystone.get_service_url)
+        self.assertEqual('http://url', keystone.get_service_url())
+
     @mock.patch.object(FakeCatalog, 'url_for', autospec=True)
     @mock.patch('keystoneclient.v2_0.client.Client', autospec=True)
     def test_url_not_found(self, mock_ks, mock_uf):
@@ -183,3 +229,73 @@ class KeystoneTestCase(base.TestCase):
         self.assertEqual(new_client, keystone._get_ksclient())
         self.assertEqual(new_client, keystone._KS_CLIENT)
         self.assertEqual(1, mock_ks.call_count)
+
+    @mock.patch.object(FakeAccessInfo, 'will_expire_soon', autospec=True)
+    @mock.patch('keystoneclient.v2_0.client.Client', autospec=True)
+    def test_cache_client_metrics(self, mock_ks, mock_expire):
+        metrics.get_registry().reset()
+        self.addCleanup(metrics.get_registry().reset)
+        mock_expire.return_value = False
+        mock_ks.return_value = FakeClient()
+        keystone.get_admin_auth_token()
+        keystone.get_admin_auth_token()
+        self.assertEqual(1, mock_ks.call_count)
+        counts = dict((s['labels']['result'], s['count'])
+                      for s in metrics.get_registry().snapshot(
+                          prefix=keystone.ADMIN_CLIENT_METRIC))
+        self.assertEqual({'hit': 1, 'miss': 1}, counts)
+
+    @mock.patch('keystoneclient.v2_0.client.Client', autospec=True)
+    def test_token_expires_soon_admin_token(self, mock_ks):
+        fake_client = FakeClient()
+        keystone._KS_CLIENT = fake_client
+        with mock.patch.object(fake_client.auth_ref, 'will_expire_soon',
+                               autospec=True) as mock_expire:
+            mock_expire.return_value = True
+            self.assertTrue(keystone.token_expires_soon('admin-token', 60))
+            mock_expire.assert_called_once_with(stale_duration=60)
+        self.assertFalse(mock_ks.called)
+
+    @mock.patch('keystoneclient.v2_0.client.Client', autospec=True)
+    def test_token_expires_soon_other_token(self, mock_ks):
+        keystone._KS_CLIENT = FakeClient()
+        mock_ks.return_value = FakeClient(token='user-token')
+        self.assertFalse(keystone.token_expires_soon('user-token'))
+        mock_ks.assert_called_once_with(token='user-token',
+                                        auth_url=mock.ANY)
+
+
+class ClientCacheTestCase(base.TestCase):
+
+    def setUp(self):
+        super(ClientCacheTestCase, self).setUp()
+        self.create = mock.Mock(side_effect=lambda: object())
+
+    def test_get_client(self):
+        client = keystone.get_client('image', ('url', 'token'), self.create)
+        self.assertIs(client, keystone.get_client('image', ('url', 'token'),
+                                                  self.create))
+        self.assertEqual(1, self.create.call_count)
+
+    def test_get_client_different_keys(self):
+        client = keystone.get_client('image', ('url', 'token'), self.create)
+        self.assertIsNot(client, keystone.get_client('image',
+                                                     ('url', 'token2'),
+                                                     self.create))
+        self.assertIsNot(client, keystone.get_client('network',
+                                                     ('url', 'token'),
+                                                     self.create))
+        self.assertEqual(3, self.create.call_count)
+
+    def test_get_client_disabled(self):
+        self.config(client_cache_ttl=0, group='keystone')
+        keystone.get_client('image', ('url',), self.create)
+        keystone.get_client('image', ('url',), self.create)
+        self.assertEqual(2, self.create.call_count)
+
+    def test_invalidate_client(self):
+        client = keystone.get_client('image', ('url',), self.create)
+        keystone.invalidate_client('image', ('url',))
+        self.assertIsNot(client, keystone.get_client('image', ('url',),
+                                                     self.create))
+        self.assertEqual(2, self.create.call_count)
@@ -0,0 +1,300 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+import oslo_messaging as messaging
+
+from ironic.common import exception
+from ironic.common import metrics
+from ironic.tests import base
+
+
+class HistogramTestCase(base.TestCase):
+
+    def test_empty(self):
+        histogram = metrics.Histogram()
+        self.assertIsNone(histogram.percentile(50))
+        self.assertEqual(0, histogram.to_dict()['count'])
+
+    def test_observe(self):
+        histogram = metrics.Histogram(buckets=(10, 100))
+        for value in (1, 5, 50, 500):
+            histogram.observe(value)
+        self.assertEqual([2, 1, 1], histogram.counts)
+        self.assertEqual(4, histogram.count)
+        self.assertEqual(556, histogram.sum)
+        self.assertEqual(500, histogram.max)
+
+    def test_percentile(self):
+        histogram = metrics.Histogram(buckets=(10, 100))
+        for value in (1, 2, 3, 50, 500):
+            histogram.observe(value)
+        self.assertEqual(10, histogram.percentile(50))
+        self.assertEqual(100, histogram.percentile(80))
+        self.assertEqual(500, histogram.percentile(99))
+
+    def test_percentile_capped_to_max(self):
+        histogram = metrics.Histogram(buckets=(10, 100))
+        histogram.observe(20)
+        self.assertEqual(20, histogram.percentile(50))
+
+    def test_to_dict(self):
+        histogram = metrics.Histogram(buckets=(10,))
+        histogram.observe(5)
+        histogram.observe(15)
+        self.assertEqual({'count': 2, 'sum': 20, 'max': 15, 'p50': 10,
+                          'p90': 15, 'p99': 15,
+                          'buckets': {'le_10': 1, 'inf': 1}},
+                         histogram.to_dict())
+
+
+class RegistryTestCase(base.TestCase):
+
+    def test_observe_and_snapshot(self):
+        registry = metrics.Registry(buckets=(10,))
+        registry.observe('api', 5, route='GET a', phase='db')
+        registry.observe('api', 7, route='GET a', phase='db')
+        registry.observe('api', 20, route='GET b', phase='db')
+        snapshot = registry.snapshot()
+        self.assertEqual(2, len(snapshot))
+        self.assertEqual('api', snapshot[0]['name'])
+        self.assertEqual({'route': 'GET a', 'phase': 'db'},
+                         snapshot[0]['labels'])
+        self.assertEqual(2, snapshot[0]['count'])
+        self.assertEqual({'route': 'GET b', 'phase': 'db'},
+                         snapshot[1]['labels'])
+        self.assertEqual(1, snapshot[1]['count'])
+
+    def test_increment(self):
+        registry = metrics.Registry()
+        registry.increment('cache', result='hit')
+        registry.increment('cache', 2, result='hit')
+        registry.increment('cache', result='miss')
+        self.assertEqual([{'name': 'cache', 'labels': {'result': 'hit'},
+                           'count': 3},
+                          {'name': 'cache', 'labels': {'result': 'miss'},
+                           'count': 1}],
+                         registry.snapshot())
+
+    def test_reset(self):
+        registry = metrics.Registry()
+        registry.observe('api', 5)
+        registry.reset()
+        self.assertEqual([], registry.snapshot())
+
+
+@mock.patch.object(metrics.time, 'time', autospec=True)
+class RecorderTestCase(base.TestCase):
+
+    def test_nested_phases(self, mock_time):
+        mock_time.side_effect = [0, 1, 3, 6, 10]
+        recorder = metrics.Recorder()
+        recorder.push('app')
+        recorder.push('db')
+        self.assertEqual(3, recorder.pop())
+        self.assertEqual(9, recorder.pop())
+        self.assertEqual({'app': 6, 'db': 3}, recorder.durations)
+
+    def test_add(self, mock_time):
+        mock_time.return_value = 0
+        recorder = metrics.Recorder()
+        recorder.push('app')
+        recorder.add('db', 2)
+        mock_time.return_value = 5
+        recorder.pop()
+        self.assertEqual({'app': 3, 'db': 2}, recorder.durations)
+
+    def test_current_durations(self, mock_time):
+        mock_time.return_value = 0
+        recorder = metrics.Recorder()
+        recorder.push('auth')
+        mock_time.return_value = 1
+        recorder.push('app')
+        mock_time.return_value = 2
+        recorder.add('db', 0.5)
+        mock_time.return_value = 4
+        self.assertEqual({'auth': 1, 'app': 2.5, 'db': 0.5},
+                         recorder.current_durations())
+
+
+class TimedTestCase(base.TestCase):
+
+    def tearDown(self):
+        metrics.stop_recording()
+        super(TimedTestCase, self).tearDown()
+
+    def test_timed_without_recorder(self):
+        self.assertIsNone(metrics.get_recorder())
+        with metrics.timed('db'):
+            pass
+
+    def test_timed(self):
+        recorder = metrics.start_recording()
+        self.assertIs(recorder, metrics.get_recorder())
+        with metrics.timed('db'):
+            pass
+        self.assertIn('db', recorder.durations)
+        self.assertIs(recorder, metrics.stop_recording())
+        self.assertIsNone(metrics.get_recorder())
+
+    def test_timed_exception(self):
+        recorder = metrics.start_recording()
+
+        def _raise():
+            with metrics.timed('db'):
+                raise ValueError()
+
+        self.assertRaises(ValueError, _raise)
+        self.assertIn('db', recorder.durations)
+        self.assertEqual([], recorder._frames)
+
+    def test_format_server_timing(self):
+        self.assertEqual('app;dur=1.5, db;dur=20.0',
+                         metrics.format_server_timing({'db': 0.02,
+                                                       'app': 0.0015}))
+
+
+class ReporterTestCase(base.TestCase):
+
+    @mock.patch.object(metrics.LOG, 'info', autospec=True)
+    @mock.patch.object(metrics.time, 'time', autospec=True)
+    def test_maybe_report(self, mock_time, mock_log):
+        self.config(report_interval=60, group='metrics')
+        registry = metrics.Registry()
+        registry.observe('rpc.server', 5, method='foo', result='ok')
+        registry.observe('api.request.phase', 5, route='GET a', phase='db')
+        mock_time.return_value = 0
+        reporter = metrics.Reporter('rpc.', 'RPC %s', registry)
+        mock_time.return_value = 30
+        reporter.maybe_report()
+        self.assertFalse(mock_log.called)
+        mock_time.return_value = 61
+        reporter.maybe_report()
+        self.assertEqual(1, mock_log.call_count)
+        self.assertIn('"name": "rpc.server"', mock_log.call_args[0][1])
+        self.assertNotIn('api.request.phase', mock_log.call_args[0][1])
+
+    @mock.patch.object(metrics.LOG, 'debug', autospec=True)
+    def test_maybe_report_debug(self, mock_log):
+        registry = metrics.Registry()
+        registry.increment('keystone.admin_client', result='hit')
+        reporter = metrics.Reporter('keystone.', 'Keystone %s', registry,
+                                    debug=True)
+        reporter._last_report = 0
+        reporter.maybe_report()
+        mock_log.assert_called_once_with('Keystone %s', mock.ANY)
+
+    @mock.patch.object(metrics.LOG, 'info', autospec=True)
+    def test_maybe_report_disabled(self, mock_log):
+        self.config(report_interval=0, group='metrics')
+        reporter = metrics.Reporter('rpc.', 'RPC %s', metrics.Registry())
+        reporter._last_report = 0
+        reporter.maybe_report()
+        self.assertFalse(mock_log.called)
+
+
+class MeteredRPCClientTestCase(base.TestCase):
+
+    def setUp(self):
+        super(MeteredRPCClientTestCase, self).setUp()
+        self.client = mock.Mock(spec_set=['prepare', 'call', 'cast',
+                                          'target', 'can_send_version'])
+        self.client.target.topic = 'ironic.conductor_manager'
+        self.registry = metrics.Registry()
+        self.reporter = mock.Mock(spec_set=['maybe_report'])
+        self.metered = metrics.MeteredRPCClient(self.client, self.registry,
+                                                self.reporter)
+
+    def _labels(self):
+        return [(s['name'], s['labels'], s['count'])
+                for s in self.registry.snapshot()]
+
+    def test_call(self):
+        cctxt = self.metered.prepare(topic='ironic.conductor_manager.host1',
+                                     version='1.1')
+        self.assertEqual(self.client.prepare.return_value.call.return_value,
+                         cctxt.call('ctxt', 'update_node', node_obj='node'))
+        self.client.prepare.return_value.call.assert_called_once_with(
+            'ctxt', 'update_node', node_obj='node')
+        self.assertEqual([('rpc.client.call', {'method': 'update_node',
+                                               'host': 'host1',
+                                               'result': 'ok'}, 1)],
+                         self._labels())
+        self.reporter.maybe_report.assert_called_once_with()
+
+    def test_call_timeout(self):
+        cctxt = self.metered.prepare(topic='ironic.conductor_manager.host1')
+        self.client.prepare.return_value.call.side_effect = (
+            messaging.MessagingTimeout())
+        self.assertRaises(messaging.MessagingTimeout, cctxt.call, 'ctxt',
+                          'update_node')
+        self.assertEqual([('rpc.client.call', {'method': 'update_node',
+                                               'host': 'host1',
+                                               'result': 'timeout'}, 1)],
+                         self._labels())
+
+    def test_call_error(self):
+        self.client.call.side_effect = exception.NodeLocked(node='n',
+                                                            host='h')
+        self.assertRaises(exception.NodeLocked, self.metered.call, 'ctxt',
+                          'update_node')
+        self.assertEqual([('rpc.client.call', {'method': 'update_node',
+                                               'host': '',
+                                               'result': 'error'}, 1)],
+                         self._labels())
+
+    def test_cast(self):
+        cctxt = self.metered.prepare(topic='ironic.conductor_manager.host1')
+        cctxt.cast('ctxt', 'continue_node_clean', node_id='node')
+        self.client.prepare.return_value.cast.assert_called_once_with(
+            'ctxt', 'continue_node_clean', node_id='node')
+        self.assertEqual([('rpc.client.cast',
+                           {'method': 'continue_node_clean', 'host': 'host1',
+                            'result': 'ok'}, 1)],
+                         self._labels())
+
+    def test_other_attributes(self):
+        self.assertEqual(self.client.can_send_version.return_value,
+                         self.metered.can_send_version('1.34'))
+
+
+class MeteredEndpointTestCase(base.TestCase):
+
+    def setUp(self):
+        super(MeteredEndpointTestCase, self).setUp()
+        self.endpoint = mock.Mock(spec_set=['target', 'update_node'])
+        self.endpoint.target = messaging.Target(version='1.0')
+        self.registry = metrics.Registry()
+        self.reporter = mock.Mock(spec_set=['maybe_report'])
+        self.metered = metrics.MeteredEndpoint(self.endpoint, self.registry,
+                                               self.reporter)
+
+    def test_method(self):
+        self.assertEqual(self.endpoint.update_node.return_value,
+                         self.metered.update_node('ctxt', node_obj='node'))
+        self.endpoint.update_node.assert_called_once_with('ctxt',
+                                                          node_obj='node')
+        snapshot = self.registry.snapshot()
+        self.assertEqual('rpc.server', snapshot[0]['name'])
+        self.assertEqual({'method': 'update_node', 'result': 'ok'},
+                         snapshot[0]['labels'])
+        self.reporter.maybe_report.assert_called_once_with()
+
+    def test_method_error(self):
+        self.endpoint.update_node.side_effect = ValueError()
+        self.assertRaises(ValueError, self.metered.update_node, 'ctxt')
+        self.assertEqual({'method': 'update_node', 'result': 'error'},
+                         self.registry.snapshot()[0]['labels'])
+
+    def test_target(self):
+        self.assertIs(self.endpoint.target, self.metered.target)
+        self.assertFalse(hasattr(self.metered, 'destroy_node'))
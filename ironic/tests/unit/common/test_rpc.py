@@ -13,10 +13,42 @@
 import mock
 
 from ironic.common import context as ironic_context
+from ironic.common import metrics
 from ironic.common import rpc
 from ironic.tests import base
 
 
+@mock.patch.object(rpc, 'TRANSPORT', autospec=True)
+class TestGetClientAndServer(base.TestCase):
+
+    @mock.patch.object(rpc.messaging, 'RPCClient', autospec=True)
+    def test_get_client(self, mock_client, mock_transport):
+        client = rpc.get_client('target')
+        self.assertIs(mock_client.return_value, client)
+
+    @mock.patch.object(rpc.messaging, 'RPCClient', autospec=True)
+    def test_get_client_metered(self, mock_client, mock_transport):
+        self.config(enable_rpc_metrics=True, group='metrics')
+        client = rpc.get_client('target')
+        self.assertIsInstance(client, metrics.MeteredRPCClient)
+        self.assertIs(mock_client.return_value, client._client)
+
+    @mock.patch.object(rpc.messaging, 'get_rpc_server', autospec=True)
+    def test_get_server(self, mock_server, mock_transport):
+        rpc.get_server('target', ['endpoint'])
+        mock_server.assert_called_once_with(
+            mock_transport, 'target', ['endpoint'], executor='eventlet',
+            serializer=mock.ANY)
+
+    @mock.patch.object(rpc.messaging, 'get_rpc_server', autospec=True)
+    def test_get_server_metered(self, mock_server, mock_transport):
+        self.config(enable_rpc_metrics=True, group='metrics')
+        rpc.get_server('target', ['endpoint'])
+        endpoints = mock_server.call_args[0][2]
+        self.assertIsInstance(endpoints[0], metrics.MeteredEndpoint)
+        self.assertEqual('endpoint', endpoints[0]._endpoint)
+
+
 class TestRequestContextSerializer(base.TestCase):
 
     def setUp(self):
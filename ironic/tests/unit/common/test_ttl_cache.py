@@ -0,0 +1,65 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+import mock
+
+from ironic.common import ttl_cache
+from ironic.tests import base
+
+
+class TTLCacheTestCase(base.TestCase):
+
+    def test_get_set(self):
+        cache = ttl_cache.TTLCache(2, 60)
+        cache.set('foo', 'bar')
+        self.assertEqual('bar', cache.get('foo'))
+        self.assertIsNone(cache.get('spam'))
+        self.assertEqual('ham', cache.get('spam', 'ham'))
+
+    @mock.patch.object(time, 'time', autospec=True)
+    def test_expired(self, mock_time):
+        mock_time.return_value = 1000
+        cache = ttl_cache.TTLCache(2, 60)
+        cache.set('foo', 'bar')
+        mock_time.return_value = 1061
+        self.assertIsNone(cache.get('foo'))
+        self.assertEqual(0, len(cache))
+
+    def test_lru_eviction(self):
+        cache = ttl_cache.TTLCache(2, 60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        # Mark 'a' as recently used so 'b' is evicted
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(1, cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(3, cache.get('c'))
+
+    def test_disabled(self):
+        for maxsize, ttl in ((0, 60), (2, 0)):
+            cache = ttl_cache.TTLCache(maxsize, ttl)
+            self.assertFalse(cache.enabled)
+            cache.set('foo', 'bar')
+            self.assertIsNone(cache.get('foo'))
+
+    def test_delete_and_clear(self):
+        cache = ttl_cache.TTLCache(4, 60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.delete('a')
+        cache.delete('missing')
+        self.assertIsNone(cache.get('a'))
+        cache.clear()
+        self.assertEqual(0, len(cache))
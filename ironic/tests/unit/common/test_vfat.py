@@ -0,0 +1,194 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import struct
+import tempfile
+
+import six
+
+from ironic.common import exception
+from ironic.common import vfat
+from ironic.tests import base
+
+
+def _read_image(data):
+    """Read the files of a FAT12 or FAT16 image, following the spec.
+
+    :returns: a tuple (boot sector fields, label, {path: content}).
+    """
+    (jump, oem, sector_size, sectors_per_cluster, reserved, fats,
+     root_entries, total, media, sectors_per_fat, _sectors_per_track,
+     _heads, _hidden, total32) = struct.unpack_from('<3s8sHBHBHHBHHHII',
+                                                    data)
+    (_drive, _reserved, signature, volume_id, label,
+     fs_type) = struct.unpack_from('<BBBI11s8s', data, 36)
+    fat_bits = 12 if fs_type.strip() == b'FAT12' else 16
+    fat_offset = reserved * sector_size
+    root_offset = fat_offset + fats * sectors_per_fat * sector_size
+    data_offset = root_offset + root_entries * 32
+    cluster_size = sectors_per_cluster * sector_size
+    end_of_chain = (1 << fat_bits) - 8
+
+    def _next(cluster):
+        if fat_bits == 16:
+            return struct.unpack_from('<H', data, fat_offset + cluster * 2)[0]
+        value = struct.unpack_from('<H', data,
+                                   fat_offset + cluster * 3 // 2)[0]
+        return value >> 4 if cluster % 2 else value & 0xfff
+
+    def _read_chain(cluster, size=None):
+        content = b''
+        while 2 <= cluster < end_of_chain:
+            start = data_offset + (cluster - 2) * cluster_size
+            content += data[start:start + cluster_size]
+            cluster = _next(cluster)
+        return content if size is None else content[:size]
+
+    files = {}
+    volume_label = [None]
+
+    def _walk(entries, prefix):
+        long_name = u''
+        for offset in range(0, len(entries), 32):
+            entry = entries[offset:offset + 32]
+            if six.indexbytes(entry, 0) == 0:
+                break
+            attr = six.indexbytes(entry, 11)
+            if attr == vfat.ATTR_LONG_NAME:
+                chars = entry[1:11] + entry[14:26] + entry[28:32]
+                long_name = (chars.decode('utf-16-le').split(u'\0')[0] +
+                             long_name)
+                continue
+            (short_name, attr, _nt, _tenth, _ctime, _cdate, _adate, _hi,
+             _mtime, _mdate, cluster, size) = struct.unpack(
+                 '<11sBBBHHHHHHHI', entry)
+            name = long_name or (
+                short_name[:8].decode('ascii').rstrip() + u'.' +
+                short_name[8:].decode('ascii').rstrip()).rstrip(u'.')
+            long_name = u''
+            if attr & vfat.ATTR_VOLUME_ID:
+                volume_label[0] = short_name
+            elif attr & vfat.ATTR_DIRECTORY:
+                if not short_name.startswith(b'.'):
+                    _walk(_read_chain(cluster), prefix + name + u'/')
+            else:
+                files[prefix + name] = _read_chain(cluster, size)
+
+    _walk(data[root_offset:data_offset], u'')
+    fields = {'jump': jump, 'oem': oem, 'sector_size': sector_size,
+              'sectors_per_cluster': sectors_per_cluster,
+              'reserved': reserved, 'fats': fats,
+              'root_entries': root_entries, 'total': total or total32,
+              'media': media, 'sectors_per_fat': sectors_per_fat,
+              'signature': signature, 'volume_id': volume_id,
+              'label': label, 'fs_type': fs_type,
+              'boot_signature': data[510:512]}
+    return fields, volume_label[0], files
+
+
+class FatImageTestCase(base.TestCase):
+
+    def test_empty_image(self):
+        image = vfat.FatImage(100 * 1024, label='ir-vfd-dev',
+                              volume_id=0x1234abcd)
+        data = image.to_bytes()
+        self.assertEqual(100 * 1024, len(data))
+        fields, label, files = _read_image(data)
+        # The layout of mkfs.fat -C <image> 100
+        self.assertEqual({'jump': b'\xeb\x3c\x90', 'oem': b'mkfs.fat',
+                          'sector_size': 512, 'sectors_per_cluster': 4,
+                          'reserved': 1, 'fats': 2, 'root_entries': 512,
+                          'total': 200, 'media': 0xf8, 'sectors_per_fat': 1,
+                          'signature': 0x29, 'volume_id': 0x1234abcd,
+                          'label': b'ir-vfd-dev ', 'fs_type': b'FAT12   ',
+                          'boot_signature': b'\x55\xaa'}, fields)
+        self.assertEqual(vfat.BOOT_CODE, data[62:62 + len(vfat.BOOT_CODE)])
+        self.assertEqual(b'ir-vfd-dev ', label)
+        self.assertEqual({}, files)
+        # Both FATs only have the reserved entries
+        self.assertEqual(b'\xf8\xff\xff\x00', data[512:516])
+        self.assertEqual(b'\xf8\xff\xff\x00', data[1024:1028])
+
+    def test_volume_id_from_time(self):
+        image = vfat.FatImage(100 * 1024)
+        self.assertNotEqual(0, image.volume_id)
+        self.assertIsNone(_read_image(image.to_bytes())[1])
+
+    def test_files(self):
+        image = vfat.FatImage(100 * 1024, label='ir-vfd-dev')
+        big = os.urandom(5000)
+        image.add_file('parameters.txt', b'a=b\nc=d')
+        image.add_file('README', b'short name')
+        image.add_file('/dir/sub/A file with a long name.conf', big)
+        image.add_file('dir/empty', b'')
+        image.add_file(u'caf\xe9', b'unicode')
+        _fields, _label, files = _read_image(image.to_bytes())
+        self.assertEqual({u'parameters.txt': b'a=b\nc=d',
+                          u'README': b'short name',
+                          u'dir/sub/A file with a long name.conf': big,
+                          u'dir/empty': b'',
+                          u'caf\xe9': b'unicode'}, files)
+
+    def test_short_names_unique(self):
+        image = vfat.FatImage(100 * 1024)
+        for name in ('parameters.txt', 'parameters.text', 'PARAME~1.TXT'):
+            image.add_file(name, name.encode('ascii'))
+        data = image.to_bytes()
+        root = data[1536:1536 + 512 * 32]
+        short_names = [root[offset:offset + 11]
+                       for offset in range(0, len(root), 32)
+                       if six.indexbytes(root, offset + 11) == 0x20]
+        self.assertEqual([b'PARAME~2TXT', b'PARAME~1TEX', b'PARAME~1TXT'],
+                         short_names)
+        files = _read_image(data)[2]
+        self.assertEqual(b'parameters.txt', files[u'parameters.txt'])
+        self.assertEqual(b'PARAME~1.TXT', files[u'PARAME~1.TXT'])
+
+    def test_fat16(self):
+        image = vfat.FatImage(16 * 1024 * 1024)
+        content = b'x' * (3 * 1024 * 1024)
+        image.add_file('big', content)
+        fields, _label, files = _read_image(image.to_bytes())
+        self.assertEqual(b'FAT16   ', fields['fs_type'])
+        self.assertEqual(4, fields['sectors_per_cluster'])
+        self.assertEqual({u'big': content}, files)
+
+    def test_write(self):
+        image = vfat.FatImage(100 * 1024)
+        image.add_file('file', b'content')
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.unlink, path)
+        image.write(path)
+        with open(path, 'rb') as f:
+            self.assertEqual(image.to_bytes(), f.read())
+
+    def test_too_small(self):
+        self.assertRaises(exception.ImageCreationFailed, vfat.FatImage,
+                          10 * 1024)
+
+    def test_files_do_not_fit(self):
+        image = vfat.FatImage(100 * 1024)
+        image.add_file('file', b'x' * 100 * 1024)
+        self.assertRaises(exception.ImageCreationFailed, image.to_bytes)
+
+    def test_invalid_label(self):
+        self.assertRaises(exception.ImageCreationFailed, vfat.FatImage,
+                          100 * 1024, label='a label too long')
+
+    def test_invalid_paths(self):
+        image = vfat.FatImage(100 * 1024)
+        image.add_file('dir/file', b'')
+        for path in ('', '/', 'a/../b', 'a:b', 'DIR/FILE', 'dir/file/sub'):
+            self.assertRaises(exception.ImageCreationFailed, image.add_file,
+                              path, b'')
@@ -22,6 +22,7 @@ from ironic.common import exception
 from ironic.conductor import base_manager
 from ironic.conductor import manager
 from ironic.drivers import base as drivers_base
+from ironic.drivers.modules import image_cache
 from ironic import objects
 from ironic.tests.unit.conductor import mgr_utils
 from ironic.tests.unit.db import base as tests_db_base
@@ -66,6 +67,15 @@ class StartStopTestCase(mgr_utils.ServiceSetUpMixin, tests_db_base.DbTestCase):
         res = objects.Conductor.get_by_hostname(self.context, self.hostname)
         self.assertEqual(self.hostname, res['hostname'])
 
+    @mock.patch.object(image_cache, 'stop_peer_server', autospec=True)
+    @mock.patch.object(image_cache, 'start_peer_server', autospec=True)
+    def test_start_stop_shares_master_images(self, mock_start, mock_stop):
+        self._start_service()
+        mock_start.assert_called_once_with(self.hostname)
+        self.assertFalse(mock_stop.called)
+        self.service.del_host()
+        mock_stop.assert_called_once_with()
+
     @mock.patch.object(manager.ConductorManager, 'init_host')
     def test_stop_uninitialized_conductor(self, mock_init):
         self._start_service()
@@ -145,6 +155,16 @@ class StartStopTestCase(mgr_utils.ServiceSetUpMixin, tests_db_base.DbTestCase):
             self.assertTrue(mock_df.called)
             self.assertFalse(mock_reg.called)
 
+    @mock.patch.object(driver_factory, 'drivers', autospec=True)
+    def test_start_fails_on_driver_load_error(self, mock_drivers):
+        mock_drivers.side_effect = exception.DriverLoadError(driver='fake',
+                                                             reason='test')
+        with mock.patch.object(self.dbapi, 'register_conductor') as mock_reg:
+            self.assertRaises(exception.DriverLoadError,
+                              self.service.init_host)
+            self.assertTrue(mock_drivers.called)
+            self.assertFalse(mock_reg.called)
+
     @mock.patch.object(base_manager, 'LOG')
     @mock.patch.object(driver_factory, 'DriverFactory')
     def test_start_fails_on_no_driver(self, df_mock, log_mock):
@@ -19,6 +19,7 @@
 """Test class for Ironic ManagerService."""
 
 import datetime
+import time
 
 import eventlet
 import mock
@@ -27,6 +28,7 @@ import oslo_messaging as messaging
 from oslo_utils import uuidutils
 from oslo_versionedobjects import base as ovo_base
 from oslo_versionedobjects import fields
+import six
 
 from ironic.common import boot_devices
 from ironic.common import driver_factory
@@ -40,6 +42,7 @@ from ironic.conductor import utils as conductor_utils
 from ironic.db import api as dbapi
 from ironic.drivers import base as drivers_base
 from ironic.drivers.modules import fake
+from ironic.drivers.modules import image_cache
 from ironic import objects
 from ironic.objects import base as obj_base
 from ironic.tests import base as tests_base
@@ -214,6 +217,21 @@ class UpdateNodeTestCase(mgr_utils.ServiceSetUpMixin,
         res = self.service.update_node(self.context, node)
         self.assertEqual({'test': 'two'}, res['extra'])
 
+    def test_update_node_delta(self):
+        node = obj_utils.create_test_node(self.context, driver='fake',
+                                          extra={'test': 'one'},
+                                          driver_internal_info={'foo': 'bar'})
+        node.extra = {'test': 'two'}
+        serializer = obj_base.IronicObjectSerializer()
+        node_obj = serializer.deserialize_entity(
+            self.context, node.obj_to_delta_primitive())
+
+        res = self.service.update_node(self.context, node_obj)
+        self.assertEqual({'test': 'two'}, res['extra'])
+        node.refresh()
+        self.assertEqual({'test': 'two'}, node.extra)
+        self.assertEqual({'foo': 'bar'}, node.driver_internal_info)
+
     def test_update_node_clears_maintenance_reason(self):
         node = obj_utils.create_test_node(self.context, driver='fake',
                                           maintenance=True,
@@ -243,6 +261,23 @@ class UpdateNodeTestCase(mgr_utils.ServiceSetUpMixin,
         res = objects.Node.get_by_uuid(self.context, node['uuid'])
         self.assertEqual({'test': 'one'}, res['extra'])
 
+    def test_update_nodes(self):
+        node1 = obj_utils.create_test_node(self.context, driver='fake',
+                                           extra={'test': 'one'})
+        node2 = obj_utils.create_test_node(self.context, driver='fake',
+                                           uuid=uuidutils.generate_uuid(),
+                                           extra={'test': 'one'})
+        node1.extra = {'test': 'two'}
+        node2.extra = {'test': 'three'}
+        with task_manager.acquire(self.context, node1['id'], shared=False):
+            res = self.service.update_nodes(self.context, [node1, node2])
+
+        self.assertEqual(exception.NodeLocked.code, res[0]['code'])
+        self.assertIn(node1.uuid, res[0]['message'])
+        self.assertEqual({'test': 'three'}, res[1]['extra'])
+        node1.refresh()
+        self.assertEqual({'test': 'one'}, node1['extra'])
+
     @mock.patch('ironic.drivers.modules.fake.FakePower.get_power_state')
     def _test_associate_node(self, power_state, mock_get_power_state):
         mock_get_power_state.return_value = power_state
@@ -2557,6 +2592,308 @@ class RaidTestCases(mgr_utils.ServiceSetUpMixin, tests_db_base.DbTestCase):
         self.assertEqual(exception.InvalidParameterValue, exc.exc_info[0])
 
 
+@mgr_utils.mock_record_keepalive
+class BulkNodeActionTestCase(mgr_utils.ServiceSetUpMixin,
+                             tests_db_base.DbTestCase):
+
+    @mock.patch.object(manager.ConductorManager, 'change_node_power_state',
+                       autospec=True)
+    def test_change_nodes_power_state(self, mock_cnps):
+        locked = exception.NodeLocked(node='locked', host='fake-host')
+
+        def change_node_power_state(service, context, node_id, new_state):
+            if node_id == 'locked':
+                try:
+                    raise locked
+                except exception.NodeLocked:
+                    raise messaging.rpc.ExpectedException()
+            if node_id == 'broken':
+                raise ValueError('boom')
+        mock_cnps.side_effect = change_node_power_state
+        self._start_service()
+        results = self.service.change_nodes_power_state(
+            self.context, ['node-1', 'locked', 'broken', 'node-2'],
+            states.POWER_ON)
+
+        self.assertIsNone(results[0])
+        self.assertEqual({'code': locked.code,
+                          'message': six.text_type(locked)}, results[1])
+        self.assertEqual({'code': 500, 'message': 'boom'}, results[2])
+        self.assertIsNone(results[3])
+        mock_cnps.assert_has_calls(
+            [mock.call(self.service, self.context, node_id, states.POWER_ON)
+             for node_id in ('node-1', 'locked', 'broken', 'node-2')],
+            any_order=True)
+
+    @mock.patch.object(manager.ConductorManager, 'do_provisioning_action',
+                       autospec=True)
+    @mock.patch.object(manager.ConductorManager, 'inspect_hardware',
+                       autospec=True)
+    @mock.patch.object(manager.ConductorManager, 'do_node_tear_down',
+                       autospec=True)
+    @mock.patch.object(manager.ConductorManager, 'do_node_deploy',
+                       autospec=True)
+    def test_do_nodes_provisioning_action(self, mock_deploy, mock_tear_down,
+                                          mock_inspect, mock_action):
+        self._start_service()
+        for target in (states.ACTIVE, states.REBUILD, states.DELETED,
+                       states.VERBS['inspect'], states.VERBS['provide']):
+            self.assertEqual(
+                [None], self.service.do_nodes_provisioning_action(
+                    self.context, ['node-1'], target, configdrive='foo'))
+        self.assertEqual(
+            [mock.call(self.service, self.context, 'node-1', False, 'foo'),
+             mock.call(self.service, self.context, 'node-1', True)],
+            mock_deploy.call_args_list)
+        mock_tear_down.assert_called_once_with(self.service, self.context,
+                                               'node-1')
+        mock_inspect.assert_called_once_with(self.service, self.context,
+                                             'node-1')
+        mock_action.assert_called_once_with(self.service, self.context,
+                                            'node-1', states.VERBS['provide'])
+
+
+@mgr_utils.mock_record_keepalive
+class JobTestCase(mgr_utils.ServiceSetUpMixin, tests_db_base.DbTestCase):
+
+    def setUp(self):
+        super(JobTestCase, self).setUp()
+        self.node = obj_utils.create_test_node(self.context, driver='fake')
+
+    def test_start_job(self):
+        self._start_service()
+        job = self.service.start_job(self.context, 'get_boot_device',
+                                     {'node_id': self.node.uuid})
+        self.assertEqual(self.node.id, job.node_id)
+        self.assertEqual('get_boot_device', job.method)
+        self.service._worker_pool.waitall()
+
+        job.refresh()
+        self.assertEqual(states.JOB_SUCCEEDED, job.state)
+        self.assertEqual(200, job.status_code)
+        self.assertEqual({'return': {'boot_device': boot_devices.PXE,
+                                     'persistent': False}},
+                         job.result)
+        self.assertIsNone(job.last_error)
+
+    @mock.patch.object(manager.ConductorManager, 'vendor_passthru',
+                       autospec=True)
+    def test_start_job_vendor_passthru_async(self, mock_vendor):
+        mock_vendor.return_value = {'return': None, 'async': True,
+                                    'attach': False}
+        self._start_service()
+        job = self.service.start_job(self.context, 'vendor_passthru',
+                                     {'node_id': self.node.uuid,
+                                      'driver_method': 'method',
+                                      'http_method': 'POST', 'info': {}})
+        self.service._worker_pool.waitall()
+
+        job.refresh()
+        self.assertEqual(states.JOB_SUCCEEDED, job.state)
+        self.assertEqual(202, job.status_code)
+        self.assertEqual({'return': mock_vendor.return_value}, job.result)
+
+    @mock.patch.object(fake.FakeManagement, 'get_boot_device',
+                       autospec=True)
+    def test_start_job_failure(self, mock_get_boot_device):
+        mock_get_boot_device.side_effect = exception.InvalidParameterValue(
+            'boom')
+        self._start_service()
+        job = self.service.start_job(self.context, 'get_boot_device',
+                                     {'node_id': self.node.uuid})
+        self.service._worker_pool.waitall()
+
+        job.refresh()
+        self.assertEqual(states.JOB_FAILED, job.state)
+        self.assertEqual(400, job.status_code)
+        self.assertEqual('boom', job.last_error)
+
+    @mock.patch.object(fake.FakeManagement, 'get_boot_device',
+                       autospec=True)
+    def test_start_job_result_not_serializable(self, mock_get_boot_device):
+        mock_get_boot_device.return_value = {'boot_device': object()}
+        self._start_service()
+        job = self.service.start_job(self.context, 'get_boot_device',
+                                     {'node_id': self.node.uuid})
+        self.service._worker_pool.waitall()
+
+        job.refresh()
+        self.assertEqual(states.JOB_FAILED, job.state)
+        self.assertEqual(500, job.status_code)
+        self.assertEqual({}, job.result)
+        self.assertIn('Unable to save the outcome', job.last_error)
+        self.assertNotIn('object', job.last_error)
+
+    @mock.patch.object(manager.ConductorManager, 'get_console_information',
+                       autospec=True)
+    def test_start_job_console_not_enabled(self, mock_console):
+        mock_console.side_effect = messaging.rpc.ExpectedException()
+        mock_console.side_effect.exc_info = (
+            exception.NodeConsoleNotEnabled,
+            exception.NodeConsoleNotEnabled(node=self.node.uuid), None)
+        self._start_service()
+        job = self.service.start_job(self.context, 'get_console_information',
+                                     {'node_id': self.node.uuid})
+        self.service._worker_pool.waitall()
+
+        job.refresh()
+        self.assertEqual(states.JOB_SUCCEEDED, job.state)
+        self.assertEqual(200, job.status_code)
+        self.assertEqual({'return': None}, job.result)
+        self.assertIsNone(job.last_error)
+
+    def test_start_job_invalid_method(self):
+        self._start_service()
+        exc = self.assertRaises(messaging.rpc.ExpectedException,
+                                self.service.start_job,
+                                self.context, 'destroy_node',
+                                {'node_id': self.node.uuid})
+        # Compare true exception hidden by @messaging.expected_exceptions
+        self.assertEqual(exception.InvalidParameterValue, exc.exc_info[0])
+
+    def test_start_job_no_free_worker(self):
+        self._start_service()
+        with mock.patch.object(self.service, '_spawn_worker',
+                               autospec=True) as mock_spawn:
+            mock_spawn.side_effect = exception.NoFreeConductorWorker()
+            exc = self.assertRaises(messaging.rpc.ExpectedException,
+                                    self.service.start_job,
+                                    self.context, 'get_boot_device',
+                                    {'node_id': self.node.uuid})
+        self.assertEqual(exception.NoFreeConductorWorker, exc.exc_info[0])
+        job_uuid = mock_spawn.call_args[0][2].uuid
+        job = objects.Job.get_by_uuid(self.context, job_uuid)
+        self.assertEqual(states.JOB_FAILED, job.state)
+        self.assertEqual(503, job.status_code)
+
+    @mock.patch.object(objects.Job, 'destroy_expired')
+    def test__cleanup_expired_jobs(self, mock_destroy):
+        self.config(job_result_ttl=600, group='conductor')
+        mock_destroy.return_value = 2
+        self.service._cleanup_expired_jobs(self.context)
+        mock_destroy.assert_called_once_with(self.context, 600)
+
+    @mock.patch.object(objects.Node, 'destroy_old_changes')
+    def test__cleanup_old_node_changes(self, mock_destroy):
+        self.config(node_change_ttl=300, group='conductor')
+        mock_destroy.return_value = 0
+        self.service._cleanup_old_node_changes(self.context)
+        mock_destroy.assert_called_once_with(self.context, 300)
+
+
+@mgr_utils.mock_record_keepalive
+@mock.patch.object(image_cache, 'get_caches', autospec=True)
+class PrewarmImageCacheTestCase(mgr_utils.ServiceSetUpMixin,
+                                tests_db_base.DbTestCase):
+
+    def setUp(self):
+        super(PrewarmImageCacheTestCase, self).setUp()
+        self.instance_cache = mock.Mock(spec_set=['cache_image',
+                                                  'master_dir'])
+        self.deploy_cache = mock.Mock(spec_set=['cache_image', 'master_dir'])
+        self.caches = {image_cache.INSTANCE_IMAGES: [self.instance_cache],
+                       image_cache.DEPLOY_IMAGES: [self.deploy_cache]}
+
+    def test_prewarm_image_cache(self, mock_get_caches):
+        mock_get_caches.side_effect = self.caches.get
+        self.instance_cache.cache_image.return_value = True
+        self.deploy_cache.cache_image.side_effect = [False, True]
+        self._start_service()
+        job = self.service.prewarm_image_cache(
+            self.context, ['image', 'image'],
+            [{'deploy_kernel': 'kernel', 'deploy_ramdisk': 'ramdisk'}],
+            pin_time=60)
+        self.assertEqual('prewarm_image_cache', job.method)
+        self.assertIsNone(job.node_id)
+        self.service._worker_pool.waitall()
+
+        job.refresh()
+        self.assertEqual(states.JOB_SUCCEEDED, job.state)
+        self.assertEqual({'return': {'total': 3, 'done': 3, 'downloaded': 2,
+                                     'failed': {}}},
+                         job.result)
+        pin_until = self.instance_cache.cache_image.call_args[1]['pin_until']
+        self.assertAlmostEqual(time.time() + 60, pin_until, delta=10)
+        self.instance_cache.cache_image.assert_called_once_with(
+            'image', ctx=self.context, force_raw=True, pin_until=pin_until)
+        self.deploy_cache.cache_image.assert_has_calls(
+            [mock.call('kernel', ctx=self.context, force_raw=True,
+                       pin_until=pin_until),
+             mock.call('ramdisk', ctx=self.context, force_raw=True,
+                       pin_until=pin_until)])
+
+    def test_prewarm_image_cache_default_pin_time(self, mock_get_caches):
+        self.config(image_prewarm_pin_time=7200, group='conductor')
+        mock_get_caches.side_effect = self.caches.get
+        self._start_service()
+        self.service.prewarm_image_cache(self.context, ['image'], [])
+        self.service._worker_pool.waitall()
+        self.instance_cache.cache_image.assert_called_once_with(
+            'image', ctx=self.context, force_raw=True, pin_until=mock.ANY)
+        pin_until = self.instance_cache.cache_image.call_args[1]['pin_until']
+        self.assertAlmostEqual(time.time() + 7200, pin_until, delta=10)
+        self.assertFalse(self.deploy_cache.cache_image.called)
+
+    def test_prewarm_image_cache_failure(self, mock_get_caches):
+        mock_get_caches.side_effect = self.caches.get
+        self.instance_cache.cache_image.side_effect = [
+            True, exception.ImageDownloadFailed(image_href='bad',
+                                                reason='boom')]
+        self._start_service()
+        job = self.service.prewarm_image_cache(self.context,
+                                               ['image', 'bad'], [])
+        self.service._worker_pool.waitall()
+
+        job.refresh()
+        self.assertEqual(states.JOB_FAILED, job.state)
+        self.assertEqual(500, job.status_code)
+        self.assertEqual(2, job.result['return']['done'])
+        self.assertEqual(['bad'], list(job.result['return']['failed']))
+        self.assertIn('1 of 2 images', job.last_error)
+
+    @mock.patch.object(manager, 'LOG', autospec=True)
+    def test_prewarm_image_cache_job_expired(self, mock_log,
+                                             mock_get_caches):
+        mock_get_caches.side_effect = self.caches.get
+        self._start_service()
+        with mock.patch.object(objects.Job, 'save',
+                               autospec=True) as mock_save:
+            mock_save.side_effect = [None, exception.JobNotFound(job='job')]
+            self.service.prewarm_image_cache(self.context,
+                                             ['image1', 'image2'], [])
+            self.service._worker_pool.waitall()
+
+        # The images are downloaded, the job is not saved again
+        self.assertEqual(2, self.instance_cache.cache_image.call_count)
+        self.assertEqual(2, mock_save.call_count)
+        mock_log.warning.assert_called_once_with(mock.ANY, mock.ANY)
+        self.assertFalse(mock_log.exception.called)
+
+    def test_prewarm_image_cache_no_cache(self, mock_get_caches):
+        mock_get_caches.return_value = []
+        self._start_service()
+        job = self.service.prewarm_image_cache(self.context, ['image'], [])
+        self.service._worker_pool.waitall()
+
+        job.refresh()
+        self.assertEqual(states.JOB_SUCCEEDED, job.state)
+        self.assertEqual(0, job.result['return']['total'])
+
+    def test_prewarm_image_cache_no_free_worker(self, mock_get_caches):
+        mock_get_caches.return_value = []
+        self._start_service()
+        with mock.patch.object(self.service, '_spawn_worker',
+                               autospec=True) as mock_spawn:
+            mock_spawn.side_effect = exception.NoFreeConductorWorker()
+            exc = self.assertRaises(messaging.rpc.ExpectedException,
+                                    self.service.prewarm_image_cache,
+                                    self.context, ['image'], [])
+        self.assertEqual(exception.NoFreeConductorWorker, exc.exc_info[0])
+        job = objects.Job.get_by_uuid(self.context,
+                                      mock_spawn.call_args[0][2].uuid)
+        self.assertEqual(states.JOB_FAILED, job.state)
+
+
 class ManagerSpawnWorkerTestCase(tests_base.TestCase):
     def setUp(self):
         super(ManagerSpawnWorkerTestCase, self).setUp()
@@ -77,6 +77,31 @@ class RPCAPITestCase(base.DbTestCase):
                           rpcapi.get_topic_for,
                           self.fake_node_obj)
 
+    def test_get_topics_for(self):
+        CONF.set_override('host', 'fake-host')
+        self.dbapi.register_conductor({'hostname': 'fake-host',
+                                       'drivers': ['fake-driver']})
+        other_node = objects.Node._from_db_object(
+            objects.Node(self.context),
+            dbutils.get_test_node(driver='other-driver'))
+
+        rpcapi = conductor_rpcapi.ConductorAPI(topic='fake-topic')
+        topics = rpcapi.get_topics_for([self.fake_node_obj, other_node])
+        self.assertEqual('fake-topic.fake-host', topics[0])
+        self.assertIsInstance(topics[1], exception.NoValidHost)
+
+    def test_get_conductor_topics(self):
+        self.dbapi.register_conductor({'hostname': 'host1',
+                                       'drivers': ['fake-driver']})
+        self.dbapi.register_conductor({'hostname': 'host2',
+                                       'drivers': ['fake-driver',
+                                                   'other-driver']})
+
+        rpcapi = conductor_rpcapi.ConductorAPI(topic='fake-topic')
+        self.assertEqual({'host1': 'fake-topic.host1',
+                          'host2': 'fake-topic.host2'},
+                         rpcapi.get_conductor_topics())
+
     def test_get_topic_doesnt_cache(self):
         CONF.set_override('host', 'fake-host')
 
@@ -184,6 +209,41 @@ class RPCAPITestCase(base.DbTestCase):
                           version='1.1',
                           node_obj=self.fake_node)
 
+    def test_update_node_delta(self):
+        self.fake_node_obj.extra = {'foo': 'bar'}
+        self._test_rpcapi('update_node',
+                          'call',
+                          version='1.34',
+                          node_obj=self.fake_node_obj)
+        self.assertEqual(self.fake_node_obj.obj_to_delta_primitive(),
+                         self.fake_kwargs['node_obj'])
+
+    @mock.patch.object(messaging.RPCClient, 'can_send_version', autospec=True)
+    def test_update_node_delta_old_conductor(self, mock_send):
+        mock_send.return_value = False
+        rpcapi = conductor_rpcapi.ConductorAPI(topic='fake-topic')
+        self.fake_node_obj.extra = {'foo': 'bar'}
+        with mock.patch.object(rpcapi.client, 'prepare',
+                               autospec=True) as mock_prepare:
+            rpcapi.update_node(self.context, self.fake_node_obj)
+            mock_prepare.assert_called_once_with(topic='fake-topic',
+                                                 version='1.1')
+            mock_prepare.return_value.call.assert_called_once_with(
+                self.context, 'update_node', node_obj=self.fake_node_obj)
+
+    def test_update_nodes(self):
+        self._test_rpcapi('update_nodes',
+                          'call',
+                          version='1.32',
+                          node_objs=[self.fake_node])
+
+    def test_start_job(self):
+        self._test_rpcapi('start_job',
+                          'call',
+                          version='1.33',
+                          job_method='get_boot_device',
+                          kwargs={'node_id': self.fake_node['uuid']})
+
     def test_change_node_power_state(self):
         self._test_rpcapi('change_node_power_state',
                           'call',
@@ -191,6 +251,13 @@ class RPCAPITestCase(base.DbTestCase):
                           node_id=self.fake_node['uuid'],
                           new_state=states.POWER_ON)
 
+    def test_change_nodes_power_state(self):
+        self._test_rpcapi('change_nodes_power_state',
+                          'call',
+                          version='1.35',
+                          node_ids=[self.fake_node['uuid']],
+                          new_state=states.POWER_ON)
+
     def test_vendor_passthru(self):
         self._test_rpcapi('vendor_passthru',
                           'call',
@@ -217,6 +284,23 @@ class RPCAPITestCase(base.DbTestCase):
                           rebuild=False,
                           configdrive=None)
 
+    def test_do_nodes_provisioning_action(self):
+        self._test_rpcapi('do_nodes_provisioning_action',
+                          'call',
+                          version='1.35',
+                          node_ids=[self.fake_node['uuid']],
+                          target=states.ACTIVE,
+                          configdrive='foo')
+
+    def test_prewarm_image_cache(self):
+        self._test_rpcapi('prewarm_image_cache',
+                          'call',
+                          version='1.36',
+                          images=['image-uuid'],
+                          deploy_images=[{'deploy_kernel': 'kernel-uuid',
+                                          'deploy_ramdisk': 'ramdisk-uuid'}],
+                          pin_time=600)
+
     def test_do_node_tear_down(self):
         self._test_rpcapi('do_node_tear_down',
                           'call',
@@ -327,6 +411,18 @@ class RPCAPITestCase(base.DbTestCase):
                           args=tuple(),
                           kwargs=dict())
 
+    def test_object_action_delta(self):
+        self.fake_node_obj.extra = {'foo': 'bar'}
+        self._test_rpcapi('object_action',
+                          'call',
+                          version='1.34',
+                          objinst=self.fake_node_obj,
+                          objmethod='save',
+                          args=tuple(),
+                          kwargs=dict())
+        self.assertEqual(self.fake_node_obj.obj_to_delta_primitive(),
+                         self.fake_kwargs['objinst'])
+
     def test_object_class_action_versions(self):
         self._test_rpcapi('object_class_action_versions',
                           'call',
@@ -407,6 +407,67 @@ class MigrationCheckersMixin(object):
         tag = node_tags.select(node_tags.c.node_id == '123').execute().first()
         self.assertEqual('tag1', tag['tag'])
 
+    def _check_60cf717201bc(self, engine, data):
+        jobs = db_utils.get_table(engine, 'jobs')
+        col_names = [column.name for column in jobs.c]
+        for name in ('uuid', 'node_id', 'method', 'state', 'status_code',
+                     'result', 'last_error'):
+            self.assertIn(name, col_names)
+        self.assertIsInstance(jobs.c.status_code.type,
+                              sqlalchemy.types.Integer)
+        uuid = uuidutils.generate_uuid()
+        data = {'uuid': uuid, 'method': 'get_boot_device',
+                'state': 'pending'}
+        jobs.insert().execute(data)
+        job = jobs.select(jobs.c.uuid == uuid).execute().first()
+        self.assertEqual('pending', job['state'])
+        self.assertIsNone(job['node_id'])
+        # The UUID is unique
+        self.assertRaises(db_exc.DBDuplicateEntry,
+                          jobs.insert().execute, data)
+
+    def _check_2d13bc3d6bba(self, engine, data):
+        node_changes = db_utils.get_table(engine, 'node_changes')
+        col_names = [column.name for column in node_changes.c]
+        for name in ('id', 'node_uuid', 'power_state', 'target_power_state',
+                     'provision_state', 'target_provision_state',
+                     'created_at'):
+            self.assertIn(name, col_names)
+        uuid = uuidutils.generate_uuid()
+        for state in ('deploying', 'active'):
+            node_changes.insert().execute({'node_uuid': uuid,
+                                           'provision_state': state})
+        changes = node_changes.select(
+            node_changes.c.node_uuid == uuid).order_by(
+            node_changes.c.id).execute().fetchall()
+        self.assertEqual(['deploying', 'active'],
+                         [c['provision_state'] for c in changes])
+
+    def _check_e294876e8028(self, engine, data):
+        cached_images = db_utils.get_table(engine, 'cached_images')
+        col_names = [column.name for column in cached_images.c]
+        for name in ('hostname', 'kind', 'file_name', 'raw', 'size', 'url',
+                     'checksums'):
+            self.assertIn(name, col_names)
+        self.assertIsInstance(cached_images.c.size.type,
+                              sqlalchemy.types.BigInteger)
+        data = {'hostname': 'conductor1', 'kind': 'instance',
+                'file_name': 'image-uuid', 'raw': True, 'size': 2 ** 33}
+        cached_images.insert().execute(data)
+        image = cached_images.select(
+            cached_images.c.hostname == 'conductor1').execute().first()
+        self.assertEqual(2 ** 33, image['size'])
+        # A conductor records an image once per kind
+        self.assertRaises(db_exc.DBDuplicateEntry,
+                          cached_images.insert().execute, data)
+
+    def _check_3f6b0d2a9c41(self, engine, data):
+        cached_images = db_utils.get_table(engine, 'cached_images')
+        col_names = [column.name for column in cached_images.c]
+        self.assertIn('file_checksums', col_names)
+        self.assertIsInstance(cached_images.c.file_checksums.type,
+                              sqlalchemy.types.Text)
+
     def test_upgrade_and_version(self):
         with patch_with_engine(self.engine):
             self.migration_api.upgrade('head')
@@ -0,0 +1,102 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for manipulating cached images via the DB API"""
+
+import datetime
+
+import mock
+from oslo_utils import timeutils
+
+from ironic.tests.unit.db import base
+from ironic.tests.unit.db import utils as db_utils
+
+
+class DbCachedImageTestCase(base.DbTestCase):
+
+    def setUp(self):
+        super(DbCachedImageTestCase, self).setUp()
+        for id, hostname in enumerate(('cdr1', 'cdr2'), 1):
+            self.dbapi.register_conductor(
+                db_utils.get_test_conductor(id=id, hostname=hostname))
+        self.image = db_utils.get_test_cached_image()
+
+    def _announce(self, **kwargs):
+        return self.dbapi.announce_cached_image(
+            db_utils.get_test_cached_image(**kwargs))
+
+    def _peers(self, raw=True, exclude_hostname=None):
+        peers = self.dbapi.get_cached_image_peers(
+            'instance', self.image['file_name'], raw,
+            exclude_hostname=exclude_hostname)
+        return sorted(peer.hostname for peer in peers)
+
+    def test_get_cached_image_peers(self):
+        self._announce(hostname='cdr1')
+        self._announce(hostname='cdr2')
+        self._announce(hostname='cdr2', file_name='other')
+        self._announce(hostname='cdr2', kind='deploy')
+        self.assertEqual(['cdr1', 'cdr2'], self._peers())
+        self.assertEqual(['cdr2'], self._peers(exclude_hostname='cdr1'))
+
+    def test_get_cached_image_peers_raw(self):
+        self._announce(hostname='cdr1')
+        self._announce(hostname='cdr2', raw=False)
+        self.assertEqual(['cdr1'], self._peers())
+        self.assertEqual(['cdr2'], self._peers(raw=False))
+
+    def test_announce_cached_image_replaces(self):
+        self._announce(hostname='cdr1', size=1)
+        self._announce(hostname='cdr1', size=2)
+        peers = self.dbapi.get_cached_image_peers(
+            'instance', self.image['file_name'], True)
+        self.assertEqual([2], [peer.size for peer in peers])
+        self.assertEqual({'md5': 'abc'}, peers[0].checksums)
+
+    def test_get_cached_image_peers_skips_offline_conductors(self):
+        self._announce(hostname='cdr1')
+        self._announce(hostname='cdr2')
+        self.dbapi.unregister_conductor('cdr1')
+        self.assertEqual(['cdr2'], self._peers())
+
+    @mock.patch.object(timeutils, 'utcnow', autospec=True)
+    def test_get_cached_image_peers_skips_dead_conductors(self, mock_utcnow):
+        now = datetime.datetime.utcnow()
+        mock_utcnow.return_value = now
+        self._announce(hostname='cdr1')
+        self._announce(hostname='cdr2')
+        self.config(heartbeat_timeout=60, group='conductor')
+        mock_utcnow.return_value = now + datetime.timedelta(seconds=30)
+        self.dbapi.touch_conductor('cdr2')
+        mock_utcnow.return_value = now + datetime.timedelta(seconds=80)
+        self.assertEqual(['cdr2'], self._peers())
+
+    def test_get_cached_image_peers_unknown_conductor(self):
+        self._announce(hostname='cdr3')
+        self.assertEqual([], self._peers())
+
+    def test_withdraw_cached_image(self):
+        self._announce(hostname='cdr1')
+        self._announce(hostname='cdr2')
+        self.dbapi.withdraw_cached_image('cdr1', 'instance',
+                                         self.image['file_name'])
+        self.assertEqual(['cdr2'], self._peers())
+        # Withdrawing an unknown image is not an error
+        self.dbapi.withdraw_cached_image('cdr1', 'instance',
+                                         self.image['file_name'])
+
+    def test_withdraw_cached_images(self):
+        self._announce(hostname='cdr1')
+        self._announce(hostname='cdr1', file_name='other')
+        self._announce(hostname='cdr2')
+        self.assertEqual(2, self.dbapi.withdraw_cached_images('cdr1'))
+        self.assertEqual(['cdr2'], self._peers())
@@ -0,0 +1,92 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for manipulating Jobs via the DB API"""
+
+import datetime
+
+import mock
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+
+from ironic.common import exception
+from ironic.tests.unit.db import base
+from ironic.tests.unit.db import utils as db_utils
+
+
+class DbJobTestCase(base.DbTestCase):
+
+    def setUp(self):
+        super(DbJobTestCase, self).setUp()
+        self.node = db_utils.create_test_node()
+        self.job = db_utils.create_test_job(node_id=self.node.id)
+
+    def test_get_job_by_uuid(self):
+        res = self.dbapi.get_job_by_uuid(self.job.uuid)
+        self.assertEqual(self.job.id, res.id)
+        self.assertEqual('get_boot_device', res.method)
+
+    def test_get_job_that_does_not_exist(self):
+        self.assertRaises(exception.JobNotFound,
+                          self.dbapi.get_job_by_uuid,
+                          '12345678-9999-0000-cccc-123456789012')
+
+    def test_create_job_generates_uuid(self):
+        job = self.dbapi.create_job({'method': 'get_boot_device',
+                                     'state': 'pending'})
+        self.assertTrue(uuidutils.is_uuid_like(job.uuid))
+        self.assertIsNone(job.node_id)
+
+    def test_create_job_duplicated_uuid(self):
+        self.assertRaises(exception.JobAlreadyExists,
+                          db_utils.create_test_job,
+                          id=2, uuid=self.job.uuid)
+
+    def test_update_job(self):
+        res = self.dbapi.update_job(self.job.uuid,
+                                    {'state': 'succeeded',
+                                     'status_code': 200,
+                                     'result': {'return': 'pxe'}})
+        self.assertEqual('succeeded', res.state)
+        self.assertEqual(200, res.status_code)
+        self.assertEqual({'return': 'pxe'}, res.result)
+
+    def test_update_job_uuid(self):
+        self.assertRaises(exception.InvalidParameterValue,
+                          self.dbapi.update_job, self.job.id,
+                          {'uuid': ''})
+
+    def test_update_job_not_found(self):
+        self.assertRaises(exception.JobNotFound,
+                          self.dbapi.update_job,
+                          '12345678-9999-0000-aaaa-123456789012',
+                          {'state': 'failed'})
+
+    @mock.patch.object(timeutils, 'utcnow', autospec=True)
+    def test_destroy_expired_jobs(self, mock_utcnow):
+        past = datetime.datetime(2000, 1, 1, 0, 0)
+        mock_utcnow.return_value = past
+        old = db_utils.create_test_job(id=2,
+                                       uuid=uuidutils.generate_uuid())
+        mock_utcnow.return_value = past + datetime.timedelta(seconds=100)
+        self.dbapi.update_job(self.job.id, {'state': 'running'})
+        mock_utcnow.return_value = past + datetime.timedelta(seconds=150)
+
+        self.assertEqual(1, self.dbapi.destroy_expired_jobs(120))
+        self.assertRaises(exception.JobNotFound,
+                          self.dbapi.get_job_by_uuid, old.uuid)
+        self.dbapi.get_job_by_uuid(self.job.uuid)
+
+    def test_destroy_node_destroys_jobs(self):
+        self.dbapi.destroy_node(self.node.id)
+        self.assertRaises(exception.JobNotFound,
+                          self.dbapi.get_job_by_uuid, self.job.uuid)
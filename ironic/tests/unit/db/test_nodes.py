@@ -53,6 +53,133 @@ class DbNodeTestCase(base.DbTestCase):
                           utils.create_test_node,
                           name=node.name)
 
+    def _get_test_nodes(self, count, **kw):
+        nodes = []
+        for i in range(count):
+            node = utils.get_test_node(uuid=uuidutils.generate_uuid(), **kw)
+            del node['id']
+            nodes.append(node)
+        return nodes
+
+    def test_create_nodes(self):
+        values = self._get_test_nodes(3)
+        res = self.dbapi.create_nodes(values)
+        self.assertEqual([v['uuid'] for v in values], [n.uuid for n in res])
+        for node in res:
+            self.assertIsNotNone(node.id)
+            self.assertEqual(states.NOSTATE, node.provision_state)
+            self.assertEqual(node.uuid,
+                             self.dbapi.get_node_by_id(node.id).uuid)
+
+    def test_create_nodes_name_duplicate(self):
+        utils.create_test_node(name='spam')
+        values = self._get_test_nodes(2)
+        values[1]['name'] = 'spam'
+        self.assertRaises(exception.DuplicateName,
+                          self.dbapi.create_nodes, values)
+        # None of the nodes was created
+        self.assertRaises(exception.NodeNotFound,
+                          self.dbapi.get_node_by_uuid, values[0]['uuid'])
+
+    def test_create_nodes_already_exists(self):
+        node = utils.create_test_node()
+        values = self._get_test_nodes(2)
+        values[1]['uuid'] = node.uuid
+        self.assertRaises(exception.NodeAlreadyExists,
+                          self.dbapi.create_nodes, values)
+
+    def test_get_node_aggregates(self):
+        for driver, state, maintenance in (('fake', states.AVAILABLE, False),
+                                           ('fake', states.AVAILABLE, True),
+                                           ('fake', states.ACTIVE, False),
+                                           ('other', states.ACTIVE, False)):
+            utils.create_test_node(uuid=uuidutils.generate_uuid(),
+                                   driver=driver, provision_state=state,
+                                   maintenance=maintenance)
+
+        res = self.dbapi.get_node_aggregates(['provision_state', 'driver'])
+        self.assertEqual([(states.ACTIVE, 'fake', 1),
+                          (states.ACTIVE, 'other', 1),
+                          (states.AVAILABLE, 'fake', 2)], res)
+
+        res = self.dbapi.get_node_aggregates(['maintenance'],
+                                             filters={'driver': 'fake'})
+        self.assertEqual([(False, 2), (True, 1)], res)
+
+        res = self.dbapi.get_node_aggregates([])
+        self.assertEqual([(4,)], res)
+
+    def test_get_node_aggregates_invalid_column(self):
+        self.assertRaises(exception.InvalidParameterValue,
+                          self.dbapi.get_node_aggregates, ['properties_x'])
+
+    def test_update_node_records_change(self):
+        node = utils.create_test_node()
+        self.assertEqual(0, self.dbapi.get_last_node_change_seq())
+        self.dbapi.update_node(node.id, {'extra': {'foo': 'bar'}})
+        self.assertEqual([], self.dbapi.get_node_changes(0))
+        # Setting the same value is not a change
+        self.dbapi.update_node(node.id,
+                               {'power_state': node.power_state})
+        self.assertEqual([], self.dbapi.get_node_changes(0))
+
+        self.dbapi.update_node(node.id,
+                               {'provision_state': states.DEPLOYING,
+                                'target_provision_state': states.ACTIVE})
+        self.dbapi.update_node(node.id, {'power_state': states.POWER_ON})
+        res = self.dbapi.get_node_changes(0)
+        self.assertEqual(2, len(res))
+        self.assertLess(res[0].id, res[1].id)
+        self.assertEqual(node.uuid, res[0].node_uuid)
+        self.assertEqual(states.DEPLOYING, res[0].provision_state)
+        self.assertEqual(states.ACTIVE, res[0].target_provision_state)
+        self.assertEqual(node.power_state, res[0].power_state)
+        self.assertEqual(states.POWER_ON, res[1].power_state)
+        self.assertEqual(states.DEPLOYING, res[1].provision_state)
+        self.assertEqual(res[1].id, self.dbapi.get_last_node_change_seq())
+
+        res2 = self.dbapi.get_node_changes(res[0].id)
+        self.assertEqual([res[1].id], [r.id for r in res2])
+        res3 = self.dbapi.get_node_changes(0, limit=1)
+        self.assertEqual([res[0].id], [r.id for r in res3])
+
+    @mock.patch.object(timeutils, 'utcnow', autospec=True)
+    def test_destroy_old_node_changes(self, mock_utcnow):
+        past = datetime.datetime(2000, 1, 1, 0, 0)
+        mock_utcnow.return_value = past
+        node = utils.create_test_node()
+        self.dbapi.update_node(node.id, {'power_state': states.POWER_ON})
+        mock_utcnow.return_value = past + datetime.timedelta(seconds=100)
+        self.dbapi.update_node(node.id, {'power_state': states.POWER_OFF})
+        mock_utcnow.return_value = past + datetime.timedelta(seconds=150)
+
+        self.assertEqual(1, self.dbapi.destroy_old_node_changes(120))
+        res = self.dbapi.get_node_changes(0)
+        self.assertEqual([states.POWER_OFF], [r.power_state for r in res])
+        self.assertEqual(res[0].id, self.dbapi.get_first_node_change_seq())
+
+    @mock.patch.object(timeutils, 'utcnow', autospec=True)
+    def test_destroy_old_node_changes_keeps_last(self, mock_utcnow):
+        past = datetime.datetime(2000, 1, 1, 0, 0)
+        mock_utcnow.return_value = past
+        node = utils.create_test_node()
+        self.dbapi.update_node(node.id, {'power_state': states.POWER_ON})
+        self.dbapi.update_node(node.id, {'power_state': states.POWER_OFF})
+        last_seq = self.dbapi.get_last_node_change_seq()
+        mock_utcnow.return_value = past + datetime.timedelta(seconds=150)
+
+        self.assertEqual(1, self.dbapi.destroy_old_node_changes(120))
+        self.assertEqual(last_seq, self.dbapi.get_first_node_change_seq())
+        self.assertEqual(last_seq, self.dbapi.get_last_node_change_seq())
+
+    def test_get_first_node_change_seq(self):
+        self.assertEqual(0, self.dbapi.get_first_node_change_seq())
+        node = utils.create_test_node()
+        self.dbapi.update_node(node.id, {'power_state': states.POWER_ON})
+        self.dbapi.update_node(node.id, {'power_state': states.POWER_OFF})
+        res = self.dbapi.get_node_changes(0)
+        self.assertEqual(res[0].id, self.dbapi.get_first_node_change_seq())
+
     def test_get_node_by_id(self):
         node = utils.create_test_node()
         res = self.dbapi.get_node_by_id(node.id)
@@ -120,3 +120,29 @@ class DbPortTestCase(base.DbTestCase):
                           uuid=self.port.uuid,
                           node_id=self.node.id,
                           address='aa-bb-cc-33-11-22')
+
+    def _get_test_ports(self, addresses):
+        ports = []
+        for address in addresses:
+            port = db_utils.get_test_port(uuid=uuidutils.generate_uuid(),
+                                          node_id=self.node.id,
+                                          address=address)
+            del port['id']
+            ports.append(port)
+        return ports
+
+    def test_create_ports(self):
+        values = self._get_test_ports(['aa:bb:cc:dd:ee:01',
+                                       'aa:bb:cc:dd:ee:02'])
+        res = self.dbapi.create_ports(values)
+        self.assertEqual([v['uuid'] for v in values], [p.uuid for p in res])
+        self.assertEqual(3, len(self.dbapi.get_ports_by_node_id(
+            self.node.id)))
+
+    def test_create_ports_duplicated_address(self):
+        values = self._get_test_ports(['aa:bb:cc:dd:ee:01',
+                                       self.port.address])
+        self.assertRaises(exception.MACAlreadyExists,
+                          self.dbapi.create_ports, values)
+        self.assertEqual(1, len(self.dbapi.get_ports_by_node_id(
+            self.node.id)))
@@ -301,6 +301,53 @@ def create_test_chassis(**kw):
     return dbapi.create_chassis(chassis)
 
 
+def get_test_job(**kw):
+    return {
+        'id': kw.get('id', 345),
+        'uuid': kw.get('uuid', '7a5b9ec3-24d5-4cb9-bda8-1fc46ba6d5d1'),
+        'node_id': kw.get('node_id', 123),
+        'method': kw.get('method', 'get_boot_device'),
+        'state': kw.get('state', 'pending'),
+        'status_code': kw.get('status_code'),
+        'result': kw.get('result'),
+        'last_error': kw.get('last_error'),
+        'created_at': kw.get('created_at'),
+        'updated_at': kw.get('updated_at'),
+    }
+
+
+def create_test_job(**kw):
+    """Create test job entry in DB and return Job DB object.
+
+    Function to be used to create test Job objects in the database.
+
+    :param kw: kwargs with overriding values for job's attributes.
+    :returns: Test Job DB object.
+
+    """
+    job = get_test_job(**kw)
+    # Let DB generate ID if it isn't specified explicitly
+    if 'id' not in kw:
+        del job['id']
+    dbapi = db_api.get_instance()
+    return dbapi.create_job(job)
+
+
+def get_test_cached_image(**kw):
+    return {
+        'hostname': kw.get('hostname', 'test-conductor-node'),
+        'kind': kw.get('kind', 'instance'),
+        'file_name': kw.get('file_name',
+                            '2a2b5f6f-77c0-4b44-a1e3-3d7e2ba1d63c'),
+        'raw': kw.get('raw', True),
+        'size': kw.get('size', 1024),
+        'url': kw.get('url', 'http://192.0.2.1:6388/token/instance/'
+                             '2a2b5f6f-77c0-4b44-a1e3-3d7e2ba1d63c'),
+        'checksums': kw.get('checksums', {'md5': 'abc'}),
+        'file_checksums': kw.get('file_checksums', {'md5': 'abc'}),
+    }
+
+
 def get_test_conductor(**kw):
     return {
         'id': kw.get('id', 6),
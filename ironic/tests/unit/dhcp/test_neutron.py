@@ -105,6 +105,14 @@ class TestNeutron(db_base.DbTestCase):
         neutron._build_client(token=None)
         mock_client_init.assert_called_once_with(**expected)
 
+    @mock.patch.object(client.Client, "__init__")
+    def test__build_client_cached(self, mock_client_init):
+        mock_client_init.return_value = None
+        client1 = neutron._build_client(token=None)
+        self.assertIs(client1, neutron._build_client(token=None))
+        self.assertIsNot(client1, neutron._build_client(token='token'))
+        self.assertEqual(2, mock_client_init.call_count)
+
     @mock.patch.object(client.Client, "__init__")
     def test__build_client_with_region(self, mock_client_init):
         expected = {'timeout': 30,
@@ -156,6 +164,23 @@ class TestNeutron(db_base.DbTestCase):
         api.provider.update_port_dhcp_opts(port_id, opts)
         mock_update_port.assert_called_once_with(port_id, expected)
 
+    @mock.patch.object(neutron.keystone, 'invalidate_service_url',
+                       autospec=True)
+    @mock.patch.object(client.Client, 'update_port')
+    @mock.patch.object(client.Client, "__init__")
+    def test_update_port_dhcp_opts_not_invalidated(self, mock_client_init,
+                                                   mock_update_port,
+                                                   mock_invalidate):
+        mock_client_init.return_value = None
+        mock_update_port.side_effect = (
+            neutron_client_exc.NeutronClientException())
+        api = dhcp_factory.DHCPFactory()
+        self.assertRaises(
+            exception.FailedToUpdateDHCPOptOnPort,
+            api.provider.update_port_dhcp_opts,
+            'fake-port-id', [{}])
+        self.assertFalse(mock_invalidate.called)
+
     @mock.patch.object(client.Client, 'update_port')
     @mock.patch.object(client.Client, "__init__")
     def test_update_port_dhcp_opts_with_exception(self, mock_client_init,
@@ -472,6 +497,20 @@ class TestNeutron(db_base.DbTestCase):
             list_mock.assert_called_once_with(
                 network_id='00000000-0000-0000-0000-000000000000')
 
+    @mock.patch.object(neutron.keystone, 'invalidate_service_url',
+                       autospec=True)
+    @mock.patch.object(client.Client, 'list_ports')
+    def test_delete_cleaning_ports_list_fail_invalidates_endpoint(
+            self, list_mock, invalidate_mock):
+        list_mock.side_effect = neutron_client_exc.ConnectionFailed
+        api = dhcp_factory.DHCPFactory().provider
+
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            self.assertRaises(exception.NodeCleaningFailure,
+                              api.delete_cleaning_ports,
+                              task)
+        invalidate_mock.assert_called_once_with(service_type='network')
+
     @mock.patch.object(client.Client, 'delete_port')
     @mock.patch.object(client.Client, 'list_ports')
     def test_delete_cleaning_ports_delete_fail(self, list_mock, delete_mock):
@@ -33,6 +33,7 @@ from ironic.conductor import utils as manager_utils
 from ironic.drivers.modules import deploy_utils
 from ironic.drivers.modules.ilo import boot as ilo_boot
 from ironic.drivers.modules.ilo import common as ilo_common
+from ironic.drivers.modules import image_cache
 from ironic.drivers import utils as driver_utils
 from ironic.tests.unit.conductor import mgr_utils
 from ironic.tests.unit.db import base as db_base
@@ -172,7 +173,8 @@ class IloBootPrivateMethodsTestCase(db_base.DbTestCase):
 
     @mock.patch.object(tempfile, 'NamedTemporaryFile', spec_set=True,
                        autospec=True)
-    @mock.patch.object(images, 'create_boot_iso', spec_set=True, autospec=True)
+    @mock.patch.object(image_cache, 'BootImageCache', spec_set=True,
+                       autospec=True)
     @mock.patch.object(swift, 'SwiftAPI', spec_set=True, autospec=True)
     @mock.patch.object(ilo_boot, '_get_boot_iso_object_name', spec_set=True,
                        autospec=True)
@@ -185,7 +187,8 @@ class IloBootPrivateMethodsTestCase(db_base.DbTestCase):
     def test__get_boot_iso_create(self, deploy_info_mock, image_props_mock,
                                   capability_mock, boot_object_name_mock,
                                   swift_api_mock,
-                                  create_boot_iso_mock, tempfile_mock):
+                                  cache_mock, tempfile_mock):
+        create_boot_iso_mock = cache_mock.return_value.create_boot_iso
         CONF.ilo.swift_ilo_container = 'ilo-cont'
         CONF.pxe.pxe_append_params = 'kernel-params'
 
@@ -230,7 +233,8 @@ class IloBootPrivateMethodsTestCase(db_base.DbTestCase):
                        autospec=True)
     @mock.patch.object(tempfile, 'NamedTemporaryFile', spec_set=True,
                        autospec=True)
-    @mock.patch.object(images, 'create_boot_iso', spec_set=True, autospec=True)
+    @mock.patch.object(image_cache, 'BootImageCache', spec_set=True,
+                       autospec=True)
     @mock.patch.object(ilo_boot, '_get_boot_iso_object_name', spec_set=True,
                        autospec=True)
     @mock.patch.object(driver_utils, 'get_node_capability', spec_set=True,
@@ -242,8 +246,9 @@ class IloBootPrivateMethodsTestCase(db_base.DbTestCase):
     def test__get_boot_iso_recreate_boot_iso_use_webserver(
             self, deploy_info_mock, image_props_mock,
             capability_mock, boot_object_name_mock,
-            create_boot_iso_mock, tempfile_mock,
+            cache_mock, tempfile_mock,
             copy_file_mock):
+        create_boot_iso_mock = cache_mock.return_value.create_boot_iso
         CONF.ilo.swift_ilo_container = 'ilo-cont'
         CONF.ilo.use_web_server_for_images = True
         CONF.deploy.http_url = "http://10.10.1.30/httpboot"
@@ -298,7 +303,8 @@ class IloBootPrivateMethodsTestCase(db_base.DbTestCase):
                        autospec=True)
     @mock.patch.object(tempfile, 'NamedTemporaryFile', spec_set=True,
                        autospec=True)
-    @mock.patch.object(images, 'create_boot_iso', spec_set=True, autospec=True)
+    @mock.patch.object(image_cache, 'BootImageCache', spec_set=True,
+                       autospec=True)
     @mock.patch.object(ilo_boot, '_get_boot_iso_object_name', spec_set=True,
                        autospec=True)
     @mock.patch.object(driver_utils, 'get_node_capability', spec_set=True,
@@ -310,8 +316,9 @@ class IloBootPrivateMethodsTestCase(db_base.DbTestCase):
     def test__get_boot_iso_create_use_webserver_true_ramdisk_webserver(
             self, deploy_info_mock, image_props_mock,
             capability_mock, boot_object_name_mock,
-            create_boot_iso_mock, tempfile_mock,
+            cache_mock, tempfile_mock,
             copy_file_mock):
+        create_boot_iso_mock = cache_mock.return_value.create_boot_iso
         CONF.ilo.swift_ilo_container = 'ilo-cont'
         CONF.ilo.use_web_server_for_images = True
         CONF.deploy.http_url = "http://10.10.1.30/httpboot"
@@ -34,6 +34,7 @@ from ironic.common import states
 from ironic.conductor import task_manager
 from ironic.conductor import utils as manager_utils
 from ironic.drivers.modules import deploy_utils
+from ironic.drivers.modules import image_cache
 from ironic.drivers.modules.irmc import boot as irmc_boot
 from ironic.drivers.modules.irmc import common as irmc_common
 from ironic.tests.unit.conductor import mgr_utils
@@ -326,7 +327,8 @@ class IRMCDeployPrivateMethodsTestCase(db_base.DbTestCase):
         expected = "boot-%s.iso" % self.node.uuid
         self.assertEqual(expected, actual)
 
-    @mock.patch.object(images, 'create_boot_iso', spec_set=True, autospec=True)
+    @mock.patch.object(image_cache, 'BootImageCache', spec_set=True,
+                       autospec=True)
     @mock.patch.object(deploy_utils, 'get_boot_mode_for_deploy', spec_set=True,
                        autospec=True)
     @mock.patch.object(images, 'get_image_properties', spec_set=True,
@@ -340,7 +342,8 @@ class IRMCDeployPrivateMethodsTestCase(db_base.DbTestCase):
                                     fetch_mock,
                                     image_props_mock,
                                     boot_mode_mock,
-                                    create_boot_iso_mock):
+                                    cache_mock):
+        create_boot_iso_mock = cache_mock.return_value.create_boot_iso
         deploy_info_mock.return_value = {'irmc_boot_iso': 'irmc_boot.iso'}
         with task_manager.acquire(self.context, self.node.uuid) as task:
             irmc_boot._prepare_boot_iso(task, 'root-uuid')
@@ -354,7 +357,8 @@ class IRMCDeployPrivateMethodsTestCase(db_base.DbTestCase):
             self.assertEqual('irmc_boot.iso',
                              task.node.driver_internal_info['irmc_boot_iso'])
 
-    @mock.patch.object(images, 'create_boot_iso', spec_set=True, autospec=True)
+    @mock.patch.object(image_cache, 'BootImageCache', spec_set=True,
+                       autospec=True)
     @mock.patch.object(deploy_utils, 'get_boot_mode_for_deploy', spec_set=True,
                        autospec=True)
     @mock.patch.object(images, 'get_image_properties', spec_set=True,
@@ -371,7 +375,8 @@ class IRMCDeployPrivateMethodsTestCase(db_base.DbTestCase):
                                         fetch_mock,
                                         image_props_mock,
                                         boot_mode_mock,
-                                        create_boot_iso_mock):
+                                        cache_mock):
+        create_boot_iso_mock = cache_mock.return_value.create_boot_iso
 
         CONF.irmc.remote_image_share_root = '/'
         image = '733d1c44-a2ea-414b-aca7-69decf20d810'
@@ -395,7 +400,8 @@ class IRMCDeployPrivateMethodsTestCase(db_base.DbTestCase):
             self.assertEqual("boot-%s.iso" % self.node.uuid,
                              task.node.driver_internal_info['irmc_boot_iso'])
 
-    @mock.patch.object(images, 'create_boot_iso', spec_set=True, autospec=True)
+    @mock.patch.object(image_cache, 'BootImageCache', spec_set=True,
+                       autospec=True)
     @mock.patch.object(deploy_utils, 'get_boot_mode_for_deploy', spec_set=True,
                        autospec=True)
     @mock.patch.object(images, 'get_image_properties', spec_set=True,
@@ -409,7 +415,8 @@ class IRMCDeployPrivateMethodsTestCase(db_base.DbTestCase):
                                          fetch_mock,
                                          image_props_mock,
                                          boot_mode_mock,
-                                         create_boot_iso_mock):
+                                         cache_mock):
+        create_boot_iso_mock = cache_mock.return_value.create_boot_iso
         CONF.pxe.pxe_append_params = 'kernel-params'
 
         deploy_info_mock.return_value = {'image_source': 'image-uuid'}
@@ -17,21 +17,28 @@
 """Tests for ImageCache class and helper functions."""
 
 import datetime
+import errno
+import hashlib
 import os
 import tempfile
 import time
 import uuid
 
+from ironic_lib import disk_utils
 import mock
 from oslo_utils import uuidutils
 import six
+import webtest
 
 from ironic.common import exception
 from ironic.common import image_service
 from ironic.common import images
+from ironic.common import metrics
 from ironic.common import utils
 from ironic.drivers.modules import image_cache
 from ironic.tests import base
+from ironic.tests.unit.db import base as db_base
+from ironic.tests.unit.db import utils as db_utils
 
 
 def touch(filename):
@@ -50,7 +57,8 @@ class TestImageCacheFetch(base.TestCase):
         self.master_path = os.path.join(self.master_dir, self.uuid)
 
     @mock.patch.object(image_cache, '_fetch', autospec=True)
-    @mock.patch.object(image_cache.ImageCache, 'clean_up', autospec=True)
+    @mock.patch.object(image_cache.ImageCache, '_clean_up_in_background',
+                       autospec=True)
     @mock.patch.object(image_cache.ImageCache, '_download_image',
                        autospec=True)
     def test_fetch_image_no_master_dir(self, mock_download, mock_clean_up,
@@ -62,7 +70,8 @@ class TestImageCacheFetch(base.TestCase):
             None, self.uuid, self.dest_path, True)
         self.assertFalse(mock_clean_up.called)
 
-    @mock.patch.object(image_cache.ImageCache, 'clean_up', autospec=True)
+    @mock.patch.object(image_cache.ImageCache, '_clean_up_in_background',
+                       autospec=True)
     @mock.patch.object(image_cache.ImageCache, '_download_image',
                        autospec=True)
     @mock.patch.object(os, 'link', autospec=True)
@@ -81,7 +90,8 @@ class TestImageCacheFetch(base.TestCase):
         self.assertFalse(mock_download.called)
         self.assertFalse(mock_clean_up.called)
 
-    @mock.patch.object(image_cache.ImageCache, 'clean_up', autospec=True)
+    @mock.patch.object(image_cache.ImageCache, '_clean_up_in_background',
+                       autospec=True)
     @mock.patch.object(image_cache.ImageCache, '_download_image',
                        autospec=True)
     @mock.patch.object(os, 'link', autospec=True)
@@ -100,7 +110,8 @@ class TestImageCacheFetch(base.TestCase):
         self.assertFalse(mock_download.called)
         self.assertFalse(mock_clean_up.called)
 
-    @mock.patch.object(image_cache.ImageCache, 'clean_up', autospec=True)
+    @mock.patch.object(image_cache.ImageCache, '_clean_up_in_background',
+                       autospec=True)
     @mock.patch.object(image_cache.ImageCache, '_download_image',
                        autospec=True)
     @mock.patch.object(os, 'link', autospec=True)
@@ -121,7 +132,8 @@ class TestImageCacheFetch(base.TestCase):
             ctx=None, force_raw=True)
         mock_clean_up.assert_called_once_with(self.cache)
 
-    @mock.patch.object(image_cache.ImageCache, 'clean_up', autospec=True)
+    @mock.patch.object(image_cache.ImageCache, '_clean_up_in_background',
+                       autospec=True)
     @mock.patch.object(image_cache.ImageCache, '_download_image',
                        autospec=True)
     @mock.patch.object(os, 'link', autospec=True)
@@ -142,7 +154,8 @@ class TestImageCacheFetch(base.TestCase):
             ctx=None, force_raw=True)
         mock_clean_up.assert_called_once_with(self.cache)
 
-    @mock.patch.object(image_cache.ImageCache, 'clean_up', autospec=True)
+    @mock.patch.object(image_cache.ImageCache, '_clean_up_in_background',
+                       autospec=True)
     @mock.patch.object(image_cache.ImageCache, '_download_image',
                        autospec=True)
     def test_fetch_image_not_uuid(self, mock_download, mock_clean_up):
@@ -156,6 +169,31 @@ class TestImageCacheFetch(base.TestCase):
             ctx=None, force_raw=True)
         self.assertTrue(mock_clean_up.called)
 
+    @mock.patch.object(image_cache.ImageCache, '_clean_up_in_background',
+                       autospec=True)
+    @mock.patch.object(image_cache, '_fetch', autospec=True)
+    def test_cache_image(self, mock_fetch, mock_clean_up):
+        mock_fetch.side_effect = lambda ctx, href, path, *args: touch(path)
+        pin_until = time.time() + 600
+        self.assertTrue(self.cache.cache_image(self.uuid,
+                                               pin_until=pin_until))
+        self.assertTrue(os.path.isfile(self.master_path))
+        self.assertEqual(1, os.stat(self.master_path).st_nlink)
+        self.assertTrue(self.cache._index.is_pinned(self.uuid))
+        mock_clean_up.assert_called_once_with(self.cache)
+
+        # Already cached
+        self.assertFalse(self.cache.cache_image(self.uuid))
+        self.assertEqual(1, mock_fetch.call_count)
+        self.assertEqual(1, mock_clean_up.call_count)
+
+    @mock.patch.object(image_cache.ImageCache, '_download_image',
+                       autospec=True)
+    def test_cache_image_no_master_dir(self, mock_download):
+        self.cache.master_dir = None
+        self.assertFalse(self.cache.cache_image(self.uuid))
+        self.assertFalse(mock_download.called)
+
     @mock.patch.object(image_cache, '_fetch', autospec=True)
     def test__download_image(self, mock_fetch):
         def _fake_fetch(ctx, uuid, tmp_path, *args):
@@ -174,6 +212,90 @@ class TestImageCacheFetch(base.TestCase):
         with open(self.dest_path) as fp:
             self.assertEqual("TEST", fp.read())
 
+    @mock.patch.object(image_cache, '_fetch', autospec=True)
+    def test__download_image_records_checksums(self, mock_fetch):
+        def _fake_fetch(ctx, uuid, tmp_path, *args):
+            touch(tmp_path)
+            return {'md5': 'fake-md5'}
+
+        mock_fetch.side_effect = _fake_fetch
+        self.cache._download_image(self.uuid, self.master_path, self.dest_path)
+        self.assertEqual({'md5': 'fake-md5'},
+                         self.cache.get_checksums(self.uuid))
+        self.assertEqual({}, self.cache.get_checksums('other-uuid'))
+
+        image_cache._unlink_master(self.master_path)
+        self.assertFalse(os.path.exists(
+            image_cache._get_metadata_path(self.master_path)))
+        self.assertEqual({}, self.cache.get_checksums(self.uuid))
+
+
+class TestCacheIndex(base.TestCase):
+
+    def setUp(self):
+        super(TestCacheIndex, self).setUp()
+        self.master_dir = tempfile.mkdtemp()
+        for file_name, content in (('old', 'XX'), ('new', 'XXX')):
+            with open(os.path.join(self.master_dir, file_name), 'w') as fp:
+                fp.write(content)
+        os.utime(os.path.join(self.master_dir, 'new'),
+                 (time.time() + 100, time.time() + 100))
+        os.mkdir(os.path.join(self.master_dir, 'tmp-dir'))
+        self.index = image_cache._get_index(self.master_dir)
+
+    def test_build(self):
+        self.assertEqual(5, self.index.total_size)
+        self.assertEqual(['old', 'new'],
+                         [item[0] for item in self.index.listing()])
+        self.assertEqual([2, 3], [item[2] for item in self.index.listing()])
+        self.assertIs(self.index, image_cache._get_index(self.master_dir))
+
+    def test_touch(self):
+        self.index.touch('old', time.time() + 200)
+        self.assertEqual(['new', 'old'],
+                         [item[0] for item in self.index.listing()])
+
+    def test_touch_unknown(self):
+        touch(os.path.join(self.master_dir, 'other'))
+        self.index.touch('other')
+        self.index.touch('missing')
+        self.assertEqual(['old', 'other', 'new'],
+                         [item[0] for item in self.index.listing()])
+
+    def test_add_and_unlink(self):
+        master_path = os.path.join(self.master_dir, 'image')
+        with open(master_path, 'w') as fp:
+            fp.write('XXXX')
+        self.index.add('image', {'md5': 'fake-md5'})
+        self.assertEqual(9, self.index.total_size)
+        self.assertEqual({'md5': 'fake-md5'},
+                         self.index.get_checksums('image'))
+
+        image_cache._unlink_master(master_path)
+        self.assertEqual(5, self.index.total_size)
+        self.assertEqual({}, self.index.get_checksums('image'))
+
+    @mock.patch.object(image_cache, '_read_metadata', autospec=True)
+    def test_get_checksums_read_once(self, mock_read):
+        mock_read.return_value = {'checksums': {'md5': 'fake-md5'}}
+        for i in range(2):
+            self.assertEqual({'md5': 'fake-md5'},
+                             self.index.get_checksums('old'))
+        mock_read.assert_called_once_with(
+            os.path.join(self.master_dir, 'old'))
+
+    def test_needs_eviction(self):
+        self.assertFalse(self.index.needs_eviction(5, 600))
+        self.assertTrue(self.index.needs_eviction(4, 600))
+        with mock.patch.object(time, 'time', lambda: 10 ** 10):
+            self.assertTrue(self.index.needs_eviction(5, 600))
+
+    def test_needs_eviction_pinned(self):
+        for file_name in ('old', 'new'):
+            self.index.pin(file_name, 10 ** 10 + 1)
+        with mock.patch.object(time, 'time', lambda: 10 ** 10):
+            self.assertFalse(self.index.needs_eviction(5, 600))
+
 
 @mock.patch.object(os, 'unlink', autospec=True)
 class TestUpdateImages(base.TestCase):
@@ -271,7 +393,7 @@ class TestUpdateImages(base.TestCase):
         res = image_cache._delete_master_path_if_stale(self.master_path, href,
                                                        None)
         mock_gis.assert_called_once_with(href, context=None)
-        mock_unlink.assert_called_once_with(self.master_path)
+        mock_unlink.assert_any_call(self.master_path)
         self.assertFalse(res)
 
     def test__delete_dest_path_if_stale_no_dest(self, mock_unlink):
@@ -330,11 +452,11 @@ class TestImageCacheCleanUp(base.TestCase):
         mock_clean_size.assert_called_once_with(self.cache, mock.ANY, None)
         survived = mock_clean_size.call_args[0][1]
         self.assertEqual(1, len(survived))
-        self.assertEqual(files[0], survived[0][0])
+        self.assertEqual('0', survived[0][0])
         # NOTE(dtantsur): do not compare milliseconds
         self.assertEqual(int(new_current_time - 100), int(survived[0][1]))
-        self.assertEqual(int(new_current_time - 100),
-                         int(survived[0][2].st_mtime))
+        self.assertEqual(0, survived[0][2])
+        self.assertFalse(os.path.exists(files[1]))
 
     @mock.patch.object(image_cache.ImageCache, '_clean_up_ensure_cache_size',
                        autospec=True)
@@ -373,6 +495,7 @@ class TestImageCacheCleanUp(base.TestCase):
     @mock.patch.object(image_cache.ImageCache, '_clean_up_too_old',
                        autospec=True)
     def test_clean_up_ensure_cache_size(self, mock_clean_ttl):
+        self.config(image_cache_low_watermark=100)
         mock_clean_ttl.side_effect = lambda *xx: xx[1:]
         # NOTE(dtantsur): Cache size in test is 10 bytes, we create 6 files
         # with 3 bytes each and expect 3 to be deleted
@@ -397,6 +520,30 @@ class TestImageCacheCleanUp(base.TestCase):
 
         mock_clean_ttl.assert_called_once_with(mock.ANY, mock.ANY, None)
 
+    @mock.patch.object(image_cache.ImageCache, '_clean_up_too_old',
+                       autospec=True)
+    def test_clean_up_ensure_cache_size_low_watermark(self, mock_clean_ttl):
+        mock_clean_ttl.side_effect = lambda *xx: xx[1:]
+        # NOTE: Cache size is 10 bytes and the low watermark 80%, we
+        # create 6 files with 3 bytes each and expect 4 to be deleted
+        files = [os.path.join(self.master_dir, str(i))
+                 for i in range(6)]
+        for filename in files:
+            with open(filename, 'w') as fp:
+                fp.write('123')
+        new_current_time = time.time() + 100
+        for filename in files[:2]:
+            os.utime(filename, (new_current_time, new_current_time))
+
+        with mock.patch.object(time, 'time', lambda: new_current_time):
+            self.cache.clean_up()
+
+        for filename in files[:2]:
+            self.assertTrue(os.path.exists(filename))
+        for filename in files[2:]:
+            self.assertFalse(os.path.exists(filename))
+        self.assertEqual(6, self.cache._index.total_size)
+
     @mock.patch.object(image_cache.ImageCache, '_clean_up_too_old',
                        autospec=True)
     def test_clean_up_ensure_cache_size_with_amount(self, mock_clean_ttl):
@@ -443,6 +590,79 @@ class TestImageCacheCleanUp(base.TestCase):
         self.assertTrue(mock_log.called)
         mock_clean_ttl.assert_called_once_with(mock.ANY, mock.ANY, None)
 
+    def test_clean_up_does_not_list_directory(self):
+        touch(os.path.join(self.master_dir, 'image'))
+        self.cache.clean_up()
+        with mock.patch.object(os, 'listdir', autospec=True) as mock_listdir:
+            self.cache.clean_up()
+            image_cache.ImageCache(self.master_dir, 10, 600).clean_up()
+        self.assertFalse(mock_listdir.called)
+
+    def test_evict_in_use(self):
+        master_path = os.path.join(self.master_dir, 'image')
+        touch(master_path)
+        os.link(master_path, os.path.join(tempfile.mkdtemp(), 'dest'))
+        self.assertFalse(self.cache._evict('image'))
+        self.assertTrue(os.path.exists(master_path))
+
+    def test_evict_used_since_threshold(self):
+        master_path = os.path.join(self.master_dir, 'image')
+        touch(master_path)
+        self.assertFalse(self.cache._evict('image', time.time() - 600))
+        self.assertTrue(os.path.exists(master_path))
+
+    def test_evict_pinned(self):
+        master_path = os.path.join(self.master_dir, 'image')
+        touch(master_path)
+        self.cache._index.pin('image', time.time() + 600)
+        self.assertFalse(self.cache._evict('image'))
+        self.assertTrue(os.path.exists(master_path))
+
+        self.cache._index.pin('image', time.time() - 600)
+        self.assertFalse(self.cache._evict('image'))
+        with mock.patch.object(time, 'time', lambda: 10 ** 10):
+            self.assertTrue(self.cache._evict('image'))
+        self.assertFalse(os.path.exists(master_path))
+
+    def test_evict_already_deleted(self):
+        master_path = os.path.join(self.master_dir, 'image')
+        touch(master_path)
+        index = self.cache._index
+        os.unlink(master_path)
+        self.assertFalse(self.cache._evict('image'))
+        self.assertEqual([], index.listing())
+
+    @mock.patch.object(image_cache.eventlet, 'spawn_n', autospec=True)
+    def test_clean_up_in_background(self, mock_spawn):
+        with open(os.path.join(self.master_dir, 'image'), 'w') as fp:
+            fp.write('X' * 11)
+        self.cache._clean_up_in_background()
+        mock_spawn.assert_called_once_with(self.cache._evict_in_background)
+        # Only one eviction runs at a time
+        self.cache._clean_up_in_background()
+        self.assertEqual(1, mock_spawn.call_count)
+
+        with mock.patch.object(self.cache, 'clean_up',
+                               autospec=True) as mock_clean_up:
+            self.cache._evict_in_background()
+        mock_clean_up.assert_called_once_with()
+        self.assertFalse(self.cache._index.evicting)
+
+    @mock.patch.object(image_cache.eventlet, 'spawn_n', autospec=True)
+    def test_clean_up_in_background_not_needed(self, mock_spawn):
+        touch(os.path.join(self.master_dir, 'image'))
+        self.cache._clean_up_in_background()
+        self.assertFalse(mock_spawn.called)
+
+    @mock.patch.object(image_cache.LOG, 'exception', autospec=True)
+    def test_evict_in_background_error(self, mock_log):
+        self.cache._index.evicting = True
+        with mock.patch.object(self.cache, 'clean_up', autospec=True,
+                               side_effect=OSError()):
+            self.cache._evict_in_background()
+        self.assertTrue(mock_log.called)
+        self.assertFalse(self.cache._index.evicting)
+
     @mock.patch.object(utils, 'rmtree_without_raise', autospec=True)
     @mock.patch.object(image_cache, '_fetch', autospec=True)
     def test_temp_images_not_cleaned(self, mock_fetch, mock_rmtree):
@@ -481,6 +701,26 @@ class TestImageCacheCleanUp(base.TestCase):
         self.cache.clean_up(amount=15)
         self.assertTrue(mock_log.called)
 
+    @mock.patch.object(image_cache, '_cache_cleanup_list', autospec=True)
+    def test_get_caches(self, mock_cleanup_list):
+
+        class InstanceCache(image_cache.ImageCache):
+            image_kind = image_cache.INSTANCE_IMAGES
+
+            def __init__(self, master_dir=self.master_dir):
+                super(InstanceCache, self).__init__(master_dir, 1, 1)
+
+        class DisabledCache(InstanceCache):
+            def __init__(self):
+                super(DisabledCache, self).__init__(None)
+
+        mock_cleanup_list.__iter__.return_value = [
+            (50, InstanceCache), (40, DisabledCache),
+            (25, image_cache.ImageCache)]
+        caches = image_cache.get_caches(image_cache.INSTANCE_IMAGES)
+        self.assertEqual([InstanceCache], [type(c) for c in caches])
+        self.assertEqual([], image_cache.get_caches(image_cache.DEPLOY_IMAGES))
+
     def test_cleanup_ordering(self):
 
         class ParentCache(image_cache.ImageCache):
@@ -509,6 +749,16 @@ class TestImageCacheCleanUp(base.TestCase):
         third_item_actual = image_cache._cache_cleanup_list[2][1]
         self.assertEqual(item_possibilities[0], third_item_actual)
 
+    @mock.patch.object(image_cache, '_cache_cleanup_list', [])
+    def test_cleanup_twice(self):
+
+        class Cache(image_cache.ImageCache):
+            pass
+
+        image_cache.cleanup(priority=10)(Cache)
+        image_cache.cleanup(priority=10)(Cache)
+        self.assertEqual([(10, Cache)], image_cache._cache_cleanup_list)
+
 
 @mock.patch.object(image_cache, '_cache_cleanup_list', autospec=True)
 @mock.patch.object(os, 'statvfs', autospec=True)
@@ -681,17 +931,483 @@ class CleanupImageCacheTestCase(base.TestCase):
         self.assertEqual(mock_statvfs_calls_expected, mock_statvfs.mock_calls)
 
 
+class SharedImageCache(image_cache.ImageCache):
+    image_kind = image_cache.INSTANCE_IMAGES
+
+
+def _fake_fetch(ctx, href, path, force_raw):
+    with open(path, 'wb') as f:
+        f.write(b'x' * 10)
+    return {'sha256': 'def'}
+
+
+@mock.patch.object(image_cache, '_peer_server', None)
+@mock.patch.dict(image_cache._peer_dirs)
+class TestPeerServer(base.TestCase):
+
+    def setUp(self):
+        super(TestPeerServer, self).setUp()
+        self.master_dir = tempfile.mkdtemp()
+        self.addCleanup(utils.rmtree_without_raise, self.master_dir)
+        image_cache._peer_dirs[image_cache.INSTANCE_IMAGES] = self.master_dir
+        with open(os.path.join(self.master_dir, 'image-uuid'), 'wb') as f:
+            f.write(b'0123456789')
+        self.server = image_cache.PeerServer('cdr1')
+        self.app = webtest.TestApp(self.server)
+        self.path = '/%s/instance/' % self.server.token
+
+    def test_get(self):
+        response = self.app.get(self.path + 'image-uuid')
+        self.assertEqual(b'0123456789', response.body)
+        self.assertEqual('bytes', response.headers['Accept-Ranges'])
+
+    def test_get_range(self):
+        response = self.app.get(self.path + 'image-uuid',
+                                headers={'Range': 'bytes=2-5'}, status=206)
+        self.assertEqual(b'2345', response.body)
+
+    def test_head(self):
+        response = self.app.head(self.path + 'image-uuid')
+        self.assertEqual('10', response.headers['Content-Length'])
+
+    def test_not_found(self):
+        for path in ('/wrong-token/instance/image-uuid',
+                     self.path + 'missing',
+                     self.path + '.metadata',
+                     '/%s/deploy/image-uuid' % self.server.token,
+                     self.path + 'image-uuid/x',
+                     '/'):
+            self.app.get(path, status=404)
+
+    def test_post(self):
+        self.app.post(self.path + 'image-uuid', status=404)
+
+    @mock.patch.object(image_cache.eventlet, 'spawn', autospec=True)
+    @mock.patch.object(image_cache.eventlet, 'listen', autospec=True)
+    @mock.patch.object(image_cache, '_withdraw_all', autospec=True)
+    def test_start_stop(self, mock_withdraw, mock_listen, mock_spawn):
+        self.config(enabled=True, port=6390, group='image_cache_peers')
+        self.config(my_ip='192.0.2.1')
+        mock_listen.return_value.getsockname.return_value = ('0.0.0.0',
+                                                             6390)
+        image_cache.start_peer_server('cdr1')
+        server = image_cache._peer_server
+        self.assertEqual('cdr1', server.hostname)
+        self.assertEqual('http://192.0.2.1:6390', server.url)
+        mock_listen.assert_called_once_with(('0.0.0.0', 6390))
+        mock_withdraw.assert_called_once_with('cdr1')
+        self.assertEqual(
+            'http://192.0.2.1:6390/%s/instance/image-uuid' % server.token,
+            server.get_image_url('instance', 'image-uuid'))
+        image_cache.stop_peer_server()
+        mock_spawn.return_value.kill.assert_called_once_with()
+        self.assertEqual(2, mock_withdraw.call_count)
+        self.assertIsNone(image_cache._peer_server)
+
+    @mock.patch.object(image_cache.eventlet, 'listen', autospec=True)
+    def test_start_disabled(self, mock_listen):
+        image_cache.start_peer_server('cdr1')
+        self.assertFalse(mock_listen.called)
+        self.assertIsNone(image_cache._peer_server)
+
+
+@mock.patch.object(image_cache, '_peer_server', None)
+@mock.patch.dict(image_cache._peer_dirs)
+class TestPeerSharing(db_base.DbTestCase):
+
+    def setUp(self):
+        super(TestPeerSharing, self).setUp()
+        self.config(enabled=True, group='image_cache_peers')
+        self.config(host='cdr1')
+        self.dbapi.register_conductor(
+            db_utils.get_test_conductor(hostname='cdr2'))
+        self.master_dir = tempfile.mkdtemp()
+        self.addCleanup(utils.rmtree_without_raise, self.master_dir)
+        self.cache = SharedImageCache(self.master_dir, 1024, 60)
+        self.uuid = uuidutils.generate_uuid()
+        self.master_path = os.path.join(self.master_dir, self.uuid)
+        self.dest_path = os.path.join(self.master_dir, 'dest')
+        metrics.get_registry().reset()
+        self.addCleanup(metrics.get_registry().reset)
+
+    def _announce(self, **kwargs):
+        kwargs.setdefault('file_checksums',
+                          {'md5': hashlib.md5(b'x' * 1024).hexdigest()})
+        values = db_utils.get_test_cached_image(file_name=self.uuid,
+                                                hostname='cdr2', **kwargs)
+        self.dbapi.announce_cached_image(values)
+
+    def _metrics(self):
+        return dict((s['name'], (s['labels'], s['count']))
+                    for s in metrics.get_registry().snapshot(
+                        prefix='image_cache.'))
+
+    @mock.patch.object(image_cache, '_fetch', autospec=True)
+    @mock.patch.object(image_service.HttpImageService, 'download',
+                       autospec=True)
+    def test_download_from_peer(self, mock_download, mock_fetch):
+        def _download(service, url, image_file):
+            image_file.write(b'x' * 1024)
+        mock_download.side_effect = _download
+        self._announce()
+
+        self.cache._download_image(self.uuid, self.master_path,
+                                   self.dest_path)
+
+        mock_download.assert_called_once_with(
+            mock.ANY, db_utils.get_test_cached_image()['url'], mock.ANY)
+        self.assertFalse(mock_fetch.called)
+        self.assertEqual(1024, os.path.getsize(self.dest_path))
+        self.assertEqual({'md5': 'abc'}, self.cache.get_checksums(self.uuid))
+        self.assertEqual(
+            {image_cache.PEER_FETCH_METRIC: ({'result': 'hit'}, 1),
+             image_cache.PEER_BYTES_METRIC: ({}, 1024)},
+            self._metrics())
+
+    @mock.patch.object(image_cache, '_fetch', autospec=True)
+    @mock.patch.object(image_service.HttpImageService, 'download',
+                       autospec=True)
+    def test_download_peer_fails(self, mock_download, mock_fetch):
+        mock_download.side_effect = exception.ImageDownloadFailed(
+            image_href='url', reason='boom')
+        mock_fetch.side_effect = _fake_fetch
+        self._announce()
+
+        self.cache._download_image(self.uuid, self.master_path, None)
+
+        mock_fetch.assert_called_once_with(None, self.uuid, mock.ANY, True)
+        self.assertEqual(
+            {image_cache.PEER_FETCH_METRIC: ({'result': 'error'}, 1)},
+            self._metrics())
+
+    @mock.patch.object(image_cache, '_fetch', autospec=True)
+    @mock.patch.object(image_service.HttpImageService, 'download',
+                       autospec=True)
+    def test_download_peer_size_mismatch(self, mock_download, mock_fetch):
+        def _download(service, url, image_file):
+            image_file.write(b'x' * 10)
+        mock_download.side_effect = _download
+        mock_fetch.side_effect = _fake_fetch
+        self._announce()
+
+        self.cache._download_image(self.uuid, self.master_path, None)
+
+        mock_fetch.assert_called_once_with(None, self.uuid, mock.ANY, True)
+
+    @mock.patch.object(image_cache, '_fetch', autospec=True)
+    @mock.patch.object(image_service.HttpImageService, 'download',
+                       autospec=True)
+    def test_download_peer_checksum_mismatch(self, mock_download,
+                                             mock_fetch):
+        def _download(service, url, image_file):
+            image_file.write(b'y' * 1024)
+        mock_download.side_effect = _download
+        mock_fetch.side_effect = _fake_fetch
+        self._announce()
+
+        self.cache._download_image(self.uuid, self.master_path, None)
+
+        mock_fetch.assert_called_once_with(None, self.uuid, mock.ANY, True)
+        self.assertEqual({'sha256': 'def'},
+                         self.cache.get_checksums(self.uuid))
+        self.assertEqual(
+            {image_cache.PEER_FETCH_METRIC: ({'result': 'error'}, 1)},
+            self._metrics())
+
+    @mock.patch.object(image_cache, '_fetch', autospec=True)
+    @mock.patch.object(image_service.HttpImageService, 'download',
+                       autospec=True)
+    def test_download_peer_not_verifiable(self, mock_download, mock_fetch):
+        mock_fetch.side_effect = _fake_fetch
+        self._announce(file_checksums={'unknown': 'abc'})
+
+        self.cache._download_image(self.uuid, self.master_path, None)
+
+        self.assertFalse(mock_download.called)
+        mock_fetch.assert_called_once_with(None, self.uuid, mock.ANY, True)
+
+    @mock.patch.object(image_cache, '_fetch', autospec=True)
+    @mock.patch.object(image_service.HttpImageService, 'download',
+                       autospec=True)
+    def test_download_no_peer(self, mock_download, mock_fetch):
+        mock_fetch.side_effect = _fake_fetch
+        # Only converted images are held by the conductor
+        self._announce(raw=False)
+
+        self.cache._download_image(self.uuid, self.master_path, None)
+
+        self.assertFalse(mock_download.called)
+        mock_fetch.assert_called_once_with(None, self.uuid, mock.ANY, True)
+        self.assertEqual(
+            {image_cache.PEER_FETCH_METRIC: ({'result': 'miss'}, 1)},
+            self._metrics())
+
+    @mock.patch.object(image_cache, '_fetch_from_peers', autospec=True)
+    @mock.patch.object(image_cache, '_fetch', autospec=True)
+    def test_download_not_shared(self, mock_fetch, mock_fetch_peers):
+        mock_fetch.side_effect = _fake_fetch
+        unshared_cache = image_cache.ImageCache(self.master_dir, 1024, 60)
+        for enabled, cache, href in (
+                (True, self.cache, 'http://example.com/image.img'),
+                (True, unshared_cache, self.uuid),
+                (False, self.cache, self.uuid)):
+            self.config(enabled=enabled, group='image_cache_peers')
+            cache._download_image(href, self.master_path, None)
+            image_cache._unlink_master(self.master_path)
+        self.assertFalse(mock_fetch_peers.called)
+        self.assertEqual(3, mock_fetch.call_count)
+
+    @mock.patch.object(image_cache, '_fetch', autospec=True)
+    def test_announce_and_withdraw(self, mock_fetch):
+        mock_fetch.side_effect = _fake_fetch
+        server = image_cache.PeerServer('cdr2')
+        server.url = 'http://192.0.2.2:6388'
+
+        with mock.patch.object(image_cache, '_peer_server', server):
+            self.cache._download_image(self.uuid, self.master_path, None)
+            peers = self.dbapi.get_cached_image_peers('instance', self.uuid,
+                                                      True)
+            self.assertEqual(1, len(peers))
+            self.assertEqual(10, peers[0].size)
+            self.assertEqual({'sha256': 'def'}, peers[0].checksums)
+            # The image was converted, its file is hashed again
+            self.assertEqual({'md5': hashlib.md5(b'x' * 10).hexdigest()},
+                             peers[0].file_checksums)
+            self.assertEqual(server.get_image_url('instance', self.uuid),
+                             peers[0].url)
+
+            image_cache._unlink_master(self.master_path)
+            self.assertEqual([], self.dbapi.get_cached_image_peers(
+                'instance', self.uuid, True))
+
+    @mock.patch.object(images, 'fetch', autospec=True)
+    def test_origin_bandwidth_saved(self, mock_origin):
+        # A conductor holding the image serves it over HTTP on the loopback
+        # interface; the image service is a stand-in counting its bytes.
+        self.config(host_ip='127.0.0.1', port=0, group='image_cache_peers')
+        self.config(my_ip='127.0.0.1')
+        content = os.urandom(1024 * 1024)
+        origin_bytes = []
+
+        def _origin(ctx, href, path, force_raw=False):
+            with open(path, 'wb') as f:
+                f.write(content)
+            origin_bytes.append(len(content))
+            return {'md5': 'abc'}
+        mock_origin.side_effect = _origin
+
+        peer_dir = tempfile.mkdtemp()
+        self.addCleanup(utils.rmtree_without_raise, peer_dir)
+        with open(os.path.join(peer_dir, self.uuid), 'wb') as f:
+            f.write(content)
+        server = image_cache.PeerServer('cdr2')
+        server.start()
+        self.addCleanup(server.stop)
+        image_cache._peer_dirs[image_cache.INSTANCE_IMAGES] = peer_dir
+        server.announce(image_cache.INSTANCE_IMAGES,
+                        os.path.join(peer_dir, self.uuid), False,
+                        {'md5': 'abc'},
+                        {'md5': hashlib.md5(content).hexdigest()})
+
+        for i in range(3):
+            dest_path = os.path.join(self.master_dir, 'dest%d' % i)
+            self.cache.fetch_image(self.uuid, dest_path, force_raw=False)
+            image_cache._unlink_master(self.master_path)
+            with open(dest_path, 'rb') as f:
+                self.assertEqual(content, f.read())
+        self.assertEqual([], origin_bytes)
+        self.assertEqual(
+            ({}, 3 * len(content)),
+            self._metrics()[image_cache.PEER_BYTES_METRIC])
+
+        # Without the peer, the image comes from the image service
+        server.stop()
+        self.cache.fetch_image(self.uuid, self.dest_path, force_raw=False)
+        self.assertEqual([len(content)], origin_bytes)
+
+
+class TestBootImageCache(base.TestCase):
+
+    def setUp(self):
+        super(TestBootImageCache, self).setUp()
+        self.master_dir = tempfile.mkdtemp()
+        self.addCleanup(utils.rmtree_without_raise, self.master_dir)
+        self.config(boot_image_master_path=self.master_dir)
+        self.files_dir = tempfile.mkdtemp()
+        self.addCleanup(utils.rmtree_without_raise, self.files_dir)
+        for name in ('isolinux_bin', 'isolinux_config_template',
+                     'grub_config_template'):
+            path = os.path.join(self.files_dir, name)
+            with open(path, 'w') as f:
+                f.write(name)
+            self.config(**{name: path})
+        self.cache = image_cache.BootImageCache()
+        self.dest_path = os.path.join(self.files_dir, 'dest')
+        self.built = []
+
+    def _build(self, path):
+        self.built.append(path)
+        with open(path, 'w') as f:
+            f.write('image %d' % len(self.built))
+
+    def _read_dest(self):
+        with open(self.dest_path) as f:
+            return f.read()
+
+    @mock.patch.object(image_cache.ImageCache, '_clean_up_in_background',
+                       autospec=True)
+    def test_fetch_built_image(self, mock_clean_up):
+        self.assertTrue(self.cache.fetch_built_image('key', self.dest_path,
+                                                     self._build))
+        self.assertEqual('image 1', self._read_dest())
+        mock_clean_up.assert_called_once_with(self.cache)
+        # The destination is replaced by a link to the cached image
+        self.assertFalse(self.cache.fetch_built_image('key', self.dest_path,
+                                                      self._build))
+        self.assertEqual(1, len(self.built))
+        self.assertEqual(os.stat(self.dest_path).st_ino,
+                         os.stat(os.path.join(self.master_dir,
+                                              'key')).st_ino)
+        self.assertEqual(1, mock_clean_up.call_count)
+
+    @mock.patch.object(image_cache.ImageCache, '_clean_up_in_background',
+                       autospec=True)
+    @mock.patch.object(os, 'link', autospec=True)
+    def test_fetch_built_image_other_filesystem(self, mock_link,
+                                                mock_clean_up):
+        master_path = os.path.join(self.master_dir, 'key')
+        with open(master_path, 'w') as f:
+            f.write('cached')
+        mock_link.side_effect = OSError(errno.EXDEV, 'cross-device link')
+        self.assertFalse(self.cache.fetch_built_image('key', self.dest_path,
+                                                      self._build))
+        self.assertEqual('cached', self._read_dest())
+        mock_link.assert_called_once_with(master_path, self.dest_path)
+
+    @mock.patch.object(image_cache.ImageCache, '_clean_up_in_background',
+                       autospec=True)
+    def test_fetch_built_image_fails(self, mock_clean_up):
+        def _build(path):
+            raise exception.ImageCreationFailed(image_type='iso',
+                                                error='boom')
+        self.assertRaises(exception.ImageCreationFailed,
+                          self.cache.fetch_built_image, 'key',
+                          self.dest_path, _build)
+        self.assertEqual([], os.listdir(self.master_dir))
+
+    @mock.patch.object(image_cache.ImageCache, '_clean_up_in_background',
+                       autospec=True)
+    @mock.patch.object(images, 'create_boot_iso', autospec=True)
+    def test_create_boot_iso(self, mock_create, mock_clean_up):
+        mock_create.side_effect = (
+            lambda ctx, path, *args, **kwargs: self._build(path))
+        kernel = uuidutils.generate_uuid()
+        ramdisk = uuidutils.generate_uuid()
+        for node in range(3):
+            self.cache.create_boot_iso('ctx', self.dest_path, kernel, ramdisk,
+                                       'deploy-iso', 'root-uuid', 'params',
+                                       'bios')
+        self.assertEqual(1, mock_create.call_count)
+        mock_create.assert_called_once_with(
+            'ctx', mock.ANY, kernel, ramdisk, 'deploy-iso',
+            root_uuid='root-uuid', kernel_params='params', boot_mode='bios')
+
+        # Any input changes the ISO
+        self.cache.create_boot_iso('ctx', self.dest_path, kernel, ramdisk,
+                                   'deploy-iso', 'other-root', 'params',
+                                   'bios')
+        with open(os.path.join(self.files_dir, 'isolinux_config_template'),
+                  'w') as f:
+            f.write('changed')
+        self.cache.create_boot_iso('ctx', self.dest_path, kernel, ramdisk,
+                                   'deploy-iso', 'root-uuid', 'params',
+                                   'bios')
+        self.assertEqual(3, mock_create.call_count)
+        self.assertEqual('image 3', self._read_dest())
+
+    @mock.patch.object(image_cache.ImageCache, '_clean_up_in_background',
+                       autospec=True)
+    @mock.patch.object(images, 'image_show', autospec=True)
+    @mock.patch.object(images, 'create_boot_iso', autospec=True)
+    def test_create_boot_iso_uefi(self, mock_create, mock_show,
+                                  mock_clean_up):
+        mock_create.side_effect = (
+            lambda ctx, path, *args, **kwargs: self._build(path))
+        updated_at = datetime.datetime(2016, 2, 1)
+        mock_show.return_value = {'size': 42, 'updated_at': updated_at}
+        for node in range(2):
+            self.cache.create_boot_iso('ctx', self.dest_path,
+                                       'http://host/kernel',
+                                       'http://host/ramdisk',
+                                       'file:///deploy.iso', None, None,
+                                       'uefi')
+        self.assertEqual(1, mock_create.call_count)
+        mock_show.assert_any_call('ctx', 'file:///deploy.iso')
+
+        # A newer deploy ISO changes the boot ISO
+        mock_show.side_effect = lambda ctx, href: {
+            'size': 42,
+            'updated_at': (updated_at if href != 'file:///deploy.iso'
+                           else datetime.datetime(2016, 2, 2))}
+        self.cache.create_boot_iso('ctx', self.dest_path,
+                                   'http://host/kernel',
+                                   'http://host/ramdisk',
+                                   'file:///deploy.iso', None, None, 'uefi')
+        self.assertEqual(2, mock_create.call_count)
+
+    @mock.patch.object(images, 'image_show', autospec=True)
+    @mock.patch.object(images, 'create_boot_iso', autospec=True)
+    def test_create_boot_iso_unknown_input(self, mock_create, mock_show):
+        mock_show.return_value = {'size': 42, 'updated_at': None}
+        self.cache.create_boot_iso('ctx', self.dest_path,
+                                   'http://host/kernel',
+                                   'http://host/ramdisk', 'deploy-iso')
+        mock_create.assert_called_once_with(
+            'ctx', self.dest_path, 'http://host/kernel',
+            'http://host/ramdisk', 'deploy-iso', root_uuid=None,
+            kernel_params=None, boot_mode=None)
+        self.assertEqual([], self.cache._index.listing())
+
+
 class TestFetchCleanup(base.TestCase):
 
-    @mock.patch.object(images, 'converted_size', autospec=True)
+    @mock.patch.object(disk_utils, 'qemu_img_info', autospec=True)
     @mock.patch.object(images, 'fetch', autospec=True)
     @mock.patch.object(images, 'image_to_raw', autospec=True)
     @mock.patch.object(image_cache, '_clean_up_caches', autospec=True)
-    def test__fetch(self, mock_clean, mock_raw, mock_fetch, mock_size):
-        mock_size.return_value = 100
-        image_cache._fetch('fake', 'fake-uuid', '/foo/bar', force_raw=True)
+    def test__fetch(self, mock_clean, mock_raw, mock_fetch, mock_info):
+        mock_info.return_value.file_format = 'qcow2'
+        mock_info.return_value.virtual_size = 100
+        self.assertEqual(
+            mock_fetch.return_value,
+            image_cache._fetch('fake', 'fake-uuid', '/foo/bar',
+                               force_raw=True))
         mock_fetch.assert_called_once_with('fake', 'fake-uuid',
                                            '/foo/bar.part', force_raw=False)
+        mock_info.assert_called_once_with('/foo/bar.part')
         mock_clean.assert_called_once_with('/foo', 100)
         mock_raw.assert_called_once_with('fake-uuid', '/foo/bar',
-                                         '/foo/bar.part')
+                                         '/foo/bar.part',
+                                         mock_info.return_value)
+
+    @mock.patch.object(disk_utils, 'qemu_img_info', autospec=True)
+    @mock.patch.object(images, 'fetch', autospec=True)
+    @mock.patch.object(images, 'image_to_raw', autospec=True)
+    @mock.patch.object(image_cache, '_clean_up_caches', autospec=True)
+    def test__fetch_raw(self, mock_clean, mock_raw, mock_fetch, mock_info):
+        mock_info.return_value.file_format = 'raw'
+        mock_info.return_value.virtual_size = 100
+        image_cache._fetch('fake', 'fake-uuid', '/foo/bar', force_raw=True)
+        # A raw image is only renamed, it needs no more space
+        self.assertFalse(mock_clean.called)
+        mock_raw.assert_called_once_with('fake-uuid', '/foo/bar',
+                                         '/foo/bar.part',
+                                         mock_info.return_value)
+
+    @mock.patch.object(os, 'rename', autospec=True)
+    @mock.patch.object(disk_utils, 'qemu_img_info', autospec=True)
+    @mock.patch.object(images, 'fetch', autospec=True)
+    def test__fetch_not_raw(self, mock_fetch, mock_info, mock_rename):
+        image_cache._fetch('fake', 'fake-uuid', '/foo/bar', force_raw=False)
+        self.assertFalse(mock_info.called)
+        mock_rename.assert_called_once_with('/foo/bar.part', '/foo/bar')
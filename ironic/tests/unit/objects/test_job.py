@@ -0,0 +1,90 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from ironic import objects
+from ironic.tests.unit.db import base
+from ironic.tests.unit.db import utils
+
+
+class TestJobObject(base.DbTestCase):
+
+    def setUp(self):
+        super(TestJobObject, self).setUp()
+        self.fake_job = utils.get_test_job()
+
+    def test_get_by_uuid(self):
+        uuid = self.fake_job['uuid']
+        with mock.patch.object(self.dbapi, 'get_job_by_uuid',
+                               autospec=True) as mock_get_job:
+            mock_get_job.return_value = self.fake_job
+
+            job = objects.Job.get_by_uuid(self.context, uuid)
+
+            mock_get_job.assert_called_once_with(uuid)
+            self.assertEqual(self.context, job._context)
+            self.assertEqual('get_boot_device', job.method)
+
+    def test_create(self):
+        with mock.patch.object(self.dbapi, 'create_job',
+                               autospec=True) as mock_create_job:
+            mock_create_job.return_value = self.fake_job
+            job = objects.Job(self.context, uuid=self.fake_job['uuid'],
+                              method='get_boot_device', state='pending')
+            job.create()
+
+            mock_create_job.assert_called_once_with(
+                {'uuid': self.fake_job['uuid'], 'method': 'get_boot_device',
+                 'state': 'pending'})
+            self.assertEqual(self.fake_job['id'], job.id)
+
+    def test_save(self):
+        uuid = self.fake_job['uuid']
+        result = {'return': {'boot_device': 'pxe', 'persistent': False}}
+        with mock.patch.object(self.dbapi, 'get_job_by_uuid',
+                               autospec=True) as mock_get_job:
+            mock_get_job.return_value = self.fake_job
+            with mock.patch.object(self.dbapi, 'update_job',
+                                   autospec=True) as mock_update_job:
+                mock_update_job.return_value = utils.get_test_job(
+                    state='succeeded', result=result)
+                job = objects.Job.get_by_uuid(self.context, uuid)
+                job.state = 'succeeded'
+                job.result = result
+                job.save()
+
+                mock_update_job.assert_called_once_with(
+                    uuid, {'state': 'succeeded', 'result': result})
+                self.assertEqual(result, job.result)
+                self.assertEqual({}, job.obj_get_changes())
+
+    def test_refresh(self):
+        uuid = self.fake_job['uuid']
+        returns = [self.fake_job, utils.get_test_job(state='running')]
+        expected = [mock.call(uuid), mock.call(uuid)]
+        with mock.patch.object(self.dbapi, 'get_job_by_uuid',
+                               side_effect=returns,
+                               autospec=True) as mock_get_job:
+            job = objects.Job.get_by_uuid(self.context, uuid)
+            self.assertEqual('pending', job.state)
+            job.refresh()
+            self.assertEqual('running', job.state)
+            self.assertEqual(expected, mock_get_job.call_args_list)
+
+    def test_destroy_expired(self):
+        with mock.patch.object(self.dbapi, 'destroy_expired_jobs',
+                               autospec=True) as mock_destroy:
+            mock_destroy.return_value = 3
+            self.assertEqual(
+                3, objects.Job.destroy_expired(self.context, 60))
+            mock_destroy.assert_called_once_with(60)
@@ -13,11 +13,15 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+
 import mock
+from oslo_utils import uuidutils
 from testtools.matchers import HasLength
 
 from ironic.common import exception
 from ironic import objects
+from ironic.objects import base as objects_base
 from ironic.tests.unit.db import base
 from ironic.tests.unit.db import utils
 
@@ -155,6 +159,139 @@ class TestNodeObject(base.DbTestCase):
         node.properties = {"local_gb": "5G"}
         self.assertRaises(exception.InvalidParameterValue, node.create)
 
+    def test_create_many(self):
+        fake_node2 = utils.get_test_node(id=2, name='node-2',
+                                         uuid='1be26c0b-03f2-4d2e-ae87-'
+                                              'c02d7f33c782')
+        with mock.patch.object(self.dbapi, 'create_nodes',
+                               autospec=True) as mock_create_nodes:
+            mock_create_nodes.return_value = [self.fake_node, fake_node2]
+            nodes = [objects.Node(self.context, uuid=n['uuid'],
+                                  driver=n['driver'])
+                     for n in (self.fake_node, fake_node2)]
+            objects.Node.create_many(self.context, nodes)
+
+            self.assertEqual(1, mock_create_nodes.call_count)
+            self.assertEqual(
+                [self.fake_node['uuid'], fake_node2['uuid']],
+                [v['uuid'] for v in mock_create_nodes.call_args[0][0]])
+            self.assertEqual([self.fake_node['id'], 2], [n.id for n in nodes])
+            self.assertEqual('node-2', nodes[1].name)
+
+    def test_get_aggregates(self):
+        with mock.patch.object(self.dbapi, 'get_node_aggregates',
+                               autospec=True) as mock_aggregates:
+            mock_aggregates.return_value = [('active', 'fake', 3),
+                                            ('available', 'fake', 1)]
+            res = objects.Node.get_aggregates(
+                self.context, ['provision_state', 'driver'],
+                filters={'maintenance': False})
+
+            mock_aggregates.assert_called_once_with(
+                ['provision_state', 'driver'], filters={'maintenance': False})
+            self.assertEqual(
+                [{'provision_state': 'active', 'driver': 'fake', 'count': 3},
+                 {'provision_state': 'available', 'driver': 'fake',
+                  'count': 1}], res)
+
+    def test_get_changes(self):
+        time = datetime.datetime(2000, 1, 1, 12, 0, 0)
+        row = {'id': 7, 'node_uuid': self.fake_node['uuid'],
+               'power_state': 'power on', 'target_power_state': None,
+               'provision_state': 'deploying',
+               'target_provision_state': 'active', 'created_at': time}
+        with mock.patch.object(self.dbapi, 'get_node_changes',
+                               autospec=True) as mock_changes:
+            mock_changes.return_value = [mock.Mock(**row)]
+            res = objects.Node.get_changes(self.context, 5, limit=10)
+
+            mock_changes.assert_called_once_with(5, limit=10)
+            self.assertEqual(
+                [{'seq': 7, 'uuid': self.fake_node['uuid'],
+                  'power_state': 'power on', 'target_power_state': None,
+                  'provision_state': 'deploying',
+                  'target_provision_state': 'active',
+                  'changed_at': time}], res)
+
+    def test_get_last_change_seq(self):
+        with mock.patch.object(self.dbapi, 'get_last_node_change_seq',
+                               autospec=True) as mock_seq:
+            mock_seq.return_value = 42
+            self.assertEqual(42,
+                             objects.Node.get_last_change_seq(self.context))
+            mock_seq.assert_called_once_with()
+
+    def test_get_first_change_seq(self):
+        with mock.patch.object(self.dbapi, 'get_first_node_change_seq',
+                               autospec=True) as mock_seq:
+            mock_seq.return_value = 7
+            self.assertEqual(7,
+                             objects.Node.get_first_change_seq(self.context))
+            mock_seq.assert_called_once_with()
+
+    def test_destroy_old_changes(self):
+        with mock.patch.object(self.dbapi, 'destroy_old_node_changes',
+                               autospec=True) as mock_destroy:
+            mock_destroy.return_value = 2
+            self.assertEqual(
+                2, objects.Node.destroy_old_changes(self.context, 600))
+            mock_destroy.assert_called_once_with(600)
+
+    def test_obj_to_delta_primitive(self):
+        uuid = self.fake_node['uuid']
+        with mock.patch.object(self.dbapi, 'get_node_by_uuid',
+                               autospec=True) as mock_get_node:
+            mock_get_node.return_value = self.fake_node
+            node = objects.Node.get(self.context, uuid)
+            self.assertTrue(node.obj_can_send_delta())
+            node.extra = {'foo': 'bar'}
+            primitive = node.obj_to_delta_primitive()
+            self.assertEqual({'uuid': uuid, 'extra': {'foo': 'bar'}},
+                             primitive['ironic_object.data'])
+            self.assertEqual(['extra'], primitive['ironic_object.changes'])
+            self.assertEqual(node.VERSION,
+                             primitive['ironic_object.version'])
+            self.assertTrue(primitive['ironic_object.delta'])
+
+    def test_obj_can_send_delta_new_node(self):
+        node = objects.Node(self.context, uuid=self.fake_node['uuid'])
+        self.assertFalse(node.obj_can_send_delta())
+
+    def test_delta_serialization(self):
+        uuid = self.fake_node['uuid']
+        serializer = objects_base.IronicObjectSerializer()
+        with mock.patch.object(self.dbapi, 'get_node_by_uuid',
+                               autospec=True) as mock_get_node:
+            mock_get_node.return_value = self.fake_node
+            node = objects.Node.get(self.context, uuid)
+            node.extra = {'foo': 'bar'}
+            node.maintenance = True
+            primitive = serializer.serialize_entity(
+                self.context, node.obj_to_delta_primitive())
+            mock_get_node.reset_mock()
+
+            result = serializer.deserialize_entity(self.context, primitive)
+
+            mock_get_node.assert_called_once_with(uuid)
+            self.assertIsInstance(result, objects.Node)
+            self.assertEqual(self.context, result._context)
+            self.assertEqual({'extra', 'maintenance'},
+                             result.obj_what_changed())
+            self.assertEqual({'foo': 'bar'}, result.extra)
+            self.assertTrue(result.maintenance)
+            self.assertEqual(self.fake_node['driver_internal_info'],
+                             result.driver_internal_info)
+
+    def test_create_many_with_invalid_properties(self):
+        nodes = [objects.Node(self.context, **self.fake_node),
+                 objects.Node(self.context, uuid=uuidutils.generate_uuid(),
+                              properties={"local_gb": "5G"})]
+        with mock.patch.object(self.dbapi, 'create_nodes',
+                               autospec=True) as mock_create_nodes:
+            self.assertRaises(exception.InvalidParameterValue,
+                              objects.Node.create_many, self.context, nodes)
+            self.assertFalse(mock_create_nodes.called)
+
     def test_update_with_invalid_properties(self):
         uuid = self.fake_node['uuid']
         with mock.patch.object(self.dbapi, 'get_node_by_uuid',
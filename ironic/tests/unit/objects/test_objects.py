@@ -404,11 +404,12 @@ class TestObject(_LocalTest, _TestObject):
 # version bump. It is md5 hash of object fields and remotable methods.
 # The fingerprint values should only be changed if there is a version bump.
 expected_object_fingerprints = {
-    'Node': '1.14-9ee8ab283b06398545880dfdedb49891',
+    'Node': '1.17-9ee8ab283b06398545880dfdedb49891',
     'MyObj': '1.5-4f5efe8f0fcaf182bbe1c7fe3ba858db',
     'Chassis': '1.3-d656e039fd8ae9f34efc232ab3980905',
-    'Port': '1.4-f5aa3ff81d1459d6d7e6d9d9dceed351',
-    'Conductor': '1.0-5091f249719d4a465062a1b3dc7f860d'
+    'Port': '1.5-f5aa3ff81d1459d6d7e6d9d9dceed351',
+    'Conductor': '1.0-5091f249719d4a465062a1b3dc7f860d',
+    'Job': '1.0-9f2c0076d23eebf3b6e13897f94e4574'
 }
 
 
@@ -66,6 +66,25 @@ class TestPortObject(base.DbTestCase):
         self.assertRaises(exception.InvalidIdentity,
                           objects.Port.get, self.context, 'not-a-uuid')
 
+    def test_create_many(self):
+        fake_port2 = utils.get_test_port(id=2, address='52:54:00:cf:2d:32',
+                                         uuid='1be26c0b-03f2-4d2e-ae87-'
+                                              'c02d7f33c782')
+        with mock.patch.object(self.dbapi, 'create_ports',
+                               autospec=True) as mock_create_ports:
+            mock_create_ports.return_value = [self.fake_port, fake_port2]
+            ports = [objects.Port(self.context, address=p['address'],
+                                  uuid=p['uuid'], node_id=p['node_id'])
+                     for p in (self.fake_port, fake_port2)]
+            objects.Port.create_many(self.context, ports)
+
+            self.assertEqual(1, mock_create_ports.call_count)
+            self.assertEqual(
+                ['52:54:00:cf:2d:31', '52:54:00:cf:2d:32'],
+                [v['address'] for v in mock_create_ports.call_args[0][0]])
+            self.assertEqual([self.fake_port['id'], 2], [p.id for p in ports])
+            self.assertEqual({}, ports[1].obj_get_changes())
+
     def test_save(self):
         uuid = self.fake_port['uuid']
         address = "b2:54:00:cf:2d:40"
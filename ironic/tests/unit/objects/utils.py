@@ -97,3 +97,30 @@ def create_test_chassis(ctxt, **kw):
     chassis = get_test_chassis(ctxt, **kw)
     chassis.create()
     return chassis
+
+
+def get_test_job(ctxt, **kw):
+    """Return a Job object with appropriate attributes.
+
+    NOTE: The object leaves the attributes marked as changed, such
+    that a create() could be used to commit it to the DB.
+    """
+    db_job = db_utils.get_test_job(**kw)
+    # Let DB generate ID if it isn't specified explicitly
+    if 'id' not in kw:
+        del db_job['id']
+    job = objects.Job(ctxt)
+    for key in db_job:
+        setattr(job, key, db_job[key])
+    return job
+
+
+def create_test_job(ctxt, **kw):
+    """Create and return a test job object.
+
+    Create a job in the DB and return a Job object with appropriate
+    attributes.
+    """
+    job = get_test_job(ctxt, **kw)
+    job.create()
+    return job
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the time needed to render a page of nodes or ports.
+
+Compares the WSME based rendering (convert_with_links() followed by
+wsme.rest.json.encode_result()) with the serializers of
+ironic.api.controllers.v1.serializer. No database is needed: the RPC
+objects are built in memory and the pecan request is faked.
+
+Example::
+
+    python tools/benchmark_api_serializer.py --count 1000 --repeat 5
+"""
+
+from __future__ import print_function
+
+import optparse
+import os
+import sys
+import timeit
+
+top_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                       os.pardir))
+sys.path.insert(0, top_dir)
+
+import pecan  # noqa
+from wsme.rest import json as wsme_json  # noqa
+
+from ironic.api.controllers import base as api_base  # noqa
+from ironic.api.controllers import v1 as api_v1  # noqa
+from ironic.api.controllers.v1 import node as api_node  # noqa
+from ironic.api.controllers.v1 import port as api_port  # noqa
+from ironic.common import context as ironic_context  # noqa
+from ironic import objects  # noqa
+from ironic.tests.unit.db import utils as db_utils  # noqa
+
+
+class FakeRequest(object):
+
+    def __init__(self, version, show_password):
+        self.public_url = 'http://127.0.0.1:6385'
+        self.version = version
+        self.context = ironic_context.RequestContext(
+            show_password=show_password)
+
+
+def make_nodes(context, count):
+    nodes = []
+    for i in range(count):
+        db_node = db_utils.get_test_node(
+            id=i + 1, uuid='1be26c0b-03f2-4d2e-ae87-%012d' % i,
+            driver_info={'ipmi_address': '10.0.0.%d' % (i % 250),
+                         'ipmi_username': 'admin',
+                         'ipmi_password': 'secret'},
+            chassis_id=None)
+        nodes.append(objects.Node._from_db_object(objects.Node(context),
+                                                  db_node))
+    return nodes
+
+
+def make_ports(context, count):
+    ports = []
+    for i in range(count):
+        db_port = db_utils.get_test_port(
+            id=i + 1, uuid='6eb02b44-18a3-4659-8c0b-%012d' % i,
+            address='52:54:00:%02x:%02x:%02x' % (i >> 16 & 0xff,
+                                                 i >> 8 & 0xff, i & 0xff),
+            node_id=None)
+        ports.append(objects.Port._from_db_object(objects.Port(context),
+                                                  db_port))
+    return ports
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-c', '--count', type='int', default=1000,
+                      help='number of objects in the page [default: %default]')
+    parser.add_option('-r', '--repeat', type='int', default=5,
+                      help='number of measurements [default: %default]')
+    parser.add_option('--show-password', action='store_true', default=False,
+                      help='render driver_info without masking it')
+    parser.add_option('--version', default=str(api_v1.MAX_VER),
+                      help='API version to emulate [default: %default]')
+    options, _args = parser.parse_args()
+
+    version = api_base.Version(
+        {api_base.Version.string: options.version},
+        str(api_v1.MIN_VER), str(api_v1.MAX_VER))
+    request = FakeRequest(version, options.show_password)
+    # NOTE: the API code only accesses the request through pecan.request
+    pecan.request = request
+    nodes = make_nodes(request.context, options.count)
+    ports = make_ports(request.context, options.count)
+
+    def wsme_nodes():
+        collection = api_node.NodeCollection.convert_with_links(
+            nodes, options.count)
+        return wsme_json.encode_result(collection, api_node.NodeCollection)
+
+    def fast_nodes():
+        return api_node.NodeSerializer().collection_to_json(nodes,
+                                                            options.count)
+
+    def wsme_ports():
+        collection = api_port.PortCollection.convert_with_links(
+            ports, options.count)
+        return wsme_json.encode_result(collection, api_port.PortCollection)
+
+    def fast_ports():
+        return api_port.PortSerializer().collection_to_json(ports,
+                                                            options.count)
+
+    print('Rendering %d objects, API version %s, best of %d runs'
+          % (options.count, options.version, options.repeat))
+    for name, reference, candidate in (('nodes', wsme_nodes, fast_nodes),
+                                       ('ports', wsme_ports, fast_ports)):
+        if reference() != candidate():
+            print('WARNING: the %s documents differ' % name)
+        before = min(timeit.repeat(reference, number=1,
+                                   repeat=options.repeat))
+        after = min(timeit.repeat(candidate, number=1,
+                                  repeat=options.repeat))
+        print('%-6s WSME: %8.1f ms  serializer: %8.1f ms  (x%.1f)'
+              % (name, before * 1000, after * 1000, before / after))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
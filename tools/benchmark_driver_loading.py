@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the time and memory needed to load the enabled drivers.
+
+Each measure runs in a new process and reports the time spent and the
+increase of the maximum resident set size (RSS) of the process:
+
+* stevedore: what the DriverFactory used to do, loading all the drivers of
+  the "ironic.drivers" namespace and keeping the enabled ones;
+* names: creating a DriverFactory, which only finds the enabled drivers;
+* one: loading the first enabled driver;
+* all: loading all the enabled drivers, as the conductor does on start.
+
+Example::
+
+    python tools/benchmark_driver_loading.py --drivers fake,pxe_ipmitool
+"""
+
+from __future__ import print_function
+
+import optparse
+import os
+import resource
+import subprocess
+import sys
+import time
+
+top_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                       os.pardir))
+sys.path.insert(0, top_dir)
+
+# Ten drivers without requirements other than the ones of ironic
+DEFAULT_DRIVERS = ['fake', 'fake_agent', 'fake_pxe', 'fake_ssh', 'fake_wol',
+                   'fake_msftocs', 'agent_ssh', 'agent_wol', 'pxe_ssh',
+                   'pxe_wol']
+
+MODES = ('stevedore', 'names', 'one', 'all')
+
+
+def _max_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(mode, drivers):
+    """Load the drivers in this process, print the time and RSS used."""
+    from oslo_config import cfg
+
+    from ironic.common import driver_factory
+
+    cfg.CONF([], project='ironic')
+    cfg.CONF.set_override('enabled_drivers', drivers)
+
+    rss = _max_rss_kb()
+    start = time.time()
+    if mode == 'stevedore':
+        from stevedore import dispatch
+        dispatch.NameDispatchExtensionManager(
+            'ironic.drivers', lambda ext: ext.name in drivers,
+            invoke_on_load=True,
+            on_load_failure_callback=lambda mgr, ep, exc: None)
+    elif mode == 'names':
+        driver_factory.DriverFactory()
+    elif mode == 'one':
+        driver_factory.get_driver(drivers[0])
+    else:
+        driver_factory.drivers()
+    print('%.1f %d' % ((time.time() - start) * 1000, _max_rss_kb() - rss))
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-d', '--drivers', default=','.join(DEFAULT_DRIVERS),
+                      help='comma-separated list of enabled drivers '
+                           '[default: %default]')
+    parser.add_option('-r', '--repeat', type='int', default=3,
+                      help='number of processes per measure, the best one '
+                           'is reported [default: %default]')
+    parser.add_option('--measure', choices=MODES, help=optparse.SUPPRESS_HELP)
+    options, _args = parser.parse_args()
+    drivers = options.drivers.split(',')
+
+    if options.measure:
+        measure(options.measure, drivers)
+        return
+
+    print('Loading %d drivers, best of %d processes'
+          % (len(drivers), options.repeat))
+    print('%-10s %10s %10s' % ('', 'time (ms)', 'RSS (KiB)'))
+    for mode in MODES:
+        results = []
+        for _i in range(options.repeat):
+            output = subprocess.check_output(
+                [sys.executable, __file__, '--measure', mode,
+                 '--drivers', options.drivers])
+            elapsed, rss = output.decode().split()[-2:]
+            results.append((float(elapsed), int(rss)))
+        elapsed, rss = min(results)
+        print('%-10s %10.1f %10d' % (mode, elapsed, rss))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the cost of sending a changed node to a conductor over RPC.
+
+Compares the full serialization of a node (obj_to_primitive()) with the
+delta serialization (obj_to_delta_primitive()) used by update_node and
+object_action since RPC API 1.34: size of the JSON message, time to encode
+it and time to decode it. Decoding a delta includes loading the node back,
+which is done from memory here; add the time of one database query by
+primary key to get the real cost.
+
+Example::
+
+    python tools/benchmark_rpc_serializer.py --steps 200 --repeat 1000
+"""
+
+from __future__ import print_function
+
+import optparse
+import os
+import sys
+import timeit
+
+top_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                       os.pardir))
+sys.path.insert(0, top_dir)
+
+import mock  # noqa
+from oslo_serialization import jsonutils  # noqa
+
+from ironic.common import context as ironic_context  # noqa
+from ironic import objects  # noqa
+from ironic.objects import base as objects_base  # noqa
+from ironic.tests.unit.db import utils as db_utils  # noqa
+
+
+def make_db_node(steps):
+    """Build a node row with large JSON fields, as seen during cleaning."""
+    clean_steps = [{'interface': 'deploy', 'step': 'erase_devices_%d' % i,
+                    'priority': i, 'args': {'passes': 3}}
+                   for i in range(steps)]
+    logical_disks = [{'size_gb': 100 + i, 'raid_level': '1',
+                      'controller': 'RAID.Integrated.1-1',
+                      'physical_disks': ['Disk.Bay.%d' % i,
+                                         'Disk.Bay.%d' % (i + 1)]}
+                     for i in range(steps)]
+    return db_utils.get_test_node(
+        driver_internal_info={'clean_steps': clean_steps,
+                              'clean_step_index': 0,
+                              'agent_url': 'http://10.0.0.1:9999'},
+        instance_info={'image_source': 'glance://image-uuid',
+                       'root_gb': 10, 'configdrive': 'x' * 4096},
+        properties={'cpus': 16, 'memory_mb': 65536, 'local_gb': 1024},
+        raid_config={'logical_disks': logical_disks},
+        target_raid_config={'logical_disks': logical_disks},
+        extra={'rack': 'r1', 'position': 12})
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-s', '--steps', type='int', default=100,
+                      help='number of clean steps and logical disks of the '
+                           'node [default: %default]')
+    parser.add_option('-r', '--repeat', type='int', default=1000,
+                      help='number of serializations measured '
+                           '[default: %default]')
+    options, _args = parser.parse_args()
+
+    context = ironic_context.RequestContext(is_admin=True)
+    db_node = make_db_node(options.steps)
+    node = objects.Node._from_db_object(objects.Node(context), db_node)
+    node.extra = dict(node.extra, maintainer='ops')
+    serializer = objects_base.IronicObjectSerializer()
+
+    def full_encode():
+        return jsonutils.dumps(serializer.serialize_entity(context, node))
+
+    def delta_encode():
+        return jsonutils.dumps(serializer.serialize_entity(
+            context, node.obj_to_delta_primitive()))
+
+    full_message = full_encode()
+    delta_message = delta_encode()
+
+    def full_decode():
+        return serializer.deserialize_entity(context,
+                                             jsonutils.loads(full_message))
+
+    def delta_decode():
+        return serializer.deserialize_entity(context,
+                                             jsonutils.loads(delta_message))
+
+    def get_by_uuid(cls, context, uuid):
+        return cls._from_db_object(cls(context), db_node)
+
+    with mock.patch.object(objects.Node, 'get_by_uuid',
+                           classmethod(get_by_uuid)):
+        if delta_decode().extra != full_decode().extra:
+            print('WARNING: the decoded nodes differ')
+
+        print('Sending a node with %d clean steps, best of %d runs'
+              % (options.steps, options.repeat))
+        print('%-6s %10s %12s %12s' % ('', 'size (B)', 'encode (us)',
+                                       'decode (us)'))
+        for name, message, encode, decode in (
+                ('full', full_message, full_encode, full_decode),
+                ('delta', delta_message, delta_encode, delta_decode)):
+            encode_time = min(timeit.repeat(encode, number=1,
+                                            repeat=options.repeat))
+            decode_time = min(timeit.repeat(decode, number=1,
+                                            repeat=options.repeat))
+            print('%-6s %10d %12.1f %12.1f' % (name, len(message),
+                                               encode_time * 1e6,
+                                               decode_time * 1e6))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
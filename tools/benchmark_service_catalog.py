@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Count the Keystone requests done by a wave of deployments.
+
+A stand-in Keystone client replaces keystoneclient: creating it counts as
+one authentication request and takes --latency milliseconds, and its
+token is considered about to expire after --token-uses uses, to simulate
+a wave of deployments lasting longer than the token lifetime. Each
+deployment looks up the Bare Metal API endpoint (as build_agent_options()
+does) and the Networking endpoint once per port (as the neutron DHCP
+provider does). The wave is run with [keystone]catalog_cache_ttl set to 0
+and to --ttl.
+
+Example::
+
+    python tools/benchmark_service_catalog.py --nodes 100 --latency 20
+"""
+
+from __future__ import print_function
+
+import optparse
+import os
+import sys
+import time
+
+top_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                       os.pardir))
+sys.path.insert(0, top_dir)
+
+import mock  # noqa
+from oslo_config import cfg  # noqa
+
+from ironic.common import keystone  # noqa
+
+CONF = cfg.CONF
+
+ENDPOINTS = {'baremetal': 'http://192.0.2.1:6385',
+             'network': 'http://192.0.2.1:9696'}
+
+
+class StandInKeystone(object):
+    """Counts the requests done to a pretend Keystone."""
+
+    def __init__(self, latency, token_uses):
+        self.latency = latency
+        self.token_uses = token_uses
+        self.authentications = 0
+        self.catalog_lookups = 0
+
+    def client(self, **kwargs):
+        self.authentications += 1
+        time.sleep(self.latency)
+        return StandInClient(self)
+
+
+class StandInClient(object):
+
+    def __init__(self, keystone):
+        self.auth_token = 'token-%d' % keystone.authentications
+        self.auth_ref = self
+        self.service_catalog = self
+        self._keystone = keystone
+        self._uses = 0
+
+    def will_expire_soon(self, stale_duration=None):
+        self._uses += 1
+        return self._uses > self._keystone.token_uses
+
+    def has_service_catalog(self):
+        return True
+
+    def url_for(self, service_type, endpoint_type, region_name):
+        self._keystone.catalog_lookups += 1
+        return ENDPOINTS[service_type]
+
+
+def deploy_wave(nodes, ports):
+    for node in range(nodes):
+        keystone.get_service_url()
+        for port in range(ports):
+            keystone.get_service_url(service_type='network')
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-n', '--nodes', type='int', default=100,
+                      help='number of nodes deployed [default: %default]')
+    parser.add_option('-p', '--ports', type='int', default=2,
+                      help='number of ports of each node [default: %default]')
+    parser.add_option('-l', '--latency', type='float', default=20,
+                      help='duration (ms) of an authentication request '
+                           '[default: %default]')
+    parser.add_option('-u', '--token-uses', type='int', default=50,
+                      help='number of uses of the admin token before it '
+                           'is about to expire [default: %default]')
+    parser.add_option('-t', '--ttl', type='int', default=600,
+                      help='value of [keystone]catalog_cache_ttl compared '
+                           'with 0 [default: %default]')
+    options, _args = parser.parse_args()
+
+    CONF([], project='ironic')
+    CONF.set_override('auth_uri', 'http://192.0.2.1:5000/',
+                      group='keystone_authtoken')
+    CONF.set_override('auth_version', 'v2.0', group='keystone_authtoken')
+
+    print('Deploying %d nodes with %d ports each'
+          % (options.nodes, options.ports))
+    print('%-6s %15s %15s %12s' % ('ttl', 'authentications', 'catalog walks',
+                                   'time (ms)'))
+    for ttl in (0, options.ttl):
+        CONF.set_override('catalog_cache_ttl', ttl, group='keystone')
+        keystone.clear_caches()
+        stand_in = StandInKeystone(options.latency / 1000.0,
+                                   options.token_uses)
+        with mock.patch('keystoneclient.v2_0.client.Client',
+                        stand_in.client):
+            start = time.time()
+            deploy_wave(options.nodes, options.ports)
+            elapsed = time.time() - start
+        print('%-6d %15d %15d %12.1f' % (ttl, stand_in.authentications,
+                                         stand_in.catalog_lookups,
+                                         elapsed * 1000))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
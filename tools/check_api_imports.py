@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Check the modules imported by an API worker and the time it takes.
+
+Imports ironic.cmd.api and the API controllers in a new process, like
+"python -X importtime" does: for each module it reports the time spent
+importing the module itself and including the modules it imports. Fails
+if a module which is only needed by the conductor is imported, or if the
+total import time or the number of imported modules exceeds its budget.
+
+Example::
+
+    python tools/check_api_imports.py --budget-ms 2000 --top 20
+"""
+
+from __future__ import print_function
+
+import json
+import optparse
+import os
+import subprocess
+import sys
+import time
+
+top_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                       os.pardir))
+
+# The modules imported by an API worker
+API_MODULES = ['ironic.cmd.api', 'ironic.api.app',
+               'ironic.api.controllers.root', 'ironic.api.controllers.v1']
+
+# Modules (and their sub-modules) the API service must not import
+FORBIDDEN_MODULES = ['ironic.common.driver_factory', 'ironic.common.images',
+                     'ironic.common.swift', 'ironic.conductor.base_manager',
+                     'ironic.conductor.manager',
+                     'ironic.conductor.task_manager',
+                     'ironic.conductor.utils', 'ironic.drivers',
+                     'ironic_lib']
+
+
+def is_forbidden(name):
+    return any(name == module or name.startswith(module + '.')
+               for module in FORBIDDEN_MODULES)
+
+
+def _timed_imports(modules):
+    """Import modules, return the import times of all the new modules.
+
+    :returns: a list of (module name, self time, cumulative time) tuples,
+              the times in milliseconds, in import order.
+    """
+    try:
+        import builtins
+    except ImportError:
+        import __builtin__ as builtins
+    real_import = builtins.__import__
+    timings = []
+    # Stack of [name, start time, time spent in nested imports]
+    stack = []
+
+    def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if name not in sys.modules:
+            new = [name]
+        else:
+            # "from package import module" imports the module without
+            # calling __import__ again
+            new = ['%s.%s' % (name, item) for item in fromlist or ()
+                   if '%s.%s' % (name, item) not in sys.modules]
+        if not new:
+            return real_import(name, globals, locals, fromlist, level)
+        stack.append([', '.join(new), time.time(), 0.0])
+        try:
+            return real_import(name, globals, locals, fromlist, level)
+        finally:
+            label, start, nested = stack.pop()
+            elapsed = time.time() - start
+            if stack:
+                stack[-1][2] += elapsed
+            if any(module in sys.modules for module in new):
+                timings.append((label, (elapsed - nested) * 1000,
+                                elapsed * 1000))
+
+    builtins.__import__ = timed_import
+    try:
+        for module in modules:
+            __import__(module)
+    finally:
+        builtins.__import__ = real_import
+    return timings
+
+
+def measure():
+    """Import the API modules, print the results as JSON."""
+    sys.path.insert(0, top_dir)
+    start = time.time()
+    timings = _timed_imports(API_MODULES)
+    print(json.dumps({'total': (time.time() - start) * 1000,
+                      'modules': sorted(sys.modules),
+                      'timings': timings}))
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-b', '--budget-ms', type='float', default=None,
+                      help='maximum total import time, in milliseconds '
+                           '[default: no limit]')
+    parser.add_option('-m', '--max-modules', type='int', default=None,
+                      help='maximum number of modules loaded '
+                           '[default: no limit]')
+    parser.add_option('-t', '--top', type='int', default=15,
+                      help='number of slowest imports shown '
+                           '[default: %default]')
+    parser.add_option('-r', '--repeat', type='int', default=3,
+                      help='number of processes, the fastest one is '
+                           'reported [default: %default]')
+    parser.add_option('--measure', action='store_true',
+                      help=optparse.SUPPRESS_HELP)
+    options, _args = parser.parse_args()
+
+    if options.measure:
+        measure()
+        return 0
+
+    results = []
+    for _i in range(options.repeat):
+        output = subprocess.check_output([sys.executable, __file__,
+                                          '--measure'])
+        results.append(json.loads(output.decode().splitlines()[-1]))
+    result = min(results, key=lambda r: r['total'])
+
+    print('%10s %10s  %s' % ('self (ms)', 'cumul (ms)', 'module'))
+    timings = sorted(result['timings'], key=lambda t: t[1], reverse=True)
+    for name, self_time, cumulative in timings[:options.top]:
+        print('%10.1f %10.1f  %s' % (self_time, cumulative, name))
+    print('Total: %.1f ms, %d modules loaded' % (result['total'],
+                                                 len(result['modules'])))
+
+    errors = []
+    forbidden = [m for m in result['modules'] if is_forbidden(m)]
+    if forbidden:
+        errors.append('modules only needed by the conductor are imported: '
+                      '%s' % ', '.join(forbidden))
+    if (options.budget_ms is not None and
+            result['total'] > options.budget_ms):
+        errors.append('import time %.1f ms exceeds the budget of %.1f ms'
+                      % (result['total'], options.budget_ms))
+    if (options.max_modules is not None and
+            len(result['modules']) > options.max_modules):
+        errors.append('%d modules loaded, more than the budget of %d'
+                      % (len(result['modules']), options.max_modules))
+    for error in errors:
+        print('ERROR: %s' % error, file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())